@@ -0,0 +1,75 @@
+"""
+Background tasks for account registration.
+These run in the task worker instead of the registration request.
+"""
+from django.conf import settings
+from django.utils import timezone
+
+from core.tasks import background_task
+
+from .models import CustomUser, EmailVerificationToken, RoleChoices
+
+
+@background_task
+def send_verification_email(user_id):
+    """
+    Send the email verification link to a newly registered user.
+    Errors propagate so the worker retries; retries reuse the still-valid token.
+    """
+    user = CustomUser.objects.filter(id=user_id).first()
+    if user is None or user.email_verified:
+        return
+
+    verification_token = (
+        EmailVerificationToken.objects
+        .filter(user=user, used=False, expires_at__gt=timezone.now())
+        .order_by('-created_at')
+        .first()
+    )
+    if verification_token is None:
+        # Create verification token (24 hour expiration)
+        verification_token = EmailVerificationToken.create_for_user(user, expiration_hours=24)
+
+    # Import here to avoid circular imports
+    from .utils import send_email_verification
+
+    send_email_verification(user, verification_token.token)
+
+
+@background_task
+def notify_super_admins_of_new_user(user_id):
+    """Send real-time notification to all super admins about a new registration."""
+    # Import here to avoid circular imports
+    from notifications.models import NotificationType
+    from notifications.utils import send_notification_to_multiple_users
+
+    user = CustomUser.objects.filter(id=user_id).first()
+    if user is None:
+        return
+
+    super_admins = CustomUser.objects.filter(role=RoleChoices.SUPER_ADMIN)
+    if not super_admins.exists():
+        return
+
+    title = "New User Registration"
+    body = f"A new {user.get_role_display()} has registered: {user.full_name} ({user.email})"
+
+    # Pointing to Django admin on backend; swap for a frontend URL if one exists
+    backend_url = getattr(settings, 'BACKEND_URL', 'http://localhost:8000')
+    action_url = f"{backend_url}/admin/accounts/customuser/{user.id}/change/"
+
+    send_notification_to_multiple_users(
+        users=super_admins,
+        title=title,
+        body=body,
+        notification_type=NotificationType.USER_REGISTRATION,
+        action_url=action_url,
+        metadata={
+            'user_id': user.id,
+            'user_email': user.email,
+            'user_full_name': user.full_name,
+            'user_role': user.role,
+            'admin_url': action_url,  # Full Django admin URL
+            'frontend_path': f'/admin/users/{user.id}',  # Suggested frontend path
+        }
+    )
@@ -1,3 +1,85 @@
+from unittest import mock
+
+from django.core import mail
 from django.test import TestCase
 
-# Create your tests here.
+from core.models import OutboxTask
+from core.tasks import run_pending_tasks
+from notifications.models import Notification, NotificationType
+from .models import CustomUser, EmailVerificationToken, RoleChoices
+
+
+class RegistrationSideEffectsTestCase(TestCase):
+    """Registration queues its emails and notifications instead of sending them inline"""
+
+    def setUp(self):
+        self.admin = CustomUser.objects.create_user(
+            email='admin@test.com',
+            password='testpass123',
+            full_name='Admin User',
+            role=RoleChoices.SUPER_ADMIN,
+        )
+        # Drop the tasks queued for the admin account itself
+        OutboxTask.objects.all().delete()
+        mail.outbox = []
+
+    def register(self):
+        return CustomUser.objects.create_user(
+            email='student@test.com',
+            password='testpass123',
+            full_name='Student User',
+            role=RoleChoices.STUDENT,
+        )
+
+    def test_registration_queues_tasks(self):
+        """Test that no email is sent and no notification is created during registration"""
+        user = self.register()
+
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertFalse(EmailVerificationToken.objects.filter(user=user).exists())
+        self.assertFalse(Notification.objects.filter(type=NotificationType.USER_REGISTRATION).exists())
+        self.assertEqual(
+            sorted(OutboxTask.objects.values_list('name', flat=True)),
+            ['accounts.tasks.notify_super_admins_of_new_user', 'accounts.tasks.send_verification_email'],
+        )
+        self.assertTrue(all(task.payload == {'user_id': user.id} for task in OutboxTask.objects.all()))
+
+    def test_worker_runs_registration_tasks(self):
+        """Test that the worker sends the verification email and the admin notification"""
+        user = self.register()
+
+        self.assertEqual(run_pending_tasks(), (2, 0))
+
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, [user.email])
+        token = EmailVerificationToken.objects.get(user=user)
+        self.assertIn(token.token, mail.outbox[0].body)
+        self.assertTrue(
+            Notification.objects.filter(
+                user=self.admin,
+                type=NotificationType.USER_REGISTRATION,
+                metadata__user_id=user.id,
+            ).exists()
+        )
+        self.assertFalse(OutboxTask.objects.exists())
+
+    def test_failed_email_is_retried_with_same_token(self):
+        """Test that an SMTP failure keeps the task queued and the retry reuses the token"""
+        user = self.register()
+        task = OutboxTask.objects.get(name='accounts.tasks.send_verification_email')
+
+        with mock.patch('accounts.utils.send_mail', side_effect=OSError('SMTP down')):
+            run_pending_tasks()
+
+        task.refresh_from_db()
+        self.assertEqual(task.attempts, 1)
+        self.assertIn('SMTP down', task.last_error)
+        token = EmailVerificationToken.objects.get(user=user)
+
+        # Make the retry due now
+        OutboxTask.objects.filter(id=task.id).update(run_after=task.created_at)
+        run_pending_tasks()
+
+        self.assertFalse(OutboxTask.objects.exists())
+        self.assertEqual(EmailVerificationToken.objects.filter(user=user).count(), 1)
+        self.assertIn(token.token, mail.outbox[0].body)
@@ -26,6 +26,7 @@ env = environ.Env(
     EMAIL_HOST_PASSWORD=(str, ''),
     DEFAULT_FROM_EMAIL=(str, ''),
     SERVER_EMAIL=(str, ''),
+    TASK_QUEUE_BACKEND=(str, 'outbox'),  # 'outbox' needs `manage.py run_task_worker`; 'immediate' runs tasks after commit
 )
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -185,6 +186,19 @@ STATIC_ROOT = BASE_DIR / 'staticfiles'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Partial SFU recordings while they are downloaded/uploaded (see course/recordings.py).
+# Must be shared by the web and task worker processes and not be publicly served.
+RECORDING_INGEST_DIR = env('RECORDING_INGEST_DIR', default=str(BASE_DIR / 'recording_ingest'))
+
+# Protected media (library PDFs, recordings, session resources), see core/media.py.
+# 'django' streams files with Range support; 'nginx' hands them off with X-Accel-Redirect
+# to the internal location below; 'sendfile' uses X-Sendfile (Apache/lighttpd).
+PROTECTED_MEDIA_BACKEND = env('PROTECTED_MEDIA_BACKEND', default='django')
+PROTECTED_MEDIA_INTERNAL_URL = env('PROTECTED_MEDIA_INTERNAL_URL', default='/protected-media/')
+# Lifetime of signed media links handed to players and PDF viewers
+PROTECTED_MEDIA_TOKEN_MAX_AGE = 60 * 60 * 6
+PROTECTED_MEDIA_CACHE_MAX_AGE = 60 * 60
+
 # File Upload Size Limits
 # Increase upload size limits to handle large files (images and PDFs)
 # 100MB for form data (non-file fields + file metadata)
@@ -332,3 +346,15 @@ CORS_ALLOW_HEADERS = [
     'sec-websocket-extensions',
 ]
 
+# Background tasks (see core/tasks.py)
+TASK_QUEUE_BACKEND = env('TASK_QUEUE_BACKEND')
+
+# Library view/download counters are buffered in the cache and flushed by
+# `manage.py flush_library_counters` (see library/counters.py). Needs a cache
+# shared by all processes; set to False to write every event through.
+LIBRARY_COUNTERS_BUFFERED = env.bool('LIBRARY_COUNTERS_BUFFERED', default=True)
+
+# Automatic attendance from SFU presence (see course/presence.py): when a room
+# ends, enrolled students present for at least this many minutes are marked
+# present and the others absent.
+ATTENDANCE_MIN_PRESENCE_MINUTES = env.int('ATTENDANCE_MIN_PRESENCE_MINUTES', default=10)
@@ -25,6 +25,10 @@ EMAIL_HOST_PASSWORD = env('EMAIL_HOST_PASSWORD', default='')
 DEFAULT_FROM_EMAIL = env('DEFAULT_FROM_EMAIL', default=EMAIL_HOST_USER or 'noreply@deenbridge.com')
 SERVER_EMAIL = env('SERVER_EMAIL', default=EMAIL_HOST_USER or DEFAULT_FROM_EMAIL)
 
+# The default LocMem cache is per process, so a separate flush process would never
+# see buffered library counters: write them through unless a shared cache is configured
+LIBRARY_COUNTERS_BUFFERED = env.bool('LIBRARY_COUNTERS_BUFFERED', default=False)
+
 # Frontend URL for password reset links
 FRONTEND_URL = env('FRONTEND_URL', default='http://localhost:3000')
 
@@ -0,0 +1,16 @@
+"""
+Management command to rebuild the precomputed related posts. Signals keep them
+up to date; run this after bulk imports that bypass them (bulk_create,
+queryset.update) or after changing the ranking rules.
+"""
+from django.core.management.base import BaseCommand
+
+from blogs.related import rebuild_related_posts
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the related posts of every blog post'
+
+    def handle(self, *args, **options):
+        posts, rows = rebuild_related_posts()
+        self.stdout.write(self.style.SUCCESS(f'Ranked {rows} related post(s) for {posts} post(s)'))
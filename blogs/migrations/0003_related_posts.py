@@ -0,0 +1,79 @@
+# Generated by Django 5.2.18 on 2026-10-16 21:22
+
+import heapq
+from collections import Counter, defaultdict
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# Related posts kept per post
+TOP_RELATED = 10
+
+
+def backfill_related_posts(apps, schema_editor):
+    """Rank the related posts of the existing posts."""
+    Post = apps.get_model('blogs', 'Post')
+    RelatedPost = apps.get_model('blogs', 'RelatedPost')
+    ContentType = apps.get_model('contenttypes', 'ContentType')
+    TaggedItem = apps.get_model('taggit', 'TaggedItem')
+
+    published = {
+        post_id: (updated_at, created_at)
+        for post_id, updated_at, created_at in Post.objects.filter(status='published').values_list(
+            'id', 'updated_at', 'created_at'
+        )
+    }
+    tags_of = defaultdict(set)
+    content_type = ContentType.objects.filter(app_label='blogs', model='post').first()
+    if content_type is not None:
+        links = TaggedItem.objects.filter(content_type=content_type).values_list('object_id', 'tag_id')
+        for post_id, tag_id in links:
+            tags_of[post_id].add(tag_id)
+
+    posts_with = defaultdict(list)
+    for post_id, tag_ids in tags_of.items():
+        if post_id in published:
+            for tag_id in tag_ids:
+                posts_with[tag_id].append(post_id)
+
+    rows = []
+    for post_id in Post.objects.values_list('id', flat=True):
+        # Most shared tags first, then the most recently updated/created post
+        shared = Counter()
+        for tag_id in tags_of.get(post_id, ()):
+            shared.update(posts_with[tag_id])
+        shared.pop(post_id, None)
+        best = heapq.nlargest(TOP_RELATED, shared, key=lambda other: (shared[other], *published[other], other))
+        rows.extend(
+            RelatedPost(post_id=post_id, related_id=other, shared_tags=shared[other], rank=rank)
+            for rank, other in enumerate(best)
+        )
+    RelatedPost.objects.bulk_create(rows, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blogs', '0002_commentlike_postlike'),
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('taggit', '0006_rename_taggeditem_content_type_object_id_taggit_tagg_content_8fc721_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RelatedPost',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('shared_tags', models.PositiveIntegerField()),
+                ('rank', models.PositiveSmallIntegerField()),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='related_posts', to='blogs.post')),
+                ('related', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='related_to', to='blogs.post')),
+            ],
+            options={
+                'ordering': ('post', 'rank'),
+                'indexes': [models.Index(fields=['post', 'rank'], name='blogs_related_post_rank_idx')],
+                'constraints': [models.UniqueConstraint(fields=('post', 'related'), name='unique_related_post')],
+            },
+        ),
+        migrations.RunPython(backfill_related_posts, migrations.RunPython.noop),
+    ]
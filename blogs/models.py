@@ -1,10 +1,37 @@
 from django.db import models
-from django.db.models import Count, Q
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
 
 from django.core.exceptions import ValidationError
 
 from taggit.managers import TaggableManager
 
+
+def _count_of(queryset, field):
+    """Subquery counting the rows of queryset whose field is the outer row"""
+    total = queryset.filter(**{field: OuterRef('pk')}).order_by().values(field).annotate(total=Count('pk')).values('total')
+    return Coalesce(Subquery(total, output_field=IntegerField()), 0)
+
+
+class PostQuerySet(models.QuerySet):
+    def with_counts(self):
+        """
+        Annotate comment and like counts, read by Post.comments_count and
+        Post.likes_count instead of a COUNT per post. Subqueries, so joins added
+        by filters (tags) cannot inflate the numbers.
+        """
+        return self.annotate(
+            comments_total=_count_of(Comment.objects.all(), 'post'),
+            likes_total=_count_of(PostLike.objects.all(), 'post'),
+        )
+
+
+class CommentQuerySet(models.QuerySet):
+    def with_counts(self):
+        """Annotate like counts, read by Comment.likes_count instead of a COUNT per comment."""
+        return self.annotate(likes_total=_count_of(CommentLike.objects.all(), 'comment'))
+
+
 class Post(models.Model):
     author = models.ForeignKey(
         'accounts.CustomUser', 
@@ -29,6 +56,8 @@ class Post(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = PostQuerySet.as_manager()
+
     @property
     def published_at(self):
         return self.updated_at if self.status == 'published' else None
@@ -36,10 +65,15 @@ class Post(models.Model):
 
     @property
     def comments_count(self):
+        # Annotated by PostQuerySet.with_counts() when present
+        if hasattr(self, 'comments_total'):
+            return self.comments_total
         return self.comments.count()
 
     @property
     def likes_count(self):
+        if hasattr(self, 'likes_total'):
+            return self.likes_total
         return self.post_likes.count()
 
     def is_liked_by_user(self, user):
@@ -56,42 +90,11 @@ class Post(models.Model):
         Get related posts based on matching tags.
         Prioritizes posts with more matching tags, then by recency.
         Falls back to latest published posts if no tags match.
+        Served from the precomputed RelatedPost rows (see blogs.related).
         """
-        # Get all tags for this post
-        post_tags = self.tags.all()
-        
-        if not post_tags.exists():
-            # If no tags, return latest published posts (excluding current)
-            return list(Post.objects.filter(
-                status='published'
-            ).exclude(id=self.id).order_by('-updated_at', '-created_at')[:limit])
-        
-        # Get tag names as a list
-        tag_names = list(post_tags.values_list('name', flat=True))
-        
-        # Find published posts that share at least one tag (excluding current post)
-        related_posts = Post.objects.filter(
-            status='published',
-            tags__name__in=tag_names
-        ).exclude(id=self.id).distinct()
-        
-        # Annotate with count of matching tags
-        related_posts = related_posts.annotate(
-            matching_tags_count=Count('tags', filter=Q(tags__name__in=tag_names))
-        ).order_by('-matching_tags_count', '-updated_at', '-created_at')
-        
-        # Get the limited results
-        results = list(related_posts[:limit])
-        
-        # If we don't have enough results and there were some matching tags,
-        # we still return what we have. But if we have no results at all,
-        # fallback to latest published posts
-        if len(results) == 0:
-            return list(Post.objects.filter(
-                status='published'
-            ).exclude(id=self.id).order_by('-updated_at', '-created_at')[:limit])
-        
-        return results
+        from .related import get_related_posts
+
+        return get_related_posts(self, limit=limit)
 
     class Meta:
         ordering = ("-updated_at", "-created_at")
@@ -124,11 +127,16 @@ class Comment(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = CommentQuerySet.as_manager()
+
     class Meta:
         ordering = ('-created_at',)
     
     @property
     def likes_count(self):
+        # Annotated by CommentQuerySet.with_counts() when present
+        if hasattr(self, 'likes_total'):
+            return self.likes_total
         return self.comment_likes.count()
 
     def is_liked_by_user(self, user):
@@ -172,3 +180,26 @@ class CommentLike(models.Model):
 
     def __str__(self):
         return f"{self.user.email} liked comment {self.comment.id}"
+
+
+class RelatedPost(models.Model):
+    """
+    Precomputed related posts of a post: published posts sharing its tags,
+    most shared tags then most recent first. Maintained by blogs.related.
+    """
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='related_posts')
+    related = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='related_to')
+    shared_tags = models.PositiveIntegerField()
+    rank = models.PositiveSmallIntegerField()
+
+    class Meta:
+        ordering = ('post', 'rank')
+        constraints = [
+            models.UniqueConstraint(fields=('post', 'related'), name='unique_related_post'),
+        ]
+        indexes = [
+            models.Index(fields=['post', 'rank'], name='blogs_related_post_rank_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.related} related to {self.post}"
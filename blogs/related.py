@@ -0,0 +1,163 @@
+"""
+Precomputed related posts.
+
+The related posts of a post are the published posts sharing the most tags
+with it, most recently updated first among equals. Instead of counting shared
+tags over taggit joins on every detail page, the TOP_RELATED best are stored
+as RelatedPost rows and read with one indexed lookup, cached per post.
+
+Saving a post (which also moves it in the recency order), changing its tags
+or deleting it enqueues `refresh_related_posts` for that post; the task
+recomputes it together with every post whose list it is in or may enter: the
+posts sharing one of its tags, and the posts listing it now.
+
+Posts without tags, or whose tags no other published post has, get the
+latest published posts instead, read live.
+"""
+import heapq
+from collections import Counter, defaultdict
+
+from django.contrib.contenttypes.models import ContentType
+from django.core.cache import cache
+from django.db import transaction
+from taggit.models import TaggedItem
+
+from core.tasks import background_task
+
+from .models import Post, RelatedPost
+
+# Related posts stored per post (the endpoint shows 3)
+TOP_RELATED = 10
+
+RELATED_CACHE_TIMEOUT = 60 * 60
+
+
+def _cache_key(post_id):
+    return f'blog:related:{post_id}'
+
+
+def rank_related(post_ids, published, tags_of, top=TOP_RELATED):
+    """
+    Rank the related posts of the given posts.
+
+    Args:
+        post_ids: Posts to rank for
+        published: {published post id: (updated_at, created_at)}
+        tags_of: {post id: set of tag ids}, for every post
+        top: Related posts kept per post
+
+    Returns:
+        {post id: [(related post id, shared tags), ...]} best first
+    """
+    posts_with = defaultdict(list)
+    for post_id, tag_ids in tags_of.items():
+        if post_id in published:
+            for tag_id in tag_ids:
+                posts_with[tag_id].append(post_id)
+
+    ranked = {}
+    for post_id in post_ids:
+        shared = Counter()
+        for tag_id in tags_of.get(post_id, ()):
+            shared.update(posts_with[tag_id])
+        shared.pop(post_id, None)
+        best = heapq.nlargest(top, shared, key=lambda other: (shared[other], *published[other], other))
+        ranked[post_id] = [(other, shared[other]) for other in best]
+    return ranked
+
+
+def load_corpus():
+    """Return (published, tags_of) for rank_related, from two queries."""
+    published = {
+        post_id: (updated_at, created_at)
+        for post_id, updated_at, created_at in Post.objects.filter(status='published').values_list(
+            'id', 'updated_at', 'created_at'
+        )
+    }
+    tags_of = defaultdict(set)
+    links = TaggedItem.objects.filter(
+        content_type=ContentType.objects.get_for_model(Post)
+    ).values_list('object_id', 'tag_id')
+    for post_id, tag_id in links.iterator():
+        tags_of[post_id].add(tag_id)
+    return published, tags_of
+
+
+def store_related(ranked):
+    """Replace the RelatedPost rows of the ranked posts and drop their cached lists."""
+    post_ids = list(ranked)
+    with transaction.atomic():
+        # Posts deleted while ranking
+        mentioned = set(post_ids) | {other for related in ranked.values() for other, _ in related}
+        existing = set(Post.objects.filter(id__in=mentioned).values_list('id', flat=True))
+        rows = []
+        for post_id, related in ranked.items():
+            if post_id not in existing:
+                continue
+            kept = [(other, shared_tags) for other, shared_tags in related if other in existing]
+            rows.extend(
+                RelatedPost(post_id=post_id, related_id=other, shared_tags=shared_tags, rank=rank)
+                for rank, (other, shared_tags) in enumerate(kept)
+            )
+        RelatedPost.objects.filter(post_id__in=post_ids).delete()
+        RelatedPost.objects.bulk_create(rows, batch_size=1000)
+    keys = [_cache_key(post_id) for post_id in post_ids]
+    # Now, and again at commit so a list cached from the old rows is dropped
+    cache.delete_many(keys)
+    transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+@background_task
+def refresh_related_posts(post_ids):
+    """
+    Recompute the related posts of the given posts and of every post whose
+    list they are in or may enter.
+    """
+    published, tags_of = load_corpus()
+    affected = set(post_ids)
+    affected.update(RelatedPost.objects.filter(related_id__in=post_ids).values_list('post_id', flat=True))
+    changed_tags = {tag_id for post_id in post_ids for tag_id in tags_of.get(post_id, ())}
+    affected.update(post_id for post_id, tag_ids in tags_of.items() if tag_ids & changed_tags)
+    store_related(rank_related(affected, published, tags_of))
+
+
+def rebuild_related_posts():
+    """
+    Recompute the related posts of every post.
+
+    Returns:
+        (posts, RelatedPost rows)
+    """
+    published, tags_of = load_corpus()
+    post_ids = list(Post.objects.values_list('id', flat=True))
+    ranked = rank_related(post_ids, published, tags_of)
+    store_related(ranked)
+    return len(post_ids), sum(len(related) for related in ranked.values())
+
+
+def get_related_post_ids(post):
+    """Ids of the stored related posts of a post, best first (one indexed lookup, cached)."""
+    key = _cache_key(post.pk)
+    related_ids = cache.get(key)
+    if related_ids is None:
+        related_ids = list(
+            RelatedPost.objects.filter(post_id=post.pk).order_by('rank').values_list('related_id', flat=True)
+        )
+        cache.set(key, related_ids, RELATED_CACHE_TIMEOUT)
+    return related_ids
+
+
+def get_related_posts(post, limit=3):
+    """
+    Related posts of a post, best first; the latest published posts if it has
+    none.
+    """
+    posts = Post.objects.with_counts().select_related('author').filter(status='published')
+    related_ids = get_related_post_ids(post)[:limit]
+    if related_ids:
+        # A post unpublished since the last refresh is skipped
+        found = posts.in_bulk(related_ids)
+        results = [found[related_id] for related_id in related_ids if related_id in found]
+        if results:
+            return results
+    return list(posts.exclude(id=post.pk).order_by('-updated_at', '-created_at')[:limit])
@@ -1,12 +1,34 @@
+from collections import defaultdict
+
+from django.db import models
 from rest_framework import serializers
 
-from .models import Post, Comment
+from .models import Post, Comment, PostLike, CommentLike
 
 from core.image_compressor import compress_image_file
 from django.conf import settings
 
 from accounts.serializers import CustomUserSerializer
 
+def _request_user(context):
+    request = context.get('request')
+    user = getattr(request, 'user', None)
+    return user if user is not None and user.is_authenticated else None
+
+
+class PostListSerializer(serializers.ListSerializer):
+    """Loads the caller's likes of every post in one query before serializing."""
+
+    def to_representation(self, data):
+        posts = list(data.all() if isinstance(data, models.manager.BaseManager) else data)
+        user = _request_user(self.context)
+        if user is not None:
+            liked = self.context.setdefault('liked_post_ids', set())
+            liked.update(PostLike.objects.filter(user=user, post__in=posts).values_list('post_id', flat=True))
+            self.context.setdefault('likes_loaded_post_ids', set()).update(post.pk for post in posts)
+        return super().to_representation(posts)
+
+
 class PostSerializer(serializers.ModelSerializer):
     author_data = CustomUserSerializer(source='author', read_only=True)
 
@@ -19,12 +41,16 @@ class PostSerializer(serializers.ModelSerializer):
     class Meta:
         model = Post
         fields = "__all__"
+        list_serializer_class = PostListSerializer
     
     def get_is_liked(self, obj):
-        request = self.context.get('request')
-        if request and hasattr(request, 'user') and request.user.is_authenticated:
-            return obj.is_liked_by_user(request.user)
-        return False
+        user = _request_user(self.context)
+        if user is None:
+            return False
+        # Batch-loaded by PostListSerializer
+        if obj.pk in self.context.get('likes_loaded_post_ids', ()):
+            return obj.pk in self.context['liked_post_ids']
+        return obj.is_liked_by_user(user)
     
     def validate(self, validated_data):
         if 'featured_image' in validated_data and validated_data.get('featured_image'):
@@ -46,6 +72,53 @@ class PostSerializer(serializers.ModelSerializer):
         return validated_data
 
 
+def load_threads(comments, context):
+    """
+    Attach to every comment, as `thread_replies`, its replies and theirs at any
+    depth, from one query over the replies of their posts; then load the
+    caller's likes of the whole thread in one more query. Comments already
+    loaded are skipped.
+    """
+    comments = [comment for comment in comments if not hasattr(comment, 'thread_replies')]
+    if not comments:
+        return
+
+    children = defaultdict(list)
+    replies = Comment.objects.with_counts().filter(
+        post_id__in={comment.post_id for comment in comments}, parent__isnull=False
+    ).select_related('author', 'post')
+    for reply in replies:
+        children[reply.parent_id].append(reply)
+
+    thread = []
+    seen = set()
+    stack = list(comments)
+    while stack:
+        comment = stack.pop()
+        if comment.pk in seen:
+            continue
+        seen.add(comment.pk)
+        thread.append(comment)
+        comment.thread_replies = children.get(comment.pk, [])
+        stack.extend(comment.thread_replies)
+
+    user = _request_user(context)
+    if user is not None:
+        liked = context.setdefault('liked_comment_ids', set())
+        liked.update(CommentLike.objects.filter(
+            user=user, comment_id__in=[comment.pk for comment in thread]
+        ).values_list('comment_id', flat=True))
+
+
+class CommentListSerializer(serializers.ListSerializer):
+    """Builds the reply threads of every comment before serializing (see load_threads)."""
+
+    def to_representation(self, data):
+        comments = list(data.all() if isinstance(data, models.manager.BaseManager) else data)
+        load_threads(comments, self.context)
+        return super().to_representation(comments)
+
+
 class CommentSerializer(serializers.ModelSerializer):
     author_data = CustomUserSerializer(source='author', read_only=True)
     post_title = serializers.CharField(source='post.title', read_only=True)
@@ -57,19 +130,21 @@ class CommentSerializer(serializers.ModelSerializer):
         model = Comment
         fields = ['id', 'post', 'author', 'author_data', 'post_title', 'parent', 'body', 'created_at', 'updated_at', 'replies', 'likes_count', 'is_liked']
         read_only_fields = ['id', 'created_at', 'updated_at', 'author_data', 'post_title', 'replies', 'likes_count', 'is_liked']
+        list_serializer_class = CommentListSerializer
+    
+    def to_representation(self, instance):
+        if self.parent is None:
+            load_threads([instance], self.context)
+        return super().to_representation(instance)
     
     def get_replies(self, obj):
-        # Only include replies for top-level comments to avoid infinite recursion
-        if obj.parent is None:
-            replies = obj.replies.all()
-            return CommentSerializer(replies, many=True, context=self.context).data
-        return []
+        # The whole thread, built by load_threads
+        return CommentSerializer(obj.thread_replies, many=True, context=self.context).data
     
     def get_is_liked(self, obj):
-        request = self.context.get('request')
-        if request and hasattr(request, 'user') and request.user.is_authenticated:
-            return obj.is_liked_by_user(request.user)
-        return False
+        if _request_user(self.context) is None:
+            return False
+        return obj.pk in self.context.get('liked_comment_ids', ())
     
     def create(self, validated_data):
         # Set the author to the current user
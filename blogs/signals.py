@@ -0,0 +1,33 @@
+"""
+Signals for blogs app
+"""
+from django.db.models.signals import m2m_changed, post_save, pre_delete
+from django.dispatch import receiver
+from taggit.models import TaggedItem
+
+from .models import Post, RelatedPost
+from .related import refresh_related_posts
+
+
+@receiver(post_save, sender=Post)
+def refresh_related_posts_on_save(sender, instance, raw=False, **kwargs):
+    """Status and recency decide where a post stands in the related posts of others"""
+    if not raw:
+        refresh_related_posts.enqueue(post_ids=[instance.pk])
+
+
+@receiver(m2m_changed, sender=TaggedItem)
+def refresh_related_posts_on_tags_change(sender, instance, action, **kwargs):
+    """Related posts are ranked by shared tags"""
+    if isinstance(instance, Post) and action in ('post_add', 'post_remove', 'post_clear'):
+        refresh_related_posts.enqueue(post_ids=[instance.pk])
+
+
+@receiver(pre_delete, sender=Post)
+def refresh_related_posts_on_delete(sender, instance, **kwargs):
+    """Refill the related posts of the posts listing a deleted post (its rows go with it)"""
+    post_ids = list(
+        RelatedPost.objects.filter(related=instance).exclude(post=instance).values_list('post_id', flat=True)
+    )
+    if post_ids:
+        refresh_related_posts.enqueue(post_ids=post_ids)
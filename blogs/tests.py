@@ -1,3 +1,174 @@
+import random
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db.models import Count, Q
 from django.test import TestCase
+from rest_framework.test import APIClient
+
+from core.tasks import run_pending_tasks
+from .models import Comment, CommentLike, Post, PostLike, RelatedPost
+from .related import rebuild_related_posts
+
+User = get_user_model()
+
+
+class BlogListQueriesTestCase(TestCase):
+    """Post and comment lists run a fixed number of queries"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.reader = User.objects.create_user(
+            email='reader@test.com',
+            password='testpass123',
+            full_name='Reader',
+            role='student'
+        )
+        self.author = User.objects.create_user(
+            email='author@test.com',
+            password='testpass123',
+            full_name='Author',
+            role='student'
+        )
+        self.posts = [
+            Post.objects.create(title=f'Post {i}', body='Body', slug=f'post-{i}', status='published', author=self.author)
+            for i in range(4)
+        ]
+        self.post = self.posts[0]
+        PostLike.objects.create(post=self.post, user=self.reader)
+        PostLike.objects.create(post=self.post, user=self.author)
+
+        self.first = Comment.objects.create(post=self.post, author=self.author, body='First')
+        self.reply = Comment.objects.create(post=self.post, author=self.reader, body='Reply', parent=self.first)
+        self.nested = Comment.objects.create(post=self.post, author=self.author, body='Nested', parent=self.reply)
+        self.second = Comment.objects.create(post=self.post, author=self.reader, body='Second')
+        CommentLike.objects.create(comment=self.nested, user=self.reader)
+        CommentLike.objects.create(comment=self.nested, user=self.author)
+        CommentLike.objects.create(comment=self.second, user=self.author)
+
+    def test_post_list(self):
+        """Test that counts and the caller's likes are loaded in bulk"""
+        self.client.force_authenticate(self.reader)
+        # Posts, then the caller's likes
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/blog/post/')
+        self.assertEqual(response.status_code, 200)
+        posts = {item['id']: item for item in response.data}
+        self.assertEqual(posts[self.post.id]['likes_count'], 2)
+        self.assertEqual(posts[self.post.id]['comments_count'], 4)
+        self.assertTrue(posts[self.post.id]['is_liked'])
+        self.assertEqual(posts[self.posts[1].id]['likes_count'], 0)
+        self.assertFalse(posts[self.posts[1].id]['is_liked'])
+
+        # Filtering by tag joins taggit; the counts stay the same
+        self.post.tags.add('fiqh')
+        response = self.client.get('/api/blog/post/', {'tag': 'fiq'})
+        self.assertEqual([(item['likes_count'], item['comments_count']) for item in response.data], [(2, 4)])
+
+    def test_comment_thread(self):
+        """Test that the whole thread is built from one query over the replies"""
+        self.client.force_authenticate(self.reader)
+        # Top-level comments, their replies, then the caller's likes
+        with self.assertNumQueries(3):
+            response = self.client.get('/api/blog/comment/', {'post': self.post.id})
+        self.assertEqual(response.status_code, 200)
+
+        second, first = response.data
+        self.assertEqual((second['id'], second['likes_count'], second['is_liked']), (self.second.id, 1, False))
+        self.assertEqual(second['replies'], [])
+        reply, = first['replies']
+        self.assertEqual(reply['id'], self.reply.id)
+        nested, = reply['replies']
+        self.assertEqual((nested['id'], nested['likes_count'], nested['is_liked']), (self.nested.id, 2, True))
+
+        response = self.client.get(f'/api/blog/comment/{self.reply.id}/')
+        self.assertEqual([item['id'] for item in response.data['replies']], [self.nested.id])
+        self.assertTrue(response.data['replies'][0]['is_liked'])
+
+    def test_like_toggle(self):
+        """Test that toggling a like reports the new count"""
+        self.client.force_authenticate(self.reader)
+        response = self.client.post(f'/api/blog/post/{self.post.id}/like/')
+        self.assertEqual(response.data, {'is_liked': False, 'likes_count': 1})
+        response = self.client.post(f'/api/blog/comment/{self.second.id}/like/')
+        self.assertEqual(response.data, {'is_liked': True, 'likes_count': 2})
+
+
+def reference_related_posts(post, limit=3):
+    """The related posts query the RelatedPost table replaced"""
+    latest = Post.objects.filter(status='published').exclude(id=post.id).order_by('-updated_at', '-created_at')
+    tag_names = list(post.tags.values_list('name', flat=True))
+    if not tag_names:
+        return list(latest[:limit])
+    results = list(Post.objects.filter(
+        status='published', tags__name__in=tag_names
+    ).exclude(id=post.id).distinct().annotate(
+        matching_tags_count=Count('tags', filter=Q(tags__name__in=tag_names))
+    ).order_by('-matching_tags_count', '-updated_at', '-created_at')[:limit])
+    return results or list(latest[:limit])
+
+
+class RelatedPostsTestCase(TestCase):
+    """Precomputed related posts"""
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.client = APIClient()
+        generator = random.Random(20)
+        tags = ['fiqh', 'hadith', 'seerah', 'tafsir', 'aqeedah', 'arabic', 'ramadan', 'family']
+        self.posts = []
+        for i in range(30):
+            post = Post.objects.create(
+                title=f'Post {i}', body='Body', slug=f'post-{i}',
+                status='draft' if i % 7 == 3 else 'published'
+            )
+            post.tags.add(*generator.sample(tags, generator.randint(0, 3)))
+            self.posts.append(post)
+        run_pending_tasks()
+
+    def assertMatchesReference(self):
+        for post in Post.objects.all():
+            with self.subTest(post=post.slug):
+                self.assertEqual(
+                    [related.id for related in post.get_related_posts(limit=3)],
+                    [related.id for related in reference_related_posts(post, limit=3)],
+                )
+
+    def test_matches_reference(self):
+        """Test that the stored ranking matches the tag overlap query on a seeded corpus"""
+        self.assertTrue(RelatedPost.objects.exists())
+        self.assertMatchesReference()
+
+        RelatedPost.objects.all().delete()
+        cache.clear()
+        rebuild_related_posts()
+        self.assertMatchesReference()
+
+    def test_incremental_maintenance(self):
+        """Test that tag, status, recency and deletion changes are followed"""
+        first, second, third = self.posts[0], self.posts[1], self.posts[2]
+        # More tags in common than any random pair
+        first.tags.add('zakat', 'hajj', 'salah', 'sawm')
+        third.tags.add('zakat', 'hajj', 'salah', 'sawm')
+        second.status = 'draft'
+        second.save()
+        self.posts[4].save()
+        self.posts[5].tags.clear()
+        self.posts[6].delete()
+        run_pending_tasks()
+        self.assertMatchesReference()
+        self.assertEqual(first.get_related_posts(limit=3)[0], third)
 
-# Create your tests here.
+    def test_endpoint_reads_table(self):
+        """Test that the related posts endpoint reads one cached row list"""
+        post = self.posts[0]
+        self.client.get(f'/api/blog/post/slug/{post.slug}/related/')
+        # Published check, post, related posts
+        with self.assertNumQueries(3):
+            response = self.client.get(f'/api/blog/post/slug/{post.slug}/related/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [item['id'] for item in response.data],
+            [related.id for related in reference_related_posts(post)]
+        )
@@ -15,7 +15,7 @@ from django.shortcuts import get_object_or_404
 
 
 class PostListCreateView(ListCreateAPIView):
-    queryset = Post.objects.all()
+    queryset = Post.objects.with_counts().select_related('author')
     serializer_class = PostSerializer
     permission_classes = [IsAuthenticatedOrReadOnly]
     filter_backends = [DjangoFilterBackend]
@@ -29,7 +29,7 @@ class PostListCreateView(ListCreateAPIView):
 
 
 class PostRetrieveUpdateDestroyView(RetrieveUpdateDestroyAPIView):
-    queryset = Post.objects.all()
+    queryset = Post.objects.with_counts().select_related('author')
     serializer_class = PostSerializer
     permission_classes = [IsAuthenticated]
 
@@ -51,9 +51,9 @@ class PostBySlugView(RetrieveAPIView):
         
         # If no published posts, show all posts
         if published_posts.exists():
-            return published_posts
+            return published_posts.with_counts().select_related('author')
         else:
-            return Post.objects.all()
+            return Post.objects.with_counts().select_related('author')
 
     def get_serializer_context(self):
         context = super().get_serializer_context()
@@ -95,7 +95,8 @@ class CommentListCreateView(ListCreateAPIView):
     filter_backends = [DjangoFilterBackend]
     
     def get_queryset(self):
-        queryset = Comment.objects.all()
+        # Replies are loaded with their threads by CommentListSerializer
+        queryset = Comment.objects.with_counts().select_related('author', 'post')
         post_id = self.request.query_params.get('post', None)
         if post_id is not None:
             queryset = queryset.filter(post_id=post_id)
@@ -108,7 +109,7 @@ class CommentListCreateView(ListCreateAPIView):
 
 
 class CommentRetrieveUpdateDestroyView(RetrieveUpdateDestroyAPIView):
-    queryset = Comment.objects.all()
+    queryset = Comment.objects.with_counts().select_related('author', 'post')
     serializer_class = CommentSerializer
     permission_classes = [IsAuthenticated]
 
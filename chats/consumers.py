@@ -172,12 +172,17 @@ class ChatConsumer(AsyncWebsocketConsumer):
                 )
                 
                 # Broadcast message to all users in the room
+                # The frame is encoded once here; receivers only append their unread count
                 try:
+                    message_data = await self.message_to_dict(chat_message)
                     await self.channel_layer.group_send(
                         self.room_group_name,
                         {
                             'type': 'chat_message_broadcast',
-                            'message': await self.message_to_dict(chat_message),
+                            'payload': json.dumps({
+                                'type': 'chat_message',
+                                'message': message_data,
+                            }),
                             'sender_id': self.user.id,  # Include sender ID for filtering
                         }
                     )
@@ -254,21 +259,19 @@ class ChatConsumer(AsyncWebsocketConsumer):
 
     async def chat_message_broadcast(self, event):
         """Send chat message to WebSocket with unread count for current user."""
-        message_data = {
-            'type': 'chat_message',
-            'message': event['message'],
-        }
+        payload = event['payload']
         
         # Add unread count for the receiving user (not the sender)
         sender_id = event.get('sender_id')
         is_sender = sender_id == self.user.id
         
         if not is_sender:
-            # This user is receiving the message, calculate their unread count
+            # This user is receiving the message, splice their unread count into
+            # the pre-encoded frame instead of re-serializing the message
             unread_count = await self.get_unread_count(self.session_id)
-            message_data['unread_count'] = unread_count
+            payload = f'{payload[:-1]}, "unread_count": {int(unread_count)}}}'
         
-        await self.send(text_data=json.dumps(message_data))
+        await self.send(text_data=payload)
 
     async def user_joined(self, event):
         """Send user joined notification to WebSocket."""
@@ -327,64 +330,34 @@ class ChatConsumer(AsyncWebsocketConsumer):
     def get_chat_history(self, session_id, limit=50):
         """Get chat history for a session."""
         from .models import ChatMessage
+        from .utils import serialize_messages
         
         messages = ChatMessage.objects.filter(
             session_id=session_id,
             is_deleted=False
         ).order_by('-created_at')[:limit]
         
-        # Reverse to get chronological order
-        messages = list(reversed(messages))
-        
-        return [msg.to_dict() for msg in messages]
+        # Reverse to get chronological order; sender cards are loaded in one batch
+        return serialize_messages(reversed(list(messages)))
     
     @database_sync_to_async
     def get_unread_count(self, session_id):
-        """Get unread message count for current user in this session."""
-        from .models import ChatMessage
-        
-        # Get all messages in session
-        all_messages = ChatMessage.objects.filter(
-            session_id=session_id,
-            is_deleted=False
-        ).count()
+        """Get unread message count for current user in this session (cached counters)."""
+        from .utils import get_unread_count
         
-        # Get unread count - messages where user is NOT in read_by
-        unread_count = ChatMessage.objects.filter(
-            session_id=session_id,
-            is_deleted=False
-        ).exclude(
-            read_by=self.user  # Exclude messages where user is in read_by
-        ).count()
-        
-        return unread_count
+        return get_unread_count(session_id, self.user.id)
     
     @database_sync_to_async
     def mark_messages_read(self, session_id, message_id=None):
         """Mark messages as read for the current user."""
-        from .models import ChatMessage
-        from course.models import LiveSession
+        from .models import ChatReadState
+        from .utils import reset_read_count
         
-        session = LiveSession.objects.get(id=session_id)
+        # Advance the user's read watermark (one UPSERT for the whole range)
+        marked_count = ChatReadState.mark_read(session_id, self.user.id, message_id)
         
-        # Get all unread messages in the session for this user
-        messages_query = ChatMessage.objects.filter(
-            session=session,
-            is_deleted=False
-        ).exclude(
-            read_by=self.user  # Only get messages user hasn't read
-        )
-        
-        # If message_id is provided, only mark messages up to that message
-        if message_id:
-            messages_query = messages_query.filter(id__lte=message_id)
-        
-        marked_count = 0
-        
-        # Add user to read_by for each unread message
-        for message in messages_query:
-            message.read_by.add(self.user)
-            marked_count += 1
+        # Reset this user's cached read counter
+        if marked_count:
+            reset_read_count(session_id, self.user.id)
         
         return marked_count
-
@@ -0,0 +1,87 @@
+# Generated by Django 5.2.18 on 2026-10-16 20:12
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import F, Max
+
+
+def forwards_read_by_to_watermarks(apps, schema_editor):
+    """
+    Collapse read_by rows into one watermark per (session, user): the latest
+    message the user read that was not their own.
+    """
+    ChatMessage = apps.get_model('chats', 'ChatMessage')
+    ChatReadState = apps.get_model('chats', 'ChatReadState')
+    ReadBy = ChatMessage.read_by.through
+
+    watermarks = ReadBy.objects.exclude(
+        chatmessage__sender_id=F('customuser_id')
+    ).values(
+        'chatmessage__session_id', 'customuser_id'
+    ).annotate(last_read=Max('chatmessage_id')).order_by()
+
+    ChatReadState.objects.bulk_create(
+        (
+            ChatReadState(
+                session_id=row['chatmessage__session_id'],
+                user_id=row['customuser_id'],
+                last_read_message_id=row['last_read'],
+            )
+            for row in watermarks.iterator()
+        ),
+        batch_size=1000,
+    )
+
+
+def backwards_watermarks_to_read_by(apps, schema_editor):
+    """Expand watermarks back into read_by rows (senders read their own messages)."""
+    ChatMessage = apps.get_model('chats', 'ChatMessage')
+    ChatReadState = apps.get_model('chats', 'ChatReadState')
+    ReadBy = ChatMessage.read_by.through
+
+    ReadBy.objects.bulk_create(
+        (
+            ReadBy(chatmessage_id=message_id, customuser_id=sender_id)
+            for message_id, sender_id in ChatMessage.objects.values_list('id', 'sender_id').iterator()
+        ),
+        batch_size=1000,
+        ignore_conflicts=True,
+    )
+    for state in ChatReadState.objects.iterator():
+        message_ids = ChatMessage.objects.filter(
+            session_id=state.session_id,
+            id__lte=state.last_read_message_id,
+        ).values_list('id', flat=True)
+        ReadBy.objects.bulk_create(
+            (ReadBy(chatmessage_id=message_id, customuser_id=state.user_id) for message_id in message_ids.iterator()),
+            batch_size=1000,
+            ignore_conflicts=True,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chats', '0001_initial'),
+        ('course', '0003_livesession_is_recording_livesession_recording_file_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChatReadState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('last_read_message_id', models.BigIntegerField(default=0, help_text='Id of the latest message the user has read in this session')),
+                ('session', models.ForeignKey(help_text='The live session this watermark belongs to', on_delete=django.db.models.deletion.CASCADE, related_name='chat_read_states', to='course.livesession')),
+                ('user', models.ForeignKey(help_text='The user who read the messages', on_delete=django.db.models.deletion.CASCADE, related_name='chat_read_states', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('session', 'user'), name='unique_chat_read_state_per_user')],
+            },
+        ),
+        migrations.RunPython(forwards_read_by_to_watermarks, backwards_watermarks_to_read_by),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-16 20:12
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chats', '0002_chatreadstate'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='chatmessage',
+            name='read_by',
+        ),
+    ]
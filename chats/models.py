@@ -1,5 +1,7 @@
 from django.db import models
+from django.db.models import Count, Max
 from django.conf import settings
+from django.utils import timezone
 from core.models import TimeStampedModel
 
 
@@ -31,14 +33,6 @@ class ChatMessage(TimeStampedModel):
         help_text='Type of message'
     )
     
-    # Array of users who have read this message (sender is automatically added)
-    read_by = models.ManyToManyField(
-        settings.AUTH_USER_MODEL,
-        related_name='read_chat_messages',
-        blank=True,
-        help_text='Users who have read this message'
-    )
-    
     is_deleted = models.BooleanField(
         default=False,
         help_text='Soft delete flag'
@@ -53,57 +47,116 @@ class ChatMessage(TimeStampedModel):
     def __str__(self):
         return f"{self.sender.email} - {self.message[:50]} ({self.created_at})"
     
-    def save(self, *args, **kwargs):
-        """Override save to automatically add sender to read_by."""
-        is_new = self.pk is None
-        super().save(*args, **kwargs)
-        
-        # Add sender to read_by after save (for new messages)
-        if is_new:
-            self.read_by.add(self.sender)
+    def is_read_by(self, user_id, last_read_message_id=0):
+        """Whether the user has read this message, given their read watermark."""
+        return self.sender_id == user_id or self.id <= last_read_message_id
     
-    def to_dict(self):
-        """Convert message to dictionary for WebSocket transmission."""
-        # Get profile picture based on user role
-        profile_picture = None
-        try:
-            if hasattr(self.sender, 'role'):
-                role = self.sender.role
-                if role == 'teacher' and hasattr(self.sender, 'teacherprofile_profile'):
-                    profile = self.sender.teacherprofile_profile
-                    if profile.profile_image:
-                        profile_picture = profile.profile_image.url
-                elif role == 'student' and hasattr(self.sender, 'studentprofile_profile'):
-                    profile = self.sender.studentprofile_profile
-                    if profile.profile_image:
-                        profile_picture = profile.profile_image.url
-                elif role == 'staff' and hasattr(self.sender, 'staffprofile_profile'):
-                    profile = self.sender.staffprofile_profile
-                    if profile.profile_image:
-                        profile_picture = profile.profile_image.url
-                elif role == 'super_admin' and hasattr(self.sender, 'superadminprofile_profile'):
-                    profile = self.sender.superadminprofile_profile
-                    if profile.profile_image:
-                        profile_picture = profile.profile_image.url
-        except Exception:
-            # If profile doesn't exist or has no image, profile_picture remains None
-            pass
-        
-        # Construct full URL for profile picture
-        if profile_picture and not profile_picture.startswith('http'):
-            # Add backend domain to relative URLs
-            profile_picture = f'http://localhost:8000{profile_picture}'
+    def to_dict(self, sender_card=None):
+        """
+        Convert message to dictionary for WebSocket transmission.
+        Pass a sender card from chats.utils.get_sender_cards() when serializing
+        many messages; otherwise the (cached) card is looked up for this sender.
+        """
+        if sender_card is None:
+            from .utils import get_sender_cards
+            sender_card = get_sender_cards([self.sender_id]).get(self.sender_id, {})
         
         return {
             'id': self.id,
-            'session_id': str(self.session.id),
-            'sender_id': self.sender.id,
-            'sender_name': self.sender.full_name if hasattr(self.sender, 'full_name') and self.sender.full_name else self.sender.email,
-            'sender_email': self.sender.email,
-            'sender_role': self.sender.role if hasattr(self.sender, 'role') else 'student',
-            'sender_profile_picture': profile_picture,
+            'session_id': str(self.session_id),
+            'sender_id': self.sender_id,
+            **sender_card,
             'message': self.message,
             'message_type': self.message_type,
             'is_deleted': self.is_deleted,
             'created_at': self.created_at.isoformat(),
         }
+
+
+class ChatReadState(TimeStampedModel):
+    """
+    Per-user read watermark for a live session chat.
+    Every message with an id up to last_read_message_id counts as read by the
+    user (their own messages always do), so marking any number of messages as
+    read is a single row update.
+    """
+    session = models.ForeignKey(
+        'course.LiveSession',
+        on_delete=models.CASCADE,
+        related_name='chat_read_states',
+        help_text='The live session this watermark belongs to'
+    )
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='chat_read_states',
+        help_text='The user who read the messages'
+    )
+    last_read_message_id = models.BigIntegerField(
+        default=0,
+        help_text='Id of the latest message the user has read in this session'
+    )
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['session', 'user'],
+                name='unique_chat_read_state_per_user'
+            )
+        ]
+    
+    def __str__(self):
+        return f"{self.user_id} read session {self.session_id} up to {self.last_read_message_id}"
+    
+    @classmethod
+    def get_last_read_message_id(cls, session_id, user_id):
+        """Return the user's watermark for a session (0 if nothing was read)."""
+        last_read = cls.objects.filter(
+            session_id=session_id,
+            user_id=user_id
+        ).values_list('last_read_message_id', flat=True).first()
+        return last_read or 0
+    
+    @classmethod
+    def unread_messages(cls, session_id, user_id, last_read_message_id=None):
+        """Visible messages in the session the user has not read yet."""
+        if last_read_message_id is None:
+            last_read_message_id = cls.get_last_read_message_id(session_id, user_id)
+        return ChatMessage.objects.filter(
+            session_id=session_id,
+            is_deleted=False,
+            id__gt=last_read_message_id
+        ).exclude(sender_id=user_id)
+    
+    @classmethod
+    def mark_read(cls, session_id, user_id, message_id=None):
+        """
+        Advance the user's watermark to the latest message in the session
+        (or up to message_id) and return how many messages became read.
+        The watermark never moves backwards.
+        """
+        last_read_message_id = cls.get_last_read_message_id(session_id, user_id)
+        
+        pending = cls.unread_messages(session_id, user_id, last_read_message_id)
+        if message_id:
+            pending = pending.filter(id__lte=message_id)
+        stats = pending.aggregate(marked_count=Count('id'), latest_id=Max('id'))
+        
+        if not stats['marked_count']:
+            return 0
+        
+        # Create the row if missing, then advance it with one conditional UPDATE
+        # for the whole range; a concurrent mark_read that already went further wins
+        cls.objects.bulk_create(
+            [cls(session_id=session_id, user_id=user_id)],
+            ignore_conflicts=True,
+        )
+        advanced = cls.objects.filter(
+            session_id=session_id,
+            user_id=user_id,
+            last_read_message_id__lt=stats['latest_id']
+        ).update(last_read_message_id=stats['latest_id'], updated_at=timezone.now())
+        
+        if not advanced:
+            return 0
+        return stats['marked_count']
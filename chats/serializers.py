@@ -1,5 +1,17 @@
+from django.db import models
 from rest_framework import serializers
-from .models import ChatMessage
+from .models import ChatMessage, ChatReadState
+from .utils import get_sender_cards
+
+
+class ChatMessageListSerializer(serializers.ListSerializer):
+    """Loads the sender cards of every message in one batch before serializing."""
+    
+    def to_representation(self, data):
+        messages = list(data.all() if isinstance(data, models.manager.BaseManager) else data)
+        cards = self.context.setdefault('sender_cards', {})
+        cards.update(get_sender_cards({message.sender_id for message in messages} - cards.keys()))
+        return super().to_representation(messages)
 
 
 class ChatMessageSerializer(serializers.ModelSerializer):
@@ -28,48 +40,30 @@ class ChatMessageSerializer(serializers.ModelSerializer):
             'updated_at',
         ]
         read_only_fields = ['id', 'created_at', 'updated_at', 'sender', 'is_read']
+        list_serializer_class = ChatMessageListSerializer
+    
+    def _sender_card(self, obj):
+        """Get the cached sender card, batch-loaded by ChatMessageListSerializer."""
+        cards = self.context.setdefault('sender_cards', {})
+        if obj.sender_id not in cards:
+            cards.update(get_sender_cards([obj.sender_id]))
+        return cards.get(obj.sender_id, {})
     
     def get_sender_name(self, obj):
         """Get the sender's full name or email."""
-        return obj.sender.full_name if hasattr(obj.sender, 'full_name') and obj.sender.full_name else obj.sender.email
+        return self._sender_card(obj).get('sender_name')
     
     def get_sender_email(self, obj):
         """Get the sender's email."""
-        return obj.sender.email
+        return self._sender_card(obj).get('sender_email')
     
     def get_sender_role(self, obj):
         """Get the sender's role."""
-        return obj.sender.role if hasattr(obj.sender, 'role') else 'student'
+        return self._sender_card(obj).get('sender_role', 'student')
     
     def get_sender_profile_picture(self, obj):
         """Get the sender's profile picture URL."""
-        profile_picture = None
-        try:
-            if hasattr(obj.sender, 'role'):
-                role = obj.sender.role
-                if role == 'teacher' and hasattr(obj.sender, 'teacherprofile_profile'):
-                    profile = obj.sender.teacherprofile_profile
-                    if profile.profile_image:
-                        profile_picture = profile.profile_image.url
-                elif role == 'student' and hasattr(obj.sender, 'studentprofile_profile'):
-                    profile = obj.sender.studentprofile_profile
-                    if profile.profile_image:
-                        profile_picture = profile.profile_image.url
-                elif role == 'staff' and hasattr(obj.sender, 'staffprofile_profile'):
-                    profile = obj.sender.staffprofile_profile
-                    if profile.profile_image:
-                        profile_picture = profile.profile_image.url
-                elif role == 'super_admin' and hasattr(obj.sender, 'superadminprofile_profile'):
-                    profile = obj.sender.superadminprofile_profile
-                    if profile.profile_image:
-                        profile_picture = profile.profile_image.url
-        except Exception:
-            pass
-        
-        if profile_picture and not profile_picture.startswith('http'):
-            profile_picture = f'http://localhost:8000{profile_picture}'
-        
-        return profile_picture
+        return self._sender_card(obj).get('sender_profile_picture')
     
     def get_is_read(self, obj):
         """Check if the current user has read this message."""
@@ -77,5 +71,12 @@ class ChatMessageSerializer(serializers.ModelSerializer):
         if not request or not request.user.is_authenticated:
             return False
         
-        # Check if user is in the read_by list
-        return obj.read_by.filter(id=request.user.id).exists()
+        # Look up the user's read watermark once per serializer, not once per message
+        if not hasattr(self, '_last_read_message_ids'):
+            self._last_read_message_ids = {}
+        if obj.session_id not in self._last_read_message_ids:
+            self._last_read_message_ids[obj.session_id] = ChatReadState.get_last_read_message_id(
+                obj.session_id, request.user.id
+            )
+        
+        return obj.is_read_by(request.user.id, self._last_read_message_ids[obj.session_id])
@@ -0,0 +1,45 @@
+"""
+Signals for chats app
+"""
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from accounts.models import CustomUser
+from profiles.models import TeacherProfile, StudentProfile, StaffProfile, SuperAdminProfile
+from .models import ChatMessage
+from .utils import record_message_sent, invalidate_session_counters, invalidate_sender_card
+
+
+@receiver(post_save, sender=ChatMessage)
+def update_unread_counters_on_save(sender, instance, created, **kwargs):
+    """Bump unread counters for new messages, drop them when a message changes"""
+    if created:
+        if not instance.is_deleted:
+            record_message_sent(instance.session_id, instance.sender_id)
+    else:
+        invalidate_session_counters(instance.session_id)
+
+
+@receiver(post_delete, sender=ChatMessage)
+def update_unread_counters_on_delete(sender, instance, **kwargs):
+    """Drop unread counters when a message is removed"""
+    invalidate_session_counters(instance.session_id)
+
+
+@receiver(post_save, sender=CustomUser)
+def invalidate_sender_card_on_user_save(sender, instance, created, **kwargs):
+    """Drop the cached sender card when a user's name, email or role may have changed"""
+    if not created:
+        invalidate_sender_card(instance.id)
+
+
+@receiver(post_save, sender=TeacherProfile)
+@receiver(post_save, sender=StudentProfile)
+@receiver(post_save, sender=StaffProfile)
+@receiver(post_save, sender=SuperAdminProfile)
+@receiver(post_delete, sender=TeacherProfile)
+@receiver(post_delete, sender=StudentProfile)
+@receiver(post_delete, sender=StaffProfile)
+@receiver(post_delete, sender=SuperAdminProfile)
+def invalidate_sender_card_on_profile_change(sender, instance, **kwargs):
+    """Drop the cached sender card when a profile (and its avatar) changes"""
+    invalidate_sender_card(instance.user_id)
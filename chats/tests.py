@@ -1,3 +1,191 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.test import TestCase
+from django.utils import timezone
+
+from course.models import Class, LiveSession
+from .models import ChatMessage, ChatReadState
+from .utils import get_unread_count, reset_read_count
+
+User = get_user_model()
+
+
+class ChatSessionTestCase(TestCase):
+    """Base test case with a live session, a teacher and a student"""
+
+    def setUp(self):
+        cache.clear()
+        self.teacher = User.objects.create_user(
+            email='teacher@test.com',
+            password='testpass123',
+            role='teacher',
+            full_name='Test Teacher'
+        )
+        self.student = User.objects.create_user(
+            email='student@test.com',
+            password='testpass123',
+            role='student',
+            full_name='Test Student'
+        )
+        test_class = Class.objects.create(
+            title='Test Class',
+            start_time=timezone.now().time(),
+            end_time=(timezone.now() + timedelta(hours=1)).time(),
+            days_of_week=[0]
+        )
+        self.session = LiveSession.objects.create(
+            title='Test Session',
+            class_session=test_class,
+            scheduled_date=timezone.now().date()
+        )
+
+    def send(self, sender, text='Salam'):
+        return ChatMessage.objects.create(session=self.session, sender=sender, message=text)
+
+
+class UnreadCounterTestCase(ChatSessionTestCase):
+    """Test cases for cached per-user unread counters"""
+
+    def test_counts_follow_sends(self):
+        """Test that counters are bumped on send without touching the database"""
+        self.send(self.teacher)
+        self.assertEqual(get_unread_count(self.session.id, self.student.id), 1)
+        self.assertEqual(get_unread_count(self.session.id, self.teacher.id), 0)
+
+        for _ in range(5):
+            self.send(self.teacher)
+        self.send(self.student)
+
+        with self.assertNumQueries(0):
+            self.assertEqual(get_unread_count(self.session.id, self.student.id), 6)
+            self.assertEqual(get_unread_count(self.session.id, self.teacher.id), 1)
+
+    def test_mark_read_resets_counter(self):
+        """Test that marking messages read resets the user's counter"""
+        messages = [self.send(self.teacher) for _ in range(3)]
+        self.assertEqual(get_unread_count(self.session.id, self.student.id), 3)
+
+        self.assertEqual(ChatReadState.mark_read(self.session.id, self.student.id, messages[1].id), 2)
+        reset_read_count(self.session.id, self.student.id)
+        self.assertEqual(get_unread_count(self.session.id, self.student.id), 1)
+
+        self.assertEqual(ChatReadState.mark_read(self.session.id, self.student.id), 1)
+        reset_read_count(self.session.id, self.student.id)
+        self.assertEqual(get_unread_count(self.session.id, self.student.id), 0)
+
+    def test_delete_invalidates_counters(self):
+        """Test that soft-deleting a message falls back to a fresh count"""
+        message = self.send(self.teacher)
+        self.send(self.teacher)
+        self.assertEqual(get_unread_count(self.session.id, self.student.id), 2)
+
+        message.is_deleted = True
+        message.save()
+        self.assertEqual(get_unread_count(self.session.id, self.student.id), 1)
+
+
+class ChatReadStateTestCase(ChatSessionTestCase):
+    """Test cases for the per-user read watermark"""
+
+    def test_mark_read_is_single_upsert(self):
+        """Test that marking many messages read writes one row"""
+        ChatMessage.objects.bulk_create([
+            ChatMessage(session=self.session, sender=self.teacher, message=f'Message {i}')
+            for i in range(1000)
+        ])
+
+        # Watermark lookup, pending aggregate, insert-if-missing, conditional update
+        with self.assertNumQueries(4):
+            marked_count = ChatReadState.mark_read(self.session.id, self.student.id)
+        self.assertEqual(marked_count, 1000)
+        self.assertEqual(ChatReadState.objects.filter(session=self.session).count(), 1)
+        self.assertFalse(ChatReadState.unread_messages(self.session.id, self.student.id).exists())
+
+    def test_watermark_never_moves_backwards(self):
+        """Test that marking an older message read keeps the newer watermark"""
+        first = self.send(self.teacher)
+        last = self.send(self.teacher)
+        ChatReadState.mark_read(self.session.id, self.student.id)
+
+        self.assertEqual(ChatReadState.mark_read(self.session.id, self.student.id, first.id), 0)
+        self.assertEqual(
+            ChatReadState.get_last_read_message_id(self.session.id, self.student.id),
+            last.id
+        )
+
+    def test_stale_mark_read_does_not_rewind_watermark(self):
+        """Test that a mark_read racing behind a newer one cannot move the watermark back"""
+        first = self.send(self.teacher)
+        last = self.send(self.teacher)
+        stale_watermark = ChatReadState.get_last_read_message_id(self.session.id, self.student.id)
+        # A newer request advances the watermark between our lookup and our write
+        ChatReadState.mark_read(self.session.id, self.student.id)
+
+        with mock.patch.object(ChatReadState, 'get_last_read_message_id', return_value=stale_watermark):
+            self.assertEqual(ChatReadState.mark_read(self.session.id, self.student.id, first.id), 0)
+
+        self.assertEqual(
+            ChatReadState.get_last_read_message_id(self.session.id, self.student.id),
+            last.id
+        )
+
+    def test_is_read(self):
+        """Test read state for own and other users' messages"""
+        own = self.send(self.student)
+        other = self.send(self.teacher)
+        self.assertTrue(own.is_read_by(self.student.id))
+        self.assertFalse(other.is_read_by(self.student.id))
+
+        ChatReadState.mark_read(self.session.id, self.student.id)
+        last_read = ChatReadState.get_last_read_message_id(self.session.id, self.student.id)
+        self.assertTrue(other.is_read_by(self.student.id, last_read))
+
+
+class SenderCardTestCase(ChatSessionTestCase):
+    """Test cases for cached sender cards used in message payloads"""
+
+    def test_history_query_count_is_bounded(self):
+        """Test that serializing history costs the same regardless of length"""
+        from .utils import serialize_messages
+
+        for i in range(30):
+            self.send(self.teacher if i % 2 else self.student)
+        cache.clear()
+
+        # Messages, then one batched user + profile lookup for all senders
+        with self.assertNumQueries(2):
+            payload = serialize_messages(ChatMessage.objects.filter(session=self.session))
+        self.assertEqual(len(payload), 30)
+        self.assertEqual(payload[0]['sender_name'], 'Test Student')
+        self.assertEqual(payload[1]['sender_role'], 'teacher')
+
+        # Cards are now cached
+        with self.assertNumQueries(1):
+            serialize_messages(ChatMessage.objects.filter(session=self.session))
+
+    def test_card_invalidated_on_user_change(self):
+        """Test that renaming a user refreshes their cached card"""
+        message = self.send(self.teacher)
+        self.assertEqual(message.to_dict()['sender_name'], 'Test Teacher')
+
+        self.teacher.full_name = 'Renamed Teacher'
+        self.teacher.save()
+        self.assertEqual(message.to_dict()['sender_name'], 'Renamed Teacher')
+
+    def test_session_messages_endpoint(self):
+        """Test that the REST history endpoint uses batched sender cards"""
+        from rest_framework.test import APIClient
+
+        for _ in range(10):
+            self.send(self.teacher)
+        client = APIClient()
+        client.force_authenticate(user=self.student)
 
-# Create your tests here.
+        response = client.get(f'/api/chat/messages/session/{self.session.id}/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['count'], 10)
+        self.assertEqual(response.data['results'][0]['sender_name'], 'Test Teacher')
+        self.assertFalse(response.data['results'][0]['is_read'])
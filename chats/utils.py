@@ -0,0 +1,198 @@
+"""
+Utility functions for chat unread counters and sender cards.
+
+Unread counts are derived from two counters held in the cache:
+- the number of visible messages in a session
+- the number of those messages a user has read (their own messages included)
+
+Sending a message bumps the session counter (and the sender's read counter),
+marking messages read resets the user's read counter, so answering "how many
+unread messages does this user have" is two cache reads no matter how long the
+session history is. Missing keys fall back to the database and are re-cached.
+
+Sender cards (name, email, role, avatar URL) are cached per user and dropped
+whenever the user or their profile is saved, so serializing a page of chat
+messages needs at most one user query no matter how many senders it has.
+"""
+import logging
+
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+# Counters self-heal after this long even if an update was missed
+UNREAD_CACHE_TIMEOUT = 60 * 60 * 24
+
+SENDER_CARD_CACHE_TIMEOUT = 60 * 60
+
+# Role -> reverse one-to-one accessor of the profile holding the avatar
+PROFILE_RELATIONS = {
+    'teacher': 'teacherprofile_profile',
+    'student': 'studentprofile_profile',
+    'staff': 'staffprofile_profile',
+    'super_admin': 'superadminprofile_profile',
+}
+
+
+def _generation_key(session_id):
+    return f'chat:session:{session_id}:generation'
+
+
+def _counter_keys(session_id, user_id):
+    """Return (total_key, read_key) for the current generation of the session."""
+    generation = cache.get(_generation_key(session_id), 0)
+    prefix = f'chat:session:{session_id}:g{generation}'
+    return f'{prefix}:total', f'{prefix}:read:{user_id}'
+
+
+def count_session_messages(session_id):
+    """Count visible messages in a session (database fallback)."""
+    from .models import ChatMessage
+
+    return ChatMessage.objects.filter(
+        session_id=session_id,
+        is_deleted=False
+    ).count()
+
+
+def count_read_messages(session_id, user_id):
+    """Count visible messages in a session the user has read (database fallback)."""
+    from .models import ChatReadState
+
+    unread = ChatReadState.unread_messages(session_id, user_id).count()
+    return count_session_messages(session_id) - unread
+
+
+def _incr(key):
+    """Increment a counter if it is cached; missing keys are rebuilt on next read."""
+    try:
+        cache.incr(key)
+    except ValueError:
+        pass
+
+
+def get_unread_count(session_id, user_id):
+    """
+    Get unread message count for a user in a session.
+
+    Args:
+        session_id: LiveSession id
+        user_id: CustomUser id
+
+    Returns:
+        Number of messages in the session the user has not read
+    """
+    total_key, read_key = _counter_keys(session_id, user_id)
+    cached = cache.get_many([total_key, read_key])
+
+    total = cached.get(total_key)
+    if total is None:
+        total = count_session_messages(session_id)
+        cache.add(total_key, total, UNREAD_CACHE_TIMEOUT)
+
+    read = cached.get(read_key)
+    if read is None:
+        read = count_read_messages(session_id, user_id)
+        cache.add(read_key, read, UNREAD_CACHE_TIMEOUT)
+
+    return max(0, total - read)
+
+
+def record_message_sent(session_id, sender_id):
+    """Bump the session counter; the sender has implicitly read their own message."""
+    total_key, read_key = _counter_keys(session_id, sender_id)
+    _incr(total_key)
+    _incr(read_key)
+
+
+def reset_read_count(session_id, user_id):
+    """Re-sync a user's read counter after they marked messages as read."""
+    _, read_key = _counter_keys(session_id, user_id)
+    cache.set(read_key, count_read_messages(session_id, user_id), UNREAD_CACHE_TIMEOUT)
+
+
+def invalidate_session_counters(session_id):
+    """
+    Drop every counter of a session, e.g. after a message was edited or deleted.
+    Bumping the generation orphans the old keys, which then simply expire.
+    """
+    key = _generation_key(session_id)
+    cache.add(key, 0, None)
+    try:
+        cache.incr(key)
+    except ValueError:
+        logger.warning(f'Could not invalidate chat counters for session {session_id}')
+
+
+def _sender_card_key(user_id):
+    return f'chat:sender_card:{user_id}'
+
+
+def build_sender_card(user):
+    """Build the sender fields of a chat message payload from a user."""
+    profile_picture = None
+    relation = PROFILE_RELATIONS.get(user.role)
+    try:
+        if relation:
+            profile = getattr(user, relation)
+            if profile.profile_image:
+                profile_picture = profile.profile_image.url
+    except Exception:
+        # If profile doesn't exist or has no image, profile_picture remains None
+        pass
+    
+    # Construct full URL for profile picture
+    if profile_picture and not profile_picture.startswith('http'):
+        backend_url = getattr(settings, 'BACKEND_URL', 'http://localhost:8000')
+        profile_picture = f'{backend_url}{profile_picture}'
+    
+    return {
+        'sender_id': user.id,
+        'sender_name': user.full_name or user.email,
+        'sender_email': user.email,
+        'sender_role': user.role or 'student',
+        'sender_profile_picture': profile_picture,
+    }
+
+
+def get_sender_cards(user_ids):
+    """
+    Get sender cards for several users.
+
+    Args:
+        user_ids: Iterable of CustomUser ids
+
+    Returns:
+        Dict mapping user id to sender card; cache misses are loaded with one query
+    """
+    from accounts.models import CustomUser
+
+    user_ids = set(user_ids)
+    keys = {_sender_card_key(user_id): user_id for user_id in user_ids}
+    cached = cache.get_many(keys.keys())
+    cards = {keys[key]: card for key, card in cached.items()}
+
+    missing = user_ids - cards.keys()
+    if missing:
+        users = CustomUser.objects.filter(id__in=missing).select_related(*PROFILE_RELATIONS.values())
+        fresh = {user.id: build_sender_card(user) for user in users}
+        cache.set_many(
+            {_sender_card_key(user_id): card for user_id, card in fresh.items()},
+            SENDER_CARD_CACHE_TIMEOUT
+        )
+        cards.update(fresh)
+
+    return cards
+
+
+def invalidate_sender_card(user_id):
+    """Drop a user's cached sender card after their name, role or avatar changed."""
+    cache.delete(_sender_card_key(user_id))
+
+
+def serialize_messages(messages):
+    """Convert chat messages to payload dicts, loading all sender cards in one batch."""
+    messages = list(messages)
+    cards = get_sender_cards(message.sender_id for message in messages)
+    return [message.to_dict(sender_card=cards.get(message.sender_id)) for message in messages]
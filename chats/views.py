@@ -4,8 +4,9 @@ from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from django_filters.rest_framework import DjangoFilterBackend
 from django.db.models import Count, Q, Exists, OuterRef
-from .models import ChatMessage
+from .models import ChatMessage, ChatReadState
 from .serializers import ChatMessageSerializer
+from .utils import get_unread_count, reset_read_count
 from course.models import LiveSession
 
 
@@ -50,15 +51,15 @@ class ChatMessageViewSet(viewsets.ModelViewSet):
             limit = int(request.query_params.get('limit', 50))
             offset = int(request.query_params.get('offset', 0))
             
-            messages = ChatMessage.objects.filter(
+            messages = list(ChatMessage.objects.filter(
                 session=session,
                 is_deleted=False
-            ).order_by('created_at')[offset:offset + limit]
+            ).order_by('created_at')[offset:offset + limit])
             
             serializer = self.get_serializer(messages, many=True)
             
             return Response({
-                'count': messages.count(),
+                'count': len(messages),
                 'results': serializer.data,
             })
             
@@ -106,24 +107,12 @@ class ChatMessageViewSet(viewsets.ModelViewSet):
             # Get message_id from request if provided
             message_id = request.data.get('message_id')
             
-            # Get all unread messages in the session for this user
-            messages_query = ChatMessage.objects.filter(
-                session=session,
-                is_deleted=False
-            ).exclude(
-                read_by=request.user  # Only get messages user hasn't read
-            )
-            
-            # If message_id is provided, only mark messages up to that message
-            if message_id:
-                messages_query = messages_query.filter(id__lte=message_id)
+            # Advance the user's read watermark (one UPSERT for the whole range)
+            marked_count = ChatReadState.mark_read(session.id, request.user.id, message_id)
             
-            marked_count = 0
-            
-            # Add user to read_by for each unread message
-            for message in messages_query:
-                message.read_by.add(request.user)
-                marked_count += 1
+            # Reset this user's cached read counter
+            if marked_count:
+                reset_read_count(session.id, request.user.id)
             
             return Response({
                 'message': f'Marked {marked_count} messages as read',
@@ -150,13 +139,8 @@ class ChatMessageViewSet(viewsets.ModelViewSet):
             # Verify session exists
             session = LiveSession.objects.get(id=session_id)
             
-            # Count unread messages (messages where user is NOT in read_by)
-            unread_count = ChatMessage.objects.filter(
-                session=session,
-                is_deleted=False
-            ).exclude(
-                read_by=request.user  # Exclude messages user has read
-            ).count()
+            # Unread count from the cached per-user counters
+            unread_count = get_unread_count(session.id, request.user.id)
             
             return Response({
                 'session_id': session_id,
@@ -1,6 +1,7 @@
 from django.contrib import admin
+from django.utils import timezone
 from django.utils.html import format_html
-from .models import ContactMessage, CompanyContact, CompanySetting, UserCommunication
+from .models import ContactMessage, CompanyContact, CompanySetting, UserCommunication, OutboxTask, OutboxTaskStatus
 
 
 @admin.register(UserCommunication)
@@ -189,4 +190,24 @@ class CompanyContactAdmin(admin.ModelAdmin):
 @admin.register(CompanySetting)
 class CompanySettingAdmin(admin.ModelAdmin):
     list_display = ['default_timezone', 'updated_at']
-    filter_horizontal = ['contact']
\ No newline at end of file
+    filter_horizontal = ['contact']
+
+
+@admin.register(OutboxTask)
+class OutboxTaskAdmin(admin.ModelAdmin):
+    """Admin interface for queued background tasks"""
+    list_display = ['name', 'status', 'attempts', 'max_attempts', 'run_after', 'created_at']
+    list_filter = ['status', 'name']
+    search_fields = ['name', 'last_error']
+    readonly_fields = ['created_at', 'updated_at', 'locked_at', 'last_error']
+    actions = ['retry_tasks']
+
+    @admin.action(description='Retry selected tasks now')
+    def retry_tasks(self, request, queryset):
+        updated = queryset.update(
+            status=OutboxTaskStatus.PENDING,
+            attempts=0,
+            run_after=timezone.now(),
+            locked_at=None
+        )
+        self.message_user(request, f'{updated} task(s) queued for retry.')
@@ -0,0 +1,46 @@
+"""
+Versioned cache keys.
+
+Data derived from the database (search vocabularies, serialized payloads,
+per-user lookups) is cached under keys that embed a version number, stored in
+the cache under its own key. Bumping the version makes every process miss and
+rebuild, without having to find and delete the old entries.
+
+Versions start from the current time in microseconds rather than from 1, so a
+version lost to eviction or a cache flush is never reused while processes
+still hold data memoized for it.
+"""
+import logging
+import time
+
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+
+def _fresh_version():
+    return time.time_ns() // 1000
+
+
+def get_cache_version(key):
+    """Current version stored under `key`, starting one if there is none."""
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, _fresh_version(), None)
+        version = cache.get(key, 0)
+    return version
+
+
+def bump_cache_version(key):
+    """
+    Move the version stored under `key` forward.
+
+    Returns:
+        The new version, or None (logged) if the cache could not bump it
+    """
+    cache.add(key, _fresh_version(), None)
+    try:
+        return cache.incr(key)
+    except ValueError:
+        logger.warning('Could not bump the cache version %s', key)
+        return None
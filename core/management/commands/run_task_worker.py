@@ -0,0 +1,68 @@
+"""
+Management command that runs queued background tasks (see core/tasks.py).
+Run it as a long-lived process next to the web server, e.g. under systemd.
+"""
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from core.tasks import run_pending_tasks
+
+
+class Command(BaseCommand):
+    help = 'Run queued background tasks from the outbox table'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Drain the currently due tasks and exit instead of polling forever',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=50,
+            help='Maximum number of tasks claimed per batch (default: 50)',
+        )
+        parser.add_argument(
+            '--only',
+            action='append',
+            metavar='TASK',
+            help='Only run this task (dotted name, repeatable), e.g. for a worker dedicated to slow tasks',
+        )
+        parser.add_argument(
+            '--exclude',
+            action='append',
+            metavar='TASK',
+            help='Never run this task (dotted name, repeatable)',
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=2.0,
+            help='Seconds to sleep when no tasks are due (default: 2)',
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        poll_interval = options['poll_interval']
+        once = options['once']
+
+        self.stdout.write(self.style.SUCCESS('Task worker started'))
+
+        try:
+            while True:
+                close_old_connections()
+                succeeded, failed = run_pending_tasks(
+                    limit=batch_size, only=options['only'], exclude=options['exclude']
+                )
+                if succeeded or failed:
+                    self.stdout.write(f'Ran {succeeded + failed} task(s): {succeeded} succeeded, {failed} failed')
+
+                if succeeded + failed < batch_size:
+                    if once:
+                        break
+                    time.sleep(poll_interval)
+        except KeyboardInterrupt:
+            self.stdout.write(self.style.WARNING('Task worker stopped'))
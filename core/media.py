@@ -0,0 +1,218 @@
+"""
+Protected media delivery.
+
+Views authorize the request in Django, then hand the file to
+`serve_protected_file`, which depending on PROTECTED_MEDIA_BACKEND either lets
+the front proxy send it (X-Accel-Redirect for nginx, X-Sendfile for
+Apache/lighttpd) or streams it itself with Range, If-Range and conditional GET
+support. Either way a video player seeking in a recording or a PDF viewer
+opening page 300 fetches only the bytes it needs.
+
+Browsers cannot attach the JWT to <video> or PDF viewer requests, so the API
+hands out short-lived signed URLs (`signed_media_url`). A token is bound to a
+user and a file; views accept either an authenticated request or a valid token
+and then apply their usual permission checks to that user.
+"""
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core import signing
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseNotModified, HttpResponseRedirect
+from django.utils.cache import patch_cache_control
+from django.utils.http import content_disposition_header, http_date, parse_http_date_safe
+
+MEDIA_TOKEN_SALT = 'core.media'
+
+RANGE_PATTERN = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+class FileRange:
+    """Read-only file-like view of `length` bytes of a file starting at `start`."""
+
+    def __init__(self, handle, start, length):
+        handle.seek(start)
+        self.handle = handle
+        self.remaining = length
+
+    def read(self, size=-1):
+        if self.remaining <= 0:
+            return b''
+        size = self.remaining if size is None or size < 0 else min(size, self.remaining)
+        data = self.handle.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def close(self):
+        self.handle.close()
+
+
+def signed_media_url(request, path, user, field_file):
+    """
+    Build an absolute URL to a protected media view, signed for this user and file.
+
+    Args:
+        request: Current request (for the host)
+        path: Path of the protected media view
+        user: User the link is issued to
+        field_file: FieldFile the view will serve
+    """
+    token = signing.dumps({'u': user.pk, 'f': field_file.name}, salt=MEDIA_TOKEN_SALT, compress=True)
+    return request.build_absolute_uri(f'{path}?token={token}')
+
+
+def get_media_user(request, field_file):
+    """
+    Return the user a protected media request is made for: the authenticated user,
+    else the user of a valid, unexpired token issued for this file. None otherwise.
+    """
+    if request.user.is_authenticated:
+        return request.user
+
+    token = request.GET.get('token')
+    if not token or not field_file:
+        return None
+    try:
+        payload = signing.loads(token, salt=MEDIA_TOKEN_SALT, max_age=settings.PROTECTED_MEDIA_TOKEN_MAX_AGE)
+    except signing.BadSignature:
+        return None
+    if payload.get('f') != field_file.name:
+        return None
+    return get_user_model().objects.filter(pk=payload.get('u'), is_active=True).first()
+
+
+def parse_range(header, size):
+    """
+    Parse a Range header against a file size.
+
+    Returns:
+        (start, end) inclusive for a single satisfiable range, None to send the
+        whole file (no header, malformed header or several ranges), or False if the
+        range cannot be satisfied.
+    """
+    match = RANGE_PATTERN.match(header.strip()) if header else None
+    if not match:
+        return None
+
+    first, last = match.groups()
+    if not first:
+        if not last:
+            return None
+        # Suffix range: the last N bytes
+        length = int(last)
+        if length == 0:
+            return False
+        return max(size - length, 0), size - 1
+
+    start = int(first)
+    if last and int(last) < start:
+        return None
+    if start >= size:
+        return False
+    end = int(last) if last else size - 1
+    return start, min(end, size - 1)
+
+
+def is_not_modified(request, etag, last_modified):
+    """Evaluate If-None-Match / If-Modified-Since for a GET or HEAD request."""
+    if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+    if if_none_match:
+        candidates = [value.strip() for value in if_none_match.split(',')]
+        # Weak comparison, as If-None-Match requires
+        return '*' in candidates or etag in candidates or f'W/{etag}' in candidates
+
+    if_modified_since = parse_http_date_safe(request.META.get('HTTP_IF_MODIFIED_SINCE', ''))
+    return if_modified_since is not None and int(last_modified) <= if_modified_since
+
+
+def serve_protected_file(request, field_file, filename=None, as_attachment=False):
+    """
+    Send a file the caller has already authorized.
+
+    Args:
+        request: Current request
+        field_file: FieldFile to send
+        filename: Name offered to the browser (default: the stored file's name)
+        as_attachment: Ask the browser to download instead of displaying inline
+
+    Raises:
+        Http404: if there is no file or it is missing from storage
+    """
+    if not field_file:
+        raise Http404('File not found')
+
+    filename = filename or os.path.basename(field_file.name)
+    content_type = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+
+    try:
+        path = field_file.path
+    except NotImplementedError:
+        # Remote storage (S3 and the like) serves ranges itself
+        return HttpResponseRedirect(field_file.url)
+
+    try:
+        stat = os.stat(path)
+    except OSError:
+        raise Http404('File not found')
+
+    backend = settings.PROTECTED_MEDIA_BACKEND
+    if backend in ('nginx', 'sendfile'):
+        # The proxy handles Range and conditional requests for the file itself
+        response = HttpResponse(content_type=content_type)
+        if backend == 'nginx':
+            internal_url = settings.PROTECTED_MEDIA_INTERNAL_URL.rstrip('/')
+            response['X-Accel-Redirect'] = f'{internal_url}/{quote(field_file.name)}'
+        else:
+            response['X-Sendfile'] = path
+        response['Content-Disposition'] = content_disposition_header(as_attachment, filename)
+        return _finalize_response(response)
+
+    etag = f'"{stat.st_size:x}-{stat.st_mtime_ns:x}"'
+    last_modified = http_date(stat.st_mtime)
+
+    if is_not_modified(request, etag, stat.st_mtime):
+        response = HttpResponseNotModified()
+        response['ETag'] = etag
+        response['Last-Modified'] = last_modified
+        return _finalize_response(response)
+
+    byte_range = parse_range(request.META.get('HTTP_RANGE'), stat.st_size)
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if byte_range is not None and if_range and if_range.strip() not in (etag, last_modified):
+        # The client's partial copy is outdated: send the whole file
+        byte_range = None
+
+    if byte_range is False:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{stat.st_size}'
+        return _finalize_response(response)
+
+    handle = open(path, 'rb')
+    if byte_range is None:
+        response = FileResponse(handle, as_attachment=as_attachment, filename=filename, content_type=content_type)
+    else:
+        start, end = byte_range
+        response = FileResponse(
+            FileRange(handle, start, end - start + 1),
+            status=206,
+            as_attachment=as_attachment,
+            filename=filename,
+            content_type=content_type,
+        )
+        response['Content-Length'] = str(end - start + 1)
+        response['Content-Range'] = f'bytes {start}-{end}/{stat.st_size}'
+
+    response['ETag'] = etag
+    response['Last-Modified'] = last_modified
+    return _finalize_response(response)
+
+
+def _finalize_response(response):
+    """Headers shared by every protected media response."""
+    response['Accept-Ranges'] = 'bytes'
+    # Never store authorized files in shared caches
+    patch_cache_control(response, private=True, max_age=settings.PROTECTED_MEDIA_CACHE_MAX_AGE)
+    return response
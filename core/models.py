@@ -1,4 +1,5 @@
 from django.db import models
+from django.utils import timezone
 import uuid
 
 # Create your models here.
@@ -214,4 +215,41 @@ class UserCommunication(TimeStampedModel):
                 self.status = 'new'
             else:
                 self.status = 'pending'
-        super().save(*args, **kwargs)
\ No newline at end of file
+        super().save(*args, **kwargs)
+
+
+class OutboxTaskStatus(models.TextChoices):
+    PENDING = 'pending', 'Pending'
+    RUNNING = 'running', 'Running'
+    FAILED = 'failed', 'Failed'
+
+
+class OutboxTask(TimeStampedModel):
+    """
+    Background task written in the same transaction as the change that caused it
+    and executed later by the `run_task_worker` management command.
+    Successful tasks are deleted; failed ones are retried with backoff.
+    """
+    name = models.CharField(max_length=255, help_text='Dotted path of the task function')
+    payload = models.JSONField(default=dict, blank=True, help_text='Keyword arguments for the task')
+    status = models.CharField(
+        max_length=16,
+        choices=OutboxTaskStatus.choices,
+        default=OutboxTaskStatus.PENDING
+    )
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    run_after = models.DateTimeField(default=timezone.now, help_text='Do not run before this time')
+    locked_at = models.DateTimeField(null=True, blank=True, help_text='When a worker claimed the task')
+    last_error = models.TextField(blank=True)
+
+    class Meta:
+        ordering = ['run_after']
+        verbose_name = 'Outbox Task'
+        verbose_name_plural = 'Outbox Tasks'
+        indexes = [
+            models.Index(fields=['status', 'run_after']),
+        ]
+
+    def __str__(self):
+        return f"{self.name} ({self.status}, attempt {self.attempts}/{self.max_attempts})"
@@ -0,0 +1,224 @@
+"""
+Local background task queue.
+
+Tasks are plain functions decorated with @background_task. Calling
+`func.enqueue(**kwargs)` schedules them through the backend selected by the
+TASK_QUEUE_BACKEND setting:
+
+- 'outbox' (default): an OutboxTask row is written in the caller's transaction,
+  so the task exists if and only if the surrounding change commits. The
+  `run_task_worker` management command claims due rows, runs them and retries
+  failures with exponential backoff.
+- 'immediate': the task runs in-process right after the transaction commits
+  (handy for local development without a worker).
+
+Task arguments must be JSON-serializable (pass ids, not model instances).
+
+A task that may run longer than STALE_LOCK_TIMEOUT must call
+`renew_task_lease()` regularly, or another worker reclaims it and runs it
+again. Slow tasks can also get their own worker (`run_task_worker --only`).
+"""
+import logging
+from contextvars import ContextVar
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import OutboxTask, OutboxTaskStatus
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_ATTEMPTS = 5
+
+# Retry delay is RETRY_BASE_DELAY * 2 ** (attempt - 1), capped at RETRY_MAX_DELAY
+RETRY_BASE_DELAY = timedelta(seconds=30)
+RETRY_MAX_DELAY = timedelta(hours=1)
+
+# Tasks stuck in RUNNING longer than this (e.g. the worker died) are claimed
+# again, or marked failed if they have no attempts left
+STALE_LOCK_TIMEOUT = timedelta(minutes=10)
+
+# The OutboxTask the current worker is running, for renew_task_lease()
+_current_task = ContextVar('current_outbox_task', default=None)
+
+
+class TaskLeaseLost(Exception):
+    """Another worker has claimed the running task; stop working on it."""
+
+
+def background_task(func=None, *, max_attempts=DEFAULT_MAX_ATTEMPTS):
+    """
+    Mark a function as a background task and attach `func.enqueue(**kwargs)`.
+
+    Usage:
+        @background_task
+        def send_welcome_email(user_id): ...
+
+        send_welcome_email.enqueue(user_id=user.id)
+    """
+    def decorator(func):
+        func.task_name = f'{func.__module__}.{func.__name__}'
+        func.enqueue = lambda **payload: enqueue(func.task_name, max_attempts=max_attempts, **payload)
+        return func
+
+    if func is not None:
+        return decorator(func)
+    return decorator
+
+
+def enqueue(name, max_attempts=DEFAULT_MAX_ATTEMPTS, **payload):
+    """
+    Schedule a task by its dotted name.
+
+    Returns:
+        The created OutboxTask, or None for the immediate backend
+    """
+    backend = getattr(settings, 'TASK_QUEUE_BACKEND', 'outbox')
+
+    if backend == 'immediate':
+        transaction.on_commit(lambda: _call(name, payload))
+        return None
+
+    return OutboxTask.objects.create(name=name, payload=payload, max_attempts=max_attempts)
+
+
+def _call(name, payload):
+    """Resolve and run a task function; only @background_task functions may run."""
+    func = import_string(name)
+    if getattr(func, 'task_name', None) != name:
+        raise ValueError(f'{name} is not a registered background task')
+    return func(**payload)
+
+
+def claim_tasks(limit=50, only=None, exclude=None):
+    """
+    Atomically claim up to `limit` due tasks for this worker, optionally only
+    the tasks named in `only` or all but those in `exclude`.
+    Uses SKIP LOCKED where supported so several workers can run side by side.
+
+    Each claimed task carries the locked_at it was stamped with; that stamp is
+    this worker's lease, and a task whose stamp changed was taken over by
+    another worker (see _owned).
+    """
+    now = timezone.now()
+    stale = Q(status=OutboxTaskStatus.RUNNING, locked_at__lt=now - STALE_LOCK_TIMEOUT)
+    retriable = Q(attempts__lt=F('max_attempts'))
+    due = Q(status=OutboxTaskStatus.PENDING, run_after__lte=now) | (stale & retriable)
+
+    tasks = OutboxTask.objects.all()
+    if only:
+        tasks = tasks.filter(name__in=only)
+    if exclude:
+        tasks = tasks.exclude(name__in=exclude)
+
+    with transaction.atomic():
+        # A stale task that used its last attempt may have done its work before
+        # the worker died; running it again could repeat side effects
+        expired = tasks.filter(stale & ~retriable).update(
+            status=OutboxTaskStatus.FAILED,
+            locked_at=None,
+            last_error='Worker lease expired on the last attempt',
+            updated_at=now,
+        )
+        if expired:
+            logger.warning(f'Marked {expired} stale task(s) with no attempts left as failed')
+
+        tasks = tasks.filter(due)
+        task_ids = list(
+            tasks.select_for_update(skip_locked=True)
+            .order_by('run_after')
+            .values_list('id', flat=True)[:limit]
+        )
+        OutboxTask.objects.filter(id__in=task_ids).update(
+            status=OutboxTaskStatus.RUNNING,
+            locked_at=now,
+            attempts=F('attempts') + 1,
+        )
+
+    return list(OutboxTask.objects.filter(id__in=task_ids).order_by('run_after'))
+
+
+def _owned(task):
+    """Queryset of the task row, empty if another worker has claimed it since."""
+    return OutboxTask.objects.filter(
+        id=task.id, status=OutboxTaskStatus.RUNNING, locked_at=task.locked_at
+    )
+
+
+def renew_task_lease():
+    """
+    Re-stamp the lease of the task this worker is running, so it is not
+    reclaimed as stale. Does nothing outside a worker (e.g. the immediate
+    backend).
+
+    Raises:
+        TaskLeaseLost: if another worker has claimed the task since
+    """
+    task = _current_task.get()
+    if task is None:
+        return
+    now = timezone.now()
+    if not _owned(task).update(locked_at=now):
+        raise TaskLeaseLost(f'Task {task.name} (id={task.id}) was claimed by another worker')
+    task.locked_at = now
+
+
+def run_task(task):
+    """Run one claimed task; delete it on success, reschedule or fail it otherwise."""
+    token = _current_task.set(task)
+    try:
+        _call(task.name, task.payload)
+    except TaskLeaseLost as e:
+        logger.warning(f'{e}; abandoning it')
+        return False
+    except Exception as e:
+        logger.error(f'Task {task.name} (id={task.id}) failed on attempt {task.attempts}: {e}', exc_info=True)
+        task.last_error = f'{type(e).__name__}: {e}'
+        if task.attempts >= task.max_attempts:
+            task.status = OutboxTaskStatus.FAILED
+        else:
+            delay = min(RETRY_BASE_DELAY * 2 ** (task.attempts - 1), RETRY_MAX_DELAY)
+            task.status = OutboxTaskStatus.PENDING
+            task.run_after = timezone.now() + delay
+        # Leave a task that was taken over to its new owner
+        _owned(task).update(
+            status=task.status,
+            run_after=task.run_after,
+            locked_at=None,
+            last_error=task.last_error,
+            updated_at=timezone.now(),
+        )
+        task.locked_at = None
+        return False
+    finally:
+        _current_task.reset(token)
+
+    _owned(task).delete()
+    return True
+
+
+def run_pending_tasks(limit=50, only=None, exclude=None):
+    """
+    Claim and run up to `limit` due tasks (filtered as in claim_tasks).
+
+    Tasks are claimed one at a time, right before they run, so a task never
+    waits behind slow ones while its lease ages towards STALE_LOCK_TIMEOUT
+    and another worker reclaims it.
+
+    Returns:
+        Tuple of (succeeded, failed) counts
+    """
+    succeeded = failed = 0
+    for _ in range(limit):
+        claimed = claim_tasks(1, only=only, exclude=exclude)
+        if not claimed:
+            break
+        if run_task(claimed[0]):
+            succeeded += 1
+        else:
+            failed += 1
+    return succeeded, failed
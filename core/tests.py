@@ -1,3 +1,174 @@
-from django.test import TestCase
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from .models import OutboxTask, OutboxTaskStatus
+from . import tasks
+from .cache import bump_cache_version, get_cache_version
+from .tasks import STALE_LOCK_TIMEOUT, claim_tasks, enqueue, run_pending_tasks, run_task
+
+
+class OutboxTaskQueueTestCase(TestCase):
+    """Test cases for the outbox task queue and worker"""
+
+    def test_unregistered_function_is_not_run(self):
+        """Test that only @background_task functions can be executed"""
+        task = enqueue('os.getcwd', max_attempts=1)
+
+        self.assertEqual(run_pending_tasks(), (0, 1))
+
+        task.refresh_from_db()
+        self.assertEqual(task.status, OutboxTaskStatus.FAILED)
+        self.assertIn('not a registered background task', task.last_error)
+
+    def test_failed_task_backs_off(self):
+        """Test that a failing task is rescheduled with a growing delay"""
+        task = enqueue('accounts.tasks.does_not_exist', max_attempts=3)
+
+        run_pending_tasks()
+        task.refresh_from_db()
+        self.assertEqual(task.status, OutboxTaskStatus.PENDING)
+        self.assertEqual(task.attempts, 1)
+        first_delay = task.run_after - timezone.now()
+        self.assertGreater(first_delay, timedelta(seconds=20))
+
+        # Not due yet, so nothing is claimed
+        self.assertEqual(run_pending_tasks(), (0, 0))
+
+        OutboxTask.objects.filter(id=task.id).update(run_after=timezone.now())
+        run_pending_tasks()
+        task.refresh_from_db()
+        self.assertGreater(task.run_after - timezone.now(), first_delay)
+
+    def test_stale_running_task_is_reclaimed(self):
+        """Test that tasks left RUNNING by a dead worker are picked up again"""
+        task = enqueue('accounts.tasks.does_not_exist')
+        OutboxTask.objects.filter(id=task.id).update(
+            status=OutboxTaskStatus.RUNNING,
+            locked_at=timezone.now() - timedelta(minutes=1),
+        )
+        self.assertEqual(claim_tasks(), [])
+
+        OutboxTask.objects.filter(id=task.id).update(locked_at=timezone.now() - STALE_LOCK_TIMEOUT * 2)
+        self.assertEqual([claimed.id for claimed in claim_tasks()], [task.id])
+
+    def test_stale_task_without_attempts_left_is_failed(self):
+        """Test that a stale task on its last attempt is not run again"""
+        task = enqueue('accounts.tasks.does_not_exist', max_attempts=1)
+        OutboxTask.objects.filter(id=task.id).update(
+            status=OutboxTaskStatus.RUNNING,
+            attempts=1,
+            locked_at=timezone.now() - STALE_LOCK_TIMEOUT * 2,
+        )
+        self.assertEqual(claim_tasks(), [])
+
+        task.refresh_from_db()
+        self.assertEqual(task.status, OutboxTaskStatus.FAILED)
+        self.assertIsNone(task.locked_at)
+        self.assertTrue(task.last_error)
+
+    def test_tasks_are_claimed_right_before_they_run(self):
+        """Test that tasks queued behind a running one are not claimed yet"""
+        first = enqueue('accounts.tasks.send_verification_email', user_id=0)
+        second = enqueue('accounts.tasks.send_verification_email', user_id=0)
+        statuses = []
+
+        def call(name, payload):
+            statuses.append(OutboxTask.objects.filter(id=second.id).values_list('status', flat=True).first())
+
+        with mock.patch.object(tasks, '_call', side_effect=call):
+            self.assertEqual(run_pending_tasks(), (2, 0))
+
+        # While the first task ran the second was still pending
+        self.assertEqual(statuses[0], OutboxTaskStatus.PENDING)
+        self.assertFalse(OutboxTask.objects.filter(id__in=[first.id, second.id]).exists())
+
+    def test_taken_over_task_is_left_to_its_new_owner(self):
+        """Test that a worker whose lease went stale does not delete or reschedule the task"""
+        enqueue('accounts.tasks.send_verification_email', user_id=0)
+        task = claim_tasks()[0]
+        # Another worker reclaims it after the lease went stale
+        OutboxTask.objects.filter(id=task.id).update(locked_at=timezone.now() + timedelta(seconds=1))
+
+        self.assertTrue(run_task(task))
+        self.assertEqual(OutboxTask.objects.get(id=task.id).status, OutboxTaskStatus.RUNNING)
+
+    def test_running_task_can_renew_its_lease(self):
+        """Test that renew_task_lease re-stamps the running task and fails once it was taken over"""
+        enqueue('accounts.tasks.send_verification_email', user_id=0)
+        task = claim_tasks()[0]
+        claimed_at = task.locked_at
+        errors = []
+
+        def call(name, payload):
+            tasks.renew_task_lease()
+            self.assertGreater(OutboxTask.objects.get(id=task.id).locked_at, claimed_at)
+            OutboxTask.objects.filter(id=task.id).update(locked_at=timezone.now() + timedelta(seconds=1))
+            try:
+                tasks.renew_task_lease()
+            except tasks.TaskLeaseLost as e:
+                errors.append(e)
+                raise
+
+        with mock.patch.object(tasks, '_call', side_effect=call):
+            self.assertFalse(run_task(task))
+
+        self.assertEqual(len(errors), 1)
+        # Left to the worker that took it over: not rescheduled, not counted as an attempt failure
+        task.refresh_from_db()
+        self.assertEqual(task.status, OutboxTaskStatus.RUNNING)
+        self.assertEqual(task.last_error, '')
+
+    def test_worker_can_be_limited_to_some_tasks(self):
+        """Test that only/exclude restrict which tasks a worker claims"""
+        slow = enqueue('course.tasks.ingest_recording', import_id=0)
+        fast = enqueue('accounts.tasks.send_verification_email', user_id=0)
+
+        self.assertEqual([task.id for task in claim_tasks(exclude=['course.tasks.ingest_recording'])], [fast.id])
+        self.assertEqual([task.id for task in claim_tasks(only=['course.tasks.ingest_recording'])], [slow.id])
+
+    @override_settings(TASK_QUEUE_BACKEND='immediate')
+    def test_immediate_backend_runs_after_commit(self):
+        """Test that the immediate backend skips the outbox table"""
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            self.assertIsNone(enqueue('accounts.tasks.send_verification_email', user_id=0))
+
+        self.assertEqual(len(callbacks), 1)
+        self.assertFalse(OutboxTask.objects.exists())
+
+    def test_worker_command_once(self):
+        """Test that run_task_worker --once drains due tasks and exits"""
+        enqueue('accounts.tasks.send_verification_email', user_id=0)
+        out = StringIO()
+
+        call_command('run_task_worker', '--once', stdout=out)
+
+        self.assertIn('1 succeeded', out.getvalue())
+        self.assertFalse(OutboxTask.objects.exists())
+
+
+class CacheVersionTestCase(TestCase):
+    """Test cases for versioned cache keys"""
+
+    def setUp(self):
+        cache.clear()
+
+    def test_bump_moves_version_forward(self):
+        """Test that a version is stable until bumped"""
+        version = get_cache_version('test:version')
+        self.assertEqual(get_cache_version('test:version'), version)
+        self.assertEqual(bump_cache_version('test:version'), version + 1)
+        self.assertEqual(get_cache_version('test:version'), version + 1)
+
+    def test_lost_version_is_not_reused(self):
+        """Test that a version evicted from the cache restarts above the old one"""
+        with mock.patch('core.cache.time.time_ns', return_value=1_000_000_000):
+            version = bump_cache_version('test:version')
+        cache.delete('test:version')
+        with mock.patch('core.cache.time.time_ns', return_value=2_000_000_000):
+            self.assertGreater(get_cache_version('test:version'), version)
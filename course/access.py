@@ -0,0 +1,88 @@
+"""
+Cached access decisions for live sessions.
+
+Who may join a session depends only on the class: its teachers and its
+students with a completed enrollment (plus superusers and super admins).
+`class_access` loads, per user, the ids of the classes they teach and the
+classes they are enrolled in, and keeps them in the cache under a per-user
+version. Checks are then set lookups with no query.
+
+Saving or deleting a ClassEnrollment bumps its student's version, and
+changing Class.teacher bumps the version of the teachers involved (see
+course/signals.py). ACCESS_CACHE_TIMEOUT bounds staleness after bulk
+updates that bypass signals.
+"""
+from typing import NamedTuple
+
+from django.core.cache import cache
+
+from accounts.models import RoleChoices
+from core.cache import bump_cache_version, get_cache_version
+from enrollments.models import ClassEnrollment, EnrollmentChoices
+
+ACCESS_CACHE_TIMEOUT = 10 * 60
+
+
+class ClassAccess(NamedTuple):
+    taught: frozenset
+    enrolled: frozenset
+
+    def teaches(self, class_id):
+        return class_id in self.taught
+
+    def can_join(self, class_id):
+        return class_id in self.taught or class_id in self.enrolled
+
+
+NO_ACCESS = ClassAccess(frozenset(), frozenset())
+
+
+def _version_key(user_id):
+    return f'course:access:{user_id}:version'
+
+
+def invalidate_class_access(user_id):
+    """Drop the cached class ids of a user (they are reloaded on the next check)."""
+    bump_cache_version(_version_key(user_id))
+
+
+def load_class_access(user_id):
+    """ClassAccess of a user straight from the database (two queries)."""
+    from .models import Class
+
+    taught = Class.objects.filter(teacher=user_id).values_list('id', flat=True)
+    enrolled = ClassEnrollment.objects.filter(
+        student=user_id,
+        status=EnrollmentChoices.COMPLETED,
+    ).values_list('class_enrolled_id', flat=True)
+    return ClassAccess(frozenset(taught), frozenset(enrolled))
+
+
+def class_access(user):
+    """Cached ClassAccess of a user; NO_ACCESS for anonymous users."""
+    if user is None or not user.is_authenticated:
+        return NO_ACCESS
+    # created_at keeps a reused id (e.g. in a recreated test database) from
+    # picking up another user's entry
+    stamp = int(user.created_at.timestamp() * 1_000_000) if user.created_at else 0
+    key = f'course:access:{user.pk}:{stamp}:v{get_cache_version(_version_key(user.pk))}'
+    access = cache.get(key)
+    if access is None:
+        access = load_class_access(user.pk)
+        cache.set(key, tuple(access), ACCESS_CACHE_TIMEOUT)
+        return access
+    return ClassAccess(*access)
+
+
+def is_session_admin(user):
+    """Superusers and super admins may join (monitor) any session."""
+    return user.is_superuser or user.role == RoleChoices.SUPER_ADMIN
+
+
+def can_join_class(user, class_id, access=None):
+    """Whether a user may join the sessions of a class (access: a preloaded ClassAccess)."""
+    if user is None or not user.is_authenticated:
+        return False
+    if is_session_admin(user):
+        return True
+    return (access or class_access(user)).can_join(class_id)
@@ -1,5 +1,6 @@
 from django.contrib import admin
-from .models import Class, LiveSession, Recording, Attendance, Certificate, LiveSessionResource
+from .models import Class, LiveSession, Recording, RecordingImport, Attendance, Certificate, LiveSessionResource
+from .scheduling import DEFAULT_WEEKS, schedule_sessions
 
 
 @admin.register(Class)
@@ -23,6 +24,14 @@ class ClassAdmin(admin.ModelAdmin):
         }),
     )
 
+    actions = ['schedule_term_sessions']
+
+    def schedule_term_sessions(self, request, queryset):
+        """Create the missing sessions of the selected classes for the coming weeks"""
+        class_count, session_count = schedule_sessions(queryset, weeks=DEFAULT_WEEKS)
+        self.message_user(request, f'{session_count} session(s) scheduled for {class_count} class(es).')
+    schedule_term_sessions.short_description = f'Schedule sessions for the next {DEFAULT_WEEKS} weeks'
+
 
 @admin.register(LiveSession)
 class LiveSessionAdmin(admin.ModelAdmin):
@@ -139,6 +148,14 @@ class RecordingAdmin(admin.ModelAdmin):
     search_fields = ['title', 'description', 'session__title']
 
 
+@admin.register(RecordingImport)
+class RecordingImportAdmin(admin.ModelAdmin):
+    list_display = ['session', 'recording_id', 'source', 'status', 'bytes_received', 'expected_size', 'updated_at']
+    list_filter = ['source', 'status', 'created_at']
+    search_fields = ['recording_id', 'session__title']
+    readonly_fields = ['bytes_received', 'completed_at', 'error', 'created_at', 'updated_at']
+
+
 @admin.register(Attendance)
 class AttendanceAdmin(admin.ModelAdmin):
     list_display = ['class_enrollment', 'session', 'status', 'created_at']
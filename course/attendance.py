@@ -0,0 +1,107 @@
+"""
+Attendance capture helpers.
+
+Device details are built from the request once and the user-agent string is
+parsed through an LRU cache: a classroom sends the same handful of browser
+strings over and over, and user_agents.parse is regex heavy.
+
+`record_attendance` writes a whole session's attendance in one upsert, so
+taking attendance for a class is one request instead of one per student.
+"""
+from functools import lru_cache
+
+from django.db import transaction
+from user_agents import parse as parse_ua
+
+from core.utils import get_client_ip
+from enrollments.models import ClassEnrollment, EnrollmentChoices
+
+from .models import Attendance
+
+UA_CACHE_SIZE = 2048
+
+# Longer strings are cut before parsing so junk headers cannot bloat the cache
+MAX_USER_AGENT_LENGTH = 512
+
+
+@lru_cache(maxsize=UA_CACHE_SIZE)
+def _parse_user_agent(user_agent):
+    if not user_agent:
+        return None
+    try:
+        ua = parse_ua(user_agent)
+    except Exception:
+        return None
+    return (
+        (ua.browser.family, ua.browser.version_string),
+        (ua.os.family, ua.os.version_string),
+        (ua.device.family, ua.is_mobile, ua.is_tablet, ua.is_pc),
+    )
+
+
+def parse_user_agent(user_agent):
+    """Friendly browser/os/device fields of a user-agent string ({} if unknown)."""
+    parsed = _parse_user_agent((user_agent or '')[:MAX_USER_AGENT_LENGTH])
+    if parsed is None:
+        return {}
+    (browser, browser_version), (os_family, os_version), (device, is_mobile, is_tablet, is_pc) = parsed
+    return {
+        "browser": {"family": browser, "version": browser_version},
+        "os": {"family": os_family, "version": os_version},
+        "device": {"family": device, "is_mobile": is_mobile, "is_tablet": is_tablet, "is_pc": is_pc},
+    }
+
+
+def request_device_info(request, client_side=None):
+    """
+    Server-observed device details of a request, merged with the details the
+    frontend sent (screen size, timezone, ...) and the parsed user agent.
+    """
+    user_agent = request.META.get('HTTP_USER_AGENT', '')
+    device_info = {
+        "user_agent": user_agent,
+        "ip": get_client_ip(request),
+        "accept_language": request.META.get('HTTP_ACCEPT_LANGUAGE'),
+        "x_forwarded_for": request.META.get('HTTP_X_FORWARDED_FOR'),
+    }
+    # client values are not trusted blindly; the parsed UA always wins
+    if isinstance(client_side, dict):
+        device_info.update(client_side)
+    device_info.update(parse_user_agent(user_agent))
+    return device_info
+
+
+def completed_enrollments(class_obj, student_ids=None):
+    """
+    {student id: completed enrollment id} for the students enrolled in the
+    class, limited to student_ids when given.
+    """
+    enrollments = ClassEnrollment.objects.filter(class_enrolled=class_obj, status=EnrollmentChoices.COMPLETED)
+    if student_ids is not None:
+        enrollments = enrollments.filter(student_id__in=student_ids)
+    return dict(enrollments.values_list('student_id', 'id'))
+
+
+def record_attendance(session, entries):
+    """
+    Create or update the attendance of many students of a session at once.
+    `entries` are dicts with class_enrollment_id, status and device_info; an
+    existing record keeps its created_at and gets the new status and details.
+    """
+    records = [
+        Attendance(
+            session=session,
+            class_enrollment_id=entry['class_enrollment_id'],
+            status=entry['status'],
+            device_info=entry.get('device_info'),
+        )
+        for entry in entries
+    ]
+    with transaction.atomic():
+        Attendance.objects.bulk_create(
+            records,
+            update_conflicts=True,
+            unique_fields=['class_enrollment', 'session'],
+            update_fields=['status', 'device_info', 'updated_at'],
+        )
+    return len(records)
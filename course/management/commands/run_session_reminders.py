@@ -0,0 +1,83 @@
+"""
+Management command that sends live session reminders (see course/reminders.py).
+Run it as a long-lived process next to the web server, e.g. under systemd;
+several instances may run at once.
+"""
+import asyncio
+import logging
+import signal
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from course.reminders import REMINDER_LEAD, dispatch_reminders
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = 'Send reminders for live sessions that are about to start'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Send the currently due reminders and exit instead of polling forever',
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=30.0,
+            help='Seconds between checks (default: 30)',
+        )
+        parser.add_argument(
+            '--lead-minutes',
+            type=int,
+            default=int(REMINDER_LEAD.total_seconds() // 60),
+            help='Remind this many minutes before a session starts (default: %(default)s)',
+        )
+
+    def handle(self, *args, **options):
+        lead = timedelta(minutes=options['lead_minutes'])
+        if options['once']:
+            self.dispatch(lead)
+            return
+
+        self.stdout.write(self.style.SUCCESS('Session reminder worker started'))
+        try:
+            asyncio.run(self.run_loop(options['interval'], lead))
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(self.style.WARNING('Session reminder worker stopped'))
+
+    async def run_loop(self, interval, lead):
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(signum, stop.set)
+            except (NotImplementedError, RuntimeError):
+                # Windows: fall back to KeyboardInterrupt
+                pass
+
+        dispatch = sync_to_async(self.dispatch, thread_sensitive=True)
+        while not stop.is_set():
+            try:
+                await dispatch(lead)
+            except Exception as e:
+                # e.g. the database is briefly unreachable; try again next round
+                logger.error(f'Session reminder pass failed: {e}', exc_info=True)
+            try:
+                await asyncio.wait_for(stop.wait(), timeout=interval)
+            except asyncio.TimeoutError:
+                pass
+
+    def dispatch(self, lead):
+        close_old_connections()
+        sessions, notifications, emails = dispatch_reminders(lead=lead)
+        if sessions:
+            self.stdout.write(
+                f'Reminded {sessions} session(s): {notifications} notification(s), {emails} email(s)'
+            )
@@ -0,0 +1,63 @@
+"""
+Management command that creates the live sessions of a term from each class's
+weekly schedule (see course/scheduling.py). Safe to re-run: dates that already
+have a session are skipped.
+"""
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from course.models import Class
+from course.scheduling import DEFAULT_WEEKS, schedule_sessions
+
+
+def _parse_date(value):
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise CommandError(f'Invalid date "{value}", expected YYYY-MM-DD')
+
+
+class Command(BaseCommand):
+    help = 'Create the scheduled live sessions of active classes for the coming weeks'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start', help='First date to schedule (YYYY-MM-DD, default: today)')
+        parser.add_argument('--end', help='Last date to schedule (YYYY-MM-DD, default: --weeks after --start)')
+        parser.add_argument(
+            '--weeks',
+            type=int,
+            default=DEFAULT_WEEKS,
+            help=f'Length of the term when --end is not given (default: {DEFAULT_WEEKS})',
+        )
+        parser.add_argument(
+            '--class',
+            dest='class_ids',
+            type=int,
+            action='append',
+            help='Only schedule this class (repeatable); inactive classes are allowed here',
+        )
+        parser.add_argument('--dry-run', action='store_true', help='Count the sessions without creating them')
+
+    def handle(self, *args, **options):
+        start_date = _parse_date(options['start']) if options['start'] else None
+        end_date = _parse_date(options['end']) if options['end'] else None
+        if start_date and end_date and end_date < start_date:
+            raise CommandError('--end must not be before --start')
+        if end_date and not start_date:
+            raise CommandError('--end needs --start')
+
+        if options['class_ids']:
+            classes = Class.objects.filter(pk__in=options['class_ids'])
+        else:
+            classes = Class.objects.filter(is_active=True)
+
+        class_count, session_count = schedule_sessions(
+            classes,
+            start_date=start_date,
+            end_date=end_date,
+            weeks=options['weeks'],
+            dry_run=options['dry_run'],
+        )
+        verb = 'Would create' if options['dry_run'] else 'Created'
+        self.stdout.write(self.style.SUCCESS(f'{verb} {session_count} session(s) for {class_count} class(es)'))
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-16 20:32
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('course', '0003_livesession_is_recording_livesession_recording_file_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecordingImport',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('recording_id', models.CharField(blank=True, help_text='Recording id assigned by the SFU', max_length=255)),
+                ('source', models.CharField(choices=[('download', 'Download from SFU'), ('upload', 'Uploaded by SFU')], max_length=10)),
+                ('source_url', models.URLField(blank=True, max_length=1000)),
+                ('status', models.CharField(choices=[('receiving', 'Receiving'), ('pending', 'Pending'), ('completed', 'Completed'), ('failed', 'Failed')], default='pending', max_length=10)),
+                ('expected_size', models.BigIntegerField(blank=True, help_text='Total size in bytes, if announced', null=True)),
+                ('expected_checksum', models.CharField(blank=True, help_text='SHA-256 hex digest, if announced', max_length=64)),
+                ('bytes_received', models.BigIntegerField(default=0)),
+                ('stopped_at', models.DateTimeField(blank=True, help_text='When the SFU stopped recording', null=True)),
+                ('completed_at', models.DateTimeField(blank=True, null=True)),
+                ('error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('session', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='recording_imports', to='course.livesession')),
+            ],
+            options={
+                'ordering': ('-created_at',),
+                'constraints': [models.UniqueConstraint(fields=('session', 'recording_id'), name='unique_recording_import')],
+            },
+        ),
+    ]
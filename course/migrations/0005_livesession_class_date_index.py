@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-16 21:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('course', '0004_recordingimport'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='livesession',
+            index=models.Index(fields=['class_session', 'scheduled_date'], name='livesession_class_date_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-16 22:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('course', '0005_livesession_class_date_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='livesession',
+            index=models.Index(fields=['status', 'reminder_sent', 'scheduled_date'], name='livesession_reminder_idx'),
+        ),
+    ]
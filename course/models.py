@@ -1,4 +1,6 @@
 from django.db import models
+from django.db.models import Count, Exists, IntegerField, OuterRef, Prefetch, Subquery, Value
+from django.db.models.functions import Coalesce
 
 from django.core.validators import MinValueValidator
 from django.utils import timezone
@@ -6,7 +8,6 @@ from django.utils import timezone
 from django.core.exceptions import ValidationError
 
 from enrollments.models import EnrollmentChoices
-from accounts.models import RoleChoices
 
 
 current_time = timezone.localtime().time()
@@ -35,6 +36,42 @@ class AttendanceStatus(models.TextChoices):
 
 
 
+class ClassQuerySet(models.QuerySet):
+    def with_enrollment_stats(self, user=None):
+        """
+        Annotate enrolled count and the caller's enrollment flag, and prefetch
+        completed enrollments with their students, so listing serializers run a
+        fixed number of queries regardless of page size.
+        """
+        from enrollments.models import ClassEnrollment
+
+        completed = ClassEnrollment.objects.filter(status=EnrollmentChoices.COMPLETED)
+
+        # Subquery instead of Count() so joins added by filters (teacher, subject)
+        # cannot inflate the number.
+        enrolled_total = completed.filter(
+            class_enrolled=OuterRef('pk')
+        ).order_by().values('class_enrolled').annotate(total=Count('pk')).values('total')
+
+        if user is not None and user.is_authenticated:
+            user_is_enrolled = Exists(completed.filter(class_enrolled=OuterRef('pk'), student=user))
+        else:
+            user_is_enrolled = Value(False)
+
+        return self.annotate(
+            enrolled_total=Coalesce(Subquery(enrolled_total, output_field=IntegerField()), 0),
+            user_is_enrolled=user_is_enrolled,
+        ).prefetch_related(
+            'teacher',
+            'subject',
+            Prefetch(
+                'enrollments',
+                queryset=completed.select_related('student').order_by('student_id'),
+                to_attr='completed_enrollments',
+            ),
+        )
+
+
 class Class(models.Model):
     DAY_OF_WEEK = (
         (0, "Monday"),
@@ -72,6 +109,8 @@ class Class(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = ClassQuerySet.as_manager()
+
     def __str__(self):
         return self.title
     
@@ -88,7 +127,10 @@ class Class(models.Model):
     def enrolled_count(self):
         """
         Number of students enrolled (COMPLETED) for this class.
+        Uses the value annotated by ClassQuerySet.with_enrollment_stats() when present.
         """
+        if hasattr(self, 'enrolled_total'):
+            return self.enrolled_total
         from enrollments.models import ClassEnrollment
         return ClassEnrollment.objects.filter(
             status=EnrollmentChoices.COMPLETED, 
@@ -146,6 +188,11 @@ class LiveSession(models.Model):
 
     class Meta:
         ordering = ('-scheduled_date', '-created_at',)
+        indexes = [
+            models.Index(fields=['class_session', 'scheduled_date'], name='livesession_class_date_idx'),
+            # Equality columns first, then the date range (see course/reminders.py)
+            models.Index(fields=['status', 'reminder_sent', 'scheduled_date'], name='livesession_reminder_idx'),
+        ]
 
     def __str__(self):
         return f'{self.title} ({self.class_session.start_time.isoformat()})'
@@ -192,8 +239,8 @@ class LiveSession(models.Model):
         if self.scheduled_date:
             date_str = self.scheduled_date.strftime('%b %d, %Y')
         else:
-            # Fallback to created_at if scheduled_date is not set
-            date_str = timezone.localtime(self.created_at).strftime('%b %d, %Y')
+            # Fallback to created_at (or now, before the first save) if scheduled_date is not set
+            date_str = timezone.localtime(self.created_at or timezone.now()).strftime('%b %d, %Y')
         return f"{self.class_session.title} - {date_str}"
     
     def save(self, *args, **kwargs):
@@ -207,18 +254,7 @@ class LiveSession(models.Model):
         # Generate title only if empty or not provided
         # This allows users to provide custom titles
         if not self.title or self.title.strip() == '':
-            if is_new:
-                # For new instances, we need scheduled_date first
-                self.title = "Temporary"
-                super().save(*args, **kwargs)
-                # Now generate the proper title with scheduled_date
-                self.title = self.generate_title()
-                # Save again with proper title
-                super().save(update_fields=['title'])
-                return
-            else:
-                # For existing instances being updated without a title
-                self.title = self.generate_title()
+            self.title = self.generate_title()
         
         super().save(*args, **kwargs)
     
@@ -226,23 +262,15 @@ class LiveSession(models.Model):
         """Get the URL to join this session."""
         return f"/video-conference/session/{self.id}/"
     
-    def can_user_join(self, user):
-        """Check if user can join this session."""
-        # Allow superusers and super admins to join any session (for monitoring)
-        if user.is_superuser or user.role == RoleChoices.SUPER_ADMIN:
-            return True
-        
-        # Check if user is a teacher of the class
-        if self.class_session.teacher.filter(id=user.id).exists():
-            return True
-        
-        # Check if user is enrolled in the class
-        from enrollments.models import ClassEnrollment, EnrollmentChoices
-        return ClassEnrollment.objects.filter(
-            student=user,
-            class_enrolled=self.class_session,
-            status=EnrollmentChoices.COMPLETED
-        ).exists()
+    def can_user_join(self, user, access=None):
+        """
+        Check if user can join this session: superusers and super admins (for
+        monitoring), teachers of the class and its enrolled students. Answered
+        from the cached class ids of the user (see course/access.py); pass a
+        preloaded ClassAccess as `access` to skip the cache lookup.
+        """
+        from .access import can_join_class
+        return can_join_class(user, self.class_session_id, access)
     
 
 
@@ -264,6 +292,51 @@ class Recording(models.Model):
         ordering = ('-created_at',)
 
 
+class RecordingImportSource(models.TextChoices):
+    DOWNLOAD = 'download', 'Download from SFU'
+    UPLOAD = 'upload', 'Uploaded by SFU'
+
+
+class RecordingImportStatus(models.TextChoices):
+    RECEIVING = 'receiving', 'Receiving'  # upload chunks still arriving
+    PENDING = 'pending', 'Pending'  # waiting for the worker to download/store it
+    COMPLETED = 'completed', 'Completed'
+    FAILED = 'failed', 'Failed'
+
+
+class RecordingImport(models.Model):
+    """
+    Tracks ingestion of one SFU recording into storage.
+    Bytes are appended to a partial file (see course/recordings.py) so interrupted
+    downloads and uploads resume where they stopped.
+    """
+    session = models.ForeignKey(LiveSession, on_delete=models.CASCADE, related_name='recording_imports')
+    recording_id = models.CharField(max_length=255, blank=True, help_text='Recording id assigned by the SFU')
+    source = models.CharField(max_length=10, choices=RecordingImportSource.choices)
+    source_url = models.URLField(max_length=1000, blank=True)
+    status = models.CharField(max_length=10, choices=RecordingImportStatus.choices, default=RecordingImportStatus.PENDING)
+
+    expected_size = models.BigIntegerField(null=True, blank=True, help_text='Total size in bytes, if announced')
+    expected_checksum = models.CharField(max_length=64, blank=True, help_text='SHA-256 hex digest, if announced')
+    bytes_received = models.BigIntegerField(default=0)
+
+    stopped_at = models.DateTimeField(null=True, blank=True, help_text='When the SFU stopped recording')
+    completed_at = models.DateTimeField(null=True, blank=True)
+    error = models.TextField(blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f'Recording import {self.recording_id or self.id} for {self.session} ({self.status})'
+
+    class Meta:
+        ordering = ('-created_at',)
+        constraints = [
+            models.UniqueConstraint(fields=['session', 'recording_id'], name='unique_recording_import'),
+        ]
+
+
 class ResourceType(models.TextChoices):
     """Types of resources that can be uploaded to a live session"""
     DOCUMENT = 'document', 'Document'
@@ -0,0 +1,215 @@
+"""
+Presence tracking for live sessions and automatic attendance.
+
+Joining or leaving a session (SFU participant.joined / participant.left
+webhooks, and SessionLeaveView) only appends an event to a per-session log in
+the cache: one INCR and one SET, no database write, so bursts of hundreds of
+events per second cost nothing on the database.
+
+Only the SFU's join events open presence: calling the join API hands out
+connection details but does not prove the student ever connected, so it is
+not counted. A leave through the API closes the user's connections at once,
+ahead of the SFU's own participant.left.
+
+When the SFU reports room.ended, the `flush_session_presence` task replays the
+log into presence intervals per user. Intervals of the same user (several
+tabs, reconnects) are merged, so time is never counted twice. Enrolled students present for at least
+ATTENDANCE_MIN_PRESENCE_MINUTES are marked present, the others absent, with
+one bulk upsert. Attendance a teacher already recorded is only ever upgraded
+to present, never downgraded to absent.
+
+Like the library counters, the log needs a cache shared by all processes
+(Redis in production).
+"""
+import logging
+from collections import defaultdict
+from datetime import timezone as dt_timezone
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+from .attendance import completed_enrollments
+from .models import Attendance, AttendanceStatus, LiveSession
+from .recordings import parse_stopped_at
+
+logger = logging.getLogger(__name__)
+
+EVENT_JOIN = 'join'
+EVENT_LEAVE = 'leave'
+
+# How long an unflushed log survives in the cache (longer than any session)
+LOG_TIMEOUT = 24 * 60 * 60
+
+FLUSH_LOCK_TIMEOUT = 120
+
+# Events read from the cache per round-trip
+FETCH_BATCH_SIZE = 1000
+
+
+def _sequence_key(session_id):
+    return f'course:presence:{session_id}:seq'
+
+
+def _event_key(session_id, sequence):
+    return f'course:presence:{session_id}:{sequence}'
+
+
+def _lock_key(session_id):
+    return f'course:presence:{session_id}:flush-lock'
+
+
+def parse_event_time(value):
+    """Timestamp sent by the SFU (naive values are UTC); now if missing or malformed."""
+    parsed = parse_stopped_at(value)
+    if parsed is None:
+        return timezone.now()
+    if timezone.is_naive(parsed):
+        return timezone.make_aware(parsed, dt_timezone.utc)
+    return parsed
+
+
+def record_join(session_id, user_id, participant_id, at=None):
+    """Log that one SFU connection (participant_id) of a user joined a session."""
+    _record(session_id, (EVENT_JOIN, user_id, participant_id, at or timezone.now()))
+
+
+def record_leave(session_id, user_id, participant_id=None, at=None):
+    """Log that a user (or one of their SFU connections) left a session."""
+    _record(session_id, (EVENT_LEAVE, user_id, participant_id, at or timezone.now()))
+
+
+def _record(session_id, event):
+    sequence_key = _sequence_key(session_id)
+    cache.add(sequence_key, 0, LOG_TIMEOUT)
+    try:
+        sequence = cache.incr(sequence_key)
+    except ValueError:
+        # Evicted between add and incr; presence is best effort
+        logger.warning('Presence log of session %s unavailable, dropping event', session_id)
+        return
+    cache.set(_event_key(session_id, sequence), (sequence,) + event, LOG_TIMEOUT)
+
+
+def presence_intervals(events, ended_at):
+    """
+    Replay (sequence, kind, user id, participant id, timestamp) events into
+    {user id: [(start, end), ...]} with overlapping intervals merged.
+
+    A leave with a participant id closes that connection; a leave without one
+    (the leave API) closes every open connection of the user. Joins without a
+    participant id, which older logs may still hold from the join API, are
+    ignored. Anything still open is closed at ended_at.
+    """
+    open_since = defaultdict(dict)  # user id -> {participant id: joined at}
+    intervals = defaultdict(list)
+
+    def close(user_id, participant_id, left_at):
+        joined_at = open_since[user_id].pop(participant_id, None)
+        if joined_at is not None and left_at > joined_at:
+            intervals[user_id].append((joined_at, left_at))
+
+    for _, kind, user_id, participant_id, at in sorted(events, key=lambda event: (event[4], event[0])):
+        at = min(at, ended_at)
+        if kind == EVENT_JOIN:
+            if participant_id is not None:
+                open_since[user_id].setdefault(participant_id, at)
+        elif participant_id is None:
+            for open_participant in list(open_since[user_id]):
+                close(user_id, open_participant, at)
+        else:
+            close(user_id, participant_id, at)
+
+    for user_id, participants in open_since.items():
+        for participant_id in list(participants):
+            close(user_id, participant_id, ended_at)
+
+    merged = {}
+    for user_id, spans in intervals.items():
+        spans.sort()
+        result = [spans[0]]
+        for start, end in spans[1:]:
+            if start <= result[-1][1]:
+                result[-1] = (result[-1][0], max(result[-1][1], end))
+            else:
+                result.append((start, end))
+        merged[user_id] = result
+    return merged
+
+
+def presence_seconds(intervals):
+    """{user id: total seconds present} from presence_intervals()."""
+    return {
+        user_id: sum((end - start).total_seconds() for start, end in spans)
+        for user_id, spans in intervals.items()
+    }
+
+
+def _read_log(session_id):
+    count = cache.get(_sequence_key(session_id)) or 0
+    keys = [_event_key(session_id, sequence) for sequence in range(1, count + 1)]
+    events = []
+    for start in range(0, len(keys), FETCH_BATCH_SIZE):
+        events.extend(cache.get_many(keys[start:start + FETCH_BATCH_SIZE]).values())
+    return events, keys
+
+
+def flush_presence(session_id, ended_at=None):
+    """
+    Turn the presence log of a finished session into Attendance rows and
+    clear it.
+
+    Returns:
+        (students marked present, students marked absent), or None if another
+        flush of the session is running
+    """
+    lock_key = _lock_key(session_id)
+    if not cache.add(lock_key, 1, FLUSH_LOCK_TIMEOUT):
+        return None
+
+    try:
+        ended_at = ended_at or timezone.now()
+        events, keys = _read_log(session_id)
+        session = LiveSession.objects.select_related('class_session').filter(id=session_id).first()
+        if session is None:
+            cache.delete_many(keys + [_sequence_key(session_id)])
+            return 0, 0
+
+        seconds = presence_seconds(presence_intervals(events, ended_at))
+        threshold = settings.ATTENDANCE_MIN_PRESENCE_MINUTES * 60
+        enrollments = completed_enrollments(session.class_session)
+
+        present, absent = [], []
+        for student_id, enrollment_id in enrollments.items():
+            present_seconds = int(seconds.get(student_id, 0))
+            record = Attendance(
+                session=session,
+                class_enrollment_id=enrollment_id,
+                device_info={'source': 'sfu', 'presence_seconds': present_seconds},
+            )
+            if present_seconds >= threshold:
+                record.status = AttendanceStatus.PRESENT
+                present.append(record)
+            else:
+                record.status = AttendanceStatus.ABSENT
+                absent.append(record)
+
+        with transaction.atomic():
+            Attendance.objects.bulk_create(
+                present,
+                update_conflicts=True,
+                unique_fields=['class_enrollment', 'session'],
+                update_fields=['status', 'updated_at'],
+            )
+            # Existing records (e.g. taken by the teacher) win over absences
+            Attendance.objects.bulk_create(absent, ignore_conflicts=True)
+
+        cache.delete_many(keys + [_sequence_key(session_id)])
+        logger.info(
+            'Presence of session %s: %s present, %s absent from %s event(s)',
+            session_id, len(present), len(absent), len(events),
+        )
+        return len(present), len(absent)
+    finally:
+        cache.delete(lock_key)
@@ -0,0 +1,334 @@
+"""
+Streaming ingestion of SFU recordings.
+
+Recordings can be several gigabytes, so they never pass through memory as a
+whole. Bytes arrive either from a download of the SFU's `fileUrl`
+(recording.stopped webhook) or as uploaded chunks (RecordingUploadView) and are
+appended in CHUNK_SIZE pieces to a partial file under RECORDING_INGEST_DIR.
+The partial file's size is the resume offset: downloads continue with an HTTP
+Range request, uploads tell the SFU which offset to send next.
+
+Once complete, the `ingest_recording` background task verifies size and SHA-256
+checksum, copies the file into the storage backend (which reads it in chunks),
+attaches it to the session and publishes the Recording.
+
+Only one worker may write an import's partial file. `ingest` holds a cache lock
+on the import and, every HEARTBEAT_SECONDS while streaming, refreshes both that
+lock and the outbox task's lease; if either was lost to another worker it stops
+before touching the file again.
+"""
+import hashlib
+import logging
+import os
+import time
+import uuid
+from datetime import datetime
+
+import requests
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files import File
+from django.utils import timezone
+
+from core.tasks import renew_task_lease
+
+from .models import Recording, RecordingImportSource, RecordingImportStatus
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 1024 * 1024
+
+# Persist download progress every this many chunks
+PROGRESS_EVERY_CHUNKS = 64
+
+DOWNLOAD_TIMEOUT = (10, 60)  # (connect, read between chunks) seconds
+
+# Refresh the import lock and the task lease at least this often while working
+HEARTBEAT_SECONDS = 60
+IMPORT_LOCK_TIMEOUT = 5 * 60
+
+
+class RecordingIntegrityError(Exception):
+    """The received bytes do not match the announced size or checksum."""
+
+
+class RecordingOffsetError(Exception):
+    """An uploaded chunk does not start where the partial file ends."""
+
+    def __init__(self, expected_offset):
+        super().__init__(f'Expected chunk at offset {expected_offset}')
+        self.expected_offset = expected_offset
+
+
+class RecordingImportBusy(Exception):
+    """Another worker holds (or took over) the import."""
+
+
+class ImportLock:
+    """
+    Exclusive per-import lock in the cache, refreshed by heartbeat() together
+    with the lease of the running outbox task.
+    """
+
+    def __init__(self, recording_import):
+        self.key = f'course:recording-import:{recording_import.id}:lock'
+        self.token = uuid.uuid4().hex
+        self.last_beat = 0.0
+
+    def __enter__(self):
+        if not cache.add(self.key, self.token, IMPORT_LOCK_TIMEOUT):
+            raise RecordingImportBusy(f'{self.key} is held by another worker')
+        self.last_beat = time.monotonic()
+        return self
+
+    def __exit__(self, *exc_info):
+        if cache.get(self.key) == self.token:
+            cache.delete(self.key)
+
+    def heartbeat(self, force=False):
+        """Refresh lock and lease if due; raises if another worker took over."""
+        if not force and time.monotonic() - self.last_beat < HEARTBEAT_SECONDS:
+            return
+        if cache.get(self.key) != self.token:
+            raise RecordingImportBusy(f'{self.key} was taken over by another worker')
+        cache.touch(self.key, IMPORT_LOCK_TIMEOUT)
+        renew_task_lease()
+        self.last_beat = time.monotonic()
+
+
+def partial_path(recording_import):
+    """Local path of the partial file of an import."""
+    return os.path.join(settings.RECORDING_INGEST_DIR, f'{recording_import.id}.part')
+
+
+def partial_size(recording_import):
+    """Bytes already on disk; this, not the database counter, is the resume offset."""
+    try:
+        return os.path.getsize(partial_path(recording_import))
+    except FileNotFoundError:
+        return 0
+
+
+def discard_partial(recording_import):
+    """Delete the partial file of an import, if any, so its upload starts over."""
+    try:
+        os.remove(partial_path(recording_import))
+    except FileNotFoundError:
+        pass
+
+
+def _open_partial(recording_import, offset):
+    """Open the partial file for appending at offset (0 starts over)."""
+    os.makedirs(settings.RECORDING_INGEST_DIR, exist_ok=True)
+    handle = open(partial_path(recording_import), 'r+b' if offset else 'wb')
+    handle.truncate(offset)
+    handle.seek(offset)
+    return handle
+
+
+def parse_stopped_at(value):
+    """Parse the ISO timestamp sent by the SFU; None if missing or malformed."""
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except (AttributeError, ValueError):
+        return None
+
+
+def append_upload_chunk(recording_import, uploaded_file, offset):
+    """
+    Append an uploaded chunk to the partial file.
+
+    Args:
+        recording_import: RecordingImport, locked by the caller
+        uploaded_file: UploadedFile holding the chunk (streamed to disk by the upload handler)
+        offset: Byte offset the chunk starts at
+
+    Returns:
+        Total bytes received so far
+
+    Raises:
+        RecordingOffsetError: if the chunk does not continue the partial file
+    """
+    received = partial_size(recording_import)
+    if offset != received:
+        raise RecordingOffsetError(received)
+
+    with _open_partial(recording_import, offset) as handle:
+        for chunk in uploaded_file.chunks(CHUNK_SIZE):
+            handle.write(chunk)
+        received = handle.tell()
+
+    recording_import.bytes_received = received
+    recording_import.save(update_fields=['bytes_received', 'updated_at'])
+    return received
+
+
+def download_to_partial(recording_import, lock=None):
+    """
+    Stream the recording from the SFU into the partial file, resuming after the bytes
+    already on disk. Errors propagate so the task is retried (and resumes again).
+    `lock` (an ImportLock) gets a heartbeat between chunks.
+    """
+    offset = partial_size(recording_import)
+    if recording_import.expected_size is not None and offset == recording_import.expected_size:
+        return offset
+
+    headers = {'Range': f'bytes={offset}-'} if offset else {}
+    with requests.get(recording_import.source_url, headers=headers, stream=True, timeout=DOWNLOAD_TIMEOUT) as response:
+        if response.status_code == 416 and offset:
+            # Nothing left to send: the partial file is already complete
+            return offset
+        response.raise_for_status()
+
+        if response.status_code != 206:
+            # Server ignored the Range header, start over
+            offset = 0
+        if recording_import.expected_size is None and 'Content-Length' in response.headers:
+            recording_import.expected_size = offset + int(response.headers['Content-Length'])
+
+        with _open_partial(recording_import, offset) as handle:
+            for index, chunk in enumerate(response.iter_content(CHUNK_SIZE), start=1):
+                if lock is not None:
+                    lock.heartbeat()
+                handle.write(chunk)
+                if index % PROGRESS_EVERY_CHUNKS == 0:
+                    recording_import.bytes_received = handle.tell()
+                    recording_import.save(update_fields=['bytes_received', 'expected_size', 'updated_at'])
+            received = handle.tell()
+
+    recording_import.bytes_received = received
+    recording_import.save(update_fields=['bytes_received', 'expected_size', 'updated_at'])
+    return received
+
+
+def file_checksum(path):
+    """SHA-256 hex digest of a file, read in chunks."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as handle:
+        for chunk in iter(lambda: handle.read(CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def verify_partial(recording_import):
+    """
+    Check the partial file against the announced size and checksum.
+
+    Raises:
+        RecordingIntegrityError: on mismatch. A short file is kept so the next attempt
+        resumes; an oversized or corrupt one is discarded so it starts over.
+    """
+    path = partial_path(recording_import)
+    size = partial_size(recording_import)
+    expected_size = recording_import.expected_size
+
+    if size == 0:
+        raise RecordingIntegrityError('Recording file is empty')
+    if expected_size is not None and size < expected_size:
+        raise RecordingIntegrityError(f'Incomplete: received {size} of {expected_size} bytes')
+
+    problem = None
+    if expected_size is not None and size != expected_size:
+        problem = f'Size mismatch: expected {expected_size} bytes, got {size}'
+    elif recording_import.expected_checksum:
+        checksum = file_checksum(path)
+        if checksum != recording_import.expected_checksum.lower():
+            problem = f'Checksum mismatch: expected {recording_import.expected_checksum}, got {checksum}'
+
+    if problem:
+        os.remove(path)
+        recording_import.bytes_received = 0
+        recording_import.error = problem
+        recording_import.save(update_fields=['bytes_received', 'error', 'updated_at'])
+        raise RecordingIntegrityError(problem)
+
+
+def attach_recording(session, stopped_at=None):
+    """Create or update the Recording object pointing at the session's recording file."""
+    recording_title = f'{session.title} - Recording'
+    if stopped_at:
+        recording_title = f'{session.title} - {stopped_at.strftime("%Y-%m-%d %H:%M")}'
+
+    # Check if recording already exists for this session (the upload and the webhook may both attach the file)
+    existing_recording = Recording.objects.filter(session=session).order_by('-created_at').first()
+    if existing_recording and existing_recording.video_url in ('', None, session.recording_file.url):
+        # Update existing recording
+        existing_recording.video_url = session.recording_file.url
+        existing_recording.title = recording_title
+        existing_recording.save()
+        logger.info(f'Updated Recording object {existing_recording.id} for session {session.id}')
+        return existing_recording
+
+    # Create new recording
+    recording = Recording.objects.create(
+        session=session,
+        title=recording_title,
+        description=f'Recording of live session: {session.title}',
+        video_url=session.recording_file.url
+    )
+    logger.info(f'Created Recording object {recording.id} for session {session.id}')
+    return recording
+
+
+def store_partial(recording_import):
+    """Copy the verified partial file into storage and attach it to the session."""
+    session = recording_import.session
+    suffix = recording_import.recording_id or timezone.now().strftime('%Y%m%d_%H%M%S')
+    filename = f'session_{session.id}_{suffix}.webm'
+
+    path = partial_path(recording_import)
+    with open(path, 'rb') as handle:
+        # Storage backends read File objects in chunks, never as a whole
+        session.recording_file.save(filename, File(handle), save=False)
+    session.save(update_fields=['recording_file'])
+    os.remove(path)
+
+    logger.info(f'Saved recording file for session {session.id}: {session.recording_file.name}')
+
+
+def ingest(recording_import):
+    """
+    Download (if needed), verify and store a recording import.
+    Raises on failure so the background task retries; progress on disk is kept.
+
+    Raises:
+        RecordingImportBusy: if another worker is ingesting the same import
+    """
+    if recording_import.status == RecordingImportStatus.COMPLETED:
+        return
+
+    with ImportLock(recording_import) as lock:
+        # Another worker may have finished it while we waited for the lock
+        recording_import.refresh_from_db()
+        if recording_import.status == RecordingImportStatus.COMPLETED:
+            return
+        _ingest_locked(recording_import, lock)
+
+
+def _ingest_locked(recording_import, lock):
+    if recording_import.source == RecordingImportSource.DOWNLOAD:
+        download_to_partial(recording_import, lock)
+        lock.heartbeat(force=True)
+        verify_partial(recording_import)
+    else:
+        try:
+            verify_partial(recording_import)
+        except RecordingIntegrityError as e:
+            # Only the SFU can send the bytes again; it sees the failure and offset 0
+            recording_import.status = RecordingImportStatus.FAILED
+            recording_import.error = str(e)
+            recording_import.save(update_fields=['status', 'error', 'updated_at'])
+            logger.error(f'Rejected uploaded recording for session {recording_import.session_id}: {e}')
+            return
+
+    lock.heartbeat(force=True)
+    store_partial(recording_import)
+
+    recording_import.status = RecordingImportStatus.COMPLETED
+    recording_import.completed_at = timezone.now()
+    recording_import.error = ''
+    recording_import.save(update_fields=['status', 'completed_at', 'error', 'updated_at'])
+
+    attach_recording(recording_import.session, recording_import.stopped_at)
@@ -0,0 +1,254 @@
+"""
+Reminders for live sessions that are about to start.
+
+`dispatch_reminders` (run in a loop by the `run_session_reminders` command)
+finds scheduled sessions whose start, in their class's timezone, falls within
+REMINDER_LEAD and whose reminder_sent flag is still False. The date window is
+read through the (status, reminder_sent, scheduled_date) index; the exact
+start times are compared in Python since they depend on each class's
+start_time and timezone.
+
+Due sessions are claimed by flipping reminder_sent inside a SELECT ... FOR
+UPDATE SKIP LOCKED transaction, so several workers can run side by side and
+each reminder goes out once. A session is claimed before it is sent: a worker
+crash loses that reminder instead of sending it twice. If neither the in-app
+notification nor any email of a session went out (e.g. the SMTP server is
+down), its claim is released and the next pass tries again while the session
+is still due.
+
+The enrolled students of every claimed class are loaded with one query. Each
+session gets one bulk in-app notification fan-out, and all emails go out over
+a single SMTP connection in batches of EMAIL_BATCH_SIZE.
+"""
+import logging
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.utils import timezone
+
+from enrollments.models import ClassEnrollment, EnrollmentChoices
+from notifications.models import NotificationType
+from notifications.utils import send_notification_to_multiple_users
+
+from .models import LiveSession, SessionStatus
+from .scheduling import class_timezone
+
+logger = logging.getLogger(__name__)
+
+REMINDER_LEAD = timedelta(minutes=15)
+
+# Messages per SMTP send_messages() call
+EMAIL_BATCH_SIZE = 100
+
+
+def session_start(session):
+    """Aware start datetime of a session in its class's timezone (None without a date)."""
+    if not session.scheduled_date:
+        return None
+    return datetime.combine(
+        session.scheduled_date,
+        session.class_session.start_time,
+        tzinfo=class_timezone(session.class_session),
+    )
+
+
+def due_sessions(now=None, lead=REMINDER_LEAD):
+    """Scheduled, unreminded sessions that start between now and now + lead."""
+    now = now or timezone.now()
+    # Dates are local to each class; a day either side covers every timezone
+    candidates = LiveSession.objects.filter(
+        status=SessionStatus.SCHEDULED,
+        reminder_sent=False,
+        scheduled_date__range=((now - timedelta(days=1)).date(), (now + lead + timedelta(days=1)).date()),
+    ).select_related('class_session')
+    return [
+        session for session in candidates
+        if (start := session_start(session)) is not None and now <= start <= now + lead
+    ]
+
+
+def claim_sessions(session_ids):
+    """
+    Flip reminder_sent on the given sessions that no other worker holds or
+    has already claimed; returns the ids this worker claimed.
+    """
+    with transaction.atomic():
+        claimed = list(
+            LiveSession.objects.select_for_update(skip_locked=True)
+            .filter(pk__in=session_ids, reminder_sent=False, status=SessionStatus.SCHEDULED)
+            .values_list('id', flat=True)
+        )
+        LiveSession.objects.filter(pk__in=claimed).update(reminder_sent=True, updated_at=timezone.now())
+    return claimed
+
+
+def release_sessions(session_ids):
+    """Give claimed sessions back so a later pass reminds them again."""
+    if session_ids:
+        LiveSession.objects.filter(
+            pk__in=session_ids, reminder_sent=True, status=SessionStatus.SCHEDULED
+        ).update(reminder_sent=False, updated_at=timezone.now())
+
+
+def enrolled_students(class_ids):
+    """{class id: [active students with a completed enrollment]} in one query."""
+    students = defaultdict(list)
+    enrollments = ClassEnrollment.objects.filter(
+        class_enrolled_id__in=class_ids,
+        status=EnrollmentChoices.COMPLETED,
+        student__is_active=True,
+    ).select_related('student').order_by('class_enrolled_id', 'student_id')
+    for enrollment in enrollments:
+        students[enrollment.class_enrolled_id].append(enrollment.student)
+    return students
+
+
+def reminder_text(session, start, now):
+    """(title, body) of a session's reminder sent at `now`."""
+    local_start = start.strftime('%I:%M %p').lstrip('0')
+    minutes = max(round((start - now).total_seconds() / 60), 1)
+    title = f'{session.class_session.title} starts soon'
+    body = (
+        f'"{session.title}" starts in about {minutes} minute{"s" if minutes != 1 else ""}, '
+        f'at {local_start} ({session.class_session.timezone}).'
+    )
+    return title, body
+
+
+def reminder_email(student, title, body, join_url):
+    message = f"""
+Hello {student.full_name or student.email},
+
+{body}
+
+Join the session here:
+{join_url}
+
+Best regards,
+Deen Bridge Team
+"""
+    return EmailMessage(
+        subject=f'Reminder: {title} - Deen Bridge',
+        body=message,
+        from_email=settings.DEFAULT_FROM_EMAIL,
+        to=[student.email],
+    )
+
+
+def open_connection():
+    """An open email connection, or None (logged) if the server is unreachable."""
+    try:
+        connection = get_connection(fail_silently=False)
+        connection.open()
+    except Exception as e:
+        logger.error(f'Could not connect to the email server for session reminders: {e}', exc_info=True)
+        return None
+    return connection
+
+
+def send_emails(connection, messages):
+    """Send emails over an open connection in batches; returns how many were sent."""
+    sent = 0
+    for start in range(0, len(messages), EMAIL_BATCH_SIZE):
+        batch = messages[start:start + EMAIL_BATCH_SIZE]
+        try:
+            sent += connection.send_messages(batch) or 0
+        except Exception as e:
+            logger.error(f'Failed to send {len(batch)} session reminder email(s): {e}', exc_info=True)
+    return sent
+
+
+def remind_session(session, recipients, connection, now, frontend_url):
+    """
+    Notify and email the recipients of one session; failures are logged.
+
+    Returns:
+        (in-app notifications created, emails sent)
+    """
+    start = session_start(session)
+    title, body = reminder_text(session, start, now)
+    action_url = session.get_session_join_url(None)
+
+    notifications = 0
+    try:
+        notifications = len(send_notification_to_multiple_users(
+            recipients,
+            title=title,
+            body=body,
+            notification_type=NotificationType.SESSION,
+            action_url=action_url,
+            metadata={'session_id': session.id, 'class_id': session.class_session_id, 'starts_at': start.isoformat()},
+        ))
+    except Exception as e:
+        logger.error(f'Failed to notify students of session {session.id}: {e}', exc_info=True)
+
+    emails = 0
+    if connection is not None:
+        emails = send_emails(connection, [
+            reminder_email(student, title, body, f'{frontend_url}{action_url}')
+            for student in recipients
+            if student.email
+        ])
+    return notifications, emails
+
+
+def dispatch_reminders(now=None, lead=REMINDER_LEAD):
+    """
+    Claim and send the reminders of every session starting within `lead`.
+    Sessions whose students got nothing at all are released for a retry.
+
+    Returns:
+        (sessions reminded, in-app notifications created, emails sent)
+    """
+    now = now or timezone.now()
+    due = due_sessions(now, lead)
+    if not due:
+        return 0, 0, 0
+
+    claimed = set(claim_sessions([session.id for session in due]))
+    sessions = [session for session in due if session.id in claimed]
+    if not sessions:
+        return 0, 0, 0
+
+    try:
+        students = enrolled_students({session.class_session_id for session in sessions})
+    except Exception:
+        release_sessions(claimed)
+        raise
+    frontend_url = getattr(settings, 'FRONTEND_URL', 'http://localhost:3000')
+
+    connection = None
+    if any(student.email for recipients in students.values() for student in recipients):
+        connection = open_connection()
+
+    failed = []
+    notifications = emails = 0
+    try:
+        for session in sessions:
+            recipients = students.get(session.class_session_id, [])
+            if not recipients:
+                continue
+            try:
+                sent = remind_session(session, recipients, connection, now, frontend_url)
+            except Exception as e:
+                logger.error(f'Failed to send the reminder of session {session.id}: {e}', exc_info=True)
+                sent = (0, 0)
+            if not any(sent):
+                failed.append(session.id)
+            notifications += sent[0]
+            emails += sent[1]
+    finally:
+        if connection is not None:
+            connection.close()
+    release_sessions(failed)
+
+    if failed:
+        logger.warning('Released %s session reminder(s) that could not be delivered', len(failed))
+    logger.info(
+        'Sent reminders for %s session(s): %s notification(s), %s email(s)',
+        len(sessions) - len(failed), notifications, emails,
+    )
+    return len(sessions) - len(failed), notifications, emails
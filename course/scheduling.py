@@ -0,0 +1,146 @@
+"""
+Bulk scheduling of live sessions.
+
+`schedule_sessions` lays out a term of LiveSessions for many classes at once.
+Occurrence dates come from each class's days_of_week, start_time and timezone
+in pure Python; the dates that already have a session are read in one query
+and the rest are inserted with bulk_create, titles included. Running it again
+over the same range creates nothing new, and the class rows are locked while
+a batch is written so concurrent runs cannot schedule the same date twice.
+
+Used by the `schedule_live_sessions` command and the "Schedule sessions"
+action of the Class admin.
+"""
+import logging
+from collections import defaultdict
+from datetime import timedelta
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Class, LiveSession, SessionStatus
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WEEKS = 12
+
+# Classes handled per transaction; their sessions go in one bulk_create
+CLASS_BATCH_SIZE = 200
+INSERT_BATCH_SIZE = 1000
+
+
+def class_timezone(class_obj):
+    """The class's zone, or the default zone if its name is unknown."""
+    try:
+        return ZoneInfo(class_obj.timezone)
+    except (ZoneInfoNotFoundError, ValueError, TypeError):
+        return timezone.get_default_timezone()
+
+
+def first_open_date(class_obj, now=None):
+    """
+    First date a new session can take: today in the class's timezone, or
+    tomorrow if today's start time has already passed there.
+    """
+    local_now = timezone.localtime(now or timezone.now(), class_timezone(class_obj))
+    if class_obj.start_time and local_now.time() >= class_obj.start_time:
+        return local_now.date() + timedelta(days=1)
+    return local_now.date()
+
+
+def occurrence_dates(days_of_week, start_date, end_date):
+    """Dates from start_date to end_date (inclusive) that fall on days_of_week."""
+    if not isinstance(days_of_week, list):
+        return []
+    days = {day for day in days_of_week if isinstance(day, int) and 0 <= day <= 6}
+    if not days:
+        return []
+
+    dates = []
+    for offset in range(7):
+        first = start_date + timedelta(days=offset)
+        if first > end_date:
+            break
+        if first.weekday() in days:
+            dates.extend(
+                first + timedelta(weeks=week)
+                for week in range((end_date - first).days // 7 + 1)
+            )
+    dates.sort()
+    return dates
+
+
+def session_title(class_title, scheduled_date):
+    """Same format as LiveSession.generate_title."""
+    return f"{class_title} - {scheduled_date.strftime('%b %d, %Y')}"
+
+
+def plan_sessions(classes, start_date, end_date, existing):
+    """
+    Unsaved LiveSessions for every occurrence of the classes between the two
+    dates that is not in `existing` ({class id: set of dates}).
+    """
+    sessions = []
+    for class_obj in classes:
+        first = max(start_date, first_open_date(class_obj))
+        taken = existing.get(class_obj.id, ())
+        for scheduled_date in occurrence_dates(class_obj.days_of_week, first, end_date):
+            if scheduled_date in taken:
+                continue
+            sessions.append(LiveSession(
+                class_session=class_obj,
+                scheduled_date=scheduled_date,
+                title=session_title(class_obj.title, scheduled_date),
+                status=SessionStatus.SCHEDULED,
+            ))
+    return sessions
+
+
+def _existing_dates(class_ids, start_date, end_date):
+    existing = defaultdict(set)
+    rows = LiveSession.objects.filter(
+        class_session_id__in=class_ids,
+        scheduled_date__range=(start_date, end_date),
+    ).values_list('class_session_id', 'scheduled_date')
+    for class_id, scheduled_date in rows:
+        existing[class_id].add(scheduled_date)
+    return existing
+
+
+def schedule_sessions(classes=None, start_date=None, end_date=None, weeks=DEFAULT_WEEKS, dry_run=False):
+    """
+    Create the missing sessions of `classes` (a queryset, default: active
+    classes) from start_date (default: today) to end_date (default: `weeks`
+    later). Returns (classes processed, sessions created); with dry_run the
+    second number is what would have been created.
+    """
+    if classes is None:
+        classes = Class.objects.filter(is_active=True)
+    if start_date is None:
+        start_date = timezone.localdate()
+    if end_date is None:
+        end_date = start_date + timedelta(weeks=weeks) - timedelta(days=1)
+
+    class_ids = list(classes.order_by('pk').values_list('pk', flat=True))
+    created = 0
+    for index in range(0, len(class_ids), CLASS_BATCH_SIZE):
+        batch_ids = class_ids[index:index + CLASS_BATCH_SIZE]
+        with transaction.atomic():
+            # Locking the classes serializes runs that overlap on them
+            batch = list(
+                Class.objects.select_for_update()
+                .filter(pk__in=batch_ids)
+                .only('id', 'title', 'days_of_week', 'start_time', 'timezone')
+                .order_by('pk')
+            )
+            sessions = plan_sessions(batch, start_date, end_date, _existing_dates(batch_ids, start_date, end_date))
+            if not dry_run:
+                LiveSession.objects.bulk_create(sessions, batch_size=INSERT_BATCH_SIZE)
+        created += len(sessions)
+
+    logger.info(
+        'Scheduled %s session(s) for %s class(es) from %s to %s%s',
+        created, len(class_ids), start_date, end_date, ' (dry run)' if dry_run else '',
+    )
+    return len(class_ids), created
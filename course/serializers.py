@@ -1,7 +1,10 @@
+from collections import Counter
 from datetime import date, datetime
 from rest_framework import serializers
 
-from .models import Class, LiveSession, Recording, Attendance, Certificate, LiveSessionResource
+from .models import Class, LiveSession, Recording, Attendance, AttendanceStatus, Certificate, LiveSessionResource
+from .access import class_access
+from .attendance import completed_enrollments
 
 from accounts.models import CustomUser
 from subjects.models import Subject
@@ -10,7 +13,9 @@ from enrollments.models import ClassEnrollment
 from accounts.serializers import CustomUserSerializer
 from subjects.serializers import SubjectSerializer
 from core.image_compressor import compress_image_file
+from core.media import signed_media_url
 from django.conf import settings
+from django.urls import reverse
 
 
 class ClassSerializer(serializers.ModelSerializer):
@@ -48,6 +53,10 @@ class ClassSerializer(serializers.ModelSerializer):
         return obj.get_days_display()
 
     def get_enrolled_students(self, obj):
+        # Use enrollments prefetched by Class.objects.with_enrollment_stats() when available
+        if hasattr(obj, 'completed_enrollments'):
+            students = [enrollment.student for enrollment in obj.completed_enrollments]
+            return CustomUserSerializer(students, many=True).data
         # return users who have an active enrollment for this class
         qs = CustomUser.objects.filter(
             class_enrollments__class_enrolled=obj,
@@ -59,6 +68,8 @@ class ClassSerializer(serializers.ModelSerializer):
         request = self.context.get('request')
         if not request or not request.user or not request.user.is_authenticated:
             return False
+        if hasattr(obj, 'user_is_enrolled'):
+            return obj.user_is_enrolled
         user = request.user
         # Check if user has a completed enrollment for this class
         from enrollments.models import ClassEnrollment, EnrollmentChoices
@@ -217,7 +228,10 @@ class LiveSessionSerializer(serializers.ModelSerializer):
         request = self.context.get('request')
         if not request or not request.user or not request.user.is_authenticated:
             return False
-        return obj.can_user_join(request.user)
+        # Loaded once per response, shared by every row of a list
+        if '_class_access' not in self.context:
+            self.context['_class_access'] = class_access(request.user)
+        return obj.can_user_join(request.user, self.context['_class_access'])
     
     def get_join_url(self, obj):
         """Get the join URL for this session."""
@@ -233,6 +247,16 @@ class LiveSessionSerializer(serializers.ModelSerializer):
 
 
 class RecordingSerializer(serializers.ModelSerializer):
+    # Signed link to the session's recording, streamed with Range support
+    file_url = serializers.SerializerMethodField()
+
+    def get_file_url(self, obj):
+        request = self.context.get('request')
+        if not obj.session.recording_file or not request or not request.user.is_authenticated:
+            return None
+        path = reverse('session_recording_file', kwargs={'session_id': obj.session_id})
+        return signed_media_url(request, path, request.user, obj.session.recording_file)
+
     class Meta:
         model = Recording
         fields = "__all__"
@@ -354,6 +378,49 @@ class AttendanceSerializer(serializers.ModelSerializer):
         return validated_data
 
 
+class AttendanceEntrySerializer(serializers.Serializer):
+    """One student's line in a bulk attendance request."""
+    student = serializers.IntegerField()
+    status = serializers.ChoiceField(choices=AttendanceStatus.choices)
+    device_info = serializers.JSONField(required=False)
+
+    def validate_device_info(self, value):
+        if value is not None and not isinstance(value, dict):
+            raise serializers.ValidationError('device_info must be an object.')
+        return value
+
+
+class BulkAttendanceSerializer(serializers.Serializer):
+    """
+    Attendance of many students of the session in context['session'], which
+    the view resolves (and authorizes) first. All enrollments are resolved
+    with one query; each record gets the enrollment id as class_enrollment_id.
+    """
+    records = AttendanceEntrySerializer(many=True, allow_empty=False)
+
+    def validate(self, validated_data):
+        session = self.context['session']
+        records = validated_data['records']
+
+        student_ids = [record['student'] for record in records]
+        duplicates = sorted(sid for sid, count in Counter(student_ids).items() if count > 1)
+        if duplicates:
+            raise serializers.ValidationError({
+                'records': f'Students listed more than once: {", ".join(map(str, duplicates))}.'
+            })
+
+        enrollments = completed_enrollments(session.class_session, student_ids)
+        missing = [sid for sid in student_ids if sid not in enrollments]
+        if missing:
+            raise serializers.ValidationError({
+                'records': f'Students not enrolled in the class for this session: {", ".join(map(str, missing))}.'
+            })
+
+        for record in records:
+            record['class_enrollment_id'] = enrollments[record['student']]
+        return validated_data
+
+
 class CertificateSerializer(serializers.ModelSerializer):
     class Meta:
         model = Certificate
@@ -388,9 +455,12 @@ class LiveSessionResourceSerializer(serializers.ModelSerializer):
         return obj.get_file_extension()
     
     def get_file_url(self, obj):
-        """Get the file URL"""
+        """Get a signed link to the file, served with Range support"""
         if obj.file:
             request = self.context.get('request')
+            if request and request.user.is_authenticated:
+                path = reverse('live_session_resource_file', kwargs={'pk': obj.pk})
+                return signed_media_url(request, path, request.user, obj.file)
             if request:
                 return request.build_absolute_uri(obj.file.url)
             return obj.file.url
@@ -0,0 +1,47 @@
+"""
+Signals for course app
+"""
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from enrollments.models import ClassEnrollment
+from .access import invalidate_class_access
+from .models import Class
+
+
+def _invalidate_class_access(user_ids):
+    user_ids = list(user_ids)
+
+    def invalidate():
+        for user_id in user_ids:
+            invalidate_class_access(user_id)
+
+    # Now, and again at commit so access loaded from uncommitted data is dropped
+    invalidate()
+    transaction.on_commit(invalidate)
+
+
+@receiver(post_save, sender=ClassEnrollment)
+@receiver(post_delete, sender=ClassEnrollment)
+def invalidate_access_on_enrollment_change(sender, instance, raw=False, **kwargs):
+    """A student's enrollments decide which sessions they may join"""
+    if not raw:
+        _invalidate_class_access([instance.student_id])
+
+
+@receiver(m2m_changed, sender=Class.teacher.through)
+def invalidate_access_on_teacher_change(sender, instance, action, reverse, pk_set, **kwargs):
+    """Teachers may join (and moderate) the sessions of their classes"""
+    if action == 'pre_clear' and not reverse:
+        # The removed teachers are unknown after the fact
+        instance._cleared_teacher_ids = list(instance.teacher.values_list('pk', flat=True))
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if reverse:
+        # user.classes.add(...) and friends: the user is the teacher
+        _invalidate_class_access([instance.pk])
+    elif action == 'post_clear':
+        _invalidate_class_access(getattr(instance, '_cleared_teacher_ids', []))
+    else:
+        _invalidate_class_access(pk_set or [])
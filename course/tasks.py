@@ -0,0 +1,25 @@
+"""
+Background tasks for courses and live sessions.
+"""
+from core.tasks import background_task
+
+from .models import RecordingImport
+
+
+@background_task(max_attempts=10)
+def ingest_recording(import_id):
+    """Download/verify/store an SFU recording; retries resume from the partial file."""
+    from .recordings import ingest
+
+    recording_import = RecordingImport.objects.select_related('session').filter(id=import_id).first()
+    if recording_import is None:
+        return
+    ingest(recording_import)
+
+
+@background_task
+def flush_session_presence(session_id, ended_at=None):
+    """Mark attendance of a finished session from its presence log."""
+    from .presence import flush_presence, parse_event_time
+
+    flush_presence(session_id, parse_event_time(ended_at) if ended_at else None)
@@ -1,10 +1,30 @@
-from django.test import TestCase
+import hashlib
+import os
+import shutil
+import tempfile
+import tracemalloc
+from unittest import mock
+
+import requests
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core import mail
+from django.core.cache import cache
+from django.test import TestCase, override_settings
 from django.contrib.auth import get_user_model
 from rest_framework.test import APIClient
 from rest_framework import status
-from course.models import Class, LiveSession, SessionStatus
+from core.models import OutboxTask, OutboxTaskStatus
+from core.tasks import run_pending_tasks
+from course import attendance, presence, recordings, reminders
+from course.tasks import ingest_recording
+from course.scheduling import occurrence_dates, schedule_sessions
+from course.models import (
+    Class, LiveSession, SessionStatus, Recording, LiveSessionResource, Attendance, AttendanceStatus,
+    RecordingImport, RecordingImportSource, RecordingImportStatus
+)
 from enrollments.models import ClassEnrollment, EnrollmentChoices
-from datetime import datetime, timedelta
+from datetime import date, datetime, time, timedelta
+from datetime import timezone as dt_timezone
 from django.utils import timezone
 
 User = get_user_model()
@@ -135,3 +155,980 @@ class SessionJoinSecurityTestCase(TestCase):
         
         # DRF's IsAuthenticated returns 403 for unauthenticated users
         self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+class ClassListQueryCountTestCase(TestCase):
+    """Class listings must run a fixed number of queries regardless of page size."""
+
+    def setUp(self):
+        """Set up classes, each with a teacher and enrolled students."""
+        self.teacher = User.objects.create_user(
+            email='teacher@test.com',
+            password='testpass123',
+            role='teacher',
+            full_name='Test Teacher'
+        )
+        self.students = [
+            User.objects.create_user(
+                email=f'student{i}@test.com',
+                password='testpass123',
+                role='student',
+                full_name=f'Student {i}'
+            )
+            for i in range(3)
+        ]
+
+        for i in range(20):
+            test_class = Class.objects.create(
+                title=f'Class {i}',
+                capacity=10,
+                start_time=timezone.now().time(),
+                end_time=(timezone.now() + timedelta(hours=1)).time(),
+                days_of_week=[0, 2]
+            )
+            test_class.teacher.add(self.teacher)
+            for student in self.students[:i % 4]:
+                ClassEnrollment.objects.create(
+                    student=student,
+                    class_enrolled=test_class,
+                    status=EnrollmentChoices.COMPLETED
+                )
+
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.students[0])
+
+    def count_queries(self, url):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return len(ctx.captured_queries), response
+
+    def test_class_list_query_count_is_flat(self):
+        """Test that a larger page does not issue more queries."""
+        small, _ = self.count_queries('/api/course/?page_size=2')
+        large, _ = self.count_queries('/api/course/?page_size=20')
+        self.assertEqual(small, large)
+
+    def test_timetable_list_query_count_is_flat(self):
+        """Test that the timetable listing does not issue per-row queries."""
+        small, _ = self.count_queries('/api/course/timetable/?page_size=2')
+        large, _ = self.count_queries('/api/course/timetable/?page_size=20')
+        self.assertEqual(small, large)
+
+    def test_annotated_values_match_model_methods(self):
+        """Test that annotated counts and flags agree with the per-row model methods."""
+        _, response = self.count_queries('/api/course/?page_size=20')
+        for row in response.data['results']:
+            test_class = Class.objects.get(pk=row['id'])
+            enrolled_ids = set(
+                ClassEnrollment.objects.filter(
+                    class_enrolled=test_class,
+                    status=EnrollmentChoices.COMPLETED
+                ).values_list('student_id', flat=True)
+            )
+            self.assertEqual(row['enrolled_count'], test_class.enrolled_count())
+            self.assertEqual(row['seat_left'], test_class.seat_left())
+            self.assertEqual(row['is_enrolled'], self.students[0].id in enrolled_ids)
+            self.assertEqual({s['id'] for s in row['enrolled_students']}, enrolled_ids)
+
+
+class SessionSchedulingTestCase(TestCase):
+    """Bulk scheduling must match the class schedule and be safe to re-run."""
+
+    # A fixed term in the future so today's date and time do not matter
+    TERM_START = date(2099, 1, 5)  # a Monday
+    TERM_END = date(2099, 3, 29)  # a Sunday, 12 weeks later
+
+    def create_classes(self, count, days_of_week=(0, 2, 4)):
+        return [
+            Class.objects.create(
+                title=f'Scheduled Class {i}',
+                start_time=time(9, 0),
+                end_time=time(10, 0),
+                days_of_week=list(days_of_week),
+                timezone='Asia/Kabul',
+                is_active=True,
+            )
+            for i in range(count)
+        ]
+
+    def schedule(self, classes):
+        return schedule_sessions(
+            Class.objects.filter(pk__in=[c.pk for c in classes]),
+            start_date=self.TERM_START,
+            end_date=self.TERM_END,
+        )
+
+    def test_occurrence_dates_match_weekdays(self):
+        """Test that occurrences are exactly the dates on the class's days."""
+        start, end = date(2099, 1, 1), date(2099, 2, 14)
+        expected = [
+            start + timedelta(days=i)
+            for i in range((end - start).days + 1)
+            if (start + timedelta(days=i)).weekday() in (1, 6)
+        ]
+        self.assertEqual(occurrence_dates([6, 1], start, end), expected)
+        self.assertEqual(occurrence_dates([], start, end), [])
+        self.assertEqual(occurrence_dates('not a list', start, end), [])
+
+    def test_term_is_created_with_titles(self):
+        """Test that a term gets one session per class day, titled like single saves."""
+        classes = self.create_classes(3)
+        self.assertEqual(self.schedule(classes), (3, 3 * 36))
+
+        for session in LiveSession.objects.filter(class_session=classes[0]):
+            self.assertIn(session.scheduled_date.weekday(), (0, 2, 4))
+            self.assertEqual(session.title, session.generate_title())
+            self.assertEqual(session.status, SessionStatus.SCHEDULED)
+
+    def test_rerun_and_existing_sessions_are_skipped(self):
+        """Test that scheduling twice, or over a hand-made session, adds no duplicates."""
+        classes = self.create_classes(2)
+        LiveSession.objects.create(
+            title='Makeup',
+            class_session=classes[0],
+            scheduled_date=self.TERM_START,
+        )
+
+        self.assertEqual(self.schedule(classes), (2, 2 * 36 - 1))
+        self.assertEqual(self.schedule(classes), (2, 0))
+        self.assertEqual(
+            LiveSession.objects.filter(class_session=classes[0], scheduled_date=self.TERM_START).count(),
+            1
+        )
+
+    def test_query_count_does_not_grow_with_classes(self):
+        """Test that scheduling more classes does not issue more queries."""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        few, many = self.create_classes(2), self.create_classes(20, days_of_week=(1, 3))
+        with CaptureQueriesContext(connection) as small:
+            self.schedule(few)
+        with CaptureQueriesContext(connection) as large:
+            self.schedule(many)
+        self.assertEqual(len(small.captured_queries), len(large.captured_queries))
+
+    def test_single_session_is_saved_once(self):
+        """Test that creating a session without a title issues a single INSERT."""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        test_class = self.create_classes(1)[0]
+        with CaptureQueriesContext(connection) as ctx:
+            session = LiveSession.objects.create(class_session=test_class, scheduled_date=self.TERM_START)
+        writes = [q for q in ctx.captured_queries if q['sql'].startswith(('INSERT', 'UPDATE'))]
+        self.assertEqual(len(writes), 1)
+        self.assertEqual(session.title, f'Scheduled Class 0 - {self.TERM_START.strftime("%b %d, %Y")}')
+
+
+class BulkAttendanceTestCase(TestCase):
+    """A whole session's attendance is taken in one request with a fixed number of queries."""
+
+    USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0 Safari/537.36'
+
+    def setUp(self):
+        self.teacher = User.objects.create_user(
+            email='teacher@test.com', password='testpass123', role='teacher', full_name='Test Teacher'
+        )
+        self.test_class = Class.objects.create(
+            title='Attendance Class', start_time=time(9, 0), end_time=time(10, 0), days_of_week=[0]
+        )
+        self.test_class.teacher.add(self.teacher)
+        self.students = []
+        for i in range(30):
+            student = User.objects.create_user(
+                email=f'student{i}@test.com', password='testpass123', role='student', full_name=f'Student {i}'
+            )
+            ClassEnrollment.objects.create(student=student, class_enrolled=self.test_class, status=EnrollmentChoices.COMPLETED)
+            self.students.append(student)
+        self.session = LiveSession.objects.create(
+            title='Attendance Session', class_session=self.test_class, scheduled_date=date(2099, 1, 5)
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.teacher)
+
+    def post(self, students, status_value=AttendanceStatus.PRESENT):
+        return self.client.post('/api/course/attendance/bulk/', {
+            'session': self.session.id,
+            'records': [
+                {'student': s.id, 'status': status_value, 'device_info': {'screen': '1920x1080'}}
+                for s in students
+            ],
+        }, format='json', HTTP_USER_AGENT=self.USER_AGENT)
+
+    def test_records_and_updates_whole_session(self):
+        """Test that a bulk post creates every record and a second one updates them in place."""
+        response = self.post(self.students)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['recorded'], 30)
+        first = Attendance.objects.get(session=self.session, class_enrollment__student=self.students[0])
+        self.assertEqual(first.status, AttendanceStatus.PRESENT)
+        self.assertEqual(first.device_info['screen'], '1920x1080')
+        self.assertEqual(first.device_info['browser']['family'], 'Chrome')
+
+        response = self.post(self.students[:10], AttendanceStatus.ABSENT)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(Attendance.objects.filter(session=self.session).count(), 30)
+        self.assertEqual(Attendance.objects.filter(session=self.session, status=AttendanceStatus.ABSENT).count(), 10)
+        updated = Attendance.objects.get(pk=first.pk)
+        self.assertEqual(updated.status, AttendanceStatus.ABSENT)
+        self.assertEqual(updated.created_at, first.created_at)
+
+    def test_unenrolled_student_rejects_whole_batch(self):
+        """Test that one student outside the class fails validation and writes nothing."""
+        outsider = User.objects.create_user(
+            email='outsider@test.com', password='testpass123', role='student', full_name='Outsider'
+        )
+        response = self.post(self.students[:5] + [outsider])
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn(str(outsider.id), str(response.data['records']))
+        self.assertFalse(Attendance.objects.filter(session=self.session).exists())
+
+    def test_duplicate_students_are_rejected(self):
+        """Test that a student listed twice is rejected."""
+        response = self.post([self.students[0], self.students[0]])
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_only_teachers_and_admins_can_take_attendance(self):
+        """Test that a student of the class cannot post attendance."""
+        self.client.force_authenticate(user=self.students[0])
+        response = self.post(self.students)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_outsider_learns_nothing_about_enrollments(self):
+        """Test that a non-teacher is refused before records are checked against enrollments."""
+        outsider = User.objects.create_user(
+            email='outsider@test.com', password='testpass123', role='student', full_name='Outsider'
+        )
+        self.client.force_authenticate(user=outsider)
+        response = self.post(self.students[:1] + [outsider])
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertNotIn('records', response.data)
+
+    def test_client_cannot_override_parsed_user_agent(self):
+        """Test that per-record device details never replace the server-parsed browser."""
+        response = self.client.post('/api/course/attendance/bulk/', {
+            'session': self.session.id,
+            'records': [{
+                'student': self.students[0].id,
+                'status': AttendanceStatus.PRESENT,
+                'device_info': {'screen': '1920x1080', 'browser': {'family': 'Spoofed'}},
+            }],
+        }, format='json', HTTP_USER_AGENT=self.USER_AGENT)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        record = Attendance.objects.get(session=self.session, class_enrollment__student=self.students[0])
+        self.assertEqual(record.device_info['browser']['family'], 'Chrome')
+        self.assertEqual(record.device_info['screen'], '1920x1080')
+
+    def test_query_count_does_not_grow_with_students(self):
+        """Test that posting more students does not issue more queries."""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        with CaptureQueriesContext(connection) as small:
+            self.post(self.students[:2])
+        with CaptureQueriesContext(connection) as large:
+            self.post(self.students)
+        self.assertEqual(len(small.captured_queries), len(large.captured_queries))
+
+    def test_user_agent_is_parsed_once(self):
+        """Test that repeated user agents are served from the parse cache."""
+        attendance._parse_user_agent.cache_clear()
+        with mock.patch.object(attendance, 'parse_ua', wraps=attendance.parse_ua) as parse:
+            for _ in range(3):
+                self.assertEqual(attendance.parse_user_agent(self.USER_AGENT)['browser']['family'], 'Chrome')
+        self.assertEqual(parse.call_count, 1)
+
+
+@override_settings(ATTENDANCE_MIN_PRESENCE_MINUTES=10, TASK_QUEUE_BACKEND='outbox')
+class PresenceAttendanceTestCase(TestCase):
+    """SFU participant events are logged without database writes and become attendance when the room ends."""
+
+    WEBHOOK_SECRET = 'test-secret'
+    START = datetime(2099, 1, 5, 9, 0, tzinfo=dt_timezone.utc)
+
+    def setUp(self):
+        cache.clear()
+        env_override = mock.patch.dict(os.environ, {'SFU_WEBHOOK_SECRET': self.WEBHOOK_SECRET})
+        env_override.start()
+        self.addCleanup(env_override.stop)
+
+        test_class = Class.objects.create(
+            title='Presence Class', start_time=time(9, 0), end_time=time(10, 0), days_of_week=[0]
+        )
+        self.students = []
+        self.enrollments = []
+        for i in range(3):
+            student = User.objects.create_user(
+                email=f'student{i}@test.com', password='testpass123', role='student', full_name=f'Student {i}'
+            )
+            self.students.append(student)
+            self.enrollments.append(ClassEnrollment.objects.create(
+                student=student, class_enrolled=test_class, status=EnrollmentChoices.COMPLETED
+            ))
+        self.session = LiveSession.objects.create(
+            title='Presence Session', class_session=test_class, scheduled_date=self.START.date(), status=SessionStatus.LIVE
+        )
+        self.client = APIClient()
+
+    def at(self, minutes):
+        return (self.START + timedelta(minutes=minutes)).isoformat()
+
+    def send_webhook(self, event, **data):
+        response = self.client.post(
+            '/api/sfu/webhook/',
+            {'event': event, 'data': {'roomId': str(self.session.id), **data}},
+            format='json',
+            HTTP_X_WEBHOOK_SECRET=self.WEBHOOK_SECRET
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def attendance_of(self, student):
+        return Attendance.objects.get(session=self.session, class_enrollment__student=student)
+
+    def test_intervals_of_one_user_are_merged(self):
+        """Test that overlapping connections are not counted twice."""
+        start = self.START
+        minute = timedelta(minutes=1)
+        events = [
+            (1, presence.EVENT_JOIN, 7, 'p1', start),
+            (2, presence.EVENT_JOIN, 7, 'p1', start + minute),  # repeated webhook
+            (3, presence.EVENT_JOIN, 7, 'p2', start + 5 * minute),  # second tab
+            (4, presence.EVENT_LEAVE, 7, 'p1', start + 10 * minute),
+            (5, presence.EVENT_LEAVE, 7, 'p2', start + 20 * minute),
+            (6, presence.EVENT_JOIN, 7, 'p3', start + 30 * minute),  # reconnect, still open
+        ]
+        intervals = presence.presence_intervals(events, start + 40 * minute)
+        self.assertEqual(intervals[7], [(start, start + 20 * minute), (start + 30 * minute, start + 40 * minute)])
+        self.assertEqual(presence.presence_seconds(intervals)[7], 30 * 60)
+
+    def test_participant_events_do_not_touch_the_database(self):
+        """Test that join and leave webhooks only append to the cache."""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        with CaptureQueriesContext(connection) as ctx:
+            for i in range(50):
+                student = self.students[i % 3]
+                self.send_webhook('participant.joined', userId=str(student.id), participantId=f'p{i}', joinedAt=self.at(i))
+                self.send_webhook('participant.left', userId=str(student.id), participantId=f'p{i}', leftAt=self.at(i + 1))
+        self.assertEqual(len(ctx.captured_queries), 0)
+
+    def test_room_end_marks_attendance_by_threshold(self):
+        """Test that room.ended records present/absent and never downgrades a teacher's record."""
+        long_stay, short_stay, no_show = self.students
+        Attendance.objects.create(
+            class_enrollment=self.enrollments[1], session=self.session, status=AttendanceStatus.PRESENT
+        )
+
+        self.send_webhook('participant.joined', userId=str(long_stay.id), participantId='a', joinedAt=self.at(0))
+        self.send_webhook('participant.left', userId=str(long_stay.id), participantId='a', leftAt=self.at(8))
+        self.send_webhook('participant.joined', userId=str(long_stay.id), participantId='b', joinedAt=self.at(15))
+        self.send_webhook('participant.joined', userId=str(short_stay.id), participantId='c', joinedAt=self.at(0))
+        self.send_webhook('participant.left', userId=str(short_stay.id), participantId='c', leftAt=self.at(3))
+        self.send_webhook('room.ended', endedAt=self.at(20))
+        run_pending_tasks()
+
+        # 8 + 5 minutes in two visits
+        long_record = self.attendance_of(long_stay)
+        self.assertEqual(long_record.status, AttendanceStatus.PRESENT)
+        self.assertEqual(long_record.device_info['presence_seconds'], 13 * 60)
+        self.assertEqual(self.attendance_of(short_stay).status, AttendanceStatus.PRESENT)
+        self.assertEqual(self.attendance_of(no_show).status, AttendanceStatus.ABSENT)
+        self.assertIsNone(cache.get(presence._sequence_key(self.session.id)))
+
+    def test_join_api_alone_does_not_count_as_presence(self):
+        """Test that a student who calls the join API but never connects to the SFU is absent."""
+        student = self.students[0]
+        self.client.force_authenticate(user=student)
+        self.assertEqual(self.client.post(f'/api/course/session/{self.session.id}/join/').status_code, status.HTTP_200_OK)
+        # Joins without a participant, as logged by earlier versions, are ignored too
+        presence.record_join(self.session.id, student.id, None, at=self.at(0))
+        self.send_webhook('room.ended', endedAt=self.at(20))
+        run_pending_tasks()
+
+        self.assertEqual(self.attendance_of(student).status, AttendanceStatus.ABSENT)
+
+    def test_leave_endpoint_closes_sfu_presence(self):
+        """Test that leaving through the API closes the student's SFU connections."""
+        student = self.students[0]
+        joined_at = timezone.now() - timedelta(minutes=5)
+        self.send_webhook('participant.joined', userId=str(student.id), participantId='a', joinedAt=joined_at.isoformat())
+        self.client.force_authenticate(user=student)
+        self.assertEqual(self.client.post(f'/api/course/session/{self.session.id}/leave/').status_code, status.HTTP_200_OK)
+
+        events, _ = presence._read_log(self.session.id)
+        self.assertEqual([event[1] for event in events], [presence.EVENT_JOIN, presence.EVENT_LEAVE])
+        intervals = presence.presence_intervals(events, timezone.now() + timedelta(hours=1))
+        self.assertEqual(len(intervals[student.id]), 1)
+        self.assertLessEqual(intervals[student.id][0][1], timezone.now())
+
+
+class SessionAccessCacheTestCase(TestCase):
+    """Join decisions are served from cached class ids and follow enrollment and teacher changes."""
+
+    def setUp(self):
+        cache.clear()
+        self.teacher = User.objects.create_user(
+            email='teacher@test.com', password='testpass123', role='teacher', full_name='Test Teacher'
+        )
+        self.student = User.objects.create_user(
+            email='student@test.com', password='testpass123', role='student', full_name='Test Student'
+        )
+        self.classes = []
+        self.sessions = []
+        for i in range(10):
+            test_class = Class.objects.create(
+                title=f'Access Class {i}', start_time=time(9, 0), end_time=time(10, 0), days_of_week=[0]
+            )
+            test_class.teacher.add(self.teacher)
+            self.classes.append(test_class)
+            self.sessions.append(LiveSession.objects.create(
+                title=f'Access Session {i}', class_session=test_class,
+                scheduled_date=date(2099, 1, 5), status=SessionStatus.LIVE
+            ))
+        self.enrollment = ClassEnrollment.objects.create(
+            student=self.student, class_enrolled=self.classes[0], status=EnrollmentChoices.COMPLETED
+        )
+        self.client = APIClient()
+
+    def test_checks_run_no_queries_once_cached(self):
+        """Test that repeated checks are answered without queries."""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        self.assertTrue(self.sessions[0].can_user_join(self.student))
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertTrue(self.sessions[0].can_user_join(self.student))
+            self.assertFalse(self.sessions[1].can_user_join(self.student))
+            self.assertTrue(self.sessions[1].can_user_join(self.teacher))
+            self.assertTrue(self.sessions[1].can_user_join(self.teacher))
+        # The teacher's first check loads their classes once
+        self.assertEqual(len(ctx.captured_queries), 2)
+
+    def test_enrollment_changes_invalidate(self):
+        """Test that enrolling and unenrolling is seen by the next check."""
+        self.assertFalse(self.sessions[1].can_user_join(self.student))
+        enrollment = ClassEnrollment.objects.create(
+            student=self.student, class_enrolled=self.classes[1], status=EnrollmentChoices.COMPLETED
+        )
+        self.assertTrue(self.sessions[1].can_user_join(self.student))
+
+        enrollment.status = EnrollmentChoices.CANCELLED
+        enrollment.save()
+        self.assertFalse(self.sessions[1].can_user_join(self.student))
+
+        self.enrollment.delete()
+        self.assertFalse(self.sessions[0].can_user_join(self.student))
+
+    def test_teacher_changes_invalidate(self):
+        """Test that adding, removing and clearing teachers is seen by the next check."""
+        other = User.objects.create_user(
+            email='other@test.com', password='testpass123', role='teacher', full_name='Other Teacher'
+        )
+        self.assertFalse(self.sessions[2].can_user_join(other))
+        self.classes[2].teacher.add(other)
+        self.assertTrue(self.sessions[2].can_user_join(other))
+        self.classes[2].teacher.remove(other)
+        self.assertFalse(self.sessions[2].can_user_join(other))
+        other.classes.add(self.classes[3])
+        self.assertTrue(self.sessions[3].can_user_join(other))
+        self.classes[3].teacher.clear()
+        self.assertFalse(self.sessions[3].can_user_join(other))
+        self.assertFalse(self.sessions[3].can_user_join(self.teacher))
+
+    def test_session_list_can_join_query_count_is_flat(self):
+        """Test that can_join in session lists does not issue per-row queries."""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        self.client.force_authenticate(user=self.student)
+        counts = []
+        for page_size in (2, 10):
+            cache.clear()
+            with CaptureQueriesContext(connection) as ctx:
+                response = self.client.get(f'/api/course/live_session/?page_size={page_size}')
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            counts.append(len([q for q in ctx.captured_queries if 'enrollments_classenrollment' in q['sql']]))
+            can_join = {row['id']: row['can_join'] for row in response.data['results']}
+            for session_id, allowed in can_join.items():
+                self.assertEqual(allowed, session_id == self.sessions[0].id)
+        self.assertEqual(counts[0], counts[1])
+
+    def test_join_view_uses_cached_role(self):
+        """Test that teachers join as moderators and students as members."""
+        self.client.force_authenticate(user=self.teacher)
+        response = self.client.post(f'/api/course/session/{self.sessions[0].id}/join/')
+        self.assertEqual(response.data['user']['role'], 'moderator')
+        self.client.force_authenticate(user=self.student)
+        response = self.client.post(f'/api/course/session/{self.sessions[0].id}/join/')
+        self.assertEqual(response.data['user']['role'], 'member')
+
+
+class SessionReminderTestCase(TestCase):
+    """Reminders go out once per session, to enrolled students, shortly before it starts."""
+
+    # 09:00 in Kabul (UTC+4:30) on the session date
+    START = datetime(2099, 1, 5, 4, 30, tzinfo=dt_timezone.utc)
+
+    def setUp(self):
+        self.students = [
+            User.objects.create_user(
+                email=f'student{i}@test.com', password='testpass123', role='student', full_name=f'Student {i}'
+            )
+            for i in range(4)
+        ]
+        self.sessions = []
+        for i in range(3):
+            test_class = Class.objects.create(
+                title=f'Reminder Class {i}', start_time=time(9, 0), end_time=time(10, 0),
+                days_of_week=[0], timezone='Asia/Kabul'
+            )
+            for student in self.students[:3]:
+                ClassEnrollment.objects.create(student=student, class_enrolled=test_class, status=EnrollmentChoices.COMPLETED)
+            ClassEnrollment.objects.create(student=self.students[3], class_enrolled=test_class, status=EnrollmentChoices.PENDING)
+            self.sessions.append(LiveSession.objects.create(
+                title=f'Reminder Session {i}', class_session=test_class, scheduled_date=self.START.date()
+            ))
+
+    def test_reminders_are_sent_once_to_enrolled_students(self):
+        """Test that due sessions notify and email their enrolled students exactly once."""
+        from notifications.models import Notification
+
+        self.assertEqual(reminders.dispatch_reminders(now=self.START - timedelta(minutes=30)), (0, 0, 0))
+
+        result = reminders.dispatch_reminders(now=self.START - timedelta(minutes=10))
+        self.assertEqual(result, (3, 9, 9))
+        self.assertEqual(len(mail.outbox), 9)
+        self.assertEqual({m.to[0] for m in mail.outbox}, {s.email for s in self.students[:3]})
+        self.assertFalse(Notification.objects.filter(user=self.students[3]).exists())
+        self.assertEqual(Notification.objects.filter(user=self.students[0]).count(), 3)
+        self.assertFalse(LiveSession.objects.filter(reminder_sent=False).exists())
+
+        self.assertEqual(reminders.dispatch_reminders(now=self.START - timedelta(minutes=5)), (0, 0, 0))
+        self.assertEqual(len(mail.outbox), 9)
+
+    def test_started_or_unscheduled_sessions_are_skipped(self):
+        """Test that past, cancelled and live sessions get no reminder."""
+        LiveSession.objects.filter(pk=self.sessions[1].pk).update(status=SessionStatus.CANCELLED)
+        LiveSession.objects.filter(pk=self.sessions[2].pk).update(status=SessionStatus.LIVE)
+        self.assertEqual(reminders.dispatch_reminders(now=self.START + timedelta(minutes=1)), (0, 0, 0))
+        self.assertEqual(reminders.dispatch_reminders(now=self.START - timedelta(minutes=1))[0], 1)
+
+    def test_claimed_sessions_are_not_claimed_again(self):
+        """Test that a second worker cannot claim sessions another worker took."""
+        ids = [session.id for session in self.sessions]
+        self.assertEqual(sorted(reminders.claim_sessions(ids)), sorted(ids))
+        self.assertEqual(reminders.claim_sessions(ids), [])
+
+    def test_reminder_states_time_left(self):
+        """Test that the reminder text gives the actual time left, not the configured lead."""
+        reminders.dispatch_reminders(now=self.START - timedelta(minutes=7), lead=timedelta(minutes=30))
+        self.assertIn('starts in about 7 minutes', mail.outbox[0].body)
+
+    def test_undelivered_reminders_are_released(self):
+        """Test that a session whose reminder could not be delivered at all is retried."""
+        with mock.patch.object(reminders, 'get_connection', side_effect=OSError('SMTP down')), \
+                mock.patch.object(reminders, 'send_notification_to_multiple_users', side_effect=RuntimeError('boom')):
+            self.assertEqual(reminders.dispatch_reminders(now=self.START - timedelta(minutes=10)), (0, 0, 0))
+        self.assertEqual(LiveSession.objects.filter(reminder_sent=False).count(), 3)
+
+        # Emails down but notifications delivered: the reminder counts as sent
+        with mock.patch.object(reminders, 'open_connection', return_value=None):
+            self.assertEqual(reminders.dispatch_reminders(now=self.START - timedelta(minutes=9)), (3, 9, 0))
+        self.assertFalse(LiveSession.objects.filter(reminder_sent=False).exists())
+
+    def test_students_are_loaded_once_and_emails_share_a_connection(self):
+        """Test that enrollments are read in one query and emails use one SMTP connection."""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        with mock.patch.object(reminders, 'get_connection', wraps=reminders.get_connection) as get_connection:
+            with CaptureQueriesContext(connection) as ctx:
+                reminders.dispatch_reminders(now=self.START - timedelta(minutes=10))
+        enrollment_queries = [q for q in ctx.captured_queries if 'enrollments_classenrollment' in q['sql']]
+        self.assertEqual(len(enrollment_queries), 1)
+        self.assertEqual(get_connection.call_count, 1)
+
+
+class FakeDownload:
+    """Streaming response of the SFU file server; can drop the connection midway."""
+
+    def __init__(self, payload, offset=0, fail_after=None):
+        self.payload = payload[offset:]
+        self.fail_after = fail_after
+        self.status_code = 206 if offset else 200
+        self.headers = {'Content-Length': str(len(self.payload))}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+    def raise_for_status(self):
+        pass
+
+    def iter_content(self, chunk_size):
+        for start in range(0, len(self.payload), chunk_size):
+            if self.fail_after is not None and start >= self.fail_after:
+                raise requests.exceptions.ConnectionError('connection reset')
+            yield self.payload[start:start + chunk_size]
+
+
+class RecordingIngestTestCase(TestCase):
+    """Recordings are streamed to disk in chunks, resumed after interruptions and verified."""
+
+    WEBHOOK_SECRET = 'test-secret'
+
+    def setUp(self):
+        """Set up a session and temporary ingest/media directories."""
+        self.tempdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tempdir, ignore_errors=True)
+        settings_override = override_settings(
+            RECORDING_INGEST_DIR=os.path.join(self.tempdir, 'ingest'),
+            MEDIA_ROOT=os.path.join(self.tempdir, 'media'),
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        env_override = mock.patch.dict(os.environ, {'SFU_WEBHOOK_SECRET': self.WEBHOOK_SECRET})
+        env_override.start()
+        self.addCleanup(env_override.stop)
+
+        test_class = Class.objects.create(
+            title='Test Class',
+            capacity=10,
+            start_time=timezone.now().time(),
+            end_time=(timezone.now() + timedelta(hours=1)).time(),
+            days_of_week=[1]
+        )
+        self.session = LiveSession.objects.create(
+            title='Recorded Session',
+            class_session=test_class,
+            scheduled_date=timezone.now().date(),
+            status=SessionStatus.LIVE
+        )
+        self.client = APIClient()
+        self.payload = os.urandom(3 * recordings.CHUNK_SIZE + 12345)
+
+    def send_webhook(self, data):
+        return self.client.post(
+            '/api/sfu/webhook/',
+            {'event': 'recording.stopped', 'data': data},
+            format='json',
+            HTTP_X_WEBHOOK_SECRET=self.WEBHOOK_SECRET
+        )
+
+    def upload_chunk(self, chunk, offset, **extra):
+        data = {
+            'file': SimpleUploadedFile('chunk.webm', chunk),
+            'roomId': str(self.session.id),
+            'recordingId': 'rec-1',
+            'offset': str(offset),
+            'totalSize': str(len(self.payload)),
+            'checksum': hashlib.sha256(self.payload).hexdigest(),
+            **extra
+        }
+        return self.client.post(
+            '/api/course/recording/upload/', data, format='multipart', HTTP_X_WEBHOOK_SECRET=self.WEBHOOK_SECRET
+        )
+
+    def stored_bytes(self):
+        self.session.refresh_from_db()
+        with self.session.recording_file.open('rb') as handle:
+            return handle.read()
+
+    def test_webhook_download_resumes_after_interruption(self):
+        """Test that a dropped download resumes with a Range request and stores the verified file."""
+        responses = [
+            FakeDownload(self.payload, fail_after=2 * recordings.CHUNK_SIZE),
+            FakeDownload(self.payload, offset=2 * recordings.CHUNK_SIZE),
+        ]
+        with mock.patch('course.recordings.requests.get', side_effect=responses) as get:
+            response = self.send_webhook({
+                'roomId': str(self.session.id),
+                'recordingId': 'rec-1',
+                'fileUrl': 'http://sfu.local/recordings/rec-1.webm',
+                'sha256': hashlib.sha256(self.payload).hexdigest(),
+                'stoppedAt': '2026-01-05T10:30:00Z',
+            })
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+            # The webhook only queues the download
+            self.assertEqual(get.call_count, 0)
+            recording_import = RecordingImport.objects.get(session=self.session)
+            self.assertEqual(recording_import.source, RecordingImportSource.DOWNLOAD)
+
+            with self.assertRaises(requests.exceptions.ConnectionError):
+                recordings.ingest(recording_import)
+            self.assertEqual(recordings.partial_size(recording_import), 2 * recordings.CHUNK_SIZE)
+
+            recordings.ingest(recording_import)
+
+        self.assertEqual(get.call_args_list[1].kwargs['headers'], {'Range': f'bytes={2 * recordings.CHUNK_SIZE}-'})
+        recording_import.refresh_from_db()
+        self.assertEqual(recording_import.status, RecordingImportStatus.COMPLETED)
+        self.assertEqual(self.stored_bytes(), self.payload)
+        self.assertFalse(os.path.exists(recordings.partial_path(recording_import)))
+        recording = Recording.objects.get(session=self.session)
+        self.assertEqual(recording.title, 'Recorded Session - 2026-01-05 10:30')
+
+    def test_download_memory_is_bounded_by_chunk_size(self):
+        """Test that streaming a large recording does not hold it in memory."""
+        payload_size = 24 * recordings.CHUNK_SIZE
+        recording_import = RecordingImport.objects.create(
+            session=self.session,
+            source=RecordingImportSource.DOWNLOAD,
+            source_url='http://sfu.local/recordings/big.webm',
+            expected_size=payload_size
+        )
+
+        class LargeDownload(FakeDownload):
+            def __init__(self):
+                self.status_code = 200
+                self.headers = {'Content-Length': str(payload_size)}
+
+            def iter_content(self, chunk_size):
+                for _ in range(payload_size // chunk_size):
+                    yield bytes(chunk_size)
+
+        with mock.patch('course.recordings.requests.get', return_value=LargeDownload()):
+            tracemalloc.start()
+            try:
+                recordings.download_to_partial(recording_import)
+                recordings.verify_partial(recording_import)
+                _, peak = tracemalloc.get_traced_memory()
+            finally:
+                tracemalloc.stop()
+
+        self.assertEqual(recordings.partial_size(recording_import), payload_size)
+        self.assertLess(peak, 4 * recordings.CHUNK_SIZE)
+
+    def test_checksum_mismatch_discards_download(self):
+        """Test that a corrupt download is rejected and restarted from scratch."""
+        recording_import = RecordingImport.objects.create(
+            session=self.session,
+            source=RecordingImportSource.DOWNLOAD,
+            source_url='http://sfu.local/recordings/rec-1.webm',
+            expected_checksum=hashlib.sha256(b'something else').hexdigest()
+        )
+        with mock.patch('course.recordings.requests.get', return_value=FakeDownload(self.payload)):
+            with self.assertRaises(recordings.RecordingIntegrityError):
+                recordings.ingest(recording_import)
+
+        recording_import.refresh_from_db()
+        self.assertIn('Checksum mismatch', recording_import.error)
+        self.assertEqual(recordings.partial_size(recording_import), 0)
+        self.session.refresh_from_db()
+        self.assertFalse(self.session.recording_file)
+        self.assertFalse(Recording.objects.filter(session=self.session).exists())
+
+    def test_concurrent_ingest_of_same_import_is_refused(self):
+        """Test that a second worker cannot write the partial file of an import being ingested."""
+        recording_import = RecordingImport.objects.create(
+            session=self.session,
+            source=RecordingImportSource.DOWNLOAD,
+            source_url='http://sfu.local/recordings/rec-1.webm',
+        )
+        with mock.patch('course.recordings.requests.get') as get:
+            with recordings.ImportLock(recording_import):
+                with self.assertRaises(recordings.RecordingImportBusy):
+                    recordings.ingest(recording_import)
+
+        self.assertEqual(get.call_count, 0)
+        self.assertEqual(recordings.partial_size(recording_import), 0)
+
+    def test_download_stops_when_task_is_taken_over(self):
+        """Test that a long download renews its task lease and stops once another worker reclaims it."""
+        recording_import = RecordingImport.objects.create(
+            session=self.session,
+            source=RecordingImportSource.DOWNLOAD,
+            source_url='http://sfu.local/recordings/rec-1.webm',
+        )
+        ingest_recording.enqueue(import_id=recording_import.id)
+        payload = self.payload
+        leases = []
+
+        class SlowDownload(FakeDownload):
+            def iter_content(self, chunk_size):
+                for index, chunk in enumerate(super().iter_content(chunk_size)):
+                    task = OutboxTask.objects.get(name='course.tasks.ingest_recording')
+                    leases.append(task.locked_at)
+                    if index == 2:
+                        # The lease looked stale to another worker, which claimed the task
+                        OutboxTask.objects.filter(id=task.id).update(locked_at=timezone.now() + timedelta(minutes=1))
+                    yield chunk
+
+        with mock.patch.object(recordings, 'HEARTBEAT_SECONDS', 0), \
+                mock.patch('course.recordings.requests.get', return_value=SlowDownload(payload)):
+            self.assertEqual(run_pending_tasks(), (0, 1))
+
+        # Renewed before every chunk, then abandoned without writing further
+        self.assertLess(leases[0], leases[1])
+        self.assertEqual(recordings.partial_size(recording_import), 2 * recordings.CHUNK_SIZE)
+        recording_import.refresh_from_db()
+        self.assertNotEqual(recording_import.status, RecordingImportStatus.COMPLETED)
+        self.assertEqual(OutboxTask.objects.get(name='course.tasks.ingest_recording').status, OutboxTaskStatus.RUNNING)
+
+    def test_chunked_upload_resumes_and_is_stored_by_worker(self):
+        """Test chunked uploads: offset mismatches get 409, the resume offset is reported, the worker stores the file."""
+        first, rest = self.payload[:recordings.CHUNK_SIZE], self.payload[recordings.CHUNK_SIZE:]
+
+        response = self.upload_chunk(first, 0)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['offset'], len(first))
+        self.assertEqual(response.data['status'], RecordingImportStatus.RECEIVING)
+        self.assertIsNone(response.data['fileUrl'])
+
+        # A chunk sent at the wrong offset is refused with the offset to resume from
+        response = self.upload_chunk(rest, len(first) + 10)
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(response.data['offset'], len(first))
+
+        response = self.client.get(
+            '/api/course/recording/upload/',
+            {'sessionId': self.session.id, 'recordingId': 'rec-1'},
+            HTTP_X_WEBHOOK_SECRET=self.WEBHOOK_SECRET
+        )
+        self.assertEqual(response.data['offset'], len(first))
+
+        response = self.upload_chunk(rest, len(first))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['status'], RecordingImportStatus.PENDING)
+
+        self.assertEqual(run_pending_tasks(), (1, 0))
+        self.assertEqual(self.stored_bytes(), self.payload)
+        self.assertEqual(Recording.objects.filter(session=self.session).count(), 1)
+
+        # The SFU's recording.stopped webhook after the upload does not duplicate the Recording
+        self.send_webhook({'roomId': str(self.session.id), 'recordingId': 'rec-1'})
+        self.assertEqual(Recording.objects.filter(session=self.session).count(), 1)
+
+    def test_upload_restarts_after_partial_upload(self):
+        """Test that a new upload at offset 0 replaces the chunks of an abandoned one."""
+        stale = os.urandom(recordings.CHUNK_SIZE)
+        self.assertEqual(self.upload_chunk(stale, 0).status_code, status.HTTP_200_OK)
+        self.assertEqual(self.upload_chunk(stale, len(stale)).data['offset'], 2 * len(stale))
+
+        first, rest = self.payload[:recordings.CHUNK_SIZE], self.payload[recordings.CHUNK_SIZE:]
+        response = self.upload_chunk(first, 0)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['offset'], len(first))
+
+        response = self.upload_chunk(rest, len(first))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['status'], RecordingImportStatus.PENDING)
+        self.assertEqual(run_pending_tasks(), (1, 0))
+        self.assertEqual(self.stored_bytes(), self.payload)
+
+    def test_corrupt_upload_is_rejected(self):
+        """Test that an upload not matching its checksum fails and can be restarted at offset 0."""
+        response = self.upload_chunk(self.payload[:-1] + bytes([self.payload[-1] ^ 1]), 0)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        run_pending_tasks()
+
+        recording_import = RecordingImport.objects.get(session=self.session)
+        self.assertEqual(recording_import.status, RecordingImportStatus.FAILED)
+        self.session.refresh_from_db()
+        self.assertFalse(self.session.recording_file)
+
+        response = self.upload_chunk(self.payload, 0)
+        self.assertEqual(response.data['status'], RecordingImportStatus.PENDING)
+        run_pending_tasks()
+        self.assertEqual(self.stored_bytes(), self.payload)
+
+    def test_upload_requires_secret(self):
+        """Test that uploads without the webhook secret are refused."""
+        response = self.client.post(
+            '/api/course/recording/upload/',
+            {'file': SimpleUploadedFile('chunk.webm', b'data'), 'roomId': str(self.session.id)},
+            format='multipart'
+        )
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+@override_settings(PROTECTED_MEDIA_BACKEND='django')
+class ProtectedSessionMediaTestCase(TestCase):
+    """Recordings and session resources are served with Range support to permitted users only."""
+
+    def setUp(self):
+        """Set up a recorded session with a resource, an enrolled and an outside student."""
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.teacher = User.objects.create_user(
+            email='teacher@test.com', password='testpass123', role='teacher', full_name='Teacher'
+        )
+        self.student = User.objects.create_user(
+            email='student@test.com', password='testpass123', role='student', full_name='Student'
+        )
+        self.outsider = User.objects.create_user(
+            email='outsider@test.com', password='testpass123', role='student', full_name='Outsider'
+        )
+        test_class = Class.objects.create(
+            title='Test Class',
+            capacity=10,
+            start_time=timezone.now().time(),
+            end_time=(timezone.now() + timedelta(hours=1)).time(),
+            days_of_week=[1]
+        )
+        test_class.teacher.add(self.teacher)
+        ClassEnrollment.objects.create(
+            student=self.student, class_enrolled=test_class, status=EnrollmentChoices.COMPLETED
+        )
+
+        self.video = os.urandom(50000)
+        self.session = LiveSession.objects.create(
+            title='Recorded Session',
+            class_session=test_class,
+            scheduled_date=timezone.now().date(),
+            status=SessionStatus.COMPLETED,
+            recording_file=SimpleUploadedFile('session.webm', self.video)
+        )
+        Recording.objects.create(session=self.session, title='Recorded Session - Recording')
+        self.resource = LiveSessionResource.objects.create(
+            session=self.session,
+            title='Slides',
+            file=SimpleUploadedFile('slides.pdf', b'%PDF-slides'),
+            file_type='document',
+            uploaded_by=self.teacher
+        )
+        self.client = APIClient()
+
+    def test_enrolled_student_can_seek_in_recording(self):
+        """Test that a recording is served in ranges through the signed link in the API."""
+        self.client.force_authenticate(user=self.student)
+        file_url = self.client.get('/api/course/recording/').data[0]['file_url']
+
+        response = APIClient().get(file_url, HTTP_RANGE='bytes=40000-40999')
+        self.assertEqual(response.status_code, status.HTTP_206_PARTIAL_CONTENT)
+        self.assertEqual(b''.join(response.streaming_content), self.video[40000:41000])
+        self.assertEqual(response['Content-Range'], f'bytes 40000-40999/{len(self.video)}')
+
+    def test_outsider_cannot_watch_recording(self):
+        """Test that users who cannot join the session are refused, even with a signed link."""
+        url = f'/api/course/session/{self.session.id}/recording-file/'
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_401_UNAUTHORIZED)
+
+        self.client.force_authenticate(user=self.outsider)
+        file_url = self.client.get('/api/course/recording/').data[0]['file_url']
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_403_FORBIDDEN)
+        self.assertEqual(APIClient().get(file_url).status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_session_resource_file(self):
+        """Test that resource files are served to users who can see the resource."""
+        url = f'/api/course/session/resources/{self.resource.id}/file/'
+        self.client.force_authenticate(user=self.student)
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(b''.join(response.streaming_content), b'%PDF-slides')
+
+        self.client.force_authenticate(user=self.outsider)
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_404_NOT_FOUND)
@@ -8,6 +8,7 @@ from .views import (
     RecordingListCreateView,
     RecordingRetrieveUpdateDestroyView,
     AttendanceListCreateView,
+    BulkAttendanceView,
     AttendanceRetrieveUpdateDestroyView,
     CertificateListCreateView,
     CertificateRetrieveUpdateDestroyView,
@@ -22,7 +23,9 @@ from .views import (
     SessionEnrolledStudentsView,
     SessionEnrollmentsView,
     LiveSessionResourceListCreateView,
-    LiveSessionResourceRetrieveUpdateDestroyView
+    LiveSessionResourceRetrieveUpdateDestroyView,
+    LiveSessionResourceFileView,
+    SessionRecordingFileView
 )
 
 urlpatterns = [
@@ -44,6 +47,7 @@ urlpatterns = [
     
     # Attendance endpoints
     path('attendance/', AttendanceListCreateView.as_view(), name='attendance_list_create_view'),
+    path('attendance/bulk/', BulkAttendanceView.as_view(), name='attendance_bulk_view'),
     path('attendance/<int:pk>/', AttendanceRetrieveUpdateDestroyView.as_view(), name='attendance_retrieve_update_destroy_view'),
     
     # Certificate endpoints
@@ -59,6 +63,7 @@ urlpatterns = [
     path('session/<int:session_id>/start-recording/', SessionStartRecordingView.as_view(), name='session_start_recording'),
     path('session/<int:session_id>/stop-recording/', SessionStopRecordingView.as_view(), name='session_stop_recording'),
     path('session/<int:session_id>/recording-status/', SessionRecordingStatusView.as_view(), name='session_recording_status'),
+    path('session/<int:session_id>/recording-file/', SessionRecordingFileView.as_view(), name='session_recording_file'),
     
     # Session students/enrollments endpoints
     path('session/<int:session_id>/students/', SessionEnrolledStudentsView.as_view(), name='session_enrolled_students'),
@@ -66,5 +71,6 @@ urlpatterns = [
     
     # Live session resources endpoints
     path('session/resources/', LiveSessionResourceListCreateView.as_view(), name='live_session_resource_list_create'),
-    path('session/resources/<int:pk>/', LiveSessionResourceRetrieveUpdateDestroyView.as_view(), name='live_session_resource_detail')
+    path('session/resources/<int:pk>/', LiveSessionResourceRetrieveUpdateDestroyView.as_view(), name='live_session_resource_detail'),
+    path('session/resources/<int:pk>/file/', LiveSessionResourceFileView.as_view(), name='live_session_resource_file')
 ]
\ No newline at end of file
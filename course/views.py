@@ -16,21 +16,31 @@ from django.shortcuts import get_object_or_404
 from django.views.decorators.csrf import csrf_exempt
 from django.utils.decorators import method_decorator
 from django.utils import timezone
+from django.db import transaction
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
 
 
 from django_filters.rest_framework import DjangoFilterBackend
 
-from .serializers import ClassSerializer, LiveSessionSerializer, RecordingSerializer, AttendanceSerializer, CertificateSerializer, LiveSessionResourceSerializer
+from .serializers import ClassSerializer, LiveSessionSerializer, RecordingSerializer, AttendanceSerializer, BulkAttendanceSerializer, CertificateSerializer, LiveSessionResourceSerializer
 
-from .models import Class, LiveSession, Recording, Attendance, Certificate, LiveSessionResource
+from .models import (
+    Class, LiveSession, Recording, Attendance, Certificate, LiveSessionResource,
+    RecordingImport, RecordingImportSource, RecordingImportStatus
+)
+from .recordings import (
+    RecordingOffsetError, append_upload_chunk, attach_recording, discard_partial, parse_stopped_at, partial_size
+)
+from .tasks import flush_session_presence, ingest_recording
+from .access import class_access
+from .attendance import record_attendance, request_device_info
+from .presence import parse_event_time, record_join, record_leave
 
 from .filters import ClassFilter, LiveSessionFilter, RecordingFilter, AttendanceFilter, CertificateFilter, LiveSessionResourceFilter
 
-from core.utils import get_client_ip
+from core.media import get_media_user, serve_protected_file
 from accounts.models import RoleChoices, CustomUser
 from core.pagination import CustomPagination
-# optional: pip install pyyaml user-agents
-from user_agents import parse as parse_ua  # optional
 
 logger = logging.getLogger(__name__)
 
@@ -58,16 +68,14 @@ class CourseListCreateView(ListCreateAPIView):
         """
         user = self.request.user
         
+        queryset = Class.objects.with_enrollment_stats(user)
+
         # If user is authenticated and is a teacher, filter their classes
         if user.is_authenticated and user.role == RoleChoices.TEACHER:
-            return Class.objects.filter(teacher=user).prefetch_related(
-                'teacher', 'subject'
-            ).order_by('-created_at')
+            return queryset.filter(teacher=user).order_by('-created_at')
         
         # For all other cases, return all classes
-        return Class.objects.all().prefetch_related(
-            'teacher', 'subject'
-        ).order_by('-created_at')
+        return queryset.order_by('-created_at')
 
 
 class CourseRetrieveUpdateDestroyView(RetrieveUpdateDestroyAPIView):
@@ -120,7 +128,7 @@ class LiveSessionRetrieveUpdateDestroyView(RetrieveUpdateDestroyAPIView):
 
 
 class RecordingListCreateView(ListCreateAPIView):
-    queryset = Recording.objects.all()
+    queryset = Recording.objects.select_related('session')
     serializer_class = RecordingSerializer
     permission_classes = [IsAuthenticatedOrReadOnly]
     filter_backends = [DjangoFilterBackend]
@@ -129,7 +137,7 @@ class RecordingListCreateView(ListCreateAPIView):
 
 
 class RecordingRetrieveUpdateDestroyView(RetrieveUpdateDestroyAPIView):
-    queryset = Recording.objects.all()
+    queryset = Recording.objects.select_related('session')
     serializer_class = RecordingSerializer
     permission_classes = [IsAuthenticatedOrReadOnly]
 
@@ -189,38 +197,60 @@ class AttendanceListCreateView(ListCreateAPIView):
         return Attendance.objects.none()
 
     def perform_create(self, serializer):
-        req = self.request
-        # server-observed info
-        user_agent = req.META.get('HTTP_USER_AGENT', '')
-        ip = get_client_ip(req)
-        accept_lang = req.META.get('HTTP_ACCEPT_LANGUAGE')
-
-        device_info = {
-            "user_agent": user_agent,
-            "ip": ip,
-            "accept_language": accept_lang,
-            "x_forwarded_for": req.META.get('HTTP_X_FORWARDED_FOR'),
-        }
+        # server-observed info, plus optional extra details the frontend sends
+        # (screen size, timezone, etc.) and friendly fields parsed from the UA
+        device_info = request_device_info(self.request, self.request.data.get("device_info"))
+        serializer.save(device_info=device_info)
 
-        # optional: if frontend sends extra device details (screen size, timezone, etc.)
-        client_side = req.data.get("device_info")
-        if isinstance(client_side, dict):
-            # merge (client values not trusted blindly; you may sanitize)
-            device_info.update(client_side)
 
-        # optional: parse UA for friendly fields
-        try:
-            ua = parse_ua(user_agent)
-            device_info.update({
-                "browser": {"family": ua.browser.family, "version": ua.browser.version_string},
-                "os": {"family": ua.os.family, "version": ua.os.version_string},
-                "device": {"family": ua.device.family, "is_mobile": ua.is_mobile, "is_tablet": ua.is_tablet, "is_pc": ua.is_pc},
-            })
-        except Exception:
-            pass
-
-        # finally save
-        serializer.save(device_info=device_info)
+class BulkAttendanceView(APIView):
+    """
+    Record the attendance of many students of one session in one request
+    (teachers of the class and administrators only).
+
+    Body: {"session": id, "records": [{"student": id, "status": "present",
+    "device_info": {...}}, ...]}. Existing records are updated in place.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        session_id = request.data.get('session')
+        if not str(session_id).isdigit():
+            return Response({'session': ['A valid session id is required.']}, status=status.HTTP_400_BAD_REQUEST)
+        session = get_object_or_404(LiveSession.objects.select_related('class_session'), id=session_id)
+
+        # Authorize before validating records, which would reveal who is enrolled
+        user = request.user
+        is_admin = user.is_superuser or user.is_staff or user.role == RoleChoices.SUPER_ADMIN
+        if not is_admin and not class_access(user).teaches(session.class_session_id):
+            return Response(
+                {'error': 'Only teachers of this class and administrators can take attendance'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+
+        serializer = BulkAttendanceSerializer(data=request.data, context={'session': session})
+        serializer.is_valid(raise_exception=True)
+        records = serializer.validated_data['records']
+
+        # Per-record client details first; the parsed user agent wins (UA parsing is cached)
+        entries = [
+            {
+                'class_enrollment_id': record['class_enrollment_id'],
+                'status': record['status'],
+                'device_info': request_device_info(request, record.get('device_info')),
+            }
+            for record in records
+        ]
+        recorded = record_attendance(session, entries)
+
+        return Response({
+            'session_id': session.id,
+            'recorded': recorded,
+            'records': [
+                {'student_id': record['student'], 'class_enrollment_id': record['class_enrollment_id'], 'status': record['status']}
+                for record in records
+            ],
+        }, status=status.HTTP_200_OK)
 
 
 
@@ -251,10 +281,11 @@ class SessionJoinView(APIView):
     
     def post(self, request, session_id):
         """Join a session's SFU room."""
-        session = get_object_or_404(LiveSession, id=session_id)
+        session = get_object_or_404(LiveSession.objects.select_related('class_session'), id=session_id)
+        access = class_access(request.user)
         
         # Check if user can join this session
-        if not session.can_user_join(request.user):
+        if not session.can_user_join(request.user, access):
             return Response(
                 {'error': 'You are not enrolled in this class or session is not available'}, 
                 status=status.HTTP_403_FORBIDDEN
@@ -275,7 +306,7 @@ class SessionJoinView(APIView):
         role = 'member'  # Students are members, teachers could be moderators
         
         # Check if user is a teacher of this class
-        if session.class_session.teacher.filter(id=request.user.id).exists():
+        if access.teaches(session.class_session_id):
             role = 'moderator'
         
         # Check participant limit (simplified check)
@@ -311,11 +342,9 @@ class SessionLeaveView(APIView):
         """
         session = get_object_or_404(LiveSession, id=session_id)
         
-        # Log the leave action (optional - can be used for analytics)
-        # In a production system, you might want to:
-        # 1. Update attendance duration
-        # 2. Send webhooks/notifications
-        # 3. Clean up any session-specific data
+        # Close the user's presence interval (see course/presence.py); attendance
+        # is computed from it when the room ends
+        record_leave(session.id, request.user.id)
         
         # The SFU server will handle the actual WebRTC cleanup when the 
         # WebSocket disconnects, but this endpoint allows for graceful cleanup
@@ -370,7 +399,7 @@ class SFURoomAccessView(APIView):
                 return Response({'allowed': True})
             
             # Check if session exists
-            session = LiveSession.objects.filter(id=session_id).first()
+            session = LiveSession.objects.only('id', 'class_session_id').filter(id=session_id).first()
             
             if not session:
                 return Response({'allowed': False})
@@ -753,6 +782,13 @@ class SFUWebhookView(APIView):
             # Still return 200 to prevent SFU from retrying
             return Response({'status': 'error', 'message': str(e)}, status=status.HTTP_200_OK)
     
+    def presence_ids(self, data):
+        """(session id, user id) of a participant event, or None if either is not numeric."""
+        try:
+            return int(data.get('roomId')), int(data.get('userId'))
+        except (TypeError, ValueError):
+            return None
+
     def handle_participant_joined(self, data):
         """Handle participant.joined event."""
         room_id = data.get('roomId')
@@ -763,8 +799,9 @@ class SFUWebhookView(APIView):
         
         logger.info(f'Participant joined: room={room_id}, user={user_id}, participant={participant_id}, display_name={display_name}')
         
-        # You can add database logging or other actions here
-        # For example, update session participant count or log to database
+        ids = self.presence_ids(data)
+        if ids:
+            record_join(*ids, participant_id=participant_id, at=parse_event_time(joined_at))
     
     def handle_participant_left(self, data):
         """Handle participant.left event."""
@@ -774,6 +811,10 @@ class SFUWebhookView(APIView):
         left_at = data.get('leftAt')
         
         logger.info(f'Participant left: room={room_id}, user={user_id}, participant={participant_id}')
+        
+        ids = self.presence_ids(data)
+        if ids:
+            record_leave(*ids, participant_id=participant_id, at=parse_event_time(left_at))
     
     def handle_room_created(self, data):
         """Handle room.created event."""
@@ -789,6 +830,13 @@ class SFUWebhookView(APIView):
         ended_at = data.get('endedAt')
         
         logger.info(f'Room ended: room={room_id}, ended_at={ended_at}')
+        
+        # Turn the room's presence log into attendance in the background
+        try:
+            session_id = int(room_id)
+        except (TypeError, ValueError):
+            return
+        flush_session_presence.enqueue(session_id=session_id, ended_at=ended_at or timezone.now().isoformat())
     
     def handle_recording_started(self, data):
         """Handle recording.started event."""
@@ -858,56 +906,34 @@ class SFUWebhookView(APIView):
             session.is_recording = False
             session.save(update_fields=['is_recording'])
             
-            # If file URL is provided, download and save the file
+            stopped_at = parse_stopped_at(stopped_at)
+            if stopped_at:
+                # Uploads still being received or stored use it for the Recording title
+                RecordingImport.objects.filter(
+                    session=session, recording_id=recording_id or '', stopped_at__isnull=True
+                ).update(stopped_at=stopped_at)
+            
+            # If file URL is provided, queue a streaming download of the file
             # Note: File should already be uploaded via RecordingUploadView, but we can handle URL as fallback
             if file_url and not session.recording_file:
-                try:
-                    # Download file from SFU backend
-                    response = requests.get(file_url, timeout=300, stream=True)  # 5 minute timeout for large files
-                    if response.status_code == 200:
-                        from django.core.files.base import ContentFile
-                        
-                        # Generate filename
-                        filename = f'session_{session_id_int}_{recording_id or timezone.now().strftime("%Y%m%d_%H%M%S")}.webm'
-                        
-                        # Save file
-                        file_content = ContentFile(response.content)
-                        session.recording_file.save(filename, file_content, save=True)
-                        
-                        logger.info(f'Saved recording file for session {session_id_int}: {session.recording_file.name}')
-                    else:
-                        logger.error(f'Failed to download recording file: HTTP {response.status_code}')
-                except Exception as e:
-                    logger.error(f'Error downloading recording file: {e}', exc_info=True)
+                recording_import, created = RecordingImport.objects.get_or_create(
+                    session=session,
+                    recording_id=recording_id or '',
+                    defaults={
+                        'source': RecordingImportSource.DOWNLOAD,
+                        'source_url': file_url,
+                        'expected_size': data.get('fileSize'),
+                        'expected_checksum': data.get('sha256') or data.get('checksum') or '',
+                        'stopped_at': stopped_at,
+                    }
+                )
+                if created:
+                    ingest_recording.enqueue(import_id=recording_import.id)
+                    logger.info(f'Queued recording download for session {session_id_int} (import {recording_import.id})')
             
             # Create Recording object only if we have a file
-            if session.recording_file:
-                recording_title = f'{session.title} - Recording'
-                if stopped_at:
-                    from datetime import datetime
-                    try:
-                        stop_time = datetime.fromisoformat(stopped_at.replace('Z', '+00:00'))
-                        recording_title = f'{session.title} - {stop_time.strftime("%Y-%m-%d %H:%M")}'
-                    except:
-                        pass
-                
-                # Check if recording already exists for this session
-                existing_recording = Recording.objects.filter(session=session).order_by('-created_at').first()
-                if existing_recording and not existing_recording.video_url:
-                    # Update existing recording
-                    existing_recording.video_url = session.recording_file.url
-                    existing_recording.title = recording_title
-                    existing_recording.save()
-                    logger.info(f'Updated Recording object {existing_recording.id} for session {session_id_int}')
-                else:
-                    # Create new recording
-                    recording = Recording.objects.create(
-                        session=session,
-                        title=recording_title,
-                        description=f'Recording of live session: {session.title}',
-                        video_url=session.recording_file.url
-                    )
-                    logger.info(f'Created Recording object {recording.id} for session {session_id_int}')
+            elif session.recording_file:
+                attach_recording(session, stopped_at)
             
         except Exception as e:
             logger.error(f'Error handling recording stopped: {e}', exc_info=True)
@@ -930,7 +956,7 @@ class TimetableListView(ListAPIView):
         Filter classes based on query parameters.
         Frontend typically passes ?course=<course_id>
         """
-        queryset = Class.objects.all().prefetch_related('teacher', 'subject')
+        queryset = Class.objects.with_enrollment_stats(self.request.user)
         
         # Filter by course/class ID if provided
         course_id = self.request.query_params.get('course')
@@ -1006,6 +1032,36 @@ class SessionEnrollmentsView(APIView):
         })
 
 
+def visible_session_resources(user):
+    """
+    Live session resources a user may see:
+    - Super Admin/Staff: all resources
+    - Teachers: resources for their sessions
+    - Students: resources for sessions they're enrolled in
+    """
+    # Super admin and staff can see all resources
+    if user.role == RoleChoices.SUPER_ADMIN or user.is_staff:
+        return LiveSessionResource.objects.all()
+    
+    # Teachers can see resources for their sessions
+    elif user.role == RoleChoices.TEACHER:
+        teacher_classes = Class.objects.filter(teacher=user)
+        teacher_sessions = LiveSession.objects.filter(class_session__in=teacher_classes)
+        return LiveSessionResource.objects.filter(session__in=teacher_sessions)
+    
+    # Students can see resources for sessions they're enrolled in
+    elif user.role == RoleChoices.STUDENT:
+        from enrollments.models import ClassEnrollment, EnrollmentChoices
+        enrolled_classes = ClassEnrollment.objects.filter(
+            student=user,
+            status=EnrollmentChoices.COMPLETED
+        ).values_list('class_enrolled', flat=True)
+        enrolled_sessions = LiveSession.objects.filter(class_session__in=enrolled_classes)
+        return LiveSessionResource.objects.filter(session__in=enrolled_sessions)
+    
+    return LiveSessionResource.objects.none()
+
+
 class LiveSessionResourceListCreateView(ListCreateAPIView):
     """
     List and create resources for live sessions.
@@ -1026,30 +1082,7 @@ class LiveSessionResourceListCreateView(ListCreateAPIView):
         - Super Admin/Staff: See all resources
         - Students: See resources for sessions they're enrolled in
         """
-        user = self.request.user
-        
-        # Super admin and staff can see all resources
-        if user.role == RoleChoices.SUPER_ADMIN or user.is_staff:
-            queryset = LiveSessionResource.objects.all()
-        
-        # Teachers can see resources for their sessions
-        elif user.role == RoleChoices.TEACHER:
-            teacher_classes = Class.objects.filter(teacher=user)
-            teacher_sessions = LiveSession.objects.filter(class_session__in=teacher_classes)
-            queryset = LiveSessionResource.objects.filter(session__in=teacher_sessions)
-        
-        # Students can see resources for sessions they're enrolled in
-        elif user.role == RoleChoices.STUDENT:
-            from enrollments.models import ClassEnrollment, EnrollmentChoices
-            enrolled_classes = ClassEnrollment.objects.filter(
-                student=user,
-                status=EnrollmentChoices.COMPLETED
-            ).values_list('class_enrolled', flat=True)
-            enrolled_sessions = LiveSession.objects.filter(class_session__in=enrolled_classes)
-            queryset = LiveSessionResource.objects.filter(session__in=enrolled_sessions)
-        
-        else:
-            queryset = LiveSessionResource.objects.none()
+        queryset = visible_session_resources(self.request.user)
         
         # Filter by session if provided
         session_id = self.request.query_params.get('session')
@@ -1090,29 +1123,7 @@ class LiveSessionResourceRetrieveUpdateDestroyView(RetrieveUpdateDestroyAPIView)
     
     def get_queryset(self):
         """Apply same filtering as list view"""
-        user = self.request.user
-        
-        # Super admin and staff can see all resources
-        if user.role == RoleChoices.SUPER_ADMIN or user.is_staff:
-            return LiveSessionResource.objects.all()
-        
-        # Teachers can see resources for their sessions
-        elif user.role == RoleChoices.TEACHER:
-            teacher_classes = Class.objects.filter(teacher=user)
-            teacher_sessions = LiveSession.objects.filter(class_session__in=teacher_classes)
-            return LiveSessionResource.objects.filter(session__in=teacher_sessions)
-        
-        # Students can see resources for sessions they're enrolled in
-        elif user.role == RoleChoices.STUDENT:
-            from enrollments.models import ClassEnrollment, EnrollmentChoices
-            enrolled_classes = ClassEnrollment.objects.filter(
-                student=user,
-                status=EnrollmentChoices.COMPLETED
-            ).values_list('class_enrolled', flat=True)
-            enrolled_sessions = LiveSession.objects.filter(class_session__in=enrolled_classes)
-            return LiveSessionResource.objects.filter(session__in=enrolled_sessions)
-        
-        return LiveSessionResource.objects.none()
+        return visible_session_resources(self.request.user)
     
     def perform_update(self, serializer):
         """Only allow uploader, teacher, or admin to update"""
@@ -1144,20 +1155,117 @@ class LiveSessionResourceRetrieveUpdateDestroyView(RetrieveUpdateDestroyAPIView)
         instance.delete()
 
 
+class LiveSessionResourceFileView(APIView):
+    """
+    Serve a live session resource file with HTTP Range support.
+    Accepts a logged-in user or the signed `file_url` from the resource serializer;
+    either way the user must be able to see the resource.
+    """
+    permission_classes = []  # Checked below, to accept signed links
+    throttle_classes = []  # Viewers send many Range requests
+    
+    def get(self, request, pk):
+        resource = get_object_or_404(LiveSessionResource, pk=pk)
+        user = get_media_user(request, resource.file)
+        if user is None:
+            return Response({'error': 'Authentication required'}, status=status.HTTP_401_UNAUTHORIZED)
+        if not visible_session_resources(user).filter(pk=resource.pk).exists():
+            return Response({'error': 'Resource not found'}, status=status.HTTP_404_NOT_FOUND)
+        return serve_protected_file(
+            request, resource.file, as_attachment=request.query_params.get('download') == '1'
+        )
+
+
+class SessionRecordingFileView(APIView):
+    """
+    Stream a session's recording with HTTP Range support, so players can seek.
+    Accepts a logged-in user or the signed `file_url` from the recording serializer;
+    either way the user must be allowed to join the session.
+    """
+    permission_classes = []  # Checked below, to accept signed links
+    throttle_classes = []  # Players send many Range requests while seeking
+    
+    def get(self, request, session_id):
+        session = get_object_or_404(LiveSession.objects.select_related('class_session'), id=session_id)
+        user = get_media_user(request, session.recording_file)
+        if user is None:
+            return Response({'error': 'Authentication required'}, status=status.HTTP_401_UNAUTHORIZED)
+        if not session.can_user_join(user):
+            return Response(
+                {'error': 'You do not have permission to watch this recording'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        return serve_protected_file(request, session.recording_file)
+
+
 @method_decorator(csrf_exempt, name='dispatch')
 class RecordingUploadView(APIView):
-    """Receive recording file uploads from SFU backend."""
+    """
+    Receive recording file uploads from SFU backend.
+    
+    The file may be sent whole or in chunks: each POST carries `offset` (where the
+    chunk starts, default 0) and `totalSize` (full file size, default: this chunk
+    completes the file), plus an optional `checksum` (SHA-256 hex) of the full file.
+    A chunk at the wrong offset gets 409 with the offset to resume from; GET with
+    `sessionId`/`roomId` and `recordingId` reports it too. Once all bytes are in,
+    the file is verified and stored by the task worker.
+    """
     permission_classes = []  # No auth required - webhook secret validation instead
     throttle_classes = []  # Exempt from rate limiting - called by SFU backend
     parser_classes = [MultiPartParser, FormParser]
     
-    def post(self, request):
-        """Handle recording file upload from SFU backend."""
-        # Verify webhook secret
+    def initialize_request(self, request, *args, **kwargs):
+        # Stream uploaded chunks to a temporary file whatever their size
+        request.upload_handlers = [TemporaryFileUploadHandler(request)]
+        return super().initialize_request(request, *args, **kwargs)
+    
+    def check_secret(self, request):
         secret = request.headers.get('X-Webhook-Secret', '')
         expected_secret = os.environ.get('SFU_WEBHOOK_SECRET', '')
-        
-        if not expected_secret or secret != expected_secret:
+        return bool(expected_secret) and hmac.compare_digest(secret, expected_secret)
+    
+    def get_session(self, params):
+        session_id = params.get('sessionId') or params.get('roomId')
+        try:
+            return LiveSession.objects.get(id=int(session_id))
+        except (LiveSession.DoesNotExist, TypeError, ValueError):
+            logger.error(f'Session not found: {session_id}')
+            return None
+    
+    def upload_status(self, recording_import, http_status=status.HTTP_200_OK, **extra):
+        session = recording_import.session
+        completed = recording_import.status == RecordingImportStatus.COMPLETED
+        return Response({
+            'fileUrl': self.request.build_absolute_uri(session.recording_file.url) if completed and session.recording_file else None,
+            'success': http_status == status.HTTP_200_OK,
+            'sessionId': recording_import.session_id,
+            'recordingId': recording_import.recording_id,
+            'offset': recording_import.bytes_received if completed else partial_size(recording_import),
+            'status': recording_import.status,
+            **extra
+        }, status=http_status)
+    
+    def get(self, request):
+        """Report how many bytes of an upload were received, so the SFU can resume."""
+        if not self.check_secret(request):
+            return Response({'error': 'Invalid webhook secret'}, status=status.HTTP_403_FORBIDDEN)
+        
+        session = self.get_session(request.query_params)
+        if session is None:
+            return Response({'error': 'Session not found'}, status=status.HTTP_404_NOT_FOUND)
+        
+        recording_import = RecordingImport.objects.filter(
+            session=session,
+            recording_id=request.query_params.get('recordingId', '')
+        ).first()
+        if recording_import is None:
+            return Response({'success': True, 'sessionId': session.id, 'offset': 0, 'status': None})
+        return self.upload_status(recording_import)
+    
+    def post(self, request):
+        """Handle recording file upload (or one chunk of it) from SFU backend."""
+        # Verify webhook secret
+        if not self.check_secret(request):
             logger.warning('Invalid webhook secret for recording upload')
             return Response(
                 {'error': 'Invalid webhook secret'}, 
@@ -1168,7 +1276,6 @@ class RecordingUploadView(APIView):
             # Get file and metadata
             recording_file = request.FILES.get('file')
             room_id = request.data.get('roomId')
-            session_id = request.data.get('sessionId')
             
             if not recording_file:
                 return Response(
@@ -1184,43 +1291,73 @@ class RecordingUploadView(APIView):
                     status=status.HTTP_400_BAD_REQUEST
                 )
             
-            # Check if file is too small to be a valid video (less than 1KB)
-            if recording_file.size < 1024:
-                logger.warning(f'Recording file too small ({recording_file.size} bytes) for room {room_id}')
-                # Still allow it, but log a warning
-            
             if not room_id:
                 return Response(
                     {'error': 'roomId is required'}, 
                     status=status.HTTP_400_BAD_REQUEST
                 )
             
-            # Get session
             try:
-                session_id_int = int(session_id) if session_id else int(room_id)
-                session = LiveSession.objects.get(id=session_id_int)
-            except (LiveSession.DoesNotExist, ValueError):
-                logger.error(f'Session not found: {session_id_int}')
+                offset = int(request.data.get('offset') or 0)
+                total_size = request.data.get('totalSize')
+                total_size = int(total_size) if total_size else None
+            except ValueError:
+                return Response(
+                    {'error': 'offset and totalSize must be integers'}, 
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            
+            # Get session
+            session = self.get_session(request.data)
+            if session is None:
                 return Response(
                     {'error': 'Session not found'}, 
                     status=status.HTTP_404_NOT_FOUND
                 )
             
-            # Save file to session
-            session.recording_file = recording_file
-            session.save(update_fields=['recording_file'])
-            
-            # Build file URL
-            file_url = request.build_absolute_uri(session.recording_file.url) if session.recording_file else None
+            with transaction.atomic():
+                recording_import, _ = RecordingImport.objects.select_for_update().get_or_create(
+                    session=session,
+                    recording_id=request.data.get('recordingId', ''),
+                    defaults={'source': RecordingImportSource.UPLOAD, 'status': RecordingImportStatus.RECEIVING}
+                )
+                
+                if recording_import.status == RecordingImportStatus.COMPLETED:
+                    return self.upload_status(recording_import, message='Recording already stored')
+                
+                if offset == 0:
+                    # A (re)start: whole-file uploads, retries after a failed verification and
+                    # uploads begun again from scratch drop whatever was received before
+                    discard_partial(recording_import)
+                    recording_import.bytes_received = 0
+                    recording_import.source = RecordingImportSource.UPLOAD
+                    recording_import.status = RecordingImportStatus.RECEIVING
+                    recording_import.expected_size = total_size
+                    recording_import.expected_checksum = request.data.get('checksum', '')
+                    recording_import.error = ''
+                    recording_import.save()
+                elif recording_import.status != RecordingImportStatus.RECEIVING:
+                    return self.upload_status(recording_import, status.HTTP_409_CONFLICT, message='Upload is not accepting chunks')
+                
+                try:
+                    received = append_upload_chunk(recording_import, recording_file, offset)
+                except RecordingOffsetError as e:
+                    return self.upload_status(recording_import, status.HTTP_409_CONFLICT, message=str(e))
+                
+                complete = recording_import.expected_size is None or received >= recording_import.expected_size
+                if complete:
+                    if recording_import.expected_size is None:
+                        recording_import.expected_size = received
+                    recording_import.status = RecordingImportStatus.PENDING
+                    recording_import.save(update_fields=['status', 'expected_size', 'updated_at'])
+                    ingest_recording.enqueue(import_id=recording_import.id)
             
-            logger.info(f'Recording file uploaded for session {session_id_int}: {session.recording_file.name}')
+            logger.info(f'Received {received} bytes of recording for session {session.id}, complete={complete}')
             
-            return Response({
-                'success': True,
-                'fileUrl': file_url,
-                'sessionId': session.id,
-                'message': 'Recording file uploaded successfully'
-            }, status=status.HTTP_200_OK)
+            return self.upload_status(
+                recording_import,
+                message='Recording file received, processing' if complete else 'Chunk received'
+            )
             
         except Exception as e:
             logger.error(f'Error uploading recording file: {e}', exc_info=True)
@@ -0,0 +1,32 @@
+"""
+Signals for dashboard app
+"""
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from accounts.models import CustomUser
+from course.models import Class
+from enrollments.models import ClassEnrollment
+from .utils import invalidate_report_cache
+
+
+@receiver(post_save, sender=CustomUser)
+def invalidate_report_on_user_save(sender, instance, created, update_fields=None, **kwargs):
+    """Drop cached reports when users change; logins (last_login only) don't affect the report"""
+    if update_fields is not None and set(update_fields) <= {'last_login'}:
+        return
+    invalidate_report_cache()
+
+
+@receiver(post_save, sender=Class)
+@receiver(post_save, sender=ClassEnrollment)
+def invalidate_report_on_save(sender, instance, created, **kwargs):
+    """Drop cached reports when classes or enrollments change"""
+    invalidate_report_cache()
+
+
+@receiver(post_delete, sender=CustomUser)
+@receiver(post_delete, sender=Class)
+@receiver(post_delete, sender=ClassEnrollment)
+def invalidate_report_on_delete(sender, instance, **kwargs):
+    """Drop cached reports when users, classes or enrollments are removed"""
+    invalidate_report_cache()
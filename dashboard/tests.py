@@ -1,3 +1,239 @@
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from course.models import Attendance, Certificate, Class, LiveSession, SessionStatus
+from enrollments.models import ClassEnrollment, EnrollmentChoices
+from profiles.models import StudentParentProfile
+
+User = get_user_model()
+
+
+class DashboardReportTestCase(TestCase):
+    """Test cases for the aggregated, cached admin dashboard report"""
+
+    def setUp(self):
+        cache.clear()
+        self.admin = User.objects.create_user(
+            email='admin@test.com',
+            password='testpass123',
+            role='staff',
+            full_name='Admin',
+            is_staff=True
+        )
+        self.teacher = User.objects.create_user(
+            email='teacher@test.com',
+            password='testpass123',
+            role='teacher',
+            full_name='Teacher'
+        )
+        self.students = [
+            User.objects.create_user(
+                email=f'student{i}@test.com',
+                password='testpass123',
+                role='student',
+                full_name=f'Student {i}'
+            )
+            for i in range(3)
+        ]
+        self.classes = [
+            Class.objects.create(
+                title=f'Class {i}',
+                capacity=30,
+                start_time=timezone.now().time(),
+                end_time=(timezone.now() + timedelta(hours=1)).time(),
+                days_of_week=[1, 3]
+            )
+            for i in range(2)
+        ]
+        for student in self.students:
+            ClassEnrollment.objects.create(
+                student=student,
+                class_enrolled=self.classes[0],
+                status=EnrollmentChoices.COMPLETED,
+                enrolled_at=timezone.now(),
+                price=Decimal('10.00')
+            )
+        for status in (SessionStatus.LIVE, SessionStatus.SCHEDULED):
+            LiveSession.objects.create(
+                title=f'{status} session',
+                class_session=self.classes[0],
+                scheduled_date=timezone.now().date(),
+                status=status
+            )
+
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.admin)
+        self.url = '/api/dashboard/report/'
+
+    def test_report_values(self):
+        """Test that the aggregated metrics match the data"""
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+
+        data = response.data
+        self.assertEqual(data['students']['total'], 3)
+        self.assertEqual(data['students']['new'], 3)
+        self.assertEqual(data['teachers']['total_active'], 1)
+        self.assertEqual(data['classes']['total_offered'], 2)
+        self.assertEqual(data['revenue']['total'], Decimal('30.00'))
+        self.assertEqual(data['revenue']['new'], Decimal('30.00'))
+        self.assertEqual(data['revenue']['growth'], 100.0)
+        self.assertEqual(len(data['recent_enrollments']), 3)
+        self.assertEqual(len(data['ongoing_live_sessions']), 1)
+        self.assertEqual(len(data['upcoming_live_sessions']), 1)
+        self.assertEqual(data['popular_classes'][0], {'title': 'Class 0', 'enrolled': 3, 'percentage': 100.0})
+
+    def test_query_count_is_constant(self):
+        """Test one query per table for the metrics plus one per list, regardless of rows"""
+        # users, classes, revenue + recent enrollments, ongoing, upcoming, popular classes
+        with self.assertNumQueries(7):
+            self.client.get(self.url)
+
+    def test_report_is_cached_per_window(self):
+        """Test that a repeated request is served from the cache"""
+        params = {'start_date': '2024-01-01', 'end_date': '2024-12-31'}
+        self.client.get(self.url, params)
+
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200)
+
+        # A different window is computed separately
+        with self.assertNumQueries(7):
+            self.client.get(self.url, {'start_date': '2024-02-01', 'end_date': '2024-12-31'})
+
+    def test_enrollment_write_invalidates_report(self):
+        """Test that enrollment changes are visible on the next request"""
+        self.client.get(self.url)
+
+        enrollment = ClassEnrollment.objects.first()
+        enrollment.status = EnrollmentChoices.PENDING
+        enrollment.save()
+
+        response = self.client.get(self.url)
+        self.assertEqual(response.data['revenue']['total'], Decimal('20.00'))
+
+    def test_user_write_invalidates_report(self):
+        """Test that new users are visible on the next request"""
+        self.client.get(self.url)
+
+        User.objects.create_user(
+            email='student_new@test.com',
+            password='testpass123',
+            role='student',
+            full_name='New Student'
+        )
+
+        response = self.client.get(self.url)
+        self.assertEqual(response.data['students']['total'], 4)
+
+
+class ParentDashboardTestCase(TestCase):
+    """Test cases for the batch-computed parent dashboard"""
+
+    def setUp(self):
+        self.parent = User.objects.create_user(
+            email='parent@test.com',
+            password='testpass123',
+            role='parent',
+            full_name='Parent'
+        )
+        self.test_class = Class.objects.create(
+            title='Test Class',
+            capacity=30,
+            start_time=timezone.now().time(),
+            end_time=(timezone.now() + timedelta(hours=1)).time(),
+            days_of_week=[1, 3]
+        )
+        self.sessions = [
+            LiveSession.objects.create(
+                title=f'{status} session',
+                class_session=self.test_class,
+                scheduled_date=timezone.now().date(),
+                status=status
+            )
+            for status in (SessionStatus.COMPLETED, SessionStatus.COMPLETED, SessionStatus.SCHEDULED, SessionStatus.LIVE)
+        ]
+        self.children = []
+
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.parent)
+        self.url = '/api/dashboard/parent/'
+
+    def add_child(self, present_sessions=0, certificates=0):
+        index = len(self.children)
+        child = User.objects.create_user(
+            email=f'child{index}@test.com',
+            password='testpass123',
+            role='student',
+            full_name=f'Child {index}'
+        )
+        StudentParentProfile.objects.create(
+            user=self.parent,
+            student=child.studentprofile_profile,
+            relationship='Parent'
+        )
+        enrollment = ClassEnrollment.objects.create(
+            student=child,
+            class_enrolled=self.test_class,
+            status=EnrollmentChoices.COMPLETED
+        )
+        for session in self.sessions[:present_sessions]:
+            Attendance.objects.create(class_enrollment=enrollment, session=session, status='present')
+        for i in range(certificates):
+            Certificate.objects.create(
+                student=child,
+                class_completed=self.test_class,
+                certificate_code=f'CERT-{index}-{i}'
+            )
+        self.children.append(child)
+        return child
+
+    def test_child_stats(self):
+        """Test per-child and overall values"""
+        self.add_child(present_sessions=2, certificates=1)
+        self.add_child(present_sessions=1)
+
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+
+        data = response.data
+        self.assertEqual(data['total_children'], 2)
+        self.assertEqual(data['total_enrollments'], 2)
+        self.assertEqual(data['total_certificates'], 1)
+        self.assertEqual(data['upcoming_sessions_count'], 4)
+        self.assertEqual(data['average_attendance_rate'], 37.5)
+
+        first, second = data['children_summaries']
+        self.assertEqual(first['child']['id'], self.children[0].id)
+        self.assertEqual(first['enrollments_count'], 1)
+        self.assertEqual(first['attendance_rate'], 50.0)
+        self.assertEqual(first['upcoming_sessions_count'], 2)
+        self.assertEqual(first['certificates_count'], 1)
+        self.assertEqual(second['attendance_rate'], 25.0)
+        self.assertEqual(second['certificates_count'], 0)
+
+    def test_query_count_does_not_grow_with_children(self):
+        """Test that the dashboard costs the same number of queries for 1 or 5 children"""
+        self.add_child(present_sessions=1, certificates=1)
+        # relationships, enrollment stats, attendance, certificates
+        with self.assertNumQueries(4):
+            self.client.get(self.url)
+
+        for _ in range(4):
+            self.add_child(present_sessions=2, certificates=2)
+        with self.assertNumQueries(4):
+            response = self.client.get(self.url)
+        self.assertEqual(response.data['total_children'], 5)
 
-# Create your tests here.
+    def test_no_children(self):
+        """Test that a parent without children gets an empty dashboard"""
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url)
+        self.assertEqual(response.data['total_children'], 0)
@@ -0,0 +1,31 @@
+"""
+Utility functions for the admin dashboard report cache.
+
+The report is cached per (start_date, end_date) window. Every cache key embeds
+a version number; user, class and enrollment writes bump the version, which
+orphans all cached windows at once (they then simply expire). Between writes a
+refresh under load hits the database at most once per REPORT_CACHE_TIMEOUT.
+"""
+from core.cache import bump_cache_version, get_cache_version
+
+REPORT_CACHE_TIMEOUT = 60
+
+REPORT_VERSION_KEY = 'dashboard:report:version'
+
+
+def report_cache_key(start_date, end_date):
+    """
+    Build the cache key of a report window.
+
+    Args:
+        start_date: Aware datetime the window starts at
+        end_date: Aware datetime the window ends at, or None for "up to now"
+    """
+    version = get_cache_version(REPORT_VERSION_KEY)
+    end = end_date.isoformat() if end_date else 'now'
+    return f'dashboard:report:v{version}:{start_date.isoformat()}:{end}'
+
+
+def invalidate_report_cache():
+    """Drop every cached report window after data feeding the report changed."""
+    bump_cache_version(REPORT_VERSION_KEY)
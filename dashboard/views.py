@@ -2,6 +2,7 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, IsAdminUser  # Assuming admin access for dashboard
 
+from django.core.cache import cache
 from django.utils.timezone import now
 from datetime import timedelta
 from dateutil.parser import parse as date_parse
@@ -17,6 +18,7 @@ from .serializers import (
     ChildAttendanceSerializer, ChildSessionSerializer, ChildCertificateSerializer,
     ChildProgressSerializer, ChildDetailSerializer
 )
+from .utils import REPORT_CACHE_TIMEOUT, report_cache_key
 
 class DashboardReportView(APIView):
     permission_classes = [IsAuthenticated, IsAdminUser]  # Restrict to admins/staff
@@ -42,6 +44,15 @@ class DashboardReportView(APIView):
         except (ValueError, TypeError) as e:
             return Response({'error': 'Invalid date format or values'}, status=400)
 
+        cache_key = report_cache_key(start_date, end_date if end_str else None)
+        data = cache.get(cache_key)
+        if data is None:
+            data = self.build_report(start_date, end_date)
+            cache.set(cache_key, data, REPORT_CACHE_TIMEOUT)
+
+        return Response(data)
+
+    def build_report(self, start_date, end_date):
         period_delta = end_date - start_date
         prev_end = start_date - timedelta(seconds=1)
         prev_start = prev_end - period_delta
@@ -52,43 +63,57 @@ class DashboardReportView(APIView):
                 return 100.0 if current > 0 else 0.0
             return round(((current - previous) / previous) * 100, 2)
 
+        # Students and active teachers: total, pre-period and at-end counts in one query
+        students = Q(role=RoleChoices.STUDENT)
+        active_teachers = Q(role=RoleChoices.TEACHER, is_active=True)
+        user_stats = CustomUser.objects.aggregate(
+            total_students=Count('id', filter=students),
+            pre_students=Count('id', filter=students & Q(created_at__lt=start_date)),
+            at_end_students=Count('id', filter=students & Q(created_at__lte=end_date)),
+            total_active_teachers=Count('id', filter=active_teachers),
+            pre_teachers=Count('id', filter=active_teachers & Q(created_at__lt=start_date)),
+            at_end_teachers=Count('id', filter=active_teachers & Q(created_at__lte=end_date)),
+        )
+
         # Students
-        total_students = CustomUser.objects.filter(role=RoleChoices.STUDENT).count()
-        pre_students = CustomUser.objects.filter(role=RoleChoices.STUDENT, created_at__lt=start_date).count()
-        at_end_students = CustomUser.objects.filter(role=RoleChoices.STUDENT, created_at__lte=end_date).count()
+        total_students = user_stats['total_students']
+        pre_students = user_stats['pre_students']
+        at_end_students = user_stats['at_end_students']
         new_students = at_end_students - pre_students
         students_growth = calculate_growth(at_end_students, pre_students)
 
         # Teachers (active)
-        total_active_teachers = CustomUser.objects.filter(role=RoleChoices.TEACHER, is_active=True).count()
-        pre_teachers = CustomUser.objects.filter(role=RoleChoices.TEACHER, is_active=True, created_at__lt=start_date).count()
-        at_end_teachers = CustomUser.objects.filter(role=RoleChoices.TEACHER, is_active=True, created_at__lte=end_date).count()
+        total_active_teachers = user_stats['total_active_teachers']
+        pre_teachers = user_stats['pre_teachers']
+        at_end_teachers = user_stats['at_end_teachers']
         new_teachers = at_end_teachers - pre_teachers
         teachers_growth = calculate_growth(at_end_teachers, pre_teachers)
 
         # Classes (formerly courses)
-        total_classes = Class.objects.count()
-        pre_classes = Class.objects.filter(created_at__lt=start_date).count()
-        at_end_classes = Class.objects.filter(created_at__lte=end_date).count()
+        class_stats = Class.objects.aggregate(
+            total=Count('id'),
+            pre=Count('id', filter=Q(created_at__lt=start_date)),
+            at_end=Count('id', filter=Q(created_at__lte=end_date)),
+        )
+        total_classes = class_stats['total']
+        pre_classes = class_stats['pre']
+        at_end_classes = class_stats['at_end']
         new_classes = at_end_classes - pre_classes
         classes_growth = calculate_growth(at_end_classes, pre_classes)
 
         # Revenue
-        total_revenue_qs = ClassEnrollment.objects.filter(status=EnrollmentChoices.COMPLETED).aggregate(total=Sum('price'))['total'] or 0.0
-        new_revenue_qs = ClassEnrollment.objects.filter(
-            status=EnrollmentChoices.COMPLETED,
-            enrolled_at__gte=start_date,
-            enrolled_at__lte=end_date
-        ).aggregate(total=Sum('price'))['total'] or 0.0
-        previous_revenue_qs = ClassEnrollment.objects.filter(
-            status=EnrollmentChoices.COMPLETED,
-            enrolled_at__gte=prev_start,
-            enrolled_at__lte=prev_end
-        ).aggregate(total=Sum('price'))['total'] or 0.0
+        revenue_stats = ClassEnrollment.objects.filter(status=EnrollmentChoices.COMPLETED).aggregate(
+            total=Sum('price'),
+            new=Sum('price', filter=Q(enrolled_at__gte=start_date, enrolled_at__lte=end_date)),
+            previous=Sum('price', filter=Q(enrolled_at__gte=prev_start, enrolled_at__lte=prev_end)),
+        )
+        total_revenue_qs = revenue_stats['total'] or 0.0
+        new_revenue_qs = revenue_stats['new'] or 0.0
+        previous_revenue_qs = revenue_stats['previous'] or 0.0
         revenue_growth = calculate_growth(new_revenue_qs, previous_revenue_qs)
 
         # 5 Recent Enrollments
-        recent_enrollments = ClassEnrollment.objects.order_by('-created_at')[:5]
+        recent_enrollments = ClassEnrollment.objects.select_related('student', 'class_enrolled').order_by('-created_at')[:5]
         recent_enrollments_data = [
             {
                 'id': enrollment.id,
@@ -102,7 +127,7 @@ class DashboardReportView(APIView):
         ]
 
         # Ongoing/Live Sessions (currently happening)
-        ongoing_sessions = LiveSession.objects.filter(status='live').order_by('-updated_at')[:5]
+        ongoing_sessions = LiveSession.objects.filter(status='live').select_related('class_session').order_by('-updated_at')[:5]
         ongoing_sessions_data = [
             {
                 'id': session.id,
@@ -119,7 +144,7 @@ class DashboardReportView(APIView):
         # 5 Upcoming Live Sessions (ordered by created_at for most recently scheduled sessions)
         upcoming_sessions = LiveSession.objects.filter(
             status='scheduled'
-        ).order_by('-created_at')[:5]
+        ).select_related('class_session').order_by('-created_at')[:5]
         upcoming_sessions_data = [
             {
                 'id': session.id,
@@ -145,7 +170,7 @@ class DashboardReportView(APIView):
             } for class_obj in popular_classes_qs
         ]
 
-        data = {
+        return {
             'students': {
                 'total': total_students,
                 'new': new_students,
@@ -172,8 +197,6 @@ class DashboardReportView(APIView):
             'popular_classes': popular_classes_data
         }
 
-        return Response(data)
-
 
 class TeacherDashboardView(APIView):
     permission_classes = [IsAuthenticated]
@@ -353,11 +376,11 @@ class ParentDashboardView(APIView):
             return Response({'error': 'Access denied. Only parents can access this dashboard.'}, status=403)
         
         # Get all parent-student relationships for this parent
-        parent_relationships = StudentParentProfile.objects.filter(
+        parent_relationships = list(StudentParentProfile.objects.filter(
             user=user
-        ).select_related('student', 'student__user', 'student__user__studentprofile_profile')
+        ).select_related('student', 'student__user'))
         
-        if not parent_relationships.exists():
+        if not parent_relationships:
             return Response({
                 'children': [],
                 'total_children': 0,
@@ -369,6 +392,46 @@ class ParentDashboardView(APIView):
             })
         
         current_time = now()
+        student_ids = [relationship.student.user_id for relationship in parent_relationships]
+        
+        # Per-child stats, one grouped query per table keyed by student id
+        completed = Q(status=EnrollmentChoices.COMPLETED)
+        enrollment_stats = {
+            row['student']: row
+            for row in ClassEnrollment.objects.filter(
+                student_id__in=student_ids
+            ).values('student').annotate(
+                # Enrollments are joined with their class sessions, hence distinct
+                active_enrollments=Count('id', filter=completed, distinct=True),
+                # Sessions of classes the child is enrolled in (one enrollment per class)
+                total_sessions=Count('class_enrolled__live_sessions', filter=completed),
+                # Upcoming sessions (scheduled or live)
+                upcoming_sessions=Count(
+                    'class_enrolled__live_sessions',
+                    filter=completed & Q(class_enrolled__live_sessions__status__in=['scheduled', 'live']) & (
+                        Q(class_enrolled__live_sessions__scheduled_date__gte=current_time.date()) |
+                        Q(class_enrolled__live_sessions__scheduled_date__isnull=True)
+                    ),
+                    distinct=True
+                ),
+            )
+        }
+        present_counts = dict(
+            Attendance.objects.filter(
+                class_enrollment__student_id__in=student_ids,
+                status='present'
+            ).values('class_enrollment__student').annotate(
+                count=Count('id')
+            ).values_list('class_enrollment__student', 'count')
+        )
+        certificate_counts = dict(
+            Certificate.objects.filter(
+                student_id__in=student_ids
+            ).values('student').annotate(
+                count=Count('id')
+            ).values_list('student', 'count')
+        )
+        
         children_data = []
         all_enrollments_count = 0
         all_certificates_count = 0
@@ -378,40 +441,16 @@ class ParentDashboardView(APIView):
         for relationship in parent_relationships:
             student = relationship.student.user
             student_profile = relationship.student
-            
-            # Get enrollments
-            enrollments = ClassEnrollment.objects.filter(
-                student=student
-            ).select_related('class_enrolled').prefetch_related('class_enrolled__teacher')
-            
-            # Get attendance records
-            attendance_records = Attendance.objects.filter(
-                class_enrollment__student=student
-            ).select_related('session', 'class_enrollment', 'class_enrollment__class_enrolled')
-            
-            # Get upcoming sessions (scheduled or live)
-            upcoming_sessions = LiveSession.objects.filter(
-                class_session__enrollments__student=student,
-                class_session__enrollments__status=EnrollmentChoices.COMPLETED,
-                status__in=['scheduled', 'live']
-            ).filter(
-                Q(scheduled_date__gte=current_time.date()) | Q(scheduled_date__isnull=True)
-            ).distinct().select_related('class_session')
-            
-            # Get certificates
-            certificates = Certificate.objects.filter(student=student).select_related('class_completed')
+            stats = enrollment_stats.get(student.id, {})
             
             # Calculate attendance rate for this child
-            total_sessions = LiveSession.objects.filter(
-                class_session__enrollments__student=student,
-                class_session__enrollments__status=EnrollmentChoices.COMPLETED
-            ).count()
-            
-            present_count = attendance_records.filter(status='present').count()
+            total_sessions = stats.get('total_sessions', 0)
+            present_count = present_counts.get(student.id, 0)
             attendance_rate = round((present_count / total_sessions * 100), 2) if total_sessions > 0 else 0.0
             
-            # Count active enrollments
-            active_enrollments = enrollments.filter(status=EnrollmentChoices.COMPLETED).count()
+            active_enrollments = stats.get('active_enrollments', 0)
+            upcoming_sessions_count = stats.get('upcoming_sessions', 0)
+            certificates_count = certificate_counts.get(student.id, 0)
             
             # Prepare child summary
             child_data = {
@@ -424,14 +463,14 @@ class ParentDashboardView(APIView):
                 },
                 'enrollments_count': active_enrollments,
                 'attendance_rate': attendance_rate,
-                'upcoming_sessions_count': upcoming_sessions.count(),
-                'certificates_count': certificates.count(),
+                'upcoming_sessions_count': upcoming_sessions_count,
+                'certificates_count': certificates_count,
             }
             
             children_data.append(child_data)
             all_enrollments_count += active_enrollments
-            all_certificates_count += certificates.count()
-            all_upcoming_sessions_count += upcoming_sessions.count()
+            all_certificates_count += certificates_count
+            all_upcoming_sessions_count += upcoming_sessions_count
             if total_sessions > 0:
                 attendance_rates.append(attendance_rate)
         
@@ -0,0 +1,169 @@
+"""
+In-memory tree of library categories.
+
+The categories are few and rarely edited, so each process loads them all with
+one query into a CategoryTree: the children of every category, in display
+order, and the closure of its descendants. The tree is reloaded when the tree
+version changes, which category writes bump (see signals).
+
+Resource counts per category are computed for the whole tree at once, from a
+grouped count of the published resources per category rolled up over the tree
+and one count of the subcategory links into each subtree, and shared
+through the cache under the same version; resource writes that can move a
+resource between categories bump it too.
+"""
+import threading
+from collections import defaultdict
+
+from django.core.cache import cache
+from django.db.models import Count, Q
+
+from core.cache import bump_cache_version, get_cache_version
+
+from .models import LibraryCategory, LibraryResource
+
+TREE_VERSION_KEY = 'library:categories:version'
+
+# Upper bound on the staleness of the counts if a version bump is lost
+COUNTS_CACHE_TIMEOUT = 60 * 60
+
+# Resource fields whose change can move it to another category, or in or out of the counts
+CATEGORIZED_FIELDS = frozenset({'category', 'category_id', 'is_published'})
+
+
+def get_tree_version():
+    """Current version of the category tree and its resource counts."""
+    return get_cache_version(TREE_VERSION_KEY)
+
+
+def invalidate_category_tree():
+    """Make every process reload the category tree and recount its resources."""
+    bump_cache_version(TREE_VERSION_KEY)
+
+
+class CategoryTree:
+    """Every category, with its children and descendants. Treat as read-only."""
+
+    def __init__(self, categories, version=None):
+        self.version = version
+        self.categories = {category.pk: category for category in categories}
+        self.children_ids = defaultdict(list)
+        self.root_ids = []
+        for category in self.categories.values():
+            if category.parent_id is None:
+                self.root_ids.append(category.pk)
+            elif category.parent_id in self.categories:
+                self.children_ids[category.parent_id].append(category.pk)
+        self.descendant_ids = {pk: self._walk(pk) for pk in self.categories}
+
+    @classmethod
+    def from_database(cls, version=None):
+        # Meta ordering: children come out in display order
+        return cls(LibraryCategory.objects.all(), version=version)
+
+    def _walk(self, pk):
+        # Preorder; the seen set guards against a parent cycle saved by hand
+        seen = {pk}
+        order = [pk]
+        stack = list(reversed(self.children_ids.get(pk, ())))
+        while stack:
+            child_id = stack.pop()
+            if child_id in seen:
+                continue
+            seen.add(child_id)
+            order.append(child_id)
+            stack.extend(reversed(self.children_ids.get(child_id, ())))
+        return tuple(order)
+
+    def __contains__(self, pk):
+        return pk in self.categories
+
+    def get(self, pk):
+        return self.categories.get(pk)
+
+    def roots(self):
+        return [self.categories[pk] for pk in self.root_ids]
+
+    def children(self, pk):
+        return [self.categories[child_id] for child_id in self.children_ids.get(pk, ())]
+
+    def subtree_ids(self, pk):
+        """The category and all its descendants, or () if it does not exist."""
+        return self.descendant_ids.get(pk, ())
+
+
+_tree = None
+_tree_lock = threading.Lock()
+
+
+def get_category_tree():
+    """Return this process's category tree, reloading it if categories changed."""
+    global _tree
+    version = get_tree_version()
+    tree = _tree
+    if tree is None or tree.version != version:
+        with _tree_lock:
+            if _tree is None or _tree.version != version:
+                _tree = CategoryTree.from_database(version=version)
+            tree = _tree
+    return tree
+
+
+def subtree_resources_filter(category_ids):
+    """
+    Q for resources filed under any of the categories, as their category or as
+    one of their subcategories. Both sides are indexed lookups, and a resource
+    matches once without DISTINCT.
+    """
+    linked = LibraryResource.subcategories.through.objects.filter(
+        librarycategory_id__in=category_ids
+    ).values('libraryresource_id')
+    return Q(category_id__in=category_ids) | Q(pk__in=linked)
+
+
+def count_resources(tree):
+    """
+    Count the published resources of every category of a tree.
+
+    Returns:
+        {category id: (resources filed directly under it, distinct resources
+        of its subtree including subcategory links)}
+    """
+    published = LibraryResource.objects.filter(is_published=True)
+    direct = dict(
+        published.filter(category__isnull=False).order_by()
+        .values('category_id').annotate(count=Count('pk'))
+        .values_list('category_id', 'count')
+    )
+
+    # A resource has one category, so the direct counts of a subtree add up; a
+    # subcategory link adds the resources filed outside the subtree
+    linked = {}
+    if tree.categories:
+        links = LibraryResource.subcategories.through.objects.filter(libraryresource__is_published=True)
+        linked = links.aggregate(**{
+            f'category_{pk}': Count('libraryresource_id', distinct=True, filter=(
+                Q(librarycategory_id__in=subtree) & (
+                    Q(libraryresource__category__isnull=True)
+                    | ~Q(libraryresource__category_id__in=subtree)
+                )
+            ))
+            for pk, subtree in tree.descendant_ids.items()
+        })
+
+    counts = {}
+    for pk, subtree in tree.descendant_ids.items():
+        total = sum(direct.get(node_id, 0) for node_id in subtree) + (linked.get(f'category_{pk}') or 0)
+        counts[pk] = (direct.get(pk, 0), total)
+    return counts
+
+
+def get_resource_counts(tree=None):
+    """Resource counts of every category (see count_resources), from the cache when possible."""
+    tree = tree or get_category_tree()
+    key = f'library:categories:counts:v{tree.version}'
+    counts = cache.get(key)
+    if counts is None:
+        counts = count_resources(tree)
+        cache.set(key, counts, COUNTS_CACHE_TIMEOUT)
+    return counts
@@ -0,0 +1,196 @@
+"""
+Write-behind view and download counters for library resources.
+
+Viewing or downloading a resource only appends an event to a buffer in the
+cache; nothing is written to the database on the request path. Events are
+grouped in buckets of BUCKET_SECONDS. `flush_counters` (run every few seconds
+by the `flush_library_counters` command) takes every closed bucket and applies
+it in one transaction: the ResourceView rows with one bulk_create, and the
+view_count / download_count increments with a single UPDATE ... CASE.
+
+Counts read from the database are therefore at most a few seconds stale. A
+bucket stays open for writes until it is GRACE_BUCKETS old, so a request that
+picked its bucket just before it closed is not missed by the flush.
+
+The buffer needs a cache shared by all processes (Redis in production). With a
+per-process cache (LocMem in development) set LIBRARY_COUNTERS_BUFFERED=False
+to write each event through immediately.
+"""
+import logging
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Case, F, Value, When
+from django.utils import timezone
+
+from .models import LibraryResource, ResourceView
+
+logger = logging.getLogger(__name__)
+
+BUCKET_SECONDS = 2
+
+# Closed buckets younger than this are left for late writers
+GRACE_BUCKETS = 1
+
+# How long unflushed events survive in the cache (the flush looks back this far)
+BUFFER_TIMEOUT = 60 * 60
+
+FLUSH_LOCK_KEY = 'library:counters:flush-lock'
+FLUSH_LOCK_TIMEOUT = 120
+FLUSH_CURSOR_KEY = 'library:counters:flushed'
+
+EVENT_VIEW = 'view'
+EVENT_DOWNLOAD = 'download'
+
+# Events read from the cache per round-trip
+FETCH_BATCH_SIZE = 1000
+
+
+def current_bucket():
+    return int(time.time()) // BUCKET_SECONDS
+
+
+def _sequence_key(bucket):
+    return f'library:counters:{bucket}:seq'
+
+
+def _event_key(bucket, sequence):
+    return f'library:counters:{bucket}:{sequence}'
+
+
+def record_view(resource_id, user_id=None, ip_address=None):
+    """Count a view of a resource and log it as a ResourceView."""
+    _record((EVENT_VIEW, resource_id, user_id, ip_address, timezone.now()))
+
+
+def record_download(resource_id):
+    """Count a download of a resource."""
+    _record((EVENT_DOWNLOAD, resource_id, None, None, timezone.now()))
+
+
+def _record(event):
+    if not settings.LIBRARY_COUNTERS_BUFFERED:
+        apply_events([event])
+        return
+
+    bucket = current_bucket()
+    sequence_key = _sequence_key(bucket)
+    cache.add(sequence_key, 0, BUFFER_TIMEOUT)
+    try:
+        sequence = cache.incr(sequence_key)
+    except ValueError:
+        # Evicted between add and incr: don't lose the event
+        logger.warning('Library counter buffer unavailable, writing event through')
+        apply_events([event])
+        return
+    cache.set(_event_key(bucket, sequence), event, BUFFER_TIMEOUT)
+
+
+def apply_events(events):
+    """
+    Apply counter events to the database in one transaction.
+
+    Args:
+        events: Iterable of (kind, resource id, user id, ip address, timestamp)
+
+    Returns:
+        (number of resources updated, number of ResourceView rows created)
+    """
+    events = list(events)
+    resource_ids = {event[1] for event in events}
+    existing_resources = set(
+        LibraryResource.objects.filter(id__in=resource_ids).values_list('id', flat=True)
+    )
+    user_ids = {event[2] for event in events if event[2]}
+    existing_users = set(
+        get_user_model().objects.filter(id__in=user_ids).values_list('id', flat=True)
+    ) if user_ids else set()
+
+    views = Counter()
+    downloads = Counter()
+    view_rows = []
+    for kind, resource_id, user_id, ip_address, timestamp in events:
+        # The resource may have been deleted since the event was recorded
+        if resource_id not in existing_resources:
+            continue
+        if kind == EVENT_VIEW:
+            views[resource_id] += 1
+            view_rows.append(ResourceView(
+                resource_id=resource_id,
+                user_id=user_id if user_id in existing_users else None,
+                ip_address=ip_address,
+                viewed_at=timestamp,
+            ))
+        elif kind == EVENT_DOWNLOAD:
+            downloads[resource_id] += 1
+
+    updated_ids = set(views) | set(downloads)
+    if not updated_ids:
+        return 0, 0
+
+    with transaction.atomic():
+        ResourceView.objects.bulk_create(view_rows, batch_size=500)
+        LibraryResource.objects.filter(id__in=updated_ids).update(
+            view_count=F('view_count') + Case(
+                *[When(id=resource_id, then=Value(count)) for resource_id, count in views.items()],
+                default=Value(0),
+            ),
+            download_count=F('download_count') + Case(
+                *[When(id=resource_id, then=Value(count)) for resource_id, count in downloads.items()],
+                default=Value(0),
+            ),
+        )
+    return len(updated_ids), len(view_rows)
+
+
+def flush_counters(include_current=False):
+    """
+    Move buffered events of closed buckets into the database.
+
+    Args:
+        include_current: Also flush the open buckets (for tests and shutdown); an
+            event recorded while they are flushed may be lost
+
+    Returns:
+        (number of resources updated, number of ResourceView rows created), or
+        None if another flush is running
+    """
+    if not cache.add(FLUSH_LOCK_KEY, 1, FLUSH_LOCK_TIMEOUT):
+        return None
+
+    try:
+        now = current_bucket()
+        last_closed = now - GRACE_BUCKETS - 1
+        last_bucket = now if include_current else last_closed
+        first_bucket = cache.get(FLUSH_CURSOR_KEY)
+        oldest_kept = now - BUFFER_TIMEOUT // BUCKET_SECONDS
+        first_bucket = oldest_kept if first_bucket is None else max(first_bucket + 1, oldest_kept)
+        if first_bucket > last_bucket:
+            return 0, 0
+
+        buckets = range(first_bucket, last_bucket + 1)
+        sequences = cache.get_many([_sequence_key(bucket) for bucket in buckets])
+
+        event_keys = [
+            _event_key(bucket, sequence)
+            for bucket in buckets
+            for sequence in range(1, sequences.get(_sequence_key(bucket), 0) + 1)
+        ]
+        events = []
+        for start in range(0, len(event_keys), FETCH_BATCH_SIZE):
+            events.extend(cache.get_many(event_keys[start:start + FETCH_BATCH_SIZE]).values())
+
+        result = apply_events(events) if events else (0, 0)
+
+        # A crash before this point replays the buckets on the next flush. Open
+        # buckets are not marked flushed; deleting their keys keeps them from
+        # being applied twice.
+        cache.set(FLUSH_CURSOR_KEY, min(last_bucket, last_closed), None)
+        cache.delete_many(list(sequences) + event_keys)
+        return result
+    finally:
+        cache.delete(FLUSH_LOCK_KEY)
@@ -1,12 +1,13 @@
 import django_filters
 from django.db.models import Q
 from .models import LibraryResource, LibraryCategory, ResourceRating, ResourceType, Language
+from .search import annotate_search_rank
 
 
 class LibraryResourceFilter(django_filters.FilterSet):
     """Comprehensive filters for library resources"""
     
-    # Search across multiple fields
+    # Ranked search over title, author, description, publisher, category, subjects and tags
     search = django_filters.CharFilter(method='filter_by_search', label='Search')
     
     # Category filters
@@ -100,16 +101,9 @@ class LibraryResourceFilter(django_filters.FilterSet):
         ]
     
     def filter_by_search(self, queryset, name, value):
-        """Search across title, author, description"""
+        """Search the catalog index; matches are annotated with `search_rank`"""
         if value:
-            return queryset.filter(
-                Q(title__icontains=value) |
-                Q(title_arabic__icontains=value) |
-                Q(author__icontains=value) |
-                Q(author_arabic__icontains=value) |
-                Q(description__icontains=value) |
-                Q(publisher__icontains=value)
-            )
+            return annotate_search_rank(queryset, value)
         return queryset
     
     def filter_by_tag(self, queryset, name, value):
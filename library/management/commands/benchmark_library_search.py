@@ -0,0 +1,163 @@
+import random
+import statistics
+import time
+
+from django.contrib.contenttypes.models import ContentType
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Q
+from taggit.models import Tag, TaggedItem
+
+from library.filters import LibraryResourceFilter
+from library.management.commands.seed_library import CATEGORIES_DATA, RESOURCES_DATA
+from library.models import LibraryCategory, LibraryResource, ResourceSearchTerm
+from library.search import index_queryset
+
+DEFAULT_QUERIES = [
+    'bukhari', 'صحيح البخاري', 'tafsir ibn kathir', 'prayer fiqh', 'riya', 'bukahri', 'الرحيق', 'seerah prophet',
+]
+
+
+class IcontainsResourceFilter(LibraryResourceFilter):
+    """The filter as it searched before the index: six icontains scans."""
+
+    def filter_by_search(self, queryset, name, value):
+        return queryset.filter(
+            Q(title__icontains=value) |
+            Q(title_arabic__icontains=value) |
+            Q(author__icontains=value) |
+            Q(author_arabic__icontains=value) |
+            Q(description__icontains=value) |
+            Q(publisher__icontains=value)
+        )
+
+
+class Rollback(Exception):
+    """Raised to discard the synthetic catalog."""
+
+
+class Command(BaseCommand):
+    help = 'Benchmark library search latency: icontains scan vs the catalog search index'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--resources',
+            type=int,
+            default=100000,
+            help='Number of synthetic resources, generated from the seed_library data (default: 100000)',
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=20,
+            help='Runs per query (default: 20)',
+        )
+        parser.add_argument(
+            '--query',
+            action='append',
+            dest='queries',
+            help='Query to benchmark (repeatable, default: a mixed Arabic/English set)',
+        )
+
+    def handle(self, *args, **options):
+        queries = options['queries'] or DEFAULT_QUERIES
+
+        try:
+            with transaction.atomic():
+                started = time.perf_counter()
+                self.create_synthetic_catalog(options['resources'])
+                self.stdout.write(
+                    f'Created {options["resources"]} synthetic resources in {time.perf_counter() - started:.1f}s'
+                )
+
+                started = time.perf_counter()
+                index_queryset(LibraryResource.objects.all())
+                self.stdout.write(
+                    f'Index build: {time.perf_counter() - started:.1f}s, '
+                    f'{ResourceSearchTerm.objects.count()} index rows'
+                )
+                self.stdout.write('')
+
+                self.run(queries, options['repeat'])
+                raise Rollback
+        except Rollback:
+            self.stdout.write(self.style.SUCCESS('Synthetic data rolled back'))
+
+    def create_synthetic_catalog(self, count):
+        """Variations of the seed_library resources: same vocabulary, shuffled and numbered."""
+        rng = random.Random(42)
+        categories = {}
+        for data in CATEGORIES_DATA:
+            categories[data['name']], _ = LibraryCategory.objects.get_or_create(
+                name=data['name'],
+                defaults={'name_arabic': data['name_arabic'], 'display_order': data['order']},
+            )
+        tags = {}
+        for name in {tag for data in RESOURCES_DATA for tag in data['tags']}:
+            tags[name], _ = Tag.objects.get_or_create(name=name, defaults={'slug': name})
+        description_words = [word for data in RESOURCES_DATA for word in data['description'].split()]
+
+        for start in range(0, count, 5000):
+            resources = []
+            resource_tags = []
+            for i in range(start, min(start + 5000, count)):
+                data = rng.choice(RESOURCES_DATA)
+                volume = rng.randint(1, 40)
+                resources.append(LibraryResource(
+                    title=f'{data["title"]} - Volume {volume}',
+                    title_arabic=f'{data["title_arabic"]} - المجلد {volume}',
+                    author=data['author'],
+                    author_arabic=data['author_arabic'],
+                    category=categories[data['category']],
+                    resource_type=data['type'],
+                    language=data['language'],
+                    description=' '.join(rng.sample(description_words, 30)),
+                    publisher=data['publisher'],
+                    publication_year=data['year'],
+                    pages=data['pages'],
+                    is_published=rng.random() < 0.95,
+                ))
+                resource_tags.append(data['tags'])
+            resources = LibraryResource.objects.bulk_create(resources)
+
+            content_type = ContentType.objects.get_for_model(LibraryResource)
+            TaggedItem.objects.bulk_create([
+                TaggedItem(content_type=content_type, object_id=resource.pk, tag=tags[name])
+                for resource, names in zip(resources, resource_tags)
+                for name in names
+            ])
+
+    def run(self, queries, repeat):
+        """Time what the paginated list endpoint runs: the count and the first page."""
+        published = LibraryResource.objects.filter(is_published=True)
+
+        for query in queries:
+            def legacy_search():
+                return IcontainsResourceFilter(
+                    data={'search': query}, queryset=published
+                ).qs.order_by('-created_at')
+
+            def indexed_search():
+                return LibraryResourceFilter(
+                    data={'search': query}, queryset=published
+                ).qs.order_by('-search_rank', '-created_at')
+
+            legacy = self.measure(lambda: self.first_page(legacy_search()), repeat)
+            indexed = self.measure(lambda: self.first_page(indexed_search()), repeat)
+            self.stdout.write(
+                f'{query!r}: icontains p50 {legacy[0]:.2f}ms p95 {legacy[1]:.2f}ms ({legacy_search().count()} matches) | '
+                f'index p50 {indexed[0]:.2f}ms p95 {indexed[1]:.2f}ms ({indexed_search().count()} ranked matches)'
+            )
+
+    def first_page(self, queryset):
+        return queryset.count(), list(queryset[:20])
+
+    def measure(self, func, repeat):
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            func()
+            timings.append((time.perf_counter() - started) * 1000)
+        timings.sort()
+        p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+        return statistics.median(timings), p95
@@ -0,0 +1,22 @@
+"""
+Management command that rebuilds the precomputed library recommendations
+(see library/recommendations.py). Run it nightly from cron.
+"""
+import time
+
+from django.core.management.base import BaseCommand
+
+from library.recommendations import build_recommendations
+
+
+class Command(BaseCommand):
+    help = 'Rebuild related-resource similarities and per-user library recommendations'
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        resources, similarities, users, recommendations = build_recommendations()
+        self.stdout.write(self.style.SUCCESS(
+            f'Built {similarities} similarities for {resources} resource(s) and '
+            f'{recommendations} recommendations for {users} user(s) '
+            f'in {time.perf_counter() - started:.1f}s'
+        ))
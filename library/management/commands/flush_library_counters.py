@@ -0,0 +1,63 @@
+"""
+Management command that moves buffered library view/download counters into the
+database (see library/counters.py). Run it with --loop next to the web server,
+e.g. under systemd, or without it from cron.
+"""
+import logging
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from library.counters import BUCKET_SECONDS, flush_counters
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = 'Flush buffered library view and download counters to the database'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Keep flushing every --interval seconds instead of flushing once',
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=float(BUCKET_SECONDS),
+            help=f'Seconds between flushes with --loop (default: {BUCKET_SECONDS})',
+        )
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='Also flush the buckets still open for writes (e.g. before shutting down)',
+        )
+
+    def handle(self, *args, **options):
+        if not options['loop']:
+            self.flush(options['all'])
+            return
+
+        self.stdout.write(self.style.SUCCESS('Library counter flusher started'))
+        try:
+            while True:
+                close_old_connections()
+                try:
+                    self.flush(include_current=False)
+                except Exception as e:
+                    # e.g. the database is briefly unreachable; the buckets stay for the next pass
+                    logger.error(f'Library counter flush failed: {e}', exc_info=True)
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            self.flush(include_current=True)
+            self.stdout.write(self.style.WARNING('Library counter flusher stopped'))
+
+    def flush(self, include_current):
+        result = flush_counters(include_current=include_current)
+        if result is None:
+            self.stdout.write(self.style.WARNING('Another flush is running'))
+        elif any(result):
+            resources, views = result
+            self.stdout.write(f'Updated counters of {resources} resource(s), logged {views} view(s)')
@@ -0,0 +1,29 @@
+"""
+Management command to rebuild the rating histogram, total and average of
+library resources from their ratings. Ratings are maintained incrementally;
+run this after importing ratings in bulk or if the columns ever drift.
+"""
+from django.core.management.base import BaseCommand
+
+from library.models import LibraryResource, rebuild_rating_stats
+
+
+class Command(BaseCommand):
+    help = 'Rebuild library resource rating histograms, totals and averages from their ratings'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--resource',
+            type=int,
+            action='append',
+            dest='resource_ids',
+            help='Only rebuild this resource (repeatable, default: all resources)',
+        )
+
+    def handle(self, *args, **options):
+        queryset = LibraryResource.objects.all()
+        if options['resource_ids']:
+            queryset = queryset.filter(pk__in=options['resource_ids'])
+
+        updated = rebuild_rating_stats(queryset)
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt ratings of {updated} resource(s)'))
@@ -0,0 +1,30 @@
+"""
+Management command to rebuild the library catalog search index. Signals keep
+the index up to date; run this after bulk imports that bypass them
+(bulk_create, queryset.update) or after changing the indexing rules.
+"""
+from django.core.management.base import BaseCommand
+
+from library.models import LibraryResource
+from library.search import index_queryset
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the search index of library resources'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--resource',
+            type=int,
+            action='append',
+            dest='resource_ids',
+            help='Only reindex this resource (repeatable, default: all resources)',
+        )
+
+    def handle(self, *args, **options):
+        queryset = LibraryResource.objects.all()
+        if options['resource_ids']:
+            queryset = queryset.filter(pk__in=options['resource_ids'])
+
+        indexed = index_queryset(queryset)
+        self.stdout.write(self.style.SUCCESS(f'Indexed {indexed} resource(s)'))
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-16 20:43
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('library', '0002_alter_libraryresource_author'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='resourceview',
+            name='viewed_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ]
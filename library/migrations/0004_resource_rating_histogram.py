@@ -0,0 +1,69 @@
+# Generated by Django 5.2.18 on 2026-10-16 20:46
+
+from decimal import Decimal
+
+from django.db import migrations, models
+
+STARS = range(1, 6)
+
+
+def backfill_rating_histogram(apps, schema_editor):
+    """Build the rating histogram (and fix total and average) of existing resources."""
+    LibraryResource = apps.get_model('library', 'LibraryResource')
+    rows = LibraryResource.objects.order_by().values('pk').annotate(**{
+        f'rating_{star}_count': models.Count('ratings', filter=models.Q(ratings__rating=star))
+        for star in STARS
+    })
+    resources = []
+    for row in rows:
+        resource = LibraryResource(pk=row['pk'])
+        star_counts = {star: row[f'rating_{star}_count'] for star in STARS}
+        for star, count in star_counts.items():
+            setattr(resource, f'rating_{star}_count', count)
+        resource.total_ratings = sum(star_counts.values())
+        resource.average_rating = (
+            round(Decimal(sum(star * count for star, count in star_counts.items())) / resource.total_ratings, 2)
+            if resource.total_ratings else Decimal('0.00')
+        )
+        resources.append(resource)
+    LibraryResource.objects.bulk_update(
+        resources,
+        [f'rating_{star}_count' for star in STARS] + ['total_ratings', 'average_rating'],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('library', '0003_resourceview_viewed_at_default'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='libraryresource',
+            name='rating_1_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='libraryresource',
+            name='rating_2_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='libraryresource',
+            name='rating_3_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='libraryresource',
+            name='rating_4_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='libraryresource',
+            name='rating_5_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_rating_histogram, migrations.RunPython.noop),
+    ]
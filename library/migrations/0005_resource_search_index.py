@@ -0,0 +1,130 @@
+# Generated by Django 5.2.18 on 2026-10-16 20:56
+
+import re
+import unicodedata
+from collections import defaultdict
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# A frozen copy of the normalization in quran.utils and the weighting in
+# library.search as of this migration; later changes to those are picked up
+# by `rebuild_library_search_index`, not by rewriting history here.
+ARABIC_DIACRITICS = re.compile(
+    '[\u0610-\u061A\u064B-\u065F\u0670\u06D6-\u06DC\u06DF-\u06E8\u06EA-\u06ED\u0640]'
+)
+ARABIC_LETTER_MAP = str.maketrans({
+    '\u0622': '\u0627',
+    '\u0623': '\u0627',
+    '\u0625': '\u0627',
+    '\u0671': '\u0627',
+    '\u0629': '\u0647',
+    '\u0649': '\u064A',
+    '\u0624': '\u0648',
+    '\u0626': '\u064A',
+})
+ARABIC_ALEF = '\u0627'
+ARABIC_HAMZA = '\u0621'
+ARABIC_CONJUNCTIONS = ('\u0648', '\u0641', '\u0628', '\u0643')
+ARABIC_ARTICLE = '\u0627\u0644'
+TOKEN_PATTERN = re.compile(r'\w+')
+
+FIELD_WEIGHTS = {
+    'title': 5.0,
+    'title_arabic': 5.0,
+    'author': 3.0,
+    'author_arabic': 3.0,
+    'category': 2.0,
+    'subjects': 2.0,
+    'tags': 2.0,
+    'publisher': 1.0,
+    'description': 1.0,
+}
+MAX_TERM_LENGTH = 64
+
+
+def tokenize(text):
+    text = ARABIC_DIACRITICS.sub('', text or '').translate(ARABIC_LETTER_MAP)
+    text = text.replace(ARABIC_HAMZA + ARABIC_ALEF, ARABIC_ALEF)
+    decomposed = unicodedata.normalize('NFKD', text)
+    text = ''.join(ch for ch in decomposed if not unicodedata.combining(ch)).casefold()
+    return TOKEN_PATTERN.findall(text)
+
+
+def token_forms(token):
+    forms = [token]
+    if token[:1] in ARABIC_CONJUNCTIONS and token[1:3] == ARABIC_ARTICLE:
+        token = token[1:]
+        forms.append(token)
+    if token.startswith(ARABIC_ARTICLE) and len(token) > 4:
+        forms.append(token[2:])
+    skeletons = []
+    for form in forms:
+        skeleton = form[:1] + form[1:].replace(ARABIC_ALEF, '')
+        if skeleton != form and len(skeleton) >= 2:
+            skeletons.append(skeleton)
+    return tuple(dict.fromkeys(forms + skeletons))
+
+
+def document_terms(resource):
+    category = resource.category
+    document = {
+        'title': resource.title,
+        'title_arabic': resource.title_arabic,
+        'author': resource.author,
+        'author_arabic': resource.author_arabic,
+        'category': f'{category.name} {category.name_arabic}' if category else '',
+        'subjects': ' '.join(subject.name for subject in resource.subjects.all()),
+        'tags': ' '.join(tag.name for tag in resource.tags.all()),
+        'publisher': resource.publisher,
+        'description': resource.description,
+    }
+    weights = defaultdict(float)
+    for field_name, text in document.items():
+        terms = {form[:MAX_TERM_LENGTH] for token in tokenize(text) for form in token_forms(token)}
+        for term in terms:
+            weights[term] += FIELD_WEIGHTS[field_name]
+    return weights
+
+
+def backfill_search_index(apps, schema_editor):
+    """Index the existing catalog for search."""
+    LibraryResource = apps.get_model('library', 'LibraryResource')
+    ResourceSearchTerm = apps.get_model('library', 'ResourceSearchTerm')
+    resources = LibraryResource.objects.select_related('category').prefetch_related('subjects', 'tags')
+    rows = []
+    for resource in resources.iterator(chunk_size=500):
+        rows.extend(
+            ResourceSearchTerm(resource_id=resource.pk, term=term, weight=weight)
+            for term, weight in document_terms(resource).items()
+        )
+        if len(rows) >= 5000:
+            ResourceSearchTerm.objects.bulk_create(rows)
+            rows = []
+    ResourceSearchTerm.objects.bulk_create(rows)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('library', '0004_resource_rating_histogram'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResourceSearchTerm',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=64)),
+                ('weight', models.FloatField()),
+                ('resource', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_terms', to='library.libraryresource')),
+            ],
+            options={
+                'verbose_name': 'Resource Search Term',
+                'verbose_name_plural': 'Resource Search Terms',
+                'indexes': [models.Index(fields=['term', 'resource', 'weight'], name='library_search_term_idx')],
+                'constraints': [models.UniqueConstraint(fields=('resource', 'term'), name='unique_resource_search_term')],
+            },
+        ),
+        migrations.RunPython(backfill_search_index, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.2.18 on 2026-10-16 21:09
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('library', '0005_resource_search_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResourceSimilarity',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.FloatField()),
+                ('resource', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='similar_resources', to='library.libraryresource')),
+                ('similar', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='similar_to', to='library.libraryresource')),
+            ],
+            options={
+                'verbose_name': 'Resource Similarity',
+                'verbose_name_plural': 'Resource Similarities',
+                'indexes': [models.Index(fields=['resource', '-score'], name='library_res_resourc_41104b_idx')],
+                'constraints': [models.UniqueConstraint(fields=('resource', 'similar'), name='unique_resource_similarity')],
+            },
+        ),
+        migrations.CreateModel(
+            name='UserResourceRecommendation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.FloatField()),
+                ('resource', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='recommended_to', to='library.libraryresource')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='library_recommendations', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'User Resource Recommendation',
+                'verbose_name_plural': 'User Resource Recommendations',
+                'indexes': [models.Index(fields=['user', '-score'], name='library_use_user_id_df7236_idx')],
+                'constraints': [models.UniqueConstraint(fields=('user', 'resource'), name='unique_user_resource_recommendation')],
+            },
+        ),
+    ]
@@ -1,4 +1,8 @@
-from django.db import models
+from decimal import Decimal
+
+from django.db import models, transaction
+from django.db.models.functions import Cast
+from django.db.models.lookups import GreaterThan
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.utils import timezone
 from django.core.exceptions import ValidationError
@@ -52,6 +56,70 @@ class Language(models.TextChoices):
     TURKISH = 'turkish', 'Turkish'
 
 
+RATING_STARS = (1, 2, 3, 4, 5)
+
+
+def rating_count_field(star):
+    return f'rating_{star}_count'
+
+
+RATING_STATS_FIELDS = ['total_ratings', 'average_rating'] + [rating_count_field(star) for star in RATING_STARS]
+
+
+def rating_stats_expressions(counts):
+    """
+    Build total_ratings and average_rating from per-star count expressions.
+    
+    Args:
+        counts: {star: expression of the number of ratings with that star}
+    """
+    total = sum(counts.values())
+    weighted = sum(star * count for star, count in counts.items())
+    return {
+        'total_ratings': total,
+        'average_rating': models.Case(
+            models.When(
+                GreaterThan(total, 0),
+                then=Cast(Cast(weighted, models.FloatField()) / total, models.DecimalField(max_digits=3, decimal_places=2)),
+            ),
+            default=models.Value(Decimal('0.00')),
+            output_field=models.DecimalField(max_digits=3, decimal_places=2),
+        ),
+    }
+
+
+def rebuild_rating_stats(queryset):
+    """
+    Recompute the rating histogram, total and average of resources from their
+    ratings, e.g. to repair the incrementally maintained columns.
+    
+    Returns:
+        Number of resources updated
+    """
+    counts = {
+        star: models.Count('ratings', filter=models.Q(ratings__rating=star))
+        for star in RATING_STARS
+    }
+    rows = queryset.order_by().values('pk').annotate(
+        **{rating_count_field(star): count for star, count in counts.items()}
+    )
+    model = queryset.model
+    resources = []
+    for row in rows:
+        resource = model(pk=row['pk'])
+        star_counts = {star: row[rating_count_field(star)] for star in RATING_STARS}
+        for star, count in star_counts.items():
+            setattr(resource, rating_count_field(star), count)
+        resource.total_ratings = sum(star_counts.values())
+        resource.average_rating = (
+            round(Decimal(sum(star * count for star, count in star_counts.items())) / resource.total_ratings, 2)
+            if resource.total_ratings else Decimal('0.00')
+        )
+        resources.append(resource)
+    model.objects.bulk_update(resources, RATING_STATS_FIELDS, batch_size=500)
+    return len(resources)
+
+
 class LibraryResource(models.Model):
     """Main model for library resources"""
     
@@ -136,6 +204,14 @@ class LibraryResource(models.Model):
     view_count = models.IntegerField(default=0)
     download_count = models.IntegerField(default=0)
     
+    # Rating histogram; with total_ratings and average_rating kept up to date
+    # incrementally by the ResourceRating signals (see apply_rating_change)
+    rating_1_count = models.PositiveIntegerField(default=0)
+    rating_2_count = models.PositiveIntegerField(default=0)
+    rating_3_count = models.PositiveIntegerField(default=0)
+    rating_4_count = models.PositiveIntegerField(default=0)
+    rating_5_count = models.PositiveIntegerField(default=0)
+    
     # Status & Publishing
     is_featured = models.BooleanField(default=False, help_text="Show in featured section")
     is_published = models.BooleanField(default=True, help_text="Make visible to users")
@@ -198,15 +274,124 @@ class LibraryResource(models.Model):
         self.save(update_fields=['download_count'])
         self.refresh_from_db()
     
+    @property
+    def rating_counts(self):
+        """{star: number of ratings} from the histogram columns"""
+        return {star: getattr(self, rating_count_field(star)) for star in RATING_STARS}
+    
     def update_rating(self):
-        """Recalculate average rating and total ratings"""
-        ratings = self.ratings.all()
-        self.total_ratings = ratings.count()
-        if self.total_ratings > 0:
-            self.average_rating = sum(r.rating for r in ratings) / self.total_ratings
-        else:
-            self.average_rating = 0.00
-        self.save(update_fields=['total_ratings', 'average_rating'])
+        """Recalculate the rating histogram, average and total from the ratings (one query)"""
+        rebuild_rating_stats(LibraryResource.objects.filter(pk=self.pk))
+        self.refresh_from_db(fields=RATING_STATS_FIELDS)
+    
+    @classmethod
+    def apply_rating_change(cls, resource_id, added=None, removed=None):
+        """
+        Atomically move one rating in or out of a resource's histogram and
+        recompute total and average from it, in a single UPDATE.
+        
+        Args:
+            resource_id: Resource the rating belongs to
+            added: Star value of a new rating (or the new value of a changed one)
+            removed: Star value of a deleted rating (or the old value of a changed one)
+        """
+        deltas = {star: (star == added) - (star == removed) for star in RATING_STARS}
+        counts = {star: models.F(rating_count_field(star)) + deltas[star] for star in RATING_STARS}
+        cls.objects.filter(pk=resource_id).update(
+            **{rating_count_field(star): counts[star] for star in RATING_STARS if deltas[star]},
+            **rating_stats_expressions(counts)
+        )
+
+
+class ResourceSearchTerm(models.Model):
+    """
+    One normalized term of a resource's search document (see library/search.py).
+    Together the rows form the inverted index of the catalog search.
+    """
+    resource = models.ForeignKey(
+        LibraryResource,
+        on_delete=models.CASCADE,
+        related_name='search_terms'
+    )
+    term = models.CharField(max_length=64)
+    # Sum of the weights of the fields the term appears in
+    weight = models.FloatField()
+
+    class Meta:
+        verbose_name = 'Resource Search Term'
+        verbose_name_plural = 'Resource Search Terms'
+        constraints = [
+            models.UniqueConstraint(fields=['resource', 'term'], name='unique_resource_search_term'),
+        ]
+        indexes = [
+            # Covers the ranking query, which reads only these columns
+            models.Index(fields=['term', 'resource', 'weight'], name='library_search_term_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.term} ({self.weight:g}) -> {self.resource_id}"
+
+
+class ResourceSimilarity(models.Model):
+    """
+    A resource similar to another, with its score. Built offline by
+    `build_library_recommendations` (see library/recommendations.py).
+    """
+    resource = models.ForeignKey(
+        LibraryResource,
+        on_delete=models.CASCADE,
+        related_name='similar_resources'
+    )
+    similar = models.ForeignKey(
+        LibraryResource,
+        on_delete=models.CASCADE,
+        related_name='similar_to'
+    )
+    score = models.FloatField()
+
+    class Meta:
+        verbose_name = 'Resource Similarity'
+        verbose_name_plural = 'Resource Similarities'
+        constraints = [
+            models.UniqueConstraint(fields=['resource', 'similar'], name='unique_resource_similarity'),
+        ]
+        indexes = [
+            models.Index(fields=['resource', '-score']),
+        ]
+
+    def __str__(self):
+        return f"{self.resource_id} ~ {self.similar_id} ({self.score:.3f})"
+
+
+class UserResourceRecommendation(models.Model):
+    """
+    A resource recommended to a user, with its score. Built offline by
+    `build_library_recommendations` (see library/recommendations.py).
+    """
+    user = models.ForeignKey(
+        'accounts.CustomUser',
+        on_delete=models.CASCADE,
+        related_name='library_recommendations'
+    )
+    resource = models.ForeignKey(
+        LibraryResource,
+        on_delete=models.CASCADE,
+        related_name='recommended_to'
+    )
+    score = models.FloatField()
+
+    class Meta:
+        verbose_name = 'User Resource Recommendation'
+        verbose_name_plural = 'User Resource Recommendations'
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'resource'], name='unique_user_resource_recommendation'),
+        ]
+        indexes = [
+            models.Index(fields=['user', '-score']),
+        ]
+
+    def __str__(self):
+        return f"{self.resource_id} for {self.user_id} ({self.score:.3f})"
 
 
 class ResourceRating(models.Model):
@@ -241,15 +426,10 @@ class ResourceRating(models.Model):
         return f"{self.student.full_name} - {self.resource.title} ({self.rating}★)"
     
     def save(self, *args, **kwargs):
-        """Update resource rating when saving"""
-        super().save(*args, **kwargs)
-        self.resource.update_rating()
-    
-    def delete(self, *args, **kwargs):
-        """Update resource rating when deleting"""
-        resource = self.resource
-        super().delete(*args, **kwargs)
-        resource.update_rating()
+        # The signals lock and read the stored row, write it and move the
+        # resource's histogram; one transaction keeps concurrent edits apart
+        with transaction.atomic():
+            super().save(*args, **kwargs)
 
 
 class ResourceBookmark(models.Model):
@@ -292,7 +472,8 @@ class ResourceView(models.Model):
     )
     ip_address = models.GenericIPAddressField(null=True, blank=True)
     
-    viewed_at = models.DateTimeField(auto_now_add=True)
+    # Set when the view happened; rows are written later in batches (see library/counters.py)
+    viewed_at = models.DateTimeField(default=timezone.now)
     
     class Meta:
         ordering = ('-viewed_at',)
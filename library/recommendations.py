@@ -0,0 +1,287 @@
+"""
+Precomputed library recommendations.
+
+`build_recommendations` (run nightly by the `build_library_recommendations`
+command) turns the catalog and its usage into two compact tables:
+
+- ResourceSimilarity: for every resource, the TOP_SIMILAR published resources
+  most like it. Content similarity is the cosine of idf-weighted subject, tag
+  and category features; co-view similarity counts signed-in users who viewed
+  both within COVIEW_WINDOW. The two are mixed with COVIEW_SHARE.
+- UserResourceRecommendation: for every user with recent views or completed
+  class enrollments, the TOP_RECOMMENDATIONS resources similar to what they
+  viewed or popular in the subjects of their classes, minus what they viewed.
+
+The `related` and `recommended` endpoints read these with one indexed join and
+fall back to the most popular resources for resources and users the last build
+did not cover (new resources, new users, or no build yet).
+"""
+import heapq
+import logging
+import math
+from collections import Counter, defaultdict
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.contrib.contenttypes.models import ContentType
+from django.db import transaction
+from django.utils import timezone
+
+from .models import LibraryResource, ResourceSimilarity, ResourceView, UserResourceRecommendation
+
+logger = logging.getLogger(__name__)
+
+TOP_SIMILAR = 20
+TOP_RECOMMENDATIONS = 20
+
+# Relative weight of each kind of shared feature (before idf)
+SUBJECT_WEIGHT = 3.0
+TAG_WEIGHT = 2.0
+CATEGORY_WEIGHT = 1.0
+
+# Share of co-views in the similarity score (the rest is content)
+COVIEW_SHARE = 0.4
+
+# Views older than this do not count
+COVIEW_WINDOW = timedelta(days=180)
+
+# Most recent distinct resources per user taken into account
+MAX_VIEWS_PER_USER = 50
+
+# A feature shared by more resources (a large category, a common tag) only
+# proposes its most popular resources as candidates; it still counts in scores
+MAX_CANDIDATES_PER_FEATURE = 100
+
+# Popular resources of a subject recommended to the students of that subject
+RESOURCES_PER_SUBJECT = 20
+SUBJECT_MATCH_SCORE = 0.5
+
+WRITE_BATCH_SIZE = 5000
+
+
+def _popularity(resource):
+    return resource['view_count'], resource['download_count']
+
+
+def load_features(resources):
+    """
+    Return {resource id: frozenset of (kind, id) features} for subjects, tags
+    and category.
+    """
+    features = defaultdict(set)
+    for resource_id, resource in resources.items():
+        if resource['category_id']:
+            features[resource_id].add(('category', resource['category_id']))
+
+    subject_links = LibraryResource.subjects.through.objects.values_list('libraryresource_id', 'subject_id')
+    for resource_id, subject_id in subject_links.iterator():
+        if resource_id in resources:
+            features[resource_id].add(('subject', subject_id))
+
+    tag_links = LibraryResource.tags.through.objects.filter(
+        content_type=ContentType.objects.get_for_model(LibraryResource)
+    ).values_list('object_id', 'tag_id')
+    for resource_id, tag_id in tag_links.iterator():
+        if resource_id in resources:
+            features[resource_id].add(('tag', tag_id))
+
+    return {resource_id: frozenset(feature_set) for resource_id, feature_set in features.items()}
+
+
+def load_recent_views(since):
+    """Return {user id: [resource id, ...]}, most recent first, distinct, at most MAX_VIEWS_PER_USER."""
+    views = defaultdict(list)
+    seen = defaultdict(set)
+    rows = ResourceView.objects.filter(
+        user__isnull=False, viewed_at__gte=since
+    ).order_by('user_id', '-viewed_at').values_list('user_id', 'resource_id')
+    for user_id, resource_id in rows.iterator(chunk_size=5000):
+        if resource_id in seen[user_id] or len(views[user_id]) >= MAX_VIEWS_PER_USER:
+            continue
+        seen[user_id].add(resource_id)
+        views[user_id].append(resource_id)
+    return views
+
+
+def load_enrolled_subjects():
+    """Return {user id: {subject id}} from completed class enrollments."""
+    from enrollments.models import ClassEnrollment, EnrollmentChoices
+
+    subjects = defaultdict(set)
+    rows = ClassEnrollment.objects.filter(
+        status=EnrollmentChoices.COMPLETED, class_enrolled__subject__isnull=False
+    ).values_list('student_id', 'class_enrolled__subject')
+    for user_id, subject_id in rows.iterator():
+        subjects[user_id].add(subject_id)
+    return subjects
+
+
+def compute_similarities(resources, features, views):
+    """
+    Return {resource id: [(similar resource id, score), ...]} best first, for
+    every resource, over published candidates.
+    """
+    published = {resource_id for resource_id, resource in resources.items() if resource['is_published']}
+
+    members = defaultdict(list)
+    for resource_id, feature_set in features.items():
+        if resource_id in published:
+            for feature in feature_set:
+                members[feature].append(resource_id)
+
+    total = len(resources) or 1
+    kind_weights = {'subject': SUBJECT_WEIGHT, 'tag': TAG_WEIGHT, 'category': CATEGORY_WEIGHT}
+    squared_weights = {
+        feature: (kind_weights[feature[0]] * math.log(1 + total / len(resource_ids))) ** 2
+        for feature, resource_ids in members.items()
+    }
+    # Features no published resource has only count towards the norm
+    norms = {
+        resource_id: math.sqrt(sum(
+            squared_weights.get(feature, (kind_weights[feature[0]] * math.log(1 + total)) ** 2)
+            for feature in feature_set
+        ))
+        for resource_id, feature_set in features.items()
+    }
+    candidates_of = {
+        feature: sorted(resource_ids, key=lambda resource_id: _popularity(resources[resource_id]), reverse=True)[
+            :MAX_CANDIDATES_PER_FEATURE
+        ]
+        for feature, resource_ids in members.items()
+    }
+
+    coviews = defaultdict(Counter)
+    viewers = Counter()
+    for resource_ids in views.values():
+        viewers.update(resource_ids)
+        for position, first in enumerate(resource_ids):
+            for second in resource_ids[position + 1:]:
+                coviews[first][second] += 1
+                coviews[second][first] += 1
+
+    similarities = {}
+    for resource_id in resources:
+        feature_set = features.get(resource_id, frozenset())
+        candidates = {
+            candidate
+            for feature in feature_set
+            for candidate in candidates_of.get(feature, ())
+        }
+        candidates.update(candidate for candidate in coviews.get(resource_id, ()) if candidate in published)
+        candidates.discard(resource_id)
+
+        scores = []
+        for candidate in candidates:
+            score = 0.0
+            shared = feature_set & features.get(candidate, frozenset())
+            if shared:
+                score += (1 - COVIEW_SHARE) * sum(squared_weights[feature] for feature in shared) / (
+                    norms[resource_id] * norms[candidate]
+                )
+            together = coviews.get(resource_id, {}).get(candidate)
+            if together:
+                score += COVIEW_SHARE * together / math.sqrt(viewers[resource_id] * viewers[candidate])
+            # Ties go to the more popular resource
+            scores.append((score, _popularity(resources[candidate]), candidate))
+
+        best = heapq.nlargest(TOP_SIMILAR, scores)
+        if best:
+            similarities[resource_id] = [(candidate, score) for score, _, candidate in best]
+    return similarities
+
+
+def compute_user_recommendations(resources, features, similarities, views, enrolled_subjects):
+    """Return {user id: [(resource id, score), ...]} best first."""
+    by_subject = defaultdict(list)
+    for resource_id, feature_set in features.items():
+        if resources[resource_id]['is_published']:
+            for kind, subject_id in feature_set:
+                if kind == 'subject':
+                    by_subject[subject_id].append(resource_id)
+    popular_by_subject = {
+        subject_id: sorted(resource_ids, key=lambda resource_id: _popularity(resources[resource_id]), reverse=True)[
+            :RESOURCES_PER_SUBJECT
+        ]
+        for subject_id, resource_ids in by_subject.items()
+    }
+
+    recommendations = {}
+    for user_id in set(views) | set(enrolled_subjects):
+        viewed = views.get(user_id, [])
+        scores = defaultdict(float)
+        for resource_id in viewed:
+            for similar_id, score in similarities.get(resource_id, ()):
+                scores[similar_id] += score
+        for subject_id in enrolled_subjects.get(user_id, ()):
+            resource_ids = popular_by_subject.get(subject_id, [])
+            for rank, resource_id in enumerate(resource_ids):
+                # More popular first, and never beyond a close similarity match
+                scores[resource_id] += SUBJECT_MATCH_SCORE * (1 - rank / (2 * len(resource_ids)))
+        for resource_id in viewed:
+            scores.pop(resource_id, None)
+
+        best = heapq.nlargest(
+            TOP_RECOMMENDATIONS,
+            scores.items(),
+            key=lambda item: (item[1], _popularity(resources[item[0]]), item[0]),
+        )
+        if best:
+            recommendations[user_id] = best
+    return recommendations
+
+
+def build_recommendations():
+    """
+    Rebuild ResourceSimilarity and UserResourceRecommendation from scratch.
+    Readers keep seeing the previous build until the new one is committed.
+
+    Returns:
+        (resources with similar resources, similarity rows, users, recommendation rows)
+    """
+    resources = {
+        row['id']: row
+        for row in LibraryResource.objects.values('id', 'category_id', 'is_published', 'view_count', 'download_count')
+    }
+    features = load_features(resources)
+    views = load_recent_views(timezone.now() - COVIEW_WINDOW)
+    views = {
+        user_id: [resource_id for resource_id in resource_ids if resource_id in resources]
+        for user_id, resource_ids in views.items()
+    }
+    enrolled_subjects = load_enrolled_subjects()
+
+    similarities = compute_similarities(resources, features, views)
+    recommendations = compute_user_recommendations(resources, features, similarities, views, enrolled_subjects)
+
+    similarity_rows = [
+        ResourceSimilarity(resource_id=resource_id, similar_id=similar_id, score=score)
+        for resource_id, similar in similarities.items()
+        for similar_id, score in similar
+    ]
+    recommendation_rows = [
+        UserResourceRecommendation(user_id=user_id, resource_id=resource_id, score=score)
+        for user_id, recommended in recommendations.items()
+        for resource_id, score in recommended
+    ]
+    with transaction.atomic():
+        # Users and resources deleted while computing
+        existing_users = set(get_user_model().objects.filter(id__in=recommendations).values_list('id', flat=True))
+        existing_resources = set(LibraryResource.objects.values_list('id', flat=True))
+        similarity_rows = [
+            row for row in similarity_rows
+            if row.resource_id in existing_resources and row.similar_id in existing_resources
+        ]
+        recommendation_rows = [
+            row for row in recommendation_rows
+            if row.user_id in existing_users and row.resource_id in existing_resources
+        ]
+        ResourceSimilarity.objects.all().delete()
+        ResourceSimilarity.objects.bulk_create(similarity_rows, batch_size=WRITE_BATCH_SIZE)
+        UserResourceRecommendation.objects.all().delete()
+        UserResourceRecommendation.objects.bulk_create(recommendation_rows, batch_size=WRITE_BATCH_SIZE)
+
+    logger.info(
+        f'Built library recommendations: {len(similarity_rows)} similarities for {len(similarities)} resources, '
+        f'{len(recommendation_rows)} recommendations for {len(recommendations)} users'
+    )
+    return len(similarities), len(similarity_rows), len(recommendations), len(recommendation_rows)
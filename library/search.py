@@ -0,0 +1,378 @@
+"""
+Ranked search over the library catalog.
+
+Every resource has a search document: title, author, description and publisher
+(in both scripts), category, subjects and tags, normalized like Quran verses
+(see quran.utils). `index_resources` stores the distinct terms of the document
+as ResourceSearchTerm rows, each weighted by the fields it appears in
+(FIELD_WEIGHTS), so a title match outranks a match in the description. Signals
+keep the rows in step with the resource, its tags and subjects and the names of
+its category, subjects and tags; `rebuild_library_search_index` rebuilds them.
+
+A query term matches an indexed term that is the same word, the word without
+its attached conjunction or article, its alef-less skeleton, a word it is the
+beginning of (so results appear while typing) or, when nothing else matches, a
+word one or two typos away. Every query term must match. A resource scores the
+sum, over query terms, of its best match: term weight times match weight.
+
+Query terms are expanded against the vocabulary of the index (its distinct
+terms), which each process keeps in memory like the Quran verse index and
+reloads when the index version changes; a search is then one grouped query
+on the term rows that filters and ranks. Catalog searches use it as a
+subquery (`annotate_search_rank`), so the database counts, orders and pages
+the matches; autocomplete fetches a limited list of hits.
+"""
+import bisect
+import threading
+from collections import defaultdict
+from typing import NamedTuple
+
+from django.db import transaction
+from django.db.models import Case, Exists, F, FloatField, Max, OuterRef, Subquery, Value, When
+
+from core.cache import bump_cache_version, get_cache_version
+from quran.utils import token_forms, tokenize
+
+from .models import ResourceSearchTerm
+
+INDEX_VERSION_KEY = 'library:search:version'
+
+# Weight of a term found in each part of the search document
+FIELD_WEIGHTS = {
+    'title': 5.0,
+    'title_arabic': 5.0,
+    'author': 3.0,
+    'author_arabic': 3.0,
+    'category': 2.0,
+    'subjects': 2.0,
+    'tags': 2.0,
+    'publisher': 1.0,
+    'description': 1.0,
+}
+
+# Resource fields whose change requires reindexing (tags and subjects signal separately)
+INDEXED_FIELDS = frozenset({
+    'title', 'title_arabic', 'author', 'author_arabic',
+    'description', 'publisher', 'category', 'category_id',
+})
+
+EXACT_MATCH_WEIGHT = 1.0
+
+# The word without its conjunction/article, or its alef-less skeleton
+FORM_MATCH_WEIGHT = 0.8
+
+# "bukh" -> "bukhari"
+PREFIX_MATCH_WEIGHT = 0.5
+
+# "bukhary" -> "bukhari"
+FUZZY_MATCH_WEIGHT = 0.3
+
+# Shortest query term completed as a prefix; the last term (being typed) is
+# completed earlier
+MIN_PREFIX_LENGTH = 3
+MIN_LAST_PREFIX_LENGTH = 2
+
+# Shortest query terms allowed one typo, and two typos
+MIN_FUZZY_LENGTH = 5
+MIN_TWO_TYPOS_LENGTH = 8
+
+# Fuzzy candidates must share this many leading letters with the query term
+FUZZY_PREFIX_LENGTH = 2
+
+# Index terms a query term expands to at most (shortest completions first)
+MAX_EXPANSIONS = 50
+
+MAX_QUERY_TERMS = 8
+MAX_TERM_LENGTH = ResourceSearchTerm._meta.get_field('term').max_length
+
+INDEX_BATCH_SIZE = 500
+
+
+class SearchHit(NamedTuple):
+    resource_id: int
+    score: float
+
+
+def resource_document(resource):
+    """
+    {document field: text} of a resource. Load category, subjects and tags with
+    select_related/prefetch_related when indexing many resources.
+    """
+    category = resource.category
+    return {
+        'title': resource.title,
+        'title_arabic': resource.title_arabic,
+        'author': resource.author,
+        'author_arabic': resource.author_arabic,
+        'category': f'{category.name} {category.name_arabic}' if category else '',
+        'subjects': ' '.join(subject.name for subject in resource.subjects.all()),
+        'tags': ' '.join(tag.name for tag in resource.tags.all()),
+        'publisher': resource.publisher,
+        'description': resource.description,
+    }
+
+
+def document_terms(document):
+    """Return {index term: weight} for a search document."""
+    weights = defaultdict(float)
+    for field_name, text in document.items():
+        terms = {
+            form[:MAX_TERM_LENGTH]
+            for token in tokenize(text)
+            for form in token_forms(token)
+        }
+        for term in terms:
+            weights[term] += FIELD_WEIGHTS[field_name]
+    return weights
+
+
+def index_resources(resources):
+    """
+    Replace the index rows of the given resources.
+
+    Returns:
+        Number of index rows written
+    """
+    resources = list(resources)
+    rows = [
+        ResourceSearchTerm(resource_id=resource.pk, term=term, weight=weight)
+        for resource in resources
+        for term, weight in document_terms(resource_document(resource)).items()
+    ]
+    with transaction.atomic():
+        ResourceSearchTerm.objects.filter(resource_id__in=[resource.pk for resource in resources]).delete()
+        ResourceSearchTerm.objects.bulk_create(rows, batch_size=1000)
+        # Now for this process, and at commit for the others
+        bump_index_version()
+        transaction.on_commit(bump_index_version)
+    return len(rows)
+
+
+def index_queryset(queryset, batch_size=INDEX_BATCH_SIZE):
+    """
+    Reindex every resource of a queryset, in batches.
+
+    Returns:
+        Number of resources indexed
+    """
+    queryset = queryset.select_related('category').prefetch_related('subjects', 'tags').order_by('pk')
+    indexed = 0
+    last_pk = 0
+    while True:
+        batch = list(queryset.filter(pk__gt=last_pk)[:batch_size])
+        if not batch:
+            return indexed
+        index_resources(batch)
+        indexed += len(batch)
+        last_pk = batch[-1].pk
+
+
+def within_edit_distance(first, second, limit):
+    """
+    Whether two words are at most limit edits apart, counting insertions,
+    deletions, substitutions and swaps of adjacent letters (optimal string
+    alignment distance).
+    """
+    if abs(len(first) - len(second)) > limit:
+        return False
+    before_previous = None
+    previous = list(range(len(second) + 1))
+    for i in range(1, len(first) + 1):
+        current = [i]
+        for j in range(1, len(second) + 1):
+            distance = min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (first[i - 1] != second[j - 1]),
+            )
+            if i > 1 and j > 1 and first[i - 1] == second[j - 2] and first[i - 2] == second[j - 1]:
+                distance = min(distance, before_previous[j - 2] + 1)
+            current.append(distance)
+        if min(current) > limit:
+            return False
+        before_previous, previous = previous, current
+    return previous[-1] <= limit
+
+
+def get_index_version():
+    """Current version of the search index; changes whenever resources are reindexed."""
+    return get_cache_version(INDEX_VERSION_KEY)
+
+
+def bump_index_version():
+    """Make every process reload its vocabulary of the index."""
+    return bump_cache_version(INDEX_VERSION_KEY)
+
+
+class Vocabulary:
+    """Sorted distinct terms of the index, for prefix and typo expansion."""
+
+    def __init__(self, terms, version=None):
+        self.version = version
+        self.terms = sorted(terms)
+        self.term_set = frozenset(self.terms)
+
+    @classmethod
+    def from_database(cls, version=None):
+        terms = ResourceSearchTerm.objects.order_by().values_list('term', flat=True).distinct()
+        return cls(terms.iterator(), version=version)
+
+    def __contains__(self, term):
+        return term in self.term_set
+
+    def starting_with(self, prefix):
+        """Terms beginning with prefix, in order."""
+        start = bisect.bisect_left(self.terms, prefix)
+        for term in self.terms[start:]:
+            if not term.startswith(prefix):
+                return
+            yield term
+
+    def completions(self, prefixes, exclude=()):
+        """Shortest MAX_EXPANSIONS terms extending any of the prefixes."""
+        terms = {
+            term
+            for prefix in prefixes
+            for term in self.starting_with(prefix)
+            if term != prefix and term not in exclude
+        }
+        return sorted(terms, key=lambda term: (len(term), term))[:MAX_EXPANSIONS]
+
+    def near(self, query_term):
+        """Terms within one typo of the query term (two for long terms)."""
+        limit = 2 if len(query_term) >= MIN_TWO_TYPOS_LENGTH else 1
+        return [
+            term for term in self.starting_with(query_term[:FUZZY_PREFIX_LENGTH])
+            if within_edit_distance(query_term, term, limit)
+        ]
+
+
+_vocabulary = None
+_vocabulary_lock = threading.Lock()
+
+
+def get_vocabulary():
+    """Return this process's vocabulary, reloading it if the index changed."""
+    global _vocabulary
+    version = get_index_version()
+    vocabulary = _vocabulary
+    if vocabulary is None or vocabulary.version != version:
+        with _vocabulary_lock:
+            if _vocabulary is None or _vocabulary.version != version:
+                _vocabulary = Vocabulary.from_database(version=version)
+            vocabulary = _vocabulary
+    return vocabulary
+
+
+def expand_query(query):
+    """
+    Tokenize a query and expand each term to the index terms it matches.
+
+    Returns:
+        List of {index term: match weight}, one per query term; empty if the
+        query has no terms or one of them matches nothing
+    """
+    query_terms = [term[:MAX_TERM_LENGTH] for term in dict.fromkeys(tokenize(query))][:MAX_QUERY_TERMS]
+    if not query_terms:
+        return []
+
+    vocabulary = get_vocabulary()
+    expansions = []
+    for position, query_term in enumerate(query_terms):
+        forms = token_forms(query_term)
+        # Whole-word forms are looked up even if the vocabulary is behind
+        matches = {form: FORM_MATCH_WEIGHT for form in forms[1:]}
+        matches[query_term] = EXACT_MATCH_WEIGHT
+
+        min_length = MIN_LAST_PREFIX_LENGTH if position == len(query_terms) - 1 else MIN_PREFIX_LENGTH
+        prefixes = [form for form in forms if len(form) >= min_length]
+        for term in vocabulary.completions(prefixes, exclude=matches):
+            matches[term] = PREFIX_MATCH_WEIGHT
+
+        if len(query_term) >= MIN_FUZZY_LENGTH and not any(term in vocabulary for term in matches):
+            for term in vocabulary.near(query_term):
+                matches[term] = FUZZY_MATCH_WEIGHT
+        expansions.append(matches)
+
+    return expansions
+
+
+def ranked_postings(expansions):
+    """
+    Group the index rows matching expanded query terms by resource.
+
+    Returns:
+        Values queryset of (resource_id, score) for the resources matching
+        every query term, unordered
+    """
+    postings = ResourceSearchTerm.objects.filter(
+        term__in={term for matches in expansions for term in matches}
+    )
+
+    # Per query term, the best weighted match among the resource's terms
+    term_scores = {}
+    for position, matches in enumerate(expansions):
+        terms_by_weight = defaultdict(list)
+        for term, match_weight in matches.items():
+            terms_by_weight[match_weight].append(term)
+        term_scores[f'match_{position}'] = Max(Case(
+            *[
+                When(term__in=terms, then=F('weight') * Value(match_weight))
+                for match_weight, terms in terms_by_weight.items()
+            ],
+            default=Value(0.0),
+            output_field=FloatField(),
+        ))
+
+    score = sum((F(name) for name in term_scores), Value(0.0))
+    return (
+        postings.values('resource_id')
+        .annotate(**term_scores)
+        .filter(**{f'{name}__gt': 0 for name in term_scores})
+        .annotate(score=score)
+        .order_by()
+    )
+
+
+def search_resources(query, queryset=None, limit=None):
+    """
+    Rank the resources matching every term of a query.
+
+    Args:
+        query: Search text, Arabic and/or Latin
+        queryset: Restrict results to these resources (e.g. published ones)
+        limit: Maximum number of hits (default: all of them)
+
+    Returns:
+        List of SearchHit, best match first
+    """
+    expansions = expand_query(query)
+    if not expansions:
+        return []
+
+    rows = ranked_postings(expansions)
+    if queryset is not None:
+        # Correlated on the primary key: the cost follows the matches, not the catalog size
+        rows = rows.filter(Exists(queryset.order_by().filter(pk=OuterRef('resource_id'))))
+    rows = rows.order_by('-score', '-resource_id').values_list('resource_id', 'score')
+    if limit is not None:
+        rows = rows[:limit]
+    return [SearchHit(resource_id, score) for resource_id, score in rows]
+
+
+def annotate_search_rank(queryset, query):
+    """
+    Restrict resources to those matching a query, annotated with `search_rank`.
+
+    Matching and ranking stay in the database, so the result can be counted,
+    ordered and paginated like any queryset without loading the hits.
+    """
+    expansions = expand_query(query)
+    if not expansions:
+        return queryset.none()
+
+    postings = ranked_postings(expansions)
+    rank = postings.filter(resource_id=OuterRef('pk')).values('score')
+    return queryset.filter(pk__in=postings.values('resource_id')).annotate(
+        search_rank=Subquery(rank, output_field=FloatField())
+    )
@@ -1,5 +1,6 @@
 from rest_framework import serializers
 from taggit.serializers import TagListSerializerField, TaggitSerializer
+from .categories import get_category_tree, get_resource_counts
 from .models import (
     LibraryCategory, LibraryResource, ResourceRating, 
     ResourceBookmark, ResourceView
@@ -13,22 +14,44 @@ from django.conf import settings
 class LibraryCategorySerializer(serializers.ModelSerializer):
     """Serializer for library categories"""
     subcategories = serializers.SerializerMethodField()
-    resource_count = serializers.IntegerField(read_only=True)
+    resource_count = serializers.SerializerMethodField()
+    total_resource_count = serializers.SerializerMethodField()
     
     class Meta:
         model = LibraryCategory
         fields = [
             'id', 'name', 'name_arabic', 'description', 'icon',
             'parent', 'display_order', 'subcategories', 'resource_count',
-            'created_at', 'updated_at'
+            'total_resource_count', 'created_at', 'updated_at'
         ]
         read_only_fields = ['created_at', 'updated_at']
     
+    def get_category_tree(self):
+        """The category tree, loaded once per serialization"""
+        if 'category_tree' not in self.context:
+            self.context['category_tree'] = get_category_tree()
+        return self.context['category_tree']
+    
+    def get_resource_counts(self, obj):
+        """(direct, subtree) published resource counts of a category"""
+        if 'resource_counts' not in self.context:
+            self.context['resource_counts'] = get_resource_counts(self.get_category_tree())
+        return self.context['resource_counts'].get(obj.pk, (0, 0))
+    
     def get_subcategories(self, obj):
-        """Get subcategories recursively"""
-        if obj.subcategories.exists():
-            return LibraryCategorySerializer(obj.subcategories.all(), many=True).data
+        """Get subcategories recursively, from the category tree"""
+        children = self.get_category_tree().children(obj.pk)
+        if children:
+            return LibraryCategorySerializer(children, many=True, context=self.context).data
         return []
+    
+    def get_resource_count(self, obj):
+        """Published resources filed directly under the category"""
+        return self.get_resource_counts(obj)[0]
+    
+    def get_total_resource_count(self, obj):
+        """Published resources of the category and its subcategories, at any depth"""
+        return self.get_resource_counts(obj)[1]
 
 
 class SimpleCategorySerializer(serializers.ModelSerializer):
@@ -118,24 +141,34 @@ class LibraryResourceListSerializer(TaggitSerializer, serializers.ModelSerialize
             'created_at', 'updated_at'
         ]
     
+    def get_personalized_user(self):
+        """
+        User the per-user fields are computed for; None for anonymous requests and
+        for shared payloads (context `personalized=False`, see library/shelves.py)
+        """
+        request = self.context.get('request')
+        if self.context.get('personalized', True) and request and request.user.is_authenticated:
+            return request.user
+        return None
+    
     def get_is_bookmarked(self, obj):
         """Check if current user has bookmarked this resource"""
-        request = self.context.get('request')
-        if request and request.user.is_authenticated:
+        user = self.get_personalized_user()
+        if user:
             return ResourceBookmark.objects.filter(
                 resource=obj, 
-                user=request.user
+                user=user
             ).exists()
         return False
     
     def get_user_rating(self, obj):
         """Get current user's rating for this resource"""
-        request = self.context.get('request')
-        if request and request.user.is_authenticated:
+        user = self.get_personalized_user()
+        if user:
             try:
                 rating = ResourceRating.objects.get(
                     resource=obj, 
-                    student=request.user
+                    student=user
                 )
                 return rating.rating
             except ResourceRating.DoesNotExist:
@@ -274,21 +307,12 @@ class LibraryResourceDetailSerializer(TaggitSerializer, serializers.ModelSeriali
         return None
     
     def get_rating_breakdown(self, obj):
-        """Get breakdown of ratings by star count"""
-        ratings = obj.ratings.all()
-        total = ratings.count()
-        if total == 0:
-            return {
-                '5': {'count': 0, 'percentage': 0},
-                '4': {'count': 0, 'percentage': 0},
-                '3': {'count': 0, 'percentage': 0},
-                '2': {'count': 0, 'percentage': 0},
-                '1': {'count': 0, 'percentage': 0},
-            }
-        
+        """Get breakdown of ratings by star count (from the resource's rating histogram)"""
+        counts = obj.rating_counts
+        total = sum(counts.values())
         breakdown = {}
         for star in range(5, 0, -1):
-            count = ratings.filter(rating=star).count()
+            count = counts[star]
             percentage = (count / total * 100) if total > 0 else 0
             breakdown[str(star)] = {
                 'count': count,
@@ -0,0 +1,90 @@
+"""
+Cached landing-page shelves of the library: featured, popular, recent and
+top rated resources.
+
+Each shelf is serialized once, as an anonymous visitor sees it, and kept in
+the cache under the current shelves version. Saving or deleting a resource,
+its tags, a category or a rating bumps the version; SHELF_CACHE_TIMEOUT bounds
+how stale the counters shown (views, downloads) can get, since those are
+flushed with plain UPDATEs. Absolute file URLs depend on the host, so the
+payload is cached per host.
+
+Signed-in visitors get the cached payload with `is_bookmarked` and
+`user_rating` filled in from one query over the resources on the shelf.
+"""
+from django.core.cache import cache
+from django.db.models import Exists, OuterRef, Subquery
+
+from core.cache import bump_cache_version, get_cache_version
+
+from .models import LibraryResource, ResourceBookmark, ResourceRating
+from .serializers import LibraryResourceListSerializer
+
+SHELVES_VERSION_KEY = 'library:shelves:version'
+
+SHELF_CACHE_TIMEOUT = 5 * 60
+
+SHELVES = {
+    'featured': lambda resources: resources.filter(is_featured=True).order_by('featured_order', '-created_at')[:12],
+    'popular': lambda resources: resources.order_by('-view_count', '-download_count')[:20],
+    'recent': lambda resources: resources.order_by('-created_at')[:20],
+    # At least 3 ratings
+    'top_rated': lambda resources: resources.filter(total_ratings__gte=3).order_by('-average_rating', '-total_ratings')[:20],
+}
+
+
+def get_shelves_version():
+    return get_cache_version(SHELVES_VERSION_KEY)
+
+
+def invalidate_shelves():
+    """Drop every cached shelf (they are rebuilt on the next request)."""
+    bump_cache_version(SHELVES_VERSION_KEY)
+
+
+def serialize_shelf(name, request, resources, personalized=True):
+    """Serialize a shelf from the database."""
+    queryset = SHELVES[name](resources.select_related('category').prefetch_related('tags'))
+    serializer = LibraryResourceListSerializer(
+        queryset, many=True, context={'request': request, 'personalized': personalized}
+    )
+    return serializer.data
+
+
+def get_shelf(name, request):
+    """
+    Return the serialized published resources of a shelf, from the cache when
+    possible, with the per-user fields of the requesting user.
+    """
+    key = f'library:shelf:{name}:v{get_shelves_version()}:{request.scheme}://{request.get_host()}'
+    items = cache.get(key)
+    if items is None:
+        items = [
+            dict(item)
+            for item in serialize_shelf(name, request, LibraryResource.objects.filter(is_published=True), False)
+        ]
+        cache.set(key, items, SHELF_CACHE_TIMEOUT)
+
+    if not request.user.is_authenticated or not items:
+        return items
+    return overlay_user_fields(items, request.user)
+
+
+def overlay_user_fields(items, user):
+    """Copy shelf items with `is_bookmarked` and `user_rating` of the user (one query)."""
+    user_fields = {
+        resource_id: (is_bookmarked, user_rating)
+        for resource_id, is_bookmarked, user_rating in LibraryResource.objects.filter(
+            id__in=[item['id'] for item in items]
+        ).annotate(
+            is_bookmarked=Exists(ResourceBookmark.objects.filter(resource=OuterRef('pk'), user=user)),
+            user_rating=Subquery(
+                ResourceRating.objects.filter(resource=OuterRef('pk'), student=user).values('rating')[:1]
+            ),
+        ).values_list('id', 'is_bookmarked', 'user_rating')
+    }
+    overlaid = []
+    for item in items:
+        is_bookmarked, user_rating = user_fields.get(item['id'], (False, None))
+        overlaid.append({**item, 'is_bookmarked': is_bookmarked, 'user_rating': user_rating})
+    return overlaid
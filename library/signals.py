@@ -1,19 +1,172 @@
 """
 Signals for library app
 """
-from django.db.models.signals import post_save, post_delete
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
 from django.dispatch import receiver
-from .models import ResourceRating
+from taggit.models import Tag, TaggedItem
+
+from subjects.models import Subject
+from .categories import CATEGORIZED_FIELDS, invalidate_category_tree
+from .models import LibraryCategory, LibraryResource, ResourceRating
+from .search import INDEXED_FIELDS, index_resources
+from .shelves import invalidate_shelves
+from .tasks import reindex_library_resources
+
+
+def lock_stored_rating(instance):
+    """
+    Lock the stored row of a rating and remember its (resource id, rating),
+    or None if there is no such row (a new rating, or one another request
+    already deleted). Runs inside the transaction of the save or delete, so
+    concurrent writes of the same rating take turns and each sees what the
+    previous one stored.
+    """
+    instance._stored_rating = None
+    if instance.pk is not None:
+        instance._stored_rating = ResourceRating.objects.select_for_update().filter(
+            pk=instance.pk
+        ).values_list('resource_id', 'rating').first()
+
+
+@receiver(pre_save, sender=ResourceRating)
+def lock_rating_before_save(sender, instance, **kwargs):
+    """The histogram update needs the values being replaced (ResourceRating.save is atomic)"""
+    lock_stored_rating(instance)
+
+
+@receiver(pre_delete, sender=ResourceRating)
+def lock_rating_before_delete(sender, instance, **kwargs):
+    """The histogram update needs the values being removed (deletes run in a transaction)"""
+    lock_stored_rating(instance)
 
 
 @receiver(post_save, sender=ResourceRating)
-def update_resource_rating_on_save(sender, instance, **kwargs):
-    """Update resource average rating when a rating is saved"""
-    instance.resource.update_rating()
+def update_resource_rating_on_save(sender, instance, created, **kwargs):
+    """Move the rating into the resource's rating histogram when a rating is saved"""
+    previous = getattr(instance, '_stored_rating', None)
+    if created or previous is None:
+        LibraryResource.apply_rating_change(instance.resource_id, added=instance.rating)
+        return
+    previous_resource_id, previous_rating = previous
+    if previous_resource_id != instance.resource_id:
+        LibraryResource.apply_rating_change(previous_resource_id, removed=previous_rating)
+        LibraryResource.apply_rating_change(instance.resource_id, added=instance.rating)
+    elif previous_rating != instance.rating:
+        LibraryResource.apply_rating_change(instance.resource_id, added=instance.rating, removed=previous_rating)
 
 
 @receiver(post_delete, sender=ResourceRating)
 def update_resource_rating_on_delete(sender, instance, **kwargs):
-    """Update resource average rating when a rating is deleted"""
-    instance.resource.update_rating()
+    """Take the rating out of the resource's rating histogram when a rating is deleted"""
+    # Django sends post_delete even if another request deleted the row first;
+    # then there was no stored row to lock and nothing to take out
+    stored = getattr(instance, '_stored_rating', None)
+    if stored is None:
+        return
+    resource_id, rating = stored
+    LibraryResource.apply_rating_change(resource_id, removed=rating)
+
+
+@receiver(post_save, sender=LibraryResource)
+def index_resource_on_save(sender, instance, raw=False, update_fields=None, **kwargs):
+    """Reindex a resource for search when a searched field may have changed"""
+    if raw or (update_fields is not None and not INDEXED_FIELDS.intersection(update_fields)):
+        return
+    index_resources([instance])
+
+
+@receiver(m2m_changed, sender=LibraryResource.subjects.through)
+def index_resource_on_subjects_change(sender, instance, action, reverse, pk_set, **kwargs):
+    """Reindex resources whose subjects changed"""
+    if action == 'pre_clear' and reverse:
+        # The cleared resources are unknown after the fact
+        instance._cleared_resource_ids = list(instance.library_resources.values_list('pk', flat=True))
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        index_resources([instance])
+        return
+    if action == 'post_clear':
+        pk_set = getattr(instance, '_cleared_resource_ids', [])
+    index_resources(LibraryResource.objects.filter(pk__in=pk_set).select_related('category'))
+
+
+@receiver(m2m_changed, sender=TaggedItem)
+def index_resource_on_tags_change(sender, instance, action, **kwargs):
+    """Reindex a resource whose tags changed"""
+    if isinstance(instance, LibraryResource) and action in ('post_add', 'post_remove', 'post_clear'):
+        index_resources([instance])
+
+
+@receiver(post_save, sender=LibraryCategory)
+def reindex_category_resources(sender, instance, created, raw=False, **kwargs):
+    """The category name is part of its resources' search documents"""
+    if not created and not raw:
+        reindex_library_resources.enqueue(category_id=instance.pk)
+
+
+@receiver(post_save, sender=Subject)
+def reindex_subject_resources(sender, instance, created, raw=False, **kwargs):
+    """Subject names are part of the search documents"""
+    if not created and not raw:
+        reindex_library_resources.enqueue(subject_id=instance.pk)
+
+
+@receiver(post_save, sender=Tag)
+def reindex_tag_resources(sender, instance, created, raw=False, **kwargs):
+    """Tag names are part of the search documents"""
+    if not created and not raw:
+        reindex_library_resources.enqueue(tag_id=instance.pk)
+
+
+@receiver(post_save, sender=LibraryResource)
+@receiver(post_delete, sender=LibraryResource)
+@receiver(post_save, sender=LibraryCategory)
+@receiver(post_delete, sender=LibraryCategory)
+@receiver(post_save, sender=ResourceRating)
+@receiver(post_delete, sender=ResourceRating)
+def invalidate_shelves_on_change(sender, raw=False, **kwargs):
+    """Cached shelves show resources with their category and ratings"""
+    if not raw:
+        # Now, and again at commit so a shelf rebuilt from uncommitted data is dropped
+        invalidate_shelves()
+        transaction.on_commit(invalidate_shelves)
+
+
+@receiver(m2m_changed, sender=TaggedItem)
+def invalidate_shelves_on_tags_change(sender, instance, action, **kwargs):
+    """Cached shelves show resource tags"""
+    if isinstance(instance, LibraryResource) and action in ('post_add', 'post_remove', 'post_clear'):
+        invalidate_shelves()
+        transaction.on_commit(invalidate_shelves)
+
+
+def _invalidate_category_tree():
+    # Now, and again at commit so a tree or counts loaded from uncommitted data are dropped
+    invalidate_category_tree()
+    transaction.on_commit(invalidate_category_tree)
+
+
+@receiver(post_save, sender=LibraryCategory)
+@receiver(post_delete, sender=LibraryCategory)
+def invalidate_category_tree_on_change(sender, raw=False, **kwargs):
+    """Reload the category tree when a category is saved or deleted"""
+    if not raw:
+        _invalidate_category_tree()
+
+
+@receiver(post_save, sender=LibraryResource)
+@receiver(post_delete, sender=LibraryResource)
+def recount_categories_on_resource_change(sender, raw=False, update_fields=None, **kwargs):
+    """Category resource counts change when a resource is added, moved, (un)published or deleted"""
+    if raw or (update_fields is not None and not CATEGORIZED_FIELDS.intersection(update_fields)):
+        return
+    _invalidate_category_tree()
+
 
+@receiver(m2m_changed, sender=LibraryResource.subcategories.through)
+def recount_categories_on_subcategories_change(sender, action, **kwargs):
+    """Resources are counted in their subcategories too"""
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        _invalidate_category_tree()
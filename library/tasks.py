@@ -0,0 +1,21 @@
+"""
+Background tasks for the library.
+"""
+from core.tasks import background_task
+
+from .models import LibraryResource
+
+
+@background_task
+def reindex_library_resources(category_id=None, subject_id=None, tag_id=None):
+    """Reindex the resources of a renamed category, subject or tag."""
+    from .search import index_queryset
+
+    resources = LibraryResource.objects.none()
+    if category_id is not None:
+        resources = LibraryResource.objects.filter(category_id=category_id)
+    elif subject_id is not None:
+        resources = LibraryResource.objects.filter(subjects__id=subject_id)
+    elif tag_id is not None:
+        resources = LibraryResource.objects.filter(tags__id=tag_id)
+    index_queryset(resources)
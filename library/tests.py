@@ -1,6 +1,26 @@
-from django.test import TestCase
+import shutil
+import tempfile
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
 from django.contrib.auth import get_user_model
-from .models import LibraryCategory, LibraryResource, ResourceRating
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from core.tasks import run_pending_tasks
+from subjects.models import Subject
+from .counters import flush_counters, record_download
+from .models import (
+    LibraryCategory, LibraryResource, ResourceBookmark, ResourceRating, ResourceSearchTerm,
+    ResourceSimilarity, ResourceView, UserResourceRecommendation
+)
+from .recommendations import build_recommendations, load_features
+from .search import search_resources, within_edit_distance
 
 User = get_user_model()
 
@@ -142,3 +162,689 @@ class ResourceRatingTestCase(TestCase):
         self.assertEqual(self.resource.total_ratings, 2)
         self.assertEqual(self.resource.average_rating, 4.00)  # (5+3)/2
 
+
+
+@override_settings(PROTECTED_MEDIA_BACKEND='django')
+class LibraryFileDeliveryTestCase(TestCase):
+    """PDFs are served with Range, If-Range and conditional GET support"""
+    
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        
+        self.user = User.objects.create_user(
+            email='reader@test.com',
+            password='testpass123',
+            full_name='Reader',
+            role='student'
+        )
+        self.content = bytes(range(256)) * 40
+        self.resource = LibraryResource.objects.create(
+            title='Riyad as-Salihin',
+            pdf_file=SimpleUploadedFile('riyad.pdf', self.content, content_type='application/pdf')
+        )
+        self.url = f'/api/library/resource/{self.resource.pk}/file/'
+        self.client = APIClient()
+    
+    def read(self, response):
+        return b''.join(response.streaming_content)
+    
+    def test_full_file(self):
+        """Test that the whole file is served with validators"""
+        self.client.force_authenticate(user=self.user)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.read(response), self.content)
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        self.assertIn('ETag', response)
+        self.assertIn('private', response['Cache-Control'])
+    
+    def test_range_requests(self):
+        """Test byte, open-ended, suffix and unsatisfiable ranges"""
+        self.client.force_authenticate(user=self.user)
+        size = len(self.content)
+        
+        response = self.client.get(self.url, HTTP_RANGE='bytes=100-199')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], f'bytes 100-199/{size}')
+        self.assertEqual(response['Content-Length'], '100')
+        self.assertEqual(self.read(response), self.content[100:200])
+        
+        response = self.client.get(self.url, HTTP_RANGE=f'bytes={size - 10}-')
+        self.assertEqual(self.read(response), self.content[-10:])
+        
+        response = self.client.get(self.url, HTTP_RANGE='bytes=-5')
+        self.assertEqual(self.read(response), self.content[-5:])
+        
+        response = self.client.get(self.url, HTTP_RANGE=f'bytes={size}-')
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], f'bytes */{size}')
+    
+    def test_conditional_requests(self):
+        """Test If-None-Match and If-Range"""
+        self.client.force_authenticate(user=self.user)
+        etag = self.client.get(self.url)['ETag']
+        
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        
+        response = self.client.get(self.url, HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE=etag)
+        self.assertEqual(response.status_code, 206)
+        
+        # A stale If-Range gets the whole (changed) file instead of a mismatched piece
+        response = self.client.get(self.url, HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE='"stale"')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.read(response), self.content)
+    
+    def test_signed_link_from_download(self):
+        """Test that download returns a signed link usable without the JWT"""
+        self.client.force_authenticate(user=self.user)
+        pdf_url = self.client.post(f'/api/library/resource/{self.resource.pk}/download/').data['pdf_url']
+        self.assertIn('token=', pdf_url)
+        
+        anonymous = APIClient()
+        self.assertEqual(anonymous.get(self.url).status_code, 401)
+        response = anonymous.get(pdf_url, HTTP_RANGE='bytes=0-9')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(self.read(response), self.content[:10])
+        
+        # A token only opens the file it was issued for
+        other = LibraryResource.objects.create(
+            title='Other',
+            pdf_file=SimpleUploadedFile('other.pdf', b'%PDF-other', content_type='application/pdf')
+        )
+        token = pdf_url.split('token=')[1]
+        response = anonymous.get(f'/api/library/resource/{other.pk}/file/?token={token}')
+        self.assertEqual(response.status_code, 401)
+    
+    @override_settings(PROTECTED_MEDIA_BACKEND='nginx', PROTECTED_MEDIA_INTERNAL_URL='/protected-media/')
+    def test_nginx_offload(self):
+        """Test that with nginx the file is handed off with X-Accel-Redirect"""
+        self.client.force_authenticate(user=self.user)
+        response = self.client.get(self.url, {'download': '1'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['X-Accel-Redirect'], f'/protected-media/{self.resource.pdf_file.name}')
+        self.assertTrue(response['Content-Disposition'].startswith('attachment'))
+        self.assertEqual(response.content, b'')
+
+
+@override_settings(LIBRARY_COUNTERS_BUFFERED=True)
+class LibraryCounterTestCase(TestCase):
+    """Views and downloads are buffered and flushed to the database in batches"""
+    
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.user = User.objects.create_user(
+            email='reader@test.com',
+            password='testpass123',
+            full_name='Reader',
+            role='student'
+        )
+        self.resources = [LibraryResource.objects.create(title=f'Book {i}') for i in range(3)]
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+    
+    def view(self, resource, times=1):
+        for _ in range(times):
+            response = self.client.get(f'/api/library/resource/{resource.pk}/')
+            self.assertEqual(response.status_code, 200)
+    
+    def test_views_are_not_written_on_request(self):
+        """Test that retrieving a resource does not write to the database"""
+        resource = self.resources[0]
+        with CaptureQueriesContext(connection) as ctx:
+            self.view(resource)
+        self.assertFalse([q for q in ctx.captured_queries if not q['sql'].lstrip().upper().startswith('SELECT')])
+        resource.refresh_from_db()
+        self.assertEqual(resource.view_count, 0)
+        self.assertFalse(ResourceView.objects.exists())
+    
+    def test_flush_applies_counts_in_batches(self):
+        """Test that one flush applies all buffered views and downloads"""
+        self.view(self.resources[0], times=3)
+        self.view(self.resources[1], times=2)
+        record_download(self.resources[2].pk)
+        
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(flush_counters(include_current=True), (3, 5))
+        # Resources, users, then the bulk insert and the UPDATE ... CASE in one transaction
+        writes = [q for q in ctx.captured_queries if q['sql'].lstrip().upper().startswith(('INSERT', 'UPDATE'))]
+        self.assertEqual(len(writes), 2)
+        
+        counts = {r.pk: (r.view_count, r.download_count) for r in LibraryResource.objects.all()}
+        self.assertEqual(counts[self.resources[0].pk], (3, 0))
+        self.assertEqual(counts[self.resources[1].pk], (2, 0))
+        self.assertEqual(counts[self.resources[2].pk], (0, 1))
+        self.assertEqual(ResourceView.objects.filter(user=self.user).count(), 5)
+        
+        # Flushed events are not applied twice
+        self.assertEqual(flush_counters(include_current=True), (0, 0))
+        self.assertEqual(LibraryResource.objects.get(pk=self.resources[0].pk).view_count, 3)
+    
+    def test_open_bucket_is_left_for_late_writers(self):
+        """Test that a periodic flush only takes closed buckets"""
+        start = 1_000_000
+        with mock.patch('library.counters.time.time', return_value=start):
+            self.view(self.resources[0])
+            self.assertEqual(flush_counters(), (0, 0))
+        with mock.patch('library.counters.time.time', return_value=start + 10):
+            self.assertEqual(flush_counters(), (1, 1))
+        self.assertEqual(LibraryResource.objects.get(pk=self.resources[0].pk).view_count, 1)
+    
+    def test_events_of_deleted_resources_are_dropped(self):
+        """Test that a resource deleted before the flush does not break it"""
+        self.view(self.resources[0])
+        self.view(self.resources[1])
+        self.resources[0].delete()
+        self.assertEqual(flush_counters(include_current=True), (1, 1))
+    
+    @override_settings(LIBRARY_COUNTERS_BUFFERED=False)
+    def test_unbuffered_writes_through(self):
+        """Test that without buffering every view is written immediately"""
+        self.view(self.resources[0])
+        self.assertEqual(LibraryResource.objects.get(pk=self.resources[0].pk).view_count, 1)
+        self.assertEqual(ResourceView.objects.count(), 1)
+
+
+class RatingHistogramTestCase(TestCase):
+    """Rating totals, averages and breakdowns are maintained incrementally"""
+    
+    def setUp(self):
+        self.students = [
+            User.objects.create_user(
+                email=f'student{i}@test.com',
+                password='testpass123',
+                full_name=f'Student {i}',
+                role='student'
+            )
+            for i in range(4)
+        ]
+        self.resource = LibraryResource.objects.create(title='Al-Adab al-Mufrad')
+    
+    def rate(self, student, rating):
+        return ResourceRating.objects.create(resource=self.resource, student=student, rating=rating)
+    
+    def assertStats(self, counts, average):
+        self.resource.refresh_from_db()
+        self.assertEqual(self.resource.rating_counts, counts)
+        self.assertEqual(self.resource.total_ratings, sum(counts.values()))
+        self.assertEqual(self.resource.average_rating, Decimal(average))
+    
+    def test_create_update_delete(self):
+        """Test that every rating change moves exactly one histogram entry"""
+        ratings = [self.rate(student, rating) for student, rating in zip(self.students, [5, 4, 4, 1])]
+        self.assertStats({1: 1, 2: 0, 3: 0, 4: 2, 5: 1}, '3.50')
+        
+        ratings[3].rating = 3
+        ratings[3].save()
+        self.assertStats({1: 0, 2: 0, 3: 1, 4: 2, 5: 1}, '4.00')
+        
+        # Saving without a change leaves the histogram alone
+        rating = ResourceRating.objects.get(pk=ratings[0].pk)
+        rating.review = 'Beneficial'
+        rating.save()
+        self.assertStats({1: 0, 2: 0, 3: 1, 4: 2, 5: 1}, '4.00')
+        
+        rating.delete()
+        self.assertStats({1: 0, 2: 0, 3: 1, 4: 2, 5: 0}, '3.67')
+        
+        ResourceRating.objects.filter(resource=self.resource).delete()
+        self.assertStats({1: 0, 2: 0, 3: 0, 4: 0, 5: 0}, '0.00')
+    
+    def test_partially_loaded_ratings_are_not_counted_twice(self):
+        """Test that saves of deferred or explicitly keyed ratings move the stored value"""
+        ratings = [self.rate(student, rating) for student, rating in zip(self.students, [5, 4])]
+        
+        deferred = ResourceRating.objects.only('id', 'review').get(pk=ratings[0].pk)
+        deferred.review = 'Beneficial'
+        deferred.save()
+        self.assertStats({1: 0, 2: 0, 3: 0, 4: 1, 5: 1}, '4.50')
+        
+        ResourceRating(
+            pk=ratings[1].pk, resource=self.resource, student=self.students[1], rating=2
+        ).save()
+        self.assertStats({1: 0, 2: 1, 3: 0, 4: 0, 5: 1}, '3.50')
+        
+        ResourceRating.objects.defer('rating').get(pk=ratings[0].pk).delete()
+        self.assertStats({1: 0, 2: 1, 3: 0, 4: 0, 5: 0}, '2.00')
+    
+    def test_stale_instances_do_not_move_the_histogram_twice(self):
+        """Test that a repeated edit or delete through an outdated instance is not counted again"""
+        rating = self.rate(self.students[0], 3)
+        first = ResourceRating.objects.get(pk=rating.pk)
+        second = ResourceRating.objects.get(pk=rating.pk)
+        
+        first.rating = 5
+        first.save()
+        second.rating = 5
+        second.save()
+        self.assertStats({1: 0, 2: 0, 3: 0, 4: 0, 5: 1}, '5.00')
+        
+        first.delete()
+        second.delete()
+        self.assertStats({1: 0, 2: 0, 3: 0, 4: 0, 5: 0}, '0.00')
+    
+    def test_rating_change_is_one_update(self):
+        """Test that a rating save issues a single UPDATE on the resource"""
+        rating = self.rate(self.students[0], 2)
+        rating.rating = 5
+        with CaptureQueriesContext(connection) as ctx:
+            rating.save()
+        resource_updates = [
+            q for q in ctx.captured_queries
+            if q['sql'].startswith('UPDATE') and 'library_libraryresource' in q['sql']
+        ]
+        self.assertEqual(len(resource_updates), 1)
+    
+    def test_breakdown_does_not_count_ratings(self):
+        """Test that the detail view reads the breakdown from the resource row"""
+        for student, rating in zip(self.students, [5, 5, 4, 2]):
+            self.rate(student, rating)
+        
+        with CaptureQueriesContext(connection) as ctx:
+            response = APIClient().get(f'/api/library/resource/{self.resource.pk}/')
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse([
+            q for q in ctx.captured_queries
+            if 'COUNT(' in q['sql'] and 'library_resourcerating' in q['sql']
+        ])
+        self.assertEqual(response.data['rating_breakdown']['5'], {'count': 2, 'percentage': 50.0})
+        self.assertEqual(response.data['rating_breakdown']['3'], {'count': 0, 'percentage': 0})
+        self.assertEqual(response.data['total_ratings'], 4)
+    
+    def test_rebuild_command(self):
+        """Test that the rebuild command repairs drifted columns"""
+        for student, rating in zip(self.students, [5, 3, 3]):
+            self.rate(student, rating)
+        LibraryResource.objects.filter(pk=self.resource.pk).update(
+            rating_5_count=9, total_ratings=0, average_rating=0
+        )
+        
+        call_command('rebuild_library_ratings', stdout=StringIO())
+        self.assertStats({1: 0, 2: 0, 3: 2, 4: 0, 5: 1}, '3.67')
+
+
+class LibrarySearchTestCase(TestCase):
+    """Ranked catalog search through the search index"""
+    
+    def setUp(self):
+        self.client = APIClient()
+        self.hadith = LibraryCategory.objects.create(name='Hadith', name_arabic='حديث')
+        self.bukhari = LibraryResource.objects.create(
+            title='Sahih al-Bukhari',
+            title_arabic='صحيح البخاري',
+            author='Imam al-Bukhari',
+            category=self.hadith,
+        )
+        self.commentary = LibraryResource.objects.create(
+            title='Fath al-Bari',
+            author='Ibn Hajar al-Asqalani',
+            description='The classical commentary on the collection of Bukhari.',
+            category=self.hadith,
+        )
+        self.tafsir = LibraryResource.objects.create(title='Tafsir Ibn Kathir', author='Ibn Kathir')
+    
+    def search(self, query, **params):
+        response = self.client.get('/api/library/resource/', {'search': query, **params})
+        self.assertEqual(response.status_code, 200)
+        return [item['id'] for item in response.data]
+    
+    def test_ranking(self):
+        """Test that title and author matches outrank description matches"""
+        self.assertEqual(self.search('bukhari'), [self.bukhari.id, self.commentary.id])
+        self.assertEqual(self.search('ibn'), [self.tafsir.id, self.commentary.id])
+    
+    def test_blank_search_lists_everything(self):
+        """Test that a whitespace-only query is ignored instead of ordering by a missing rank"""
+        self.assertEqual(self.search(' '), [self.tafsir.id, self.commentary.id, self.bukhari.id])
+    
+    def test_search_results_are_not_capped(self):
+        """Test that every match is ranked and can be paged through"""
+        LibraryResource.objects.bulk_create([
+            LibraryResource(title=f'Tafsir volume {number}') for number in range(30)
+        ])
+        call_command('rebuild_library_search_index', stdout=StringIO())
+        
+        response = self.client.get('/api/library/resource/', {'search': 'tafsir', 'page_size': 10, 'page': 4})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['count'], 31)
+        self.assertEqual(len(response.data['results']), 1)
+    
+    def test_every_term_must_match(self):
+        """Test that all query terms must match"""
+        self.assertEqual(self.search('ibn kathir'), [self.tafsir.id])
+        self.assertEqual(self.search('bukhari kathir'), [])
+    
+    def test_arabic_normalization(self):
+        """Test that Arabic queries match without the article and with letter variants"""
+        self.assertEqual(self.search('البخارى'), [self.bukhari.id])
+        self.assertEqual(self.search('بخاري'), [self.bukhari.id])
+    
+    def test_prefix_and_typo(self):
+        """Test that partial words and small typos still match"""
+        self.assertEqual(self.search('sahih bukh'), [self.bukhari.id])
+        self.assertEqual(self.search('bukhary'), [self.bukhari.id, self.commentary.id])
+        self.assertEqual(self.search('asqlani'), [self.commentary.id])
+        self.assertTrue(within_edit_distance('bukahri', 'bukhari', 1))
+        self.assertFalse(within_edit_distance('tafsir', 'fiqh', 2))
+    
+    def test_category_tags_and_subjects(self):
+        """Test that the index follows tags, subjects and category renames"""
+        self.tafsir.tags.add('exegesis')
+        self.assertEqual(self.search('exegesis'), [self.tafsir.id])
+        
+        subject = Subject.objects.create(name='Quranic Sciences')
+        self.tafsir.subjects.add(subject)
+        self.assertEqual(self.search('quranic'), [self.tafsir.id])
+        self.tafsir.subjects.clear()
+        self.assertEqual(self.search('quranic'), [])
+        
+        self.hadith.name = 'Prophetic Traditions'
+        self.hadith.save()
+        run_pending_tasks()
+        # Equal rank, newest first
+        self.assertEqual(self.search('prophetic'), [self.commentary.id, self.bukhari.id])
+    
+    def test_counter_updates_do_not_reindex(self):
+        """Test that saves of unsearched fields leave the index alone"""
+        with CaptureQueriesContext(connection) as queries:
+            self.bukhari.increment_view_count()
+        self.assertFalse(any('library_resourcesearchterm' in query['sql'] for query in queries.captured_queries))
+    
+    def test_search_respects_filters_and_visibility(self):
+        """Test that search combines with other filters and hides unpublished resources"""
+        self.assertEqual(self.search('ibn', category=self.hadith.id), [self.commentary.id])
+        self.commentary.is_published = False
+        self.commentary.save()
+        self.assertEqual(self.search('bukhari'), [self.bukhari.id])
+        self.assertEqual(
+            [hit.resource_id for hit in search_resources('bukhari')],
+            [self.bukhari.id, self.commentary.id]
+        )
+    
+    def test_autocomplete(self):
+        """Test suggestions while typing"""
+        response = self.client.get('/api/library/resource/autocomplete/', {'q': 'sahih bu'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([item['id'] for item in response.data], [self.bukhari.id])
+        self.assertEqual(response.data[0]['title_arabic'], 'صحيح البخاري')
+        self.assertEqual(self.client.get('/api/library/resource/autocomplete/', {'q': ''}).data, [])
+    
+    def test_rebuild_command(self):
+        """Test that the index can be rebuilt from scratch"""
+        ResourceSearchTerm.objects.all().delete()
+        self.assertEqual(self.search('bukhari'), [])
+        call_command('rebuild_library_search_index', stdout=StringIO())
+        self.assertEqual(self.search('bukhari'), [self.bukhari.id, self.commentary.id])
+
+
+class LibraryRecommendationTestCase(TestCase):
+    """Precomputed related resources and recommendations"""
+    
+    def setUp(self):
+        self.client = APIClient()
+        self.student = User.objects.create_user(
+            email='student@test.com',
+            password='testpass123',
+            full_name='Student',
+            role='student'
+        )
+        self.fiqh = Subject.objects.create(name='Fiqh')
+        self.hadith = LibraryCategory.objects.create(name='Hadith')
+        
+        self.bulugh = LibraryResource.objects.create(title='Bulugh al-Maram', category=self.hadith, view_count=5)
+        self.bulugh.subjects.add(self.fiqh)
+        self.bulugh.tags.add('ahkam')
+        self.umdah = LibraryResource.objects.create(title='Umdat al-Ahkam', category=self.hadith, view_count=1)
+        self.umdah.subjects.add(self.fiqh)
+        self.umdah.tags.add('ahkam')
+        self.riyadh = LibraryResource.objects.create(title='Riyadh as-Salihin', category=self.hadith, view_count=3)
+        self.seerah = LibraryResource.objects.create(title='The Sealed Nectar', view_count=50)
+    
+    def related(self, resource):
+        response = self.client.get(f'/api/library/resource/{resource.pk}/related/')
+        self.assertEqual(response.status_code, 200)
+        return [item['id'] for item in response.data]
+    
+    def recommended(self):
+        self.client.force_authenticate(self.student)
+        response = self.client.get('/api/library/resource/recommended/')
+        self.assertEqual(response.status_code, 200)
+        return [item['id'] for item in response.data]
+    
+    def test_related_falls_back_to_popular(self):
+        """Test that popular resources are shown before the first build"""
+        self.assertEqual(self.related(self.bulugh), [self.seerah.id, self.riyadh.id, self.umdah.id])
+        self.assertEqual(self.recommended()[0], self.seerah.id)
+    
+    def test_related_by_content(self):
+        """Test that shared subjects and tags outrank a shared category"""
+        build_recommendations()
+        self.assertEqual(self.related(self.bulugh), [self.umdah.id, self.riyadh.id])
+        self.assertEqual(self.related(self.riyadh), [self.bulugh.id, self.umdah.id])
+        # Nothing in common with anything: popular resources
+        self.assertEqual(self.related(self.seerah)[0], self.bulugh.id)
+    
+    def test_coviews(self):
+        """Test that resources viewed by the same users become related"""
+        for i in range(3):
+            viewer = User.objects.create_user(
+                email=f'viewer{i}@test.com', password='testpass123', full_name='Viewer', role='student'
+            )
+            ResourceView.objects.create(resource=self.seerah, user=viewer)
+            ResourceView.objects.create(resource=self.riyadh, user=viewer)
+        build_recommendations()
+        self.assertEqual(self.related(self.seerah), [self.riyadh.id])
+        self.assertEqual(self.related(self.riyadh)[0], self.seerah.id)
+    
+    def test_recommended_from_views_and_class_subjects(self):
+        """Test that users get resources like the ones they viewed and of their class subjects"""
+        from course.models import Class
+        from enrollments.models import ClassEnrollment, EnrollmentChoices
+        
+        ResourceView.objects.create(resource=self.riyadh, user=self.student)
+        build_recommendations()
+        self.assertEqual(self.recommended(), [self.bulugh.id, self.umdah.id])
+        
+        fiqh_class = Class.objects.create(title='Fiqh 101', start_time='10:00', end_time='11:00')
+        fiqh_class.subject.add(self.fiqh)
+        ClassEnrollment.objects.create(
+            student=self.student, class_enrolled=fiqh_class, status=EnrollmentChoices.COMPLETED
+        )
+        ResourceView.objects.all().delete()
+        build_recommendations()
+        self.assertEqual(self.recommended(), [self.bulugh.id, self.umdah.id])
+        self.assertEqual(UserResourceRecommendation.objects.filter(user=self.student).count(), 2)
+    
+    def test_unpublished_and_rebuild(self):
+        """Test that unpublished resources are not recommended and a rebuild replaces the tables"""
+        self.umdah.is_published = False
+        self.umdah.save()
+        build_recommendations()
+        self.assertEqual(self.related(self.bulugh), [self.riyadh.id])
+        
+        self.umdah.is_published = True
+        self.umdah.save()
+        call_command('build_library_recommendations', stdout=StringIO())
+        self.assertEqual(self.related(self.bulugh), [self.umdah.id, self.riyadh.id])
+        self.assertEqual(ResourceSimilarity.objects.filter(resource=self.bulugh).count(), 2)
+
+    
+    def test_features_follow_the_resource_snapshot(self):
+        """Test that resources created after the snapshot get no features"""
+        resources = {
+            row['id']: row
+            for row in LibraryResource.objects.exclude(pk=self.umdah.pk).values(
+                'id', 'category_id', 'is_published', 'view_count', 'download_count'
+            )
+        }
+        features = load_features(resources)
+        self.assertNotIn(self.umdah.id, features)
+        self.assertEqual(
+            features[self.bulugh.id],
+            {('category', self.hadith.id), ('subject', self.fiqh.id), ('tag', self.bulugh.tags.get().id)}
+        )
+
+class LibraryShelfTestCase(TestCase):
+    """Cached featured/popular/recent/top rated shelves"""
+    
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.client = APIClient()
+        self.student = User.objects.create_user(
+            email='student@test.com',
+            password='testpass123',
+            full_name='Student',
+            role='student'
+        )
+        self.resources = [
+            LibraryResource.objects.create(title=f'Book {i}', is_featured=True, featured_order=i, view_count=i)
+            for i in range(5)
+        ]
+        for resource in self.resources:
+            resource.tags.add('hadith')
+    
+    def get(self, shelf):
+        response = self.client.get(f'/api/library/resource/{shelf}/')
+        self.assertEqual(response.status_code, 200)
+        return response.data
+    
+    def test_anonymous_payload_is_cached(self):
+        """Test that a cached shelf is served without database queries"""
+        first = self.get('featured')
+        self.assertEqual([item['id'] for item in first], [resource.id for resource in self.resources])
+        with self.assertNumQueries(0):
+            self.assertEqual(self.get('featured'), first)
+        self.assertEqual([item['id'] for item in self.get('popular')][0], self.resources[4].id)
+    
+    def test_user_fields_overlay(self):
+        """Test that bookmarks and ratings of the caller are filled in with one query"""
+        self.get('recent')
+        ResourceBookmark.objects.create(user=self.student, resource=self.resources[1])
+        ResourceRating.objects.create(student=self.student, resource=self.resources[2], rating=4)
+        self.client.force_authenticate(self.student)
+        self.get('recent')
+        
+        with self.assertNumQueries(1):
+            items = {item['id']: item for item in self.get('recent')}
+        self.assertTrue(items[self.resources[1].id]['is_bookmarked'])
+        self.assertEqual(items[self.resources[2].id]['user_rating'], 4)
+        self.assertFalse(items[self.resources[0].id]['is_bookmarked'])
+        self.assertIsNone(items[self.resources[0].id]['user_rating'])
+        
+        # The shared payload is not personalized
+        self.client.force_authenticate(None)
+        self.assertFalse(any(item['is_bookmarked'] for item in self.get('recent')))
+    
+    def test_invalidation(self):
+        """Test that resource and rating changes show up on the next request"""
+        self.get('featured')
+        self.resources[0].is_published = False
+        self.resources[0].save()
+        self.assertNotIn(self.resources[0].id, [item['id'] for item in self.get('featured')])
+        
+        self.assertEqual(self.get('top_rated'), [])
+        students = [
+            User.objects.create_user(email=f's{i}@test.com', password='testpass123', full_name='S', role='student')
+            for i in range(3)
+        ]
+        for student in students:
+            ResourceRating.objects.create(student=student, resource=self.resources[3], rating=5)
+        top_rated = self.get('top_rated')
+        self.assertEqual([item['id'] for item in top_rated], [self.resources[3].id])
+        self.assertEqual(top_rated[0]['total_ratings'], 3)
+    
+    def test_super_admin_sees_unpublished(self):
+        """Test that super admins bypass the shared payload"""
+        self.resources[0].is_published = False
+        self.resources[0].save()
+        admin = User.objects.create_user(
+            email='admin@test.com', password='testpass123', full_name='Admin', role='super_admin'
+        )
+        self.client.force_authenticate(admin)
+        self.assertIn(self.resources[0].id, [item['id'] for item in self.get('featured')])
+
+
+class LibraryCategoryTreeTestCase(TestCase):
+    """In-memory category tree and subtree resources"""
+    
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.client = APIClient()
+        self.hadith = LibraryCategory.objects.create(name='Hadith', display_order=1)
+        self.fiqh = LibraryCategory.objects.create(name='Fiqh', display_order=2)
+        self.collections = LibraryCategory.objects.create(name='Collections', parent=self.hadith, display_order=2)
+        self.commentaries = LibraryCategory.objects.create(name='Commentaries', parent=self.hadith, display_order=1)
+        self.sahih = LibraryCategory.objects.create(name='Sahih', parent=self.collections)
+        
+        self.overview = LibraryResource.objects.create(title='Hadith Sciences', category=self.hadith)
+        self.bukhari = LibraryResource.objects.create(title='Sahih al-Bukhari', category=self.sahih)
+        self.fath = LibraryResource.objects.create(title='Fath al-Bari', category=self.commentaries)
+        self.fath.subcategories.add(self.sahih)
+        self.bulugh = LibraryResource.objects.create(title='Bulugh al-Maram', category=self.fiqh)
+        self.bulugh.subcategories.add(self.collections)
+        LibraryResource.objects.create(title='Draft', category=self.sahih, is_published=False)
+    
+    def test_root_categories_tree(self):
+        """Test that the whole tree comes out in display order with bulk counts"""
+        self.client.get('/api/library/category/root_categories/')
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/library/category/root_categories/')
+        self.assertEqual(response.status_code, 200)
+        
+        hadith, fiqh = response.data
+        self.assertEqual(hadith['name'], 'Hadith')
+        self.assertEqual(fiqh['subcategories'], [])
+        self.assertEqual([child['name'] for child in hadith['subcategories']], ['Commentaries', 'Collections'])
+        collections = hadith['subcategories'][1]
+        self.assertEqual(collections['subcategories'][0]['name'], 'Sahih')
+        
+        self.assertEqual((hadith['resource_count'], hadith['total_resource_count']), (1, 4))
+        self.assertEqual((collections['resource_count'], collections['total_resource_count']), (0, 3))
+        self.assertEqual(
+            (collections['subcategories'][0]['resource_count'], collections['subcategories'][0]['total_resource_count']),
+            (1, 2)
+        )
+        self.assertEqual((fiqh['resource_count'], fiqh['total_resource_count']), (1, 1))
+    
+    def test_subtree_resources(self):
+        """Test that resources of every depth and subcategory links come out once"""
+        response = self.client.get(f'/api/library/category/{self.hadith.id}/resources/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            sorted(item['id'] for item in response.data),
+            sorted([self.overview.id, self.bukhari.id, self.fath.id, self.bulugh.id])
+        )
+        
+        response = self.client.get(f'/api/library/category/{self.collections.id}/resources/')
+        self.assertEqual(
+            sorted(item['id'] for item in response.data),
+            sorted([self.bukhari.id, self.fath.id, self.bulugh.id])
+        )
+        self.assertEqual(self.client.get('/api/library/category/0/resources/').status_code, 404)
+    
+    def test_invalidation(self):
+        """Test that category and resource writes show up on the next request"""
+        self.client.get('/api/library/category/root_categories/')
+        
+        self.sahih.parent = self.fiqh
+        self.sahih.save()
+        self.bukhari.is_published = False
+        self.bukhari.save()
+        LibraryCategory.objects.create(name='Usul', parent=self.fiqh)
+        
+        hadith, fiqh = self.client.get('/api/library/category/root_categories/').data
+        self.assertEqual([child['name'] for child in fiqh['subcategories']], ['Sahih', 'Usul'])
+        self.assertEqual(fiqh['total_resource_count'], 2)
+        self.assertEqual(hadith['total_resource_count'], 3)
+        
+        self.fath.subcategories.clear()
+        hadith, fiqh = self.client.get('/api/library/category/root_categories/').data
+        self.assertEqual(fiqh['total_resource_count'], 1)
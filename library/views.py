@@ -4,21 +4,27 @@ from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, AllowAny, IsAuthenticatedOrReadOnly
 from rest_framework.parsers import MultiPartParser, FormParser, JSONParser
 from django_filters.rest_framework import DjangoFilterBackend
-from django.db.models import Q, Count, Avg
+from django.db.models import Count, Avg
 from django.shortcuts import get_object_or_404
+from django.urls import reverse
 from django.db import IntegrityError
 
 from .models import (
     LibraryCategory, LibraryResource, ResourceRating,
-    ResourceBookmark, ResourceView
+    ResourceBookmark
 )
 from .serializers import (
     LibraryCategorySerializer, LibraryResourceListSerializer,
     LibraryResourceDetailSerializer, ResourceRatingSerializer,
     ResourceBookmarkSerializer, ResourceViewSerializer
 )
+from .categories import get_category_tree, subtree_resources_filter
 from .filters import LibraryResourceFilter, LibraryCategoryFilter, ResourceRatingFilter
+from .counters import record_download, record_view
+from .search import search_resources
+from .shelves import get_shelf, serialize_shelf
 from accounts.models import RoleChoices
+from core.media import get_media_user, serve_protected_file, signed_media_url
 from core.pagination import CustomPagination
 
 
@@ -58,33 +64,38 @@ class LibraryCategoryViewSet(viewsets.ModelViewSet):
         """
         Allow read for anyone, write for super admins only
         """
-        if self.action in ['list', 'retrieve']:
+        if self.action in ['list', 'retrieve', 'root_categories', 'subcategories', 'resources']:
             return [AllowAny()]
         return [IsSuperAdmin()]
     
     @action(detail=False, methods=['get'], permission_classes=[AllowAny])
     def root_categories(self, request):
-        """Get only root categories (no parent)"""
-        categories = self.queryset.filter(parent__isnull=True)
-        serializer = self.get_serializer(categories, many=True)
+        """Get only root categories (no parent), with the whole tree below them"""
+        tree = get_category_tree()
+        serializer = self.get_serializer(tree.roots(), many=True, context={
+            **self.get_serializer_context(), 'category_tree': tree,
+        })
         return Response(serializer.data)
     
     @action(detail=True, methods=['get'], permission_classes=[AllowAny])
     def subcategories(self, request, pk=None):
         """Get subcategories of a specific category"""
         category = self.get_object()
-        subcategories = category.subcategories.all()
-        serializer = self.get_serializer(subcategories, many=True)
+        tree = get_category_tree()
+        serializer = self.get_serializer(tree.children(category.pk), many=True, context={
+            **self.get_serializer_context(), 'category_tree': tree,
+        })
         return Response(serializer.data)
     
     @action(detail=True, methods=['get'], permission_classes=[AllowAny])
     def resources(self, request, pk=None):
-        """Get all resources in this category"""
+        """Get all resources in this category and its subcategories, at any depth"""
         category = self.get_object()
+        subtree_ids = get_category_tree().subtree_ids(category.pk) or (category.pk,)
         resources = LibraryResource.objects.filter(
-            Q(category=category) | Q(subcategories=category),
+            subtree_resources_filter(subtree_ids),
             is_published=True
-        ).distinct()
+        ).select_related('category').prefetch_related('tags')
         
         # Apply pagination
         page = self.paginate_queryset(resources)
@@ -112,13 +123,21 @@ class LibraryResourceViewSet(viewsets.ModelViewSet):
     """
     queryset = LibraryResource.objects.all()
     parser_classes = [MultiPartParser, FormParser, JSONParser]  # Support file uploads
-    filter_backends = [DjangoFilterBackend, drf_filters.SearchFilter, drf_filters.OrderingFilter]
+    # ?search= is handled by LibraryResourceFilter (ranked index search)
+    filter_backends = [DjangoFilterBackend, drf_filters.OrderingFilter]
     filterset_class = LibraryResourceFilter
-    search_fields = ['title', 'title_arabic', 'author', 'author_arabic', 'description']
     ordering_fields = ['created_at', 'updated_at', 'average_rating', 'view_count', 'download_count', 'title']
-    ordering = ['-created_at']
     pagination_class = CustomPagination  # Enable pagination for library resources
     
+    @property
+    def ordering(self):
+        """Best matches first when searching, newest first otherwise"""
+        request = getattr(self, 'request', None)
+        # Stripped like the search filter's CharFilter, which only ranks non-blank queries
+        if request is not None and request.query_params.get('search', '').strip():
+            return ['-search_rank', '-created_at']
+        return ['-created_at']
+    
     def get_serializer_class(self):
         """Use detail serializer for retrieve/create/update, list serializer for list"""
         if self.action in ['retrieve', 'create', 'update', 'partial_update']:
@@ -128,9 +147,9 @@ class LibraryResourceViewSet(viewsets.ModelViewSet):
     def get_permissions(self):
         """
         Allow read for anyone, write for super admins only
-        Download requires authentication
+        Download requires authentication (file checks it itself, to accept signed links)
         """
-        if self.action in ['list', 'retrieve', 'featured', 'recommended', 'popular', 'recent', 'top_rated', 'related']:
+        if self.action in ['list', 'retrieve', 'featured', 'recommended', 'popular', 'recent', 'top_rated', 'related', 'file', 'autocomplete']:
             return [AllowAny()]
         if self.action == 'download':
             return [IsAuthenticated()]
@@ -159,17 +178,13 @@ class LibraryResourceViewSet(viewsets.ModelViewSet):
         """Track view when retrieving a resource"""
         instance = self.get_object()
         
-        # Track view
-        ip_address = self.get_client_ip(request)
-        ResourceView.objects.create(
-            resource=instance,
-            user=request.user if request.user.is_authenticated else None,
-            ip_address=ip_address
+        # Track view (buffered, counts reach the database within seconds)
+        record_view(
+            instance.id,
+            user_id=request.user.id if request.user.is_authenticated else None,
+            ip_address=self.get_client_ip(request)
         )
         
-        # Increment view count
-        instance.increment_view_count()
-        
         serializer = self.get_serializer(instance)
         return Response(serializer.data)
     
@@ -225,11 +240,13 @@ class LibraryResourceViewSet(viewsets.ModelViewSet):
                     status=status.HTTP_404_NOT_FOUND
                 )
             
-            # Increment download count
-            resource.increment_download_count()
+            # Track download (buffered, like views)
+            record_download(resource.id)
             
-            # Return PDF file URL
-            pdf_url = request.build_absolute_uri(resource.pdf_file.url)
+            # Return a signed link to the PDF, served with Range support
+            pdf_url = signed_media_url(
+                request, reverse('library:resource-file', kwargs={'pk': resource.pk}), request.user, resource.pdf_file
+            )
             
             return Response({
                 'success': True,
@@ -249,77 +266,120 @@ class LibraryResourceViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
     
+    @action(detail=True, methods=['get'], permission_classes=[AllowAny], throttle_classes=[])
+    def file(self, request, pk=None):
+        """
+        Serve the PDF with HTTP Range support, so viewers can open any page without
+        downloading the whole file.
+        
+        Authentication Required: a logged-in user or the signed link returned by download.
+        Add ?download=1 to get it as an attachment.
+        """
+        resource = self.get_object()
+        if get_media_user(request, resource.pdf_file) is None:
+            return Response(
+                {
+                    'error': 'Authentication required',
+                    'detail': 'Please log in to download this resource.',
+                    'requires_auth': True
+                },
+                status=status.HTTP_401_UNAUTHORIZED
+            )
+        return serve_protected_file(
+            request, resource.pdf_file, as_attachment=request.query_params.get('download') == '1'
+        )
+    
+    @action(detail=False, methods=['get'], permission_classes=[AllowAny])
+    def autocomplete(self, request):
+        """
+        Suggest resources while the user types.
+        
+        Query params:
+        - q: Text typed so far (the last word is matched as a prefix)
+        - limit: Number of suggestions (default 8, max 20)
+        """
+        query = request.query_params.get('q', '').strip()
+        try:
+            limit = min(max(int(request.query_params.get('limit', 8)), 1), 20)
+        except ValueError:
+            limit = 8
+        if not query:
+            return Response([])
+        
+        hits = search_resources(query, self.get_queryset(), limit=limit)
+        resources = LibraryResource.objects.in_bulk([hit.resource_id for hit in hits])
+        return Response([
+            {
+                'id': resource.id,
+                'title': resource.title,
+                'title_arabic': resource.title_arabic,
+                'author': resource.author,
+                'author_arabic': resource.author_arabic,
+                'resource_type': resource.resource_type,
+            }
+            for resource in (resources[hit.resource_id] for hit in hits)
+        ])
+    
+    def shelf_response(self, name):
+        """Serve a landing-page shelf (cached, see library/shelves.py)"""
+        user = self.request.user
+        if user.is_authenticated and user.role == RoleChoices.SUPER_ADMIN:
+            # Super admins also see unpublished resources: not the shared payload
+            return Response(serialize_shelf(name, self.request, self.get_queryset()))
+        return Response(get_shelf(name, self.request))
+    
     @action(detail=False, methods=['get'], permission_classes=[AllowAny])
     def featured(self, request):
         """Get featured resources"""
-        resources = self.get_queryset().filter(
-            is_featured=True
-        ).order_by('featured_order', '-created_at')[:12]
-        
-        serializer = self.get_serializer(resources, many=True)
-        return Response(serializer.data)
+        return self.shelf_response('featured')
     
     @action(detail=False, methods=['get'], permission_classes=[AllowAny])
     def popular(self, request):
         """Get most popular resources by view count"""
-        resources = self.get_queryset().order_by('-view_count', '-download_count')[:20]
-        serializer = self.get_serializer(resources, many=True)
-        return Response(serializer.data)
+        return self.shelf_response('popular')
     
     @action(detail=False, methods=['get'], permission_classes=[AllowAny])
     def recent(self, request):
         """Get recently added resources"""
-        resources = self.get_queryset().order_by('-created_at')[:20]
-        serializer = self.get_serializer(resources, many=True)
-        return Response(serializer.data)
+        return self.shelf_response('recent')
     
     @action(detail=False, methods=['get'], permission_classes=[AllowAny])
     def top_rated(self, request):
         """Get top rated resources"""
-        resources = self.get_queryset().filter(
-            total_ratings__gte=3  # At least 3 ratings
-        ).order_by('-average_rating', '-total_ratings')[:20]
-        serializer = self.get_serializer(resources, many=True)
-        return Response(serializer.data)
+        return self.shelf_response('top_rated')
     
     @action(detail=False, methods=['get'], permission_classes=[IsAuthenticated])
     def recommended(self, request):
-        """Get recommended resources based on user's subjects and activity"""
-        user = request.user
-        
-        # Get user's enrolled subjects
-        from enrollments.models import CourseEnrollment, EnrollmentChoices
-        enrollments = CourseEnrollment.objects.filter(
-            student=user,
-            status=EnrollmentChoices.COMPLETED
+        """
+        Get resources recommended to the user from their views and class subjects.
+        Precomputed by `build_library_recommendations`; popular resources until then.
+        """
+        resources = list(
+            self.get_queryset().filter(
+                recommended_to__user=request.user
+            ).order_by('-recommended_to__score')[:20]
         )
-        
-        subject_ids = []
-        for enrollment in enrollments:
-            course_subjects = enrollment.timetable.course.subject.all()
-            subject_ids.extend([s.id for s in course_subjects])
-        
-        # Get resources related to these subjects
-        if subject_ids:
-            resources = self.get_queryset().filter(
-                subjects__id__in=subject_ids
-            ).distinct().order_by('-average_rating', '-created_at')[:20]
-        else:
-            # Fallback to popular resources
-            resources = self.get_queryset().order_by('-view_count')[:20]
+        if not resources:
+            resources = self.get_queryset().order_by('-view_count', '-download_count')[:20]
         
         serializer = self.get_serializer(resources, many=True)
         return Response(serializer.data)
     
     @action(detail=True, methods=['get'], permission_classes=[AllowAny])
     def related(self, request, pk=None):
-        """Get related resources (same subjects)"""
+        """
+        Get related resources (shared subjects, tags, category and co-views).
+        Precomputed by `build_library_recommendations`; popular resources until then.
+        """
         resource = self.get_object()
         
-        # Get resources with same subjects
-        related = self.get_queryset().filter(
-            Q(subjects__in=resource.subjects.all())
-        ).exclude(id=resource.id).distinct().order_by('-average_rating')[:6]
+        related = list(
+            self.get_queryset().filter(
+                similar_to__resource=resource
+            ).order_by('-similar_to__score')[:6]
+        )
+        if not related:
+            related = self.get_queryset().exclude(id=resource.id).order_by('-view_count', '-download_count')[:6]
         
         serializer = self.get_serializer(related, many=True)
         return Response(serializer.data)
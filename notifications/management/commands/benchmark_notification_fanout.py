@@ -0,0 +1,100 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from accounts.models import RoleChoices
+from notifications.models import NotificationType
+from notifications.utils import send_notification, send_notification_to_multiple_users
+
+User = get_user_model()
+
+
+class Rollback(Exception):
+    """Raised to discard everything the benchmark wrote."""
+
+
+class Command(BaseCommand):
+    help = 'Benchmark bulk notification fan-out against per-user sends (all writes are rolled back)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--recipients',
+            type=int,
+            default=10000,
+            help='Number of recipients for the bulk fan-out (default: 10000)',
+        )
+        parser.add_argument(
+            '--legacy-sample',
+            type=int,
+            default=500,
+            help='Recipients for the per-user baseline, extrapolated to --recipients (default: 500, 0 to skip)',
+        )
+
+    def handle(self, *args, **options):
+        recipients = options['recipients']
+        legacy_sample = min(options['legacy_sample'], recipients)
+
+        try:
+            with transaction.atomic():
+                # bulk_create skips the registration signals (profiles, emails, admin alerts)
+                User.objects.bulk_create(
+                    [
+                        User(
+                            email=f'fanout_bench_{i}@example.com',
+                            full_name=f'Fan-out Bench {i}',
+                            role=RoleChoices.STUDENT,
+                        )
+                        for i in range(recipients)
+                    ],
+                    batch_size=1000,
+                )
+                users = list(User.objects.filter(email__startswith='fanout_bench_'))
+
+                bulk_seconds, bulk_queries = self.measure(
+                    lambda: send_notification_to_multiple_users(
+                        users=users,
+                        title='Benchmark',
+                        body='Bulk fan-out benchmark',
+                        notification_type=NotificationType.SYSTEM,
+                    )
+                )
+                self.report('Bulk fan-out', recipients, bulk_seconds, bulk_queries)
+
+                if legacy_sample:
+                    legacy_seconds, legacy_queries = self.measure(
+                        lambda: [
+                            send_notification(
+                                user=user,
+                                title='Benchmark',
+                                body='Per-user baseline',
+                                notification_type=NotificationType.SYSTEM,
+                            )
+                            for user in users[:legacy_sample]
+                        ]
+                    )
+                    self.report('Per-user sends', legacy_sample, legacy_seconds, legacy_queries)
+                    estimated = legacy_seconds / legacy_sample * recipients
+                    self.stdout.write(
+                        f'Per-user sends extrapolated to {recipients} recipients: {estimated:.2f}s '
+                        f'({estimated / bulk_seconds:.1f}x the bulk fan-out)'
+                    )
+
+                raise Rollback
+        except Rollback:
+            self.stdout.write(self.style.SUCCESS('Benchmark data rolled back'))
+
+    def measure(self, func):
+        with CaptureQueriesContext(connection) as ctx:
+            started = time.perf_counter()
+            func()
+            elapsed = time.perf_counter() - started
+        return elapsed, len(ctx.captured_queries)
+
+    def report(self, label, recipients, seconds, queries):
+        self.stdout.write(
+            f'{label}: {recipients} recipients in {seconds:.2f}s '
+            f'({recipients / seconds:.0f}/s, {queries} queries)'
+        )
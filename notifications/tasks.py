@@ -0,0 +1,17 @@
+"""
+Background tasks for notifications.
+"""
+from django.contrib.auth import get_user_model
+
+from core.tasks import background_task
+
+from .utils import _fan_out
+
+
+# Not retried: a failure after some batches were inserted would notify those users
+# twice. If its worker dies, claim_tasks marks it failed rather than running it again.
+@background_task(max_attempts=1)
+def fan_out_notification(user_ids, **kwargs):
+    """Create and push one notification to many users (see send_notification_to_multiple_users)."""
+    users = get_user_model().objects.filter(pk__in=user_ids).order_by('pk')
+    _fan_out(users, **kwargs)
@@ -1,3 +1,66 @@
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.contrib.auth import get_user_model
 from django.test import TestCase
 
-# Create your tests here.
+from accounts.models import RoleChoices
+from core.models import OutboxTask
+from core.tasks import run_pending_tasks
+from .models import Notification, NotificationType
+from .utils import send_notification_to_multiple_users
+
+User = get_user_model()
+
+
+class BulkNotificationFanOutTestCase(TestCase):
+    """Test cases for send_notification_to_multiple_users"""
+
+    def setUp(self):
+        User.objects.bulk_create([
+            User(email=f'student{i}@test.com', full_name=f'Student {i}', role=RoleChoices.STUDENT)
+            for i in range(25)
+        ])
+        self.users = User.objects.filter(email__startswith='student')
+
+    def test_notifications_created_in_batches(self):
+        """Test that inserts are batched instead of one per user"""
+        # User query + one INSERT per batch
+        with self.assertNumQueries(1 + 3):
+            notifications = send_notification_to_multiple_users(
+                users=self.users,
+                title='Announcement',
+                body='Class starts tomorrow',
+                notification_type=NotificationType.COURSE,
+                batch_size=10
+            )
+        self.assertEqual(len(notifications), 25)
+        self.assertEqual(Notification.objects.filter(title='Announcement').count(), 25)
+
+    def test_websocket_message_delivered(self):
+        """Test that each user's notification group receives the notification"""
+        channel_layer = get_channel_layer()
+        user = self.users.first()
+        channel_name = async_to_sync(channel_layer.new_channel)()
+        async_to_sync(channel_layer.group_add)(f'notifications_{user.id}', channel_name)
+
+        send_notification_to_multiple_users(users=self.users, title='Hello', body='World')
+
+        message = async_to_sync(channel_layer.receive)(channel_name)
+        self.assertEqual(message['type'], 'notification_message')
+        self.assertEqual(message['notification']['title'], 'Hello')
+        self.assertEqual(
+            message['notification']['id'],
+            Notification.objects.get(user=user, title='Hello').id
+        )
+
+    def test_background_fan_out_is_queued(self):
+        """Test that background=True queues a task instead of inserting in the request"""
+        result = send_notification_to_multiple_users(
+            users=self.users, title='Later', body='Queued', background=True
+        )
+        self.assertIsNone(result)
+        self.assertFalse(Notification.objects.filter(title='Later').exists())
+        self.assertEqual(OutboxTask.objects.filter(name='notifications.tasks.fan_out_notification').count(), 1)
+
+        run_pending_tasks()
+        self.assertEqual(Notification.objects.filter(title='Later').count(), 25)
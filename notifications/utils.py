@@ -1,9 +1,13 @@
 """
 Utility functions for creating and sending notifications
 """
+import asyncio
 import logging
+from itertools import islice
+
 from channels.layers import get_channel_layer
 from asgiref.sync import async_to_sync
+from django.db.models import QuerySet
 from django.utils import timezone
 
 from .models import Notification, NotificationChannels, NotificationType, NotificationStatus
@@ -11,6 +15,9 @@ from .serializers import NotificationListSerializer
 
 logger = logging.getLogger(__name__)
 
+# Rows per INSERT when fanning out to many users
+NOTIFICATION_BATCH_SIZE = 500
+
 
 def send_notification(
     user,
@@ -72,11 +79,16 @@ def send_notification_to_multiple_users(
     notification_type=NotificationType.INFO,
     channel=NotificationChannels.IN_APP,
     action_url=None,
-    metadata=None
+    metadata=None,
+    background=False,
+    batch_size=None
 ):
     """
     Create and send notifications to multiple users in real-time via WebSocket.
     
+    Notifications are inserted with bulk_create in chunks and all WebSocket
+    group sends are pushed concurrently from a single async task.
+    
     Args:
         users: Queryset or list of users to send the notification to
         title: Notification title
@@ -85,39 +97,99 @@ def send_notification_to_multiple_users(
         channel: Notification channel (default: IN_APP)
         action_url: Optional URL for notification action
         metadata: Optional dictionary of additional metadata
+        background: Queue the fan-out as a background task (core.tasks) so
+            the caller returns immediately; metadata must be JSON-serializable
+        batch_size: Rows per INSERT (default: NOTIFICATION_BATCH_SIZE)
     
     Returns:
-        List of created Notification instances
+        List of created Notification instances (None when background=True)
     """
+    kwargs = {
+        'title': title,
+        'body': body,
+        'notification_type': notification_type,
+        'channel': channel,
+        'action_url': action_url,
+        'metadata': metadata,
+        'batch_size': batch_size or NOTIFICATION_BATCH_SIZE,
+    }
+    
+    if background:
+        from .tasks import fan_out_notification
+        
+        if isinstance(users, QuerySet):
+            user_ids = list(users.values_list('pk', flat=True))
+        else:
+            user_ids = [user.pk for user in users]
+        fan_out_notification.enqueue(user_ids=user_ids, **kwargs)
+        return None
+    
+    return _fan_out(users, **kwargs)
+
+
+def _chunked(iterable, size):
+    """Yield lists of at most size items."""
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _fan_out(users, title, body, notification_type, channel, action_url, metadata, batch_size):
+    """Insert notifications in chunks, then push every WebSocket message in one async task."""
+    if isinstance(users, QuerySet):
+        users = users.iterator(chunk_size=batch_size)
+    
+    sent_at = timezone.now()
     notifications = []
-    channel_layer = get_channel_layer()
+    messages = []
     
-    for user in users:
-        # Create the notification
-        notification = Notification.objects.create(
-            user=user,
-            title=title,
-            body=body,
-            type=notification_type,
-            channel=channel,
-            action_url=action_url,
-            metadata=metadata or {},
-            status=NotificationStatus.SENT,
-            sent_at=timezone.now()
-        )
-        notifications.append(notification)
+    for chunk in _chunked(users, batch_size):
+        created = Notification.objects.bulk_create([
+            Notification(
+                user=user,
+                title=title,
+                body=body,
+                type=notification_type,
+                channel=channel,
+                action_url=action_url,
+                metadata=metadata or {},
+                status=NotificationStatus.SENT,
+                sent_at=sent_at
+            )
+            for user in chunk
+        ])
+        notifications.extend(created)
         
-        # Send real-time update via WebSocket
-        try:
-            async_to_sync(channel_layer.group_send)(
-                f"notifications_{user.id}",
+        serialized = NotificationListSerializer(created, many=True).data
+        messages.extend(
+            (
+                f"notifications_{notification.user_id}",
                 {
                     "type": "notification_message",
-                    "notification": NotificationListSerializer(notification).data
+                    "notification": data
                 }
             )
+            for notification, data in zip(created, serialized)
+        )
+    
+    if messages:
+        try:
+            async_to_sync(_group_send_many)(get_channel_layer(), messages)
         except Exception as e:
-            logger.error(f"Error sending notification via WebSocket to user {user.id}: {e}", exc_info=True)
+            logger.error(f"Error sending {len(messages)} notifications via WebSocket: {e}", exc_info=True)
     
     return notifications
 
+
+async def _group_send_many(channel_layer, messages):
+    """Push all group messages concurrently, logging (not raising) per-user failures."""
+    results = await asyncio.gather(
+        *(channel_layer.group_send(group, message) for group, message in messages),
+        return_exceptions=True
+    )
+    for (group, _), result in zip(messages, results):
+        if isinstance(result, Exception):
+            logger.error(f"Error sending notification via WebSocket to {group}: {result}")
@@ -5,3 +5,5 @@ class QuranConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'quran'
 
+    def ready(self):
+        import quran.signals
@@ -0,0 +1,132 @@
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Q
+
+from quran.models import Surah, Verse
+from quran.search import VerseSearchIndex
+from quran.utils import build_search_text
+
+# Vocabulary for synthetic verses when the Quran data is not loaded
+ARABIC_WORDS = [
+    'بِسْمِ', 'ٱللَّهِ', 'ٱلرَّحْمَٰنِ', 'ٱلرَّحِيمِ', 'ٱلْحَمْدُ', 'رَبِّ', 'ٱلْعَٰلَمِينَ', 'مَٰلِكِ', 'يَوْمِ',
+    'ٱلدِّينِ', 'إِيَّاكَ', 'نَعْبُدُ', 'نَسْتَعِينُ', 'ٱهْدِنَا', 'ٱلصِّرَٰطَ', 'ٱلْمُسْتَقِيمَ', 'ٱلصَّلَوٰةَ',
+    'وَٱلَّذِينَ', 'ءَامَنُوا۟', 'ٱلْكِتَٰبُ', 'هُدًى', 'لِّلْمُتَّقِينَ', 'قُلْ', 'هُوَ', 'أَحَدٌ', 'رَحْمَةً',
+]
+ENGLISH_WORDS = [
+    'in', 'the', 'name', 'of', 'allah', 'entirely', 'merciful', 'especially', 'praise', 'lord', 'worlds',
+    'sovereign', 'day', 'recompense', 'you', 'alone', 'we', 'worship', 'ask', 'help', 'guide', 'straight',
+    'path', 'prayer', 'those', 'who', 'believe', 'book', 'guidance', 'righteous', 'say', 'he', 'one', 'mercy',
+]
+
+DEFAULT_QUERIES = ['الرحمن', 'صراط', 'رحمه', 'والذين امنوا', 'merciful', 'straight path', 'worsh', 'believe guidance']
+
+
+class Rollback(Exception):
+    """Raised to discard the synthetic verses."""
+
+
+class Command(BaseCommand):
+    help = 'Benchmark verse search latency: icontains scan vs the in-process search index'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--synthetic',
+            action='store_true',
+            help='Always benchmark on generated verses (rolled back) instead of the loaded Quran data',
+        )
+        parser.add_argument(
+            '--verses',
+            type=int,
+            default=6236,
+            help='Number of synthetic verses (default: 6236)',
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=20,
+            help='Runs per query (default: 20)',
+        )
+        parser.add_argument(
+            '--query',
+            action='append',
+            dest='queries',
+            help='Query to benchmark (repeatable, default: a mixed Arabic/English set)',
+        )
+
+    def handle(self, *args, **options):
+        queries = options['queries'] or DEFAULT_QUERIES
+
+        if not options['synthetic'] and Verse.objects.count() >= 1000:
+            self.stdout.write(f'Using {Verse.objects.count()} loaded verses')
+            self.run(queries, options['repeat'])
+            return
+
+        try:
+            with transaction.atomic():
+                self.create_synthetic_verses(options['verses'])
+                self.stdout.write(f'Using {options["verses"]} synthetic verses')
+                self.run(queries, options['repeat'])
+                raise Rollback
+        except Rollback:
+            self.stdout.write(self.style.SUCCESS('Synthetic data rolled back'))
+
+    def create_synthetic_verses(self, count):
+        rng = random.Random(42)
+        surahs = Surah.objects.bulk_create([
+            Surah(
+                number=10000 + i,
+                name_arabic=f'Bench {i}',
+                name_transliteration=f'Bench {i}',
+                name_translation=f'Bench {i}',
+                total_verses=0,
+                revelation_type='meccan',
+            )
+            for i in range(114)
+        ])
+        verses = []
+        for i in range(count):
+            text_arabic = ' '.join(rng.choices(ARABIC_WORDS, k=rng.randint(6, 30)))
+            text_translation = ' '.join(rng.choices(ENGLISH_WORDS, k=rng.randint(8, 40)))
+            verses.append(Verse(
+                surah=surahs[i % len(surahs)],
+                verse_number=i // len(surahs) + 1,
+                text_arabic=text_arabic,
+                text_translation=text_translation,
+                search_text=build_search_text(text_arabic, text_translation),
+            ))
+        Verse.objects.bulk_create(verses, batch_size=1000)
+
+    def run(self, queries, repeat):
+        started = time.perf_counter()
+        index = VerseSearchIndex.from_database()
+        self.stdout.write(f'Index build: {(time.perf_counter() - started) * 1000:.1f}ms for {len(index)} verses')
+        self.stdout.write('')
+
+        for query in queries:
+            legacy = self.measure(lambda: list(
+                Verse.objects.filter(
+                    Q(text_arabic__icontains=query) |
+                    Q(text_translation__icontains=query) |
+                    Q(text_transliteration__icontains=query)
+                )[:50]
+            ), repeat)
+            indexed = self.measure(lambda: index.search(query), repeat)
+            matches = len(index.search(query))
+            self.stdout.write(
+                f'{query!r}: icontains p50 {legacy[0]:.2f}ms p95 {legacy[1]:.2f}ms | '
+                f'index p50 {indexed[0]:.2f}ms p95 {indexed[1]:.2f}ms ({matches} ranked matches)'
+            )
+
+    def measure(self, func, repeat):
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            func()
+            timings.append((time.perf_counter() - started) * 1000)
+        timings.sort()
+        p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+        return statistics.median(timings), p95
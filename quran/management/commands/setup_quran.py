@@ -2,6 +2,7 @@ import requests
 import time
 from django.core.management.base import BaseCommand
 from quran.models import Surah, Verse
+from quran.utils import bump_content_version
 
 
 # Complete list of all 114 Surahs
@@ -176,6 +177,9 @@ class Command(BaseCommand):
             self.stdout.write(self.style.WARNING('⏭️  Skipping audio URL addition...'))
             self.stdout.write('')
         
+        # Drop cached surah bundles and search indexes (also for bulk writes that skip signals)
+        bump_content_version()
+        
         # Final Summary
         self.show_summary()
 
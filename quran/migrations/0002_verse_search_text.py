@@ -0,0 +1,61 @@
+# Generated by Django 5.2.18 on 2026-10-16 20:25
+
+import re
+import unicodedata
+
+from django.db import migrations, models
+
+# A frozen copy of the normalization in quran.utils as of this migration
+ARABIC_DIACRITICS = re.compile(
+    '[\u0610-\u061A\u064B-\u065F\u0670\u06D6-\u06DC\u06DF-\u06E8\u06EA-\u06ED\u0640]'
+)
+ARABIC_LETTER_MAP = str.maketrans({
+    '\u0622': '\u0627',
+    '\u0623': '\u0627',
+    '\u0625': '\u0627',
+    '\u0671': '\u0627',
+    '\u0629': '\u0647',
+    '\u0649': '\u064A',
+    '\u0624': '\u0648',
+    '\u0626': '\u064A',
+})
+ARABIC_ALEF = '\u0627'
+ARABIC_HAMZA = '\u0621'
+TOKEN_PATTERN = re.compile(r'\w+')
+
+
+def build_search_text(*texts):
+    tokens = []
+    for text in texts:
+        text = ARABIC_DIACRITICS.sub('', text or '').translate(ARABIC_LETTER_MAP)
+        text = text.replace(ARABIC_HAMZA + ARABIC_ALEF, ARABIC_ALEF)
+        decomposed = unicodedata.normalize('NFKD', text)
+        text = ''.join(ch for ch in decomposed if not unicodedata.combining(ch)).casefold()
+        tokens.extend(TOKEN_PATTERN.findall(text))
+    return ' '.join(tokens)
+
+
+def backfill_search_text(apps, schema_editor):
+    """Precompute the normalized search tokens of existing verses."""
+    Verse = apps.get_model('quran', 'Verse')
+
+    verses = list(Verse.objects.only('id', 'text_arabic', 'text_translation', 'text_transliteration'))
+    for verse in verses:
+        verse.search_text = build_search_text(verse.text_arabic, verse.text_translation, verse.text_transliteration)
+    Verse.objects.bulk_update(verses, ['search_text'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quran', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='verse',
+            name='search_text',
+            field=models.TextField(blank=True, default='', editable=False, help_text='Normalized tokens of the Arabic text, translation and transliteration'),
+        ),
+        migrations.RunPython(backfill_search_text, migrations.RunPython.noop),
+    ]
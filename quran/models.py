@@ -1,6 +1,8 @@
 from django.db import models
 from django.contrib.auth import get_user_model
 
+from .utils import build_search_text
+
 User = get_user_model()
 
 
@@ -37,6 +39,12 @@ class Verse(models.Model):
     text_translation = models.TextField()
     text_transliteration = models.TextField(blank=True, null=True)
     audio_url = models.URLField(max_length=500, blank=True, null=True)
+    search_text = models.TextField(
+        blank=True,
+        default='',
+        editable=False,
+        help_text='Normalized tokens of the Arabic text, translation and transliteration'
+    )
     
     class Meta:
         ordering = ['surah__number', 'verse_number']
@@ -46,6 +54,13 @@ class Verse(models.Model):
     
     def __str__(self):
         return f"{self.surah.name_transliteration} {self.verse_number}"
+    
+    def save(self, *args, **kwargs):
+        self.search_text = build_search_text(self.text_arabic, self.text_translation, self.text_transliteration)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'text_arabic', 'text_translation', 'text_transliteration'} & set(update_fields):
+            kwargs['update_fields'] = set(update_fields) | {'search_text'}
+        super().save(*args, **kwargs)
 
 
 class Bookmark(models.Model):
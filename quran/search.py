@@ -0,0 +1,197 @@
+"""
+In-process full-text search over Quran verses.
+
+The verse table is small (~6,236 rows) and only changes when `setup_quran`
+runs, so each worker process keeps an inverted index built from the
+precomputed `Verse.search_text` column and rebuilds it when the Quran content
+version changes. The same code path serves SQLite in development and Postgres
+in production.
+
+Queries are tokenized and normalized like the verses; every query term must
+match (as a whole word, a word without its attached article, its alef-less
+skeleton, or a word prefix)
+and results are ranked with BM25.
+"""
+import bisect
+import math
+import threading
+from collections import defaultdict
+from typing import NamedTuple
+
+from django.utils.html import escape
+
+from .utils import arabic_skeleton, get_content_version, token_forms, tokenize
+
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+
+# Prefix matches ("merc" -> "merciful") rank below whole-word matches
+PREFIX_MATCH_WEIGHT = 0.5
+
+# Matches through the alef-less skeleton of an Arabic term
+SKELETON_MATCH_WEIGHT = 0.8
+
+# Shortest query term that is also matched as a word prefix
+MIN_PREFIX_LENGTH = 3
+
+HIGHLIGHT_FIELDS = ('text_arabic', 'text_translation', 'text_transliteration')
+
+
+class SearchHit(NamedTuple):
+    verse_id: int
+    score: float
+    # Index terms the query matched, used for highlighting
+    terms: frozenset
+
+
+class VerseSearchIndex:
+    """Inverted index of verse tokens to {verse id: term frequency}."""
+
+    def __init__(self, rows, version=None):
+        """
+        Args:
+            rows: Iterable of (verse id, search_text) in canonical verse order
+            version: Content version the index was built from
+        """
+        self.version = version
+        self.postings = defaultdict(dict)
+        self.order = {}
+        lengths = {}
+
+        for position, (verse_id, search_text) in enumerate(rows):
+            tokens = search_text.split()
+            self.order[verse_id] = position
+            lengths[verse_id] = len(tokens) or 1
+            for token in tokens:
+                for form in token_forms(token):
+                    postings = self.postings[form]
+                    postings[verse_id] = postings.get(verse_id, 0) + 1
+
+        self.postings = dict(self.postings)
+        self.terms = sorted(self.postings)
+
+        # BM25 length normalization, precomputed per verse
+        average_length = sum(lengths.values()) / len(lengths) if lengths else 1.0
+        self.norms = {
+            verse_id: K1 * (1 - B + B * length / average_length)
+            for verse_id, length in lengths.items()
+        }
+
+    @classmethod
+    def from_database(cls, version=None):
+        from .models import Verse
+
+        rows = Verse.objects.order_by('surah__number', 'verse_number').values_list('id', 'search_text')
+        return cls(rows.iterator(), version=version)
+
+    def __len__(self):
+        return len(self.order)
+
+    def expand(self, query_term):
+        """Return {index term: weight} for every term a query term matches."""
+        matches = {query_term: 1.0} if query_term in self.postings else {}
+        skeleton = arabic_skeleton(query_term)
+        if skeleton in self.postings:
+            matches.setdefault(skeleton, SKELETON_MATCH_WEIGHT)
+        if len(query_term) >= MIN_PREFIX_LENGTH:
+            start = bisect.bisect_left(self.terms, query_term)
+            for term in self.terms[start:]:
+                if not term.startswith(query_term):
+                    break
+                matches.setdefault(term, PREFIX_MATCH_WEIGHT)
+        return matches
+
+    def search(self, query):
+        """
+        Rank verses matching every term of the query.
+
+        Returns:
+            List of SearchHit, best match first (ties in verse order)
+        """
+        expansions = [self.expand(query_term) for query_term in dict.fromkeys(tokenize(query))]
+        if not expansions or not all(expansions):
+            return []
+
+        # Start with the rarest query term so the candidate set shrinks fastest
+        expansions.sort(key=lambda matches: sum(len(self.postings[term]) for term in matches))
+
+        total = len(self.order)
+        norms = self.norms
+        scores = None
+        for matches in expansions:
+            term_scores = {}
+            for term, weight in matches.items():
+                postings = self.postings[term]
+                idf = math.log(1 + (total - len(postings) + 0.5) / (len(postings) + 0.5))
+                boost = weight * idf * (K1 + 1)
+                for verse_id, frequency in postings.items():
+                    if scores is not None and verse_id not in scores:
+                        continue
+                    score = boost * frequency / (frequency + norms[verse_id])
+                    # A verse counts its best-matching form of the query term once
+                    if score > term_scores.get(verse_id, 0):
+                        term_scores[verse_id] = score
+
+            if scores is None:
+                scores = term_scores
+            else:
+                scores = {verse_id: score + scores[verse_id] for verse_id, score in term_scores.items()}
+            if not scores:
+                return []
+
+        terms = frozenset(term for matches in expansions for term in matches)
+        order = self.order
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], order[item[0]]))
+        return [SearchHit(verse_id, score, terms) for verse_id, score in ranked]
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_search_index():
+    """Return this process's verse index, rebuilding it if the Quran content changed."""
+    global _index
+    version = get_content_version()
+    index = _index
+    if index is None or index.version != version:
+        with _index_lock:
+            if _index is None or _index.version != version:
+                _index = VerseSearchIndex.from_database(version=version)
+            index = _index
+    return index
+
+
+def search_verses(query):
+    """Search verses; see VerseSearchIndex.search."""
+    return get_search_index().search(query)
+
+
+def highlight(text, terms):
+    """
+    HTML-escape text and wrap the words that matched the search in <mark>.
+    Words keep their original spelling (diacritics included); matching is done
+    on their normalized forms.
+    """
+    if not text:
+        return text
+    parts = []
+    for word in text.split(' '):
+        word_terms = {form for token in tokenize(word) for form in token_forms(token)}
+        if word_terms & terms:
+            parts.append(f'<mark>{escape(word)}</mark>')
+        else:
+            parts.append(escape(word))
+    return ' '.join(parts)
+
+
+def highlight_verse(verse, terms):
+    """Return {field: highlighted text} for the verse fields containing a match."""
+    highlights = {}
+    for field_name in HIGHLIGHT_FIELDS:
+        value = getattr(verse, field_name)
+        highlighted = highlight(value, terms)
+        if highlighted and '<mark>' in highlighted:
+            highlights[field_name] = highlighted
+    return highlights
@@ -1,5 +1,6 @@
 from rest_framework import serializers
 from .models import Surah, Verse, Bookmark, ReadingHistory
+from .search import highlight_verse
 
 
 class VerseSerializer(serializers.ModelSerializer):
@@ -8,6 +9,25 @@ class VerseSerializer(serializers.ModelSerializer):
         fields = ['id', 'verse_number', 'text_arabic', 'text_translation', 'text_transliteration', 'audio_url']
 
 
+class VerseSearchResultSerializer(VerseSerializer):
+    """Verse with its surah, search score and highlighted matches"""
+    surah_number = serializers.IntegerField(source='surah.number', read_only=True)
+    surah_name = serializers.CharField(source='surah.name_transliteration', read_only=True)
+    score = serializers.SerializerMethodField()
+    highlights = serializers.SerializerMethodField()
+    
+    class Meta(VerseSerializer.Meta):
+        fields = VerseSerializer.Meta.fields + ['surah_number', 'surah_name', 'score', 'highlights']
+    
+    def get_score(self, obj):
+        hit = self.context.get('hits', {}).get(obj.id)
+        return round(hit.score, 4) if hit else None
+    
+    def get_highlights(self, obj):
+        hit = self.context.get('hits', {}).get(obj.id)
+        return highlight_verse(obj, hit.terms) if hit else {}
+
+
 class SurahListSerializer(serializers.ModelSerializer):
     """Lightweight serializer for listing surahs"""
     class Meta:
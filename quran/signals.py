@@ -0,0 +1,16 @@
+"""
+Signals for quran app
+"""
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from .models import Surah, Verse
+from .utils import bump_content_version
+
+
+@receiver(post_save, sender=Surah)
+@receiver(post_save, sender=Verse)
+@receiver(post_delete, sender=Surah)
+@receiver(post_delete, sender=Verse)
+def bump_content_version_on_change(sender, instance, **kwargs):
+    """Rebuild search indexes and cached payloads after surahs or verses change"""
+    bump_content_version()
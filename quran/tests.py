@@ -1,4 +1,226 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
 from django.test import TestCase
+from rest_framework.test import APIClient
+
+from .models import Surah, Verse
+from .search import search_verses
+from .utils import tokenize
+
+User = get_user_model()
+
+
+class ArabicNormalizationTestCase(TestCase):
+    """Test cases for verse text normalization"""
+
+    def test_diacritics_are_stripped(self):
+        self.assertEqual(tokenize('بِسْمِ ٱللَّهِ ٱلرَّحْمَٰنِ ٱلرَّحِيمِ'), tokenize('بسم الله الرحمن الرحيم'))
+
+    def test_letter_variants_are_unified(self):
+        # alef variants, ta marbuta, alef maqsura
+        self.assertEqual(tokenize('أحد إله آمن ٱلصلاة هدى'), ['احد', 'اله', 'امن', 'الصلاه', 'هدي'])
+
+    def test_latin_is_case_folded_without_accents(self):
+        self.assertEqual(tokenize('In the name of Allāh'), ['in', 'the', 'name', 'of', 'allah'])
+
+
+class VerseSearchTestCase(TestCase):
+    """Test cases for the verse search index and endpoint"""
+
+    def setUp(self):
+        cache.clear()
+        self.fatiha = Surah.objects.create(
+            number=1,
+            name_arabic='الفاتحة',
+            name_transliteration='Al-Fatihah',
+            name_translation='The Opening',
+            total_verses=7,
+            revelation_type='meccan'
+        )
+        self.basmala = Verse.objects.create(
+            surah=self.fatiha,
+            verse_number=1,
+            text_arabic='بِسْمِ ٱللَّهِ ٱلرَّحْمَٰنِ ٱلرَّحِيمِ',
+            text_translation='In the name of Allah, the Entirely Merciful, the Especially Merciful.'
+        )
+        self.rahman = Verse.objects.create(
+            surah=self.fatiha,
+            verse_number=3,
+            text_arabic='ٱلرَّحْمَٰنِ ٱلرَّحِيمِ',
+            text_translation='The Entirely Merciful, the Especially Merciful,'
+        )
+        self.sirat = Verse.objects.create(
+            surah=self.fatiha,
+            verse_number=6,
+            text_arabic='ٱهْدِنَا ٱلصِّرَٰطَ ٱلْمُسْتَقِيمَ',
+            text_translation='Guide us to the straight path -'
+        )
+        self.client = APIClient()
+        self.url = '/api/quran/verses/search/'
+
+    def test_arabic_query_without_diacritics(self):
+        """Test that a plain query matches fully vowelled Uthmani text"""
+        hits = search_verses('الرحيم')
+        self.assertEqual({hit.verse_id for hit in hits}, {self.basmala.id, self.rahman.id})
+
+    def test_modern_spelling_matches_uthmani_spelling(self):
+        """Test that a spelled-out long vowel matches the dagger alef"""
+        self.assertEqual([hit.verse_id for hit in search_verses('صراط')], [self.sirat.id])
+        self.assertEqual([hit.verse_id for hit in search_verses('الرحمان')][0], self.rahman.id)
+
+    def test_all_terms_must_match(self):
+        self.assertEqual([hit.verse_id for hit in search_verses('straight path')], [self.sirat.id])
+        self.assertEqual(search_verses('straight mercy'), [])
+
+    def test_ranking_prefers_denser_matches(self):
+        """Test that the shorter verse with the same matches ranks first"""
+        hits = search_verses('merciful')
+        self.assertEqual([hit.verse_id for hit in hits], [self.rahman.id, self.basmala.id])
+
+    def test_prefix_match(self):
+        self.assertEqual([hit.verse_id for hit in search_verses('stra')], [self.sirat.id])
+
+    def test_index_follows_verse_changes(self):
+        """Test that editing a verse is reflected in the next search"""
+        self.assertEqual(search_verses('opening'), [])
+
+        self.sirat.text_translation = 'The opening path'
+        self.sirat.save()
+
+        self.assertEqual([hit.verse_id for hit in search_verses('opening')], [self.sirat.id])
+
+    def test_search_endpoint(self):
+        """Test that results are paginated, ranked and highlighted"""
+        response = self.client.get(self.url, {'q': 'الرحيم', 'page_size': 1})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['count'], 2)
+        self.assertIsNotNone(response.data['next'])
+
+        result = response.data['results'][0]
+        self.assertEqual(result['id'], self.rahman.id)
+        self.assertEqual(result['surah_number'], 1)
+        self.assertGreater(result['score'], 0)
+        self.assertEqual(result['highlights']['text_arabic'], 'ٱلرَّحْمَٰنِ <mark>ٱلرَّحِيمِ</mark>')
+
+    def test_search_endpoint_escapes_highlights(self):
+        self.rahman.text_translation = '<b>Merciful</b> one'
+        self.rahman.save()
+
+        response = self.client.get(self.url, {'q': 'one'})
+        self.assertEqual(
+            response.data['results'][0]['highlights']['text_translation'],
+            '&lt;b&gt;Merciful&lt;/b&gt; <mark>one</mark>'
+        )
+
+    def test_search_endpoint_query_count(self):
+        """Test that a warm search costs one query for the page of verses"""
+        search_verses('merciful')
+        with self.assertNumQueries(1):
+            self.client.get(self.url, {'q': 'merciful'})
+
+
+class SurahBundleTestCase(TestCase):
+    """Test cases for cached surah verse payloads with ETags"""
+
+    def setUp(self):
+        cache.clear()
+        self.surah = Surah.objects.create(
+            number=112,
+            name_arabic='الإخلاص',
+            name_transliteration='Al-Ikhlas',
+            name_translation='The Sincerity',
+            total_verses=8,
+            revelation_type='meccan'
+        )
+        for i in range(1, 9):
+            Verse.objects.create(
+                surah=self.surah,
+                verse_number=i,
+                text_arabic=f'آية {i}',
+                text_translation=f'Verse {i}'
+            )
+        self.user = User.objects.create_user(
+            email='reader@test.com',
+            password='testpass123',
+            full_name='Reader',
+            role='student'
+        )
+        self.client = APIClient()
+        self.url = '/api/quran/surahs/112/verses/'
+
+    def test_verses_served_from_bundle(self):
+        """Test that warm requests neither query verses nor change the payload"""
+        first = self.client.get(self.url)
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(len(first.data['results']), 6)
+        self.assertTrue(first.data['access_restricted'])
+
+        with self.assertNumQueries(0):
+            second = self.client.get(self.url)
+        self.assertEqual(second.data, first.data)
+        self.assertEqual(second['ETag'], first['ETag'])
+        self.assertIn('immutable', second['Cache-Control'])
+
+    def test_not_modified(self):
+        """Test that a matching If-None-Match gets an empty 304"""
+        etag = self.client.get(self.url)['ETag']
+
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+        self.assertEqual(response['ETag'], etag)
+
+    def test_etag_depends_on_access_and_page(self):
+        """Test that restricted, full and paginated views carry different ETags"""
+        anonymous = self.client.get(self.url)['ETag']
+        second_page = self.client.get(self.url, {'page_size': 5, 'page': 2})['ETag']
+
+        self.client.force_authenticate(user=self.user)
+        response = self.client.get(self.url)
+        self.assertEqual(len(response.data['results']), 8)
+        self.assertTrue(response['Cache-Control'].startswith('private'))
+        self.assertEqual(len({anonymous, second_page, response['ETag']}), 3)
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=anonymous)
+        self.assertEqual(response.status_code, 200)
+
+    def test_verse_change_invalidates_bundle(self):
+        """Test that editing a verse changes the payload and the ETag"""
+        etag = self.client.get(self.url)['ETag']
+
+        verse = Verse.objects.get(surah=self.surah, verse_number=1)
+        verse.text_translation = 'Say, He is Allah, the One'
+        verse.save()
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['results'][0]['text_translation'], 'Say, He is Allah, the One')
+
+    def test_setup_quran_invalidates_bundle(self):
+        """Test that setup_quran replaces the cached bundles even when writes skip signals"""
+        self.client.get(self.url)
+        Verse.objects.filter(surah=self.surah, verse_number=1).update(text_translation='Updated')
+
+        out = StringIO()
+        call_command('setup_quran', '--skip-surahs', '--skip-verses', '--skip-audio', stdout=out)
+
+        response = self.client.get(self.url)
+        self.assertEqual(response.data['results'][0]['text_translation'], 'Updated')
+
+    def test_verse_list_by_surah(self):
+        """Test that /verses/?surah= uses the bundle and keeps the anonymous limit"""
+        response = self.client.get('/api/quran/verses/', {'surah': 112})
+        self.assertEqual([verse['verse_number'] for verse in response.data['results']], [1, 2, 3, 4, 5, 6])
+        self.assertFalse(response.data['is_authenticated'])
 
-# Create your tests here.
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/quran/verses/', {'surah': 112}, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
 
+    def test_unknown_surah(self):
+        self.assertEqual(self.client.get('/api/quran/surahs/200/verses/').status_code, 404)
+        self.assertEqual(self.client.get('/api/quran/verses/', {'surah': 200}).data['results'], [])
@@ -0,0 +1,174 @@
+"""
+Utility functions for Quran text normalization and content versioning.
+
+Verses are searched on a normalized form of their text:
+- Arabic: diacritics (tashkeel), Quranic annotation marks and tatweel are
+  stripped, alef variants become a bare alef, ta marbuta becomes ha and
+  alef maqsura becomes ya, so a query matches with or without vowels.
+- Latin (translation, transliteration): accents are stripped and case folded.
+
+Surah and verse content only changes when `setup_quran` runs (or an admin edits
+a verse). Everything derived from it - the search index, the serialized surah
+bundles - is keyed by a content version that those writes bump.
+"""
+import hashlib
+import json
+import re
+import unicodedata
+from dataclasses import dataclass
+from functools import lru_cache
+
+from django.core.cache import cache
+
+from core.cache import bump_cache_version, get_cache_version
+
+CONTENT_VERSION_KEY = 'quran:content:version'
+
+# Bundles are keyed by content version, so they never need to expire early
+SURAH_BUNDLE_CACHE_TIMEOUT = 60 * 60 * 24 * 7
+
+# Harakat, Quranic annotation marks, superscript alef and tatweel
+ARABIC_DIACRITICS = re.compile(
+    '[\u0610-\u061A\u064B-\u065F\u0670\u06D6-\u06DC\u06DF-\u06E8\u06EA-\u06ED\u0640]'
+)
+
+ARABIC_LETTER_MAP = str.maketrans({
+    '\u0622': '\u0627',  # alef with madda -> alef
+    '\u0623': '\u0627',  # alef with hamza above -> alef
+    '\u0625': '\u0627',  # alef with hamza below -> alef
+    '\u0671': '\u0627',  # alef wasla -> alef
+    '\u0629': '\u0647',  # ta marbuta -> ha
+    '\u0649': '\u064A',  # alef maqsura -> ya
+    '\u0624': '\u0648',  # waw with hamza -> waw
+    '\u0626': '\u064A',  # ya with hamza -> ya
+})
+
+ARABIC_ALEF = '\u0627'
+ARABIC_HAMZA = '\u0621'
+
+# Attached particles stripped from Arabic words, so "والرحمن" also matches "الرحمن" and "رحمن"
+ARABIC_CONJUNCTIONS = ('\u0648', '\u0641', '\u0628', '\u0643')  # wa, fa, bi, ka
+ARABIC_ARTICLE = '\u0627\u0644'  # al
+
+TOKEN_PATTERN = re.compile(r'\w+')
+
+
+def normalize_arabic(text):
+    """Strip diacritics and unify letter variants of Arabic text."""
+    text = ARABIC_DIACRITICS.sub('', text or '').translate(ARABIC_LETTER_MAP)
+    # Uthmani script writes a leading long a as hamza + alef ("ءامنوا")
+    return text.replace(ARABIC_HAMZA + ARABIC_ALEF, ARABIC_ALEF)
+
+
+def arabic_skeleton(token):
+    """
+    Drop medial alefs, so Uthmani spellings with a dagger alef ("صرط", "الرحمن")
+    and modern spellings ("صراط", "الرحمان") meet on the same form.
+    Returns None for tokens without a medial alef.
+    """
+    skeleton = token[:1] + token[1:].replace(ARABIC_ALEF, '')
+    return skeleton if skeleton != token and len(skeleton) >= 2 else None
+
+
+def normalize_latin(text):
+    """Strip accents and case fold Latin text."""
+    decomposed = unicodedata.normalize('NFKD', text or '')
+    return ''.join(ch for ch in decomposed if not unicodedata.combining(ch)).casefold()
+
+
+def tokenize(text):
+    """Split text into normalized search tokens (works for Arabic and Latin)."""
+    return TOKEN_PATTERN.findall(normalize_latin(normalize_arabic(text)))
+
+
+@lru_cache(maxsize=50000)
+def token_forms(token):
+    """
+    Return the token plus its forms without an attached conjunction and article,
+    and the alef-less skeleton of each (see arabic_skeleton).
+    """
+    forms = [token]
+    if token[:1] in ARABIC_CONJUNCTIONS and token[1:3] == ARABIC_ARTICLE:
+        token = token[1:]
+        forms.append(token)
+    # Keep short words like "الله" intact
+    if token.startswith(ARABIC_ARTICLE) and len(token) > 4:
+        forms.append(token[2:])
+    skeletons = [skeleton for skeleton in map(arabic_skeleton, forms) if skeleton]
+    return tuple(dict.fromkeys(forms + skeletons))
+
+
+def build_search_text(*texts):
+    """Build the precomputed, space-separated token string stored on a verse."""
+    return ' '.join(token for text in texts for token in tokenize(text))
+
+
+def get_content_version():
+    """Current version of the Quran content; changes whenever surahs or verses change."""
+    return get_cache_version(CONTENT_VERSION_KEY)
+
+
+def bump_content_version():
+    """Invalidate everything derived from Quran content (search index, cached payloads)."""
+    return bump_cache_version(CONTENT_VERSION_KEY)
+
+
+@dataclass(frozen=True)
+class SurahBundle:
+    """All verses of a surah, serialized once per content version."""
+    number: int
+    verses: tuple
+    # Hash of the serialized verses; stable across processes and restarts
+    digest: str
+
+
+# Surah number -> SurahBundle, for the content version in _bundles_version
+_bundles = {}
+_bundles_version = None
+
+
+def build_surah_bundle(number):
+    """Serialize a surah's verses from the database; None if the surah does not exist."""
+    from .models import Surah, Verse
+    from .serializers import VerseSerializer
+
+    surah_id = Surah.objects.filter(number=number).values_list('id', flat=True).first()
+    if surah_id is None:
+        return None
+
+    # Filtering by surah id and ordering by verse number avoids the surah join of Verse.Meta.ordering
+    verses = Verse.objects.filter(surah_id=surah_id).order_by('verse_number')
+    data = tuple(dict(item) for item in VerseSerializer(verses, many=True).data)
+    digest = hashlib.sha256(
+        json.dumps(data, sort_keys=True, ensure_ascii=False, default=str).encode()
+    ).hexdigest()[:32]
+    return SurahBundle(number=number, verses=data, digest=digest)
+
+
+def get_surah_bundle(number):
+    """
+    Get the serialized verses of a surah.
+
+    Bundles are memoized in the process and shared through the cache; both are
+    keyed by the content version, so `setup_quran` and verse edits replace them.
+
+    Returns:
+        SurahBundle, or None if the surah does not exist
+    """
+    global _bundles_version
+    version = get_content_version()
+    if _bundles_version != version:
+        _bundles.clear()
+        _bundles_version = version
+
+    bundle = _bundles.get(number)
+    if bundle is None:
+        key = f'quran:surah:{number}:v{version}:bundle'
+        bundle = cache.get(key)
+        if bundle is None:
+            bundle = build_surah_bundle(number)
+            if bundle is None:
+                return None
+            cache.set(key, bundle, SURAH_BUNDLE_CACHE_TIMEOUT)
+        _bundles[number] = bundle
+    return bundle
@@ -1,17 +1,57 @@
+import hashlib
+
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticatedOrReadOnly, IsAuthenticated, AllowAny
 from rest_framework.pagination import PageNumberPagination
 from django.db.models import Q
+from django.utils.http import parse_etags, quote_etag
 from .models import Surah, Verse, Bookmark, ReadingHistory
 from .serializers import (
-    SurahListSerializer, SurahDetailSerializer, VerseSerializer,
+    SurahListSerializer, SurahDetailSerializer, VerseSerializer, VerseSearchResultSerializer,
     BookmarkSerializer, ReadingHistorySerializer
 )
+from .search import search_verses
+from .utils import SurahBundle, get_surah_bundle
 from .permissions import IsAuthenticatedOrLimitedAccess
 
 
+# Verse content only changes with `setup_quran`; the ETag still catches that after expiry
+QURAN_CACHE_CONTROL = 'max-age=86400, immutable'
+
+
+def get_bundle_or_none(number):
+    """Return the surah bundle for a URL/query value, or None if it is not a known surah"""
+    try:
+        return get_surah_bundle(int(number))
+    except (TypeError, ValueError):
+        return None
+
+
+def conditional_response(request, bundle, build_data):
+    """
+    Respond with a strong ETag derived from the bundle, the URL and the access level.
+    A matching If-None-Match gets a 304 without building or serializing the body.
+    """
+    is_authenticated = bool(request.user and request.user.is_authenticated)
+    etag = quote_etag(hashlib.sha256(
+        f'{bundle.digest}:{request.get_full_path()}:{is_authenticated}'.encode()
+    ).hexdigest()[:32])
+    headers = {
+        'ETag': etag,
+        # Authenticated responses include the full surah, keep them out of shared caches
+        'Cache-Control': f"{'private' if is_authenticated else 'public'}, {QURAN_CACHE_CONTROL}",
+        'Vary': 'Authorization, Cookie',
+    }
+    
+    if_none_match = parse_etags(request.headers.get('If-None-Match', ''))
+    if etag in if_none_match or '*' in if_none_match:
+        return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    
+    return Response(build_data(), headers=headers)
+
+
 class VersePagination(PageNumberPagination):
     """Custom pagination for verses"""
     page_size = 50
@@ -42,14 +82,21 @@ class SurahViewSet(viewsets.ReadOnlyModelViewSet):
     def get_verses(self, request, number=None):
         """
         Get verses for a surah with pagination.
+        Served from the precomputed surah bundle, with ETag/304 support.
         
         Authentication Restrictions:
         - Unauthenticated users: Limited to first 5 ayahs
         - Authenticated users: Full access
         """
-        try:
-            surah = self.get_object()
-            verses = Verse.objects.filter(surah=surah).order_by('verse_number')
+        bundle = get_bundle_or_none(number)
+        if bundle is None:
+            return Response(
+                {'error': 'Surah not found'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        
+        def build_data():
+            verses = list(bundle.verses)
             
             # Check if user is authenticated
             is_authenticated = request.user and request.user.is_authenticated
@@ -67,28 +114,23 @@ class SurahViewSet(viewsets.ReadOnlyModelViewSet):
             page = paginator.paginate_queryset(verses, request)
             
             if page is not None:
-                serializer = VerseSerializer(page, many=True)
-                response_data = paginator.get_paginated_response(serializer.data).data
+                response_data = paginator.get_paginated_response(page).data
                 # Add authentication status to response
                 response_data['is_authenticated'] = is_authenticated
                 response_data['access_restricted'] = restricted
                 if restricted:
                     response_data['message'] = 'Login to access all ayahs. Currently showing first 5 ayahs only.'
-                return Response(response_data)
+                return response_data
             
             # Fallback if no pagination
-            serializer = VerseSerializer(verses, many=True)
-            return Response({
-                'results': serializer.data,
+            return {
+                'results': verses,
                 'is_authenticated': is_authenticated,
                 'access_restricted': restricted,
                 'message': 'Login to access all ayahs. Currently showing first 5 ayahs only.' if restricted else None
-            })
-        except Surah.DoesNotExist:
-            return Response(
-                {'error': 'Surah not found'},
-                status=status.HTTP_404_NOT_FOUND
-            )
+            }
+        
+        return conditional_response(request, bundle, build_data)
     
     @action(detail=False, methods=['get'])
     def search(self, request):
@@ -135,6 +177,10 @@ class VerseViewSet(viewsets.ReadOnlyModelViewSet):
     
     def list(self, request, *args, **kwargs):
         """Override list to add authentication metadata"""
+        surah_number = request.query_params.get('surah', None)
+        if surah_number:
+            return self.list_surah(request, surah_number)
+        
         queryset = self.filter_queryset(self.get_queryset())
         is_authenticated = request.user and request.user.is_authenticated
         
@@ -154,21 +200,64 @@ class VerseViewSet(viewsets.ReadOnlyModelViewSet):
             'message': 'Login to access all ayahs. Currently showing first 5 ayahs only.' if not is_authenticated else None
         })
     
+    def list_surah(self, request, surah_number):
+        """List the verses of one surah from its precomputed bundle, with ETag/304 support"""
+        bundle = get_bundle_or_none(surah_number)
+        if bundle is None:
+            # Unknown surah: same empty result the queryset filter used to give
+            bundle = SurahBundle(number=None, verses=(), digest='empty')
+        
+        def build_data():
+            is_authenticated = request.user and request.user.is_authenticated
+            verses = list(bundle.verses)
+            
+            # Limit unauthenticated users to first 6 ayahs (5 normal + 1 blurred preview)
+            if not is_authenticated:
+                verses = [verse for verse in verses if verse['verse_number'] <= 6]
+            
+            page = self.paginate_queryset(verses)
+            if page is not None:
+                data = self.get_paginated_response(page).data
+                data['is_authenticated'] = is_authenticated
+                if not is_authenticated:
+                    data['message'] = 'Login to access all ayahs. Currently showing first 5 ayahs only.'
+                return data
+            
+            return {
+                'results': verses,
+                'is_authenticated': is_authenticated,
+                'message': 'Login to access all ayahs. Currently showing first 5 ayahs only.' if not is_authenticated else None
+            }
+        
+        return conditional_response(request, bundle, build_data)
+    
     @action(detail=False, methods=['get'])
     def search(self, request):
-        """Search verses by Arabic text or translation"""
-        query = request.query_params.get('q', '')
-        if query:
-            verses = Verse.objects.filter(
-                Q(text_arabic__icontains=query) |
-                Q(text_translation__icontains=query) |
-                Q(text_transliteration__icontains=query)
-            )[:50]  # Limit results
-        else:
-            verses = Verse.objects.all()[:50]
+        """
+        Search verses by Arabic text, translation or transliteration.
+        Arabic matches ignore diacritics and letter variants; results are ranked
+        and paginated, with matched words wrapped in <mark> in `highlights`.
+        """
+        query = request.query_params.get('q', '').strip()
+        paginator = VersePagination()
         
-        serializer = self.get_serializer(verses, many=True)
-        return Response(serializer.data)
+        if not query:
+            verses = Verse.objects.select_related('surah')
+            page = paginator.paginate_queryset(verses, request)
+            serializer = VerseSearchResultSerializer(page, many=True)
+            return paginator.get_paginated_response(serializer.data)
+        
+        hits = search_verses(query)
+        page = paginator.paginate_queryset(hits, request)
+        
+        # Load only the verses of this page, keeping the ranking order
+        verses = Verse.objects.select_related('surah').in_bulk([hit.verse_id for hit in page])
+        serializer = VerseSearchResultSerializer(
+            [verses[hit.verse_id] for hit in page if hit.verse_id in verses],
+            many=True,
+            context={'hits': {hit.verse_id: hit for hit in page}}
+        )
+        return paginator.get_paginated_response(serializer.data)
 
 
 class BookmarkViewSet(viewsets.ModelViewSet):